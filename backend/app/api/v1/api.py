@@ -4,10 +4,16 @@ from app.api.v1.endpoints import (
     employees,
     equipment,
     emplacements,
+    events,
     chatbot,
     health,
     import_excel,
-    employee_history
+    employee_history,
+    jobs,
+    movements,
+    reports,
+    search,
+    stats
 )
 
 api_router = APIRouter()
@@ -17,7 +23,13 @@ api_router.include_router(employees.router, prefix="/employees", tags=["employee
 api_router.include_router(equipment.router, prefix="/equipment", tags=["equipment"])
 api_router.include_router(emplacements.router, prefix="/emplacements", tags=["emplacements"])
 api_router.include_router(chatbot.router, prefix="/chatbot", tags=["chatbot"])
+api_router.include_router(events.router, prefix="/events", tags=["events"])
 api_router.include_router(health.router, prefix="/health", tags=["health"])
 api_router.include_router(import_excel.router, prefix="/import", tags=["import"])
+api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
+api_router.include_router(movements.router, prefix="/movements", tags=["movements"])
+api_router.include_router(reports.router, prefix="/reports", tags=["reports"])
+api_router.include_router(search.router, prefix="/search", tags=["search"])
+api_router.include_router(stats.router, prefix="/stats", tags=["stats"])
 # ✅ Historique des équipements par employé
 api_router.include_router(employee_history.router, prefix="/employees", tags=["employee-history"])
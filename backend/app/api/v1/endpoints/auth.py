@@ -2,11 +2,11 @@ from datetime import timedelta
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core import security
 from app.core.config import settings
-from app.core.deps import get_db, get_current_active_user
+from app.core.deps import get_async_db, get_current_active_user
 from app.crud import user as user_crud
 from app.schemas.token import Token
 from app.models.user import User
@@ -15,13 +15,21 @@ router = APIRouter()
 
 
 @router.post("/login", response_model=Token)
-def login(
-    db: Session = Depends(get_db),
+async def login(
+    db: AsyncSession = Depends(get_async_db),
     form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
-    user = user_crud.authenticate(
-        db, email=form_data.username, password=form_data.password
-    )
+    try:
+        user = await user_crud.authenticate_async(
+            db, email=form_data.username, password=form_data.password
+        )
+    except security.PasswordHasherBusy:
+        # ✅ Rafale de connexions : refuser tout de suite plutôt que d'affamer les autres routes
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Trop de connexions simultanées, réessayez dans un instant",
+            headers={"Retry-After": "1"},
+        )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.core.deps import get_db, get_current_user  # ✅ Import corrigé
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.deps import get_async_db, get_current_user  # ✅ Import corrigé
 from app.schemas.chatbot import ChatbotQuery, ChatbotResponse
 from app.services.chatbot import ChatbotService
 from app.models.user import User
@@ -11,14 +11,14 @@ router = APIRouter()
 @router.post("/query", response_model=ChatbotResponse)
 async def chatbot_query(
     query: ChatbotQuery,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Traite une question en langage naturel sur l'inventaire IT.
     
     Args:
-        query: Question en langage naturel
+        query: Question en langage naturel (context["cursor"] pour la suite d'une liste)
         db: Session de base de données
         current_user: Utilisateur authentifié
     
@@ -26,7 +26,7 @@ async def chatbot_query(
         Réponse du chatbot avec la réponse et les données
     """
     chatbot_service = ChatbotService(db)
-    result = await chatbot_service.process_query(query.question)
+    result = await chatbot_service.process_query(query.question, query.context)
     
     return ChatbotResponse(
         answer=result["answer"],
@@ -1,40 +1,70 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from collections import Counter
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal, Optional
 
-from app.core.deps import get_db
+from app.core.deps import get_async_db
+from app.core.etag import cache_headers, is_fresh, list_etag, not_modified, row_etag
+from app.core.serialization import FastJSONResponse
+from app.crud import emplacement as emplacement_crud
+from app.crud.pagination import count_rows_async
 from app.models.emplacements import Emplacement as EmplacementModel
+from app.models.equipment import Equipment as EquipmentModel
 from app.schemas.emplacements import (
     EmplacementResponse,
     EmplacementCreate,
     EmplacementUpdate
 )
+from app.services import stats, versions
 
 router = APIRouter()
 
 
 @router.get("", response_model=List[EmplacementResponse])
-def get_emplacements(
+async def get_emplacements(
+    request: Request,
     skip: int = Query(default=0, ge=0),
-    limit: int = Query(default=100, le=500),
-    db: Session = Depends(get_db)
+    limit: int = Query(default=100, ge=1, le=500),
+    cursor: Optional[str] = Query(default=None, description="Curseur X-Next-Cursor de la page précédente"),
+    sort: str = Query(default="id", description="id, updated_at ou site ; préfixe '-' pour décroissant"),
+    count: Optional[Literal["exact", "estimate"]] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Récupérer tous les emplacements avec pagination"""
-    emplacements = db.query(EmplacementModel).offset(skip).limit(limit).all()
-    return emplacements
+    """Récupérer les emplacements page par page (curseur renvoyé dans X-Next-Cursor)"""
+    etag = list_etag(request, await versions.read_async(db, ["emplacements"]))
+    if is_fresh(request, etag):
+        return not_modified(etag)
+
+    try:
+        emplacements, next_cursor = await emplacement_crud.get_emplacement_rows_async(
+            db, skip=skip, limit=limit, cursor=cursor, sort=sort
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    response = FastJSONResponse(emplacements, headers=cache_headers(etag))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if count:
+        total = await count_rows_async(db, emplacement_crud.list_emplacements_query(), count)
+        response.headers["X-Total-Count"] = str(total)
+    return response
 
 
 @router.post("", response_model=EmplacementResponse, status_code=201)
-def create_emplacement(
+async def create_emplacement(
     emplacement: EmplacementCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Créer un nouvel emplacement"""
-    existing = db.query(EmplacementModel).filter(
+    existing = await db.scalar(select(EmplacementModel.id).where(
         EmplacementModel.site == emplacement.site,
         EmplacementModel.etage == emplacement.etage,
         EmplacementModel.rosace == emplacement.rosace
-    ).first()
+    ))
     
     if existing:
         raise HTTPException(
@@ -44,58 +74,74 @@ def create_emplacement(
 
     db_emplacement = EmplacementModel(**emplacement.dict())
     db.add(db_emplacement)
-    db.commit()
-    db.refresh(db_emplacement)
+    await db.commit()
+    await db.refresh(db_emplacement)
     return db_emplacement
 
 
 @router.get("/{emplacement_id}", response_model=EmplacementResponse)
-def get_emplacement(
+async def get_emplacement(
     emplacement_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Récupérer un emplacement par ID"""
-    emplacement = db.query(EmplacementModel).filter(
-        EmplacementModel.id == emplacement_id
-    ).first()
+    emplacement = await emplacement_crud.get_emplacement_async(db, emplacement_id)
     if not emplacement:
         raise HTTPException(status_code=404, detail="Emplacement non trouvé")
+    etag = row_etag("emplacements", emplacement.id, emplacement.updated_at)
+    if is_fresh(request, etag):
+        return not_modified(etag)
+    response.headers.update(cache_headers(etag))
     return emplacement
 
 
 @router.put("/{emplacement_id}", response_model=EmplacementResponse)
-def update_emplacement(
+async def update_emplacement(
     emplacement_id: int,
     emplacement: EmplacementUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Mettre à jour un emplacement"""
-    db_emplacement = db.query(EmplacementModel).filter(
-        EmplacementModel.id == emplacement_id
-    ).first()
+    db_emplacement = await emplacement_crud.get_emplacement_async(db, emplacement_id)
     if not db_emplacement:
         raise HTTPException(status_code=404, detail="Emplacement non trouvé")
 
-    for key, value in emplacement.dict(exclude_unset=True).items():
-        setattr(db_emplacement, key, value)
-
-    db.commit()
-    db.refresh(db_emplacement)
+    # Les compteurs par site / étage suivent les équipements de cet emplacement
+    def apply_fields(session: Session) -> None:
+        located_here = EquipmentModel.emplacement_id == emplacement_id
+        before = stats.capture(session, located_here)
+        for key, value in emplacement.dict(exclude_unset=True).items():
+            setattr(db_emplacement, key, value)
+        session.flush()
+        stats.apply_changes(session, before, stats.capture(session, located_here))
+
+    await db.run_sync(apply_fields)
+    await db.commit()
+    await db.refresh(db_emplacement)
     return db_emplacement
 
 
 @router.delete("/{emplacement_id}")
-def delete_emplacement(
+async def delete_emplacement(
     emplacement_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Supprimer un emplacement"""
-    db_emplacement = db.query(EmplacementModel).filter(
-        EmplacementModel.id == emplacement_id
-    ).first()
+    db_emplacement = await emplacement_crud.get_emplacement_async(db, emplacement_id)
     if not db_emplacement:
         raise HTTPException(status_code=404, detail="Emplacement non trouvé")
 
-    db.delete(db_emplacement)
-    db.commit()
+    # Les équipements de l'emplacement sont détachés : ils quittent les compteurs par site / étage
+    def detach(session: Session) -> None:
+        before = stats.capture(session, EquipmentModel.emplacement_id == emplacement_id)
+        after = Counter()
+        for equipment in db_emplacement.equipments:
+            after += stats.contribution(equipment.status, equipment.equipment_type, equipment.condition, None, None)
+        session.delete(db_emplacement)
+        stats.apply_changes(session, before, after)
+
+    await db.run_sync(detach)
+    await db.commit()
     return {"message": "Emplacement supprimé avec succès"}
@@ -1,61 +1,97 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
-from typing import List
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
 
-from app.core.deps import get_db
+from app.core.deps import get_async_db
+from app.core.serialization import FastJSONResponse
+from app.crud import employee_equipment_history as history_crud
+from app.db.session import get_async_session_factory
 from app.models.employee_equipment_history import EmployeeEquipmentHistory
 from app.models.employee import Employee
 from app.models.equipment import Equipment
 from app.schemas.employee_equipment_history import HistoryCreate, HistoryResponse
+from app.services import export
+from app.services.history import AsOfService
 
 router = APIRouter()
 
 
+@router.get("/history/export")
+async def export_history(
+    employee_id: Optional[int] = None,
+    equipment_id: Optional[int] = None,
+    format: Literal["ndjson", "csv"] = Query(default="ndjson"),
+    gzip: bool = Query(default=False, description="Corps compressé (Content-Encoding: gzip)"),
+    session_factory=Depends(get_async_session_factory),
+):
+    """Exporter l'historique des attributions, tous employés confondus (NDJSON ou CSV)"""
+    stmt = export.history_query(employee_id=employee_id, equipment_id=equipment_id)
+    return export.export_response(session_factory, "history", export.HISTORY_COLUMNS, stmt, format, gzip)
+
+
+@router.get("/history/as-of", response_model=List[HistoryResponse])
+async def get_holders_as_of(
+    at: datetime = Query(description="Instant recherché (ISO 8601, UTC si sans fuseau)"),
+    serial_number: Optional[str] = None,
+    equipment_id: Optional[int] = None,
+    employee_id: Optional[int] = None,
+    department: Optional[str] = None,
+    limit: int = Query(default=100, ge=1, le=500),
+    cursor: Optional[str] = Query(default=None, description="Curseur X-Next-Cursor de la page précédente"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Qui détenait quel équipement à l'instant ``at`` (par numéro de série, employé ou département)"""
+    try:
+        holders, next_cursor = await db.run_sync(lambda session: AsOfService(session).holders(
+            at, serial_number=serial_number, equipment_id=equipment_id, employee_id=employee_id,
+            department=department, limit=limit, cursor=cursor,
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    response = FastJSONResponse(holders)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+
 @router.get("/{employee_id}/history", response_model=List[HistoryResponse])
-def get_employee_history(
+async def get_employee_history(
     employee_id: int,
-    db: Session = Depends(get_db)
+    limit: int = Query(default=100, ge=1, le=500),
+    cursor: Optional[str] = Query(default=None, description="Curseur X-Next-Cursor de la page précédente"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Récupérer tout l'historique des équipements d'un employé"""
-    employee = db.query(Employee).filter(Employee.id == employee_id).first()
-    if not employee:
+    """Récupérer l'historique des équipements d'un employé page par page, du plus récent au plus ancien"""
+    try:
+        history, next_cursor = await db.run_sync(history_crud.get_by_employee, employee_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Existence de l'employé vérifiée seulement si l'historique est vide
+    if not history and not cursor and await db.scalar(select(Employee.id).where(Employee.id == employee_id)) is None:
         raise HTTPException(status_code=404, detail="Employé non trouvé")
 
-    history = db.query(EmployeeEquipmentHistory).options(
-        joinedload(EmployeeEquipmentHistory.equipment)
-    ).filter(
-        EmployeeEquipmentHistory.employee_id == employee_id
-    ).order_by(EmployeeEquipmentHistory.assigned_at.desc()).all()
-
-    result = []
-    for h in history:
-        result.append(HistoryResponse(
-            id=h.id,
-            employee_id=h.employee_id,
-            equipment_id=h.equipment_id,
-            assigned_at=h.assigned_at,
-            returned_at=h.returned_at,
-            notes=h.notes,
-            created_at=h.created_at,
-            equipment_serial=h.equipment.serial_number if h.equipment else None,
-            equipment_model=h.equipment.model if h.equipment else None,
-            equipment_type=h.equipment.equipment_type if h.equipment else None,
-        ))
-    return result
+    response = FastJSONResponse(history)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
 
 
 @router.post("/{employee_id}/history", response_model=HistoryResponse, status_code=201)
-def add_equipment_to_history(
+async def add_equipment_to_history(
     employee_id: int,
     history: HistoryCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Ajouter une entrée dans l'historique d'un employé"""
-    employee = db.query(Employee).filter(Employee.id == employee_id).first()
+    employee = await db.get(Employee, employee_id)
     if not employee:
         raise HTTPException(status_code=404, detail="Employé non trouvé")
 
-    equipment = db.query(Equipment).filter(Equipment.id == history.equipment_id).first()
+    equipment = await db.get(Equipment, history.equipment_id)
     if not equipment:
         raise HTTPException(status_code=404, detail="Équipement non trouvé")
 
@@ -67,8 +103,8 @@ def add_equipment_to_history(
         notes=history.notes
     )
     db.add(db_history)
-    db.commit()
-    db.refresh(db_history)
+    await db.commit()
+    await db.refresh(db_history)
 
     return HistoryResponse(
         id=db_history.id,
@@ -85,21 +121,20 @@ def add_equipment_to_history(
 
 
 @router.patch("/{employee_id}/history/{history_id}/return")
-def return_equipment(
+async def return_equipment(
     employee_id: int,
     history_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Marquer un équipement comme restitué"""
-    from datetime import datetime
-    history = db.query(EmployeeEquipmentHistory).filter(
+    history = await db.scalar(select(EmployeeEquipmentHistory).where(
         EmployeeEquipmentHistory.id == history_id,
         EmployeeEquipmentHistory.employee_id == employee_id
-    ).first()
+    ))
 
     if not history:
         raise HTTPException(status_code=404, detail="Historique non trouvé")
 
     history.returned_at = datetime.utcnow()
-    db.commit()
+    await db.commit()
     return {"message": "Équipement marqué comme restitué ✅"}
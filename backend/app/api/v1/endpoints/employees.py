@@ -1,77 +1,112 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
 
-from app.core.deps import get_db
+from app.core.deps import get_async_db
+from app.core.etag import cache_headers, is_fresh, list_etag, not_modified, row_etag
+from app.core.serialization import FastJSONResponse
+from app.crud import employee as employee_crud
+from app.crud.pagination import count_rows_async
+from app.db.session import get_async_session_factory
 from app.models.employee import Employee as EmployeeModel
 from app.schemas.employee import Employee, EmployeeCreate, EmployeeUpdate
+from app.services import export, versions
 
 router = APIRouter()
 
 @router.get("", response_model=List[Employee])
-def get_employees(
+async def get_employees(
+    request: Request,
     skip: int = Query(default=0, ge=0),
-    limit: int = Query(default=100, le=500),
-    db: Session = Depends(get_db)
+    limit: int = Query(default=100, ge=1, le=500),
+    cursor: Optional[str] = Query(default=None, description="Curseur X-Next-Cursor de la page précédente"),
+    sort: str = Query(default="id", description="id, updated_at ou name ; préfixe '-' pour décroissant"),
+    count: Optional[Literal["exact", "estimate"]] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Récupérer tous les employés avec pagination"""
-    employees = db.query(EmployeeModel).offset(skip).limit(limit).all()
-    return employees
+    """Récupérer les employés page par page (curseur renvoyé dans X-Next-Cursor)"""
+    etag = list_etag(request, await versions.read_async(db, ["employees"]))
+    if is_fresh(request, etag):
+        return not_modified(etag)
+
+    try:
+        employees, next_cursor = await employee_crud.get_rows_async(
+            db, skip=skip, limit=limit, cursor=cursor, sort=sort
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    response = FastJSONResponse(employees, headers=cache_headers(etag))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if count:
+        response.headers["X-Total-Count"] = str(await count_rows_async(db, employee_crud.list_query(), count))
+    return response
 
 @router.post("", response_model=Employee, status_code=201)
-def create_employee(employee: EmployeeCreate, db: Session = Depends(get_db)):
+async def create_employee(employee: EmployeeCreate, db: AsyncSession = Depends(get_async_db)):
     """Créer un nouvel employé"""
-    existing = db.query(EmployeeModel).filter(
-        EmployeeModel.cuid == employee.cuid
-    ).first()
+    existing = await db.scalar(select(EmployeeModel.id).where(EmployeeModel.cuid == employee.cuid))
     if existing:
         raise HTTPException(status_code=400, detail="CUID déjà existant")
     
     db_employee = EmployeeModel(**employee.dict())
     db.add(db_employee)
-    db.commit()
-    db.refresh(db_employee)
+    await db.commit()
+    await db.refresh(db_employee)
     return db_employee
 
+# Déclaré avant /{employee_id}
+@router.get("/export")
+async def export_employees(
+    format: Literal["ndjson", "csv"] = Query(default="ndjson"),
+    gzip: bool = Query(default=False, description="Corps compressé (Content-Encoding: gzip)"),
+    session_factory=Depends(get_async_session_factory),
+):
+    """Exporter tous les employés (NDJSON ou CSV)"""
+    stmt = export.employees_query()
+    return export.export_response(session_factory, "employees", export.EMPLOYEE_COLUMNS, stmt, format, gzip)
+
 @router.get("/{employee_id}", response_model=Employee)
-def get_employee(employee_id: int, db: Session = Depends(get_db)):
+async def get_employee(
+    employee_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)
+):
     """Récupérer un employé par ID"""
-    employee = db.query(EmployeeModel).filter(
-        EmployeeModel.id == employee_id
-    ).first()
+    employee = await employee_crud.get_async(db, employee_id)
     if not employee:
         raise HTTPException(status_code=404, detail="Employé non trouvé")
+    etag = row_etag("employees", employee.id, employee.updated_at)
+    if is_fresh(request, etag):
+        return not_modified(etag)
+    response.headers.update(cache_headers(etag))
     return employee
 
 @router.put("/{employee_id}", response_model=Employee)
-def update_employee(
+async def update_employee(
     employee_id: int,
     employee: EmployeeUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Mettre à jour un employé"""
-    db_employee = db.query(EmployeeModel).filter(
-        EmployeeModel.id == employee_id
-    ).first()
+    db_employee = await employee_crud.get_async(db, employee_id)
     if not db_employee:
         raise HTTPException(status_code=404, detail="Employé non trouvé")
     
     for key, value in employee.dict(exclude_unset=True).items():
         setattr(db_employee, key, value)
     
-    db.commit()
-    db.refresh(db_employee)
+    await db.commit()
+    await db.refresh(db_employee)
     return db_employee
 
 @router.delete("/{employee_id}")
-def delete_employee(employee_id: int, db: Session = Depends(get_db)):
+async def delete_employee(employee_id: int, db: AsyncSession = Depends(get_async_db)):
     """Supprimer un employé"""
-    db_employee = db.query(EmployeeModel).filter(
-        EmployeeModel.id == employee_id
-    ).first()
+    db_employee = await employee_crud.get_async(db, employee_id)
     if not db_employee:
         raise HTTPException(status_code=404, detail="Employé non trouvé")
     
-    db.delete(db_employee)
-    db.commit()
+    await db.delete(db_employee)
+    await db.commit()
     return {"message": "Employé supprimé avec succès"}
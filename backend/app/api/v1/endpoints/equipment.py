@@ -1,105 +1,315 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal, Optional
+from datetime import datetime
+from collections import Counter
 
-from app.core.deps import get_db
-from app.models.equipment import Equipment as EquipmentModel
-from app.schemas.equipment import EquipmentResponse, EquipmentCreate, EquipmentUpdate
+from app.core.auth_cache import Principal
+from app.core.deps import get_async_db, get_current_user
+from app.core.etag import cache_headers, is_fresh, list_etag, not_modified, row_etag
+from app.core.serialization import FastJSONResponse
+from app.crud import employee_equipment_history as history_crud
+from app.crud import equipment as equipment_crud
+from app.crud.pagination import count_rows_async
+from app.db.session import get_async_session_factory
+from app.models.equipment import Equipment as EquipmentModel, EquipmentType, EquipmentCondition, EquipmentStatus
+from app.schemas.equipment import (
+    EquipmentResponse, EquipmentCreate, EquipmentUpdate, EquipmentFilter,
+    EquipmentBulkCreate, EquipmentBulkUpdate, EquipmentBulkSelection, EquipmentBulkResult,
+)
+from app.schemas.employee_equipment_history import HistoryResponse
+from app.schemas.assignment import AssignmentBatch, AssignmentBatchResult, AssignmentItem
+from app.services import assignment, equipment_bulk, export, movements, stats, versions
 
 router = APIRouter()
 
+# Tables lues par la liste (les filtres site / étage passent par les emplacements)
+LIST_RESOURCES = ("equipment", "emplacements")
+
+
+def equipment_filters(
+    status: Optional[List[EquipmentStatus]] = Query(default=None),
+    equipment_type: Optional[List[EquipmentType]] = Query(default=None),
+    condition: Optional[List[EquipmentCondition]] = Query(default=None),
+    employee_id: Optional[int] = None,
+    emplacement_id: Optional[int] = None,
+    site: Optional[str] = None,
+    etage: Optional[str] = None,
+    updated_since: Optional[datetime] = None,
+) -> EquipmentFilter:
+    """Filtres de liste ; status, equipment_type et condition peuvent être répétés"""
+    return EquipmentFilter(
+        status=status,
+        equipment_type=equipment_type,
+        condition=condition,
+        employee_id=employee_id,
+        emplacement_id=emplacement_id,
+        site=site,
+        etage=etage,
+        updated_since=updated_since,
+    )
+
 @router.get("", response_model=List[EquipmentResponse])
-def get_equipment(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Récupérer tous les équipements"""
-    equipment = db.query(EquipmentModel).offset(skip).limit(limit).all()
-    return equipment
+async def get_equipment(
+    request: Request,
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=500),
+    cursor: Optional[str] = Query(default=None, description="Curseur X-Next-Cursor de la page précédente"),
+    sort: str = Query(
+        default="id",
+        description="Colonnes séparées par des virgules (id, updated_at, created_at, serial_number, "
+                    "status, equipment_type, condition) ; préfixe '-' pour décroissant",
+    ),
+    count: Optional[Literal["exact", "estimate"]] = None,
+    filters: EquipmentFilter = Depends(equipment_filters),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Récupérer les équipements filtrés page par page (curseur renvoyé dans X-Next-Cursor)"""
+    # ✅ Liste inchangée depuis la dernière lecture du client : 304 sans relire les données
+    etag = list_etag(request, await versions.read_async(db, LIST_RESOURCES))
+    if is_fresh(request, etag):
+        return not_modified(etag)
+
+    try:
+        equipment, next_cursor = await equipment_crud.get_equipment_rows_async(
+            db, skip=skip, limit=limit, cursor=cursor, sort=sort, filters=filters
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # ✅ Lignes déjà au format EquipmentResponse : encodées par orjson sans validation
+    response = FastJSONResponse(equipment, headers=cache_headers(etag))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if count:
+        total = await count_rows_async(db, equipment_crud.list_equipment_query(filters), count)
+        response.headers["X-Total-Count"] = str(total)
+    return response
 
 @router.post("", response_model=EquipmentResponse, status_code=201)
-def create_equipment(equipment: EquipmentCreate, db: Session = Depends(get_db)):
-    """Créer un nouvel équipement"""
-    existing = db.query(EquipmentModel).filter(EquipmentModel.serial_number == equipment.serial_number).first()
+async def create_equipment(
+    equipment: EquipmentCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Créer un nouvel équipement (un détenteur passe par le moteur d'attribution)"""
+    existing = await equipment_crud.get_equipment_by_serial_async(db, equipment.serial_number)
     if existing:
         raise HTTPException(status_code=400, detail="Serial number already exists")
-    
-    db_equipment = EquipmentModel(**equipment.dict())
+    error = assignment.status_error(equipment.employee_id, equipment.status)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+
+    fields = equipment.dict()
+    employee_id = fields.pop("employee_id")
+    if employee_id is not None:
+        # ✅ Créé en stock, puis attribué : historique et mouvement dans la même transaction
+        fields["status"] = assignment.holder_status(None)
+    db_equipment = EquipmentModel(**fields)
     db.add(db_equipment)
-    db.commit()
-    db.refresh(db_equipment)
+    # ✅ Compteurs : code sync partagé, exécuté sur la connexion async
+    await db.run_sync(lambda session: stats.apply_changes(session, Counter(), stats.snapshot(session, db_equipment)))
+    if employee_id is not None:
+        await db.flush()
+        await db.run_sync(_assign, db_equipment.id, employee_id, current_user.id, commit=False)
+    await db.commit()
+    await db.refresh(db_equipment)
     return db_equipment
 
+# ✅ Export complet en flux : déclaré avant /{equipment_id}
+@router.get("/export")
+async def export_equipment(
+    format: Literal["ndjson", "csv"] = Query(default="ndjson"),
+    gzip: bool = Query(default=False, description="Corps compressé (Content-Encoding: gzip)"),
+    filters: EquipmentFilter = Depends(equipment_filters),
+    session_factory=Depends(get_async_session_factory),
+):
+    """Exporter les équipements filtrés, avec détenteur et emplacement (NDJSON ou CSV)"""
+    stmt = export.equipment_query(filters)
+    return export.export_response(session_factory, "equipment", export.EQUIPMENT_COLUMNS, stmt, format, gzip)
+
+# ✅ Opérations en masse : déclarées avant /{equipment_id}
+# ✅ Opérations en masse : services sync exécutés sur la connexion async (run_sync)
+@router.post("/assignments", response_model=AssignmentBatchResult)
+async def assign_equipment_batch(
+    batch: AssignmentBatch,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Attribuer ou restituer un lot d'équipements (employee_id null = retour en stock) en une transaction"""
+    try:
+        return await db.run_sync(assignment.apply_assignments, batch.items, current_user.id, batch.notes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/bulk", response_model=EquipmentBulkResult)
+async def bulk_create_equipment(
+    payload: EquipmentBulkCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Créer des équipements en masse (une transaction, résultat par élément)"""
+    try:
+        return await db.run_sync(equipment_bulk.bulk_create, payload.items, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.patch("/bulk", response_model=EquipmentBulkResult)
+async def bulk_update_equipment(
+    payload: EquipmentBulkUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Modifier statut, état, emplacement, détenteur... d'une liste d'équipements (ids ou numéros de série)"""
+    try:
+        return await db.run_sync(equipment_bulk.bulk_update, payload, payload.changes, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.delete("/bulk", response_model=EquipmentBulkResult)
+async def bulk_delete_equipment(payload: EquipmentBulkSelection, db: AsyncSession = Depends(get_async_db)):
+    """Supprimer une liste d'équipements (ids ou numéros de série)"""
+    try:
+        return await db.run_sync(equipment_bulk.bulk_delete, payload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _conditional(request: Request, response: Response, equipment: EquipmentModel):
+    """304 si le client a déjà cette version de l'équipement, sinon l'équipement avec son ETag"""
+    etag = row_etag("equipment", equipment.id, equipment.updated_at)
+    if is_fresh(request, etag):
+        return not_modified(etag)
+    response.headers.update(cache_headers(etag))
+    return equipment
+
 @router.get("/{equipment_id}", response_model=EquipmentResponse)
-def get_equipment_by_id(equipment_id: int, db: Session = Depends(get_db)):
+async def get_equipment_by_id(
+    equipment_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)
+):
     """Récupérer un équipement par ID"""
-    equipment = db.query(EquipmentModel).filter(EquipmentModel.id == equipment_id).first()
+    equipment = await equipment_crud.get_equipment_by_id_async(db, equipment_id)
     if not equipment:
         raise HTTPException(status_code=404, detail="Equipment not found")
-    return equipment
+    return _conditional(request, response, equipment)
 
 @router.put("/{equipment_id}", response_model=EquipmentResponse)
-def update_equipment(equipment_id: int, equipment: EquipmentUpdate, db: Session = Depends(get_db)):
-    """Mettre à jour un équipement"""
-    db_equipment = db.query(EquipmentModel).filter(EquipmentModel.id == equipment_id).first()
+async def update_equipment(
+    equipment_id: int,
+    equipment: EquipmentUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Mettre à jour un équipement (un changement de détenteur passe par le moteur d'attribution)"""
+    db_equipment = await equipment_crud.get_equipment_by_id_async(db, equipment_id)
     if not db_equipment:
         raise HTTPException(status_code=404, detail="Equipment not found")
-    
-    for key, value in equipment.dict(exclude_unset=True).items():
-        setattr(db_equipment, key, value)
-    
-    db.commit()
-    db.refresh(db_equipment)
+
+    fields = equipment.dict(exclude_unset=True)
+    reassign = "employee_id" in fields
+    employee_id = fields.pop("employee_id") if reassign else db_equipment.employee_id
+    status = fields.get("status", assignment.holder_status(employee_id) if reassign else db_equipment.status)
+    if reassign or "status" in fields:
+        error = assignment.status_error(employee_id, status)
+        if error:
+            raise HTTPException(status_code=400, detail=error)
+
+    # ✅ Historique et mouvement écrits avec le reste, dans la même transaction
+    if reassign:
+        await db.run_sync(_assign, equipment_id, employee_id, current_user.id, commit=False)
+        if status == assignment.holder_status(employee_id):
+            fields.pop("status", None)
+
+    def apply_fields(session: Session) -> None:
+        before = stats.snapshot(session, db_equipment)
+        for key, value in fields.items():
+            setattr(db_equipment, key, value)
+        stats.apply_changes(session, before, stats.snapshot(session, db_equipment))
+
+    await db.run_sync(apply_fields)
+    await db.commit()
+    await db.refresh(db_equipment)
     return db_equipment
 
 @router.delete("/{equipment_id}")
-def delete_equipment(equipment_id: int, db: Session = Depends(get_db)):
+async def delete_equipment(equipment_id: int, db: AsyncSession = Depends(get_async_db)):
     """Supprimer un équipement"""
-    db_equipment = db.query(EquipmentModel).filter(EquipmentModel.id == equipment_id).first()
+    db_equipment = await equipment_crud.get_equipment_by_id_async(db, equipment_id)
     if not db_equipment:
         raise HTTPException(status_code=404, detail="Equipment not found")
+    # ✅ Historique et mouvements conservés : même règle que la suppression en masse
+    referenced = await db.run_sync(
+        lambda session: history_crud.has_history(session, equipment_id)
+        or bool(movements.equipment_with_movements(session, [equipment_id]))
+    )
+    if referenced:
+        raise HTTPException(status_code=409, detail="Équipement référencé par l'historique ou les mouvements")
     
-    db.delete(db_equipment)
-    db.commit()
+    await db.run_sync(lambda session: stats.apply_changes(session, stats.snapshot(session, db_equipment), Counter()))
+    await db.delete(db_equipment)
+    await db.commit()
     return {"message": "Equipment deleted successfully"}
 
 @router.get("/by-serial/{serial_number}", response_model=EquipmentResponse)
-def get_equipment_by_serial(serial_number: str, db: Session = Depends(get_db)):
+async def get_equipment_by_serial(
+    serial_number: str, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)
+):
     """Récupérer un équipement par numéro de série"""
-    equipment = db.query(EquipmentModel).filter(EquipmentModel.serial_number == serial_number).first()
+    equipment = await equipment_crud.get_equipment_by_serial_async(db, serial_number)
     if not equipment:
         raise HTTPException(status_code=404, detail="Equipment not found")
-    return equipment
+    return _conditional(request, response, equipment)
 
-@router.post("/{equipment_id}/assign", response_model=EquipmentResponse)
-def assign_equipment(equipment_id: int, employee_id: int, db: Session = Depends(get_db)):
-    """Assigner un équipement à un employé"""
-    equipment = db.query(EquipmentModel).filter(EquipmentModel.id == equipment_id).first()
-    if not equipment:
+def _assign(db: Session, equipment_id: int, employee_id: Optional[int], actor_id: int, commit: bool = True):
+    result = assignment.apply_assignments(
+        db, [AssignmentItem(equipment_id=equipment_id, employee_id=employee_id)], actor_id, commit=commit
+    ).items[0]
+    if result.result == assignment.NOT_FOUND:
         raise HTTPException(status_code=404, detail="Equipment not found")
-    
-    equipment.employee_id = employee_id
-    equipment.status = "assigned"
-    db.commit()
-    db.refresh(equipment)
-    return equipment
+    if result.result == assignment.INVALID:
+        raise HTTPException(status_code=404, detail=result.error)
+    return result.equipment
+
+@router.post("/{equipment_id}/assign", response_model=EquipmentResponse)
+async def assign_equipment(
+    equipment_id: int,
+    employee_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Assigner un équipement à un employé (historique et mouvement enregistrés)"""
+    return await db.run_sync(_assign, equipment_id, employee_id, current_user.id)
 
 @router.post("/{equipment_id}/unassign", response_model=EquipmentResponse)
-def unassign_equipment(equipment_id: int, db: Session = Depends(get_db)):
-    """Désassigner un équipement"""
-    equipment = db.query(EquipmentModel).filter(EquipmentModel.id == equipment_id).first()
-    if not equipment:
+async def unassign_equipment(
+    equipment_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Désassigner un équipement (historique clos et mouvement enregistrés)"""
+    return await db.run_sync(_assign, equipment_id, None, current_user.id)
+
+@router.get("/{equipment_id}/history", response_model=List[HistoryResponse])
+async def get_equipment_history(
+    equipment_id: int,
+    limit: int = Query(default=100, ge=1, le=500),
+    cursor: Optional[str] = Query(default=None, description="Curseur X-Next-Cursor de la page précédente"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Détenteurs successifs d'un équipement page par page, du plus récent au plus ancien"""
+    try:
+        history, next_cursor = await db.run_sync(history_crud.get_by_equipment, equipment_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not history and not cursor and await db.get(EquipmentModel, equipment_id) is None:
         raise HTTPException(status_code=404, detail="Equipment not found")
-    
-    equipment.employee_id = None
-    equipment.status = "in_stock"
-    db.commit()
-    db.refresh(equipment)
-    return equipment
+
+    response = FastJSONResponse(history)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
 
 @router.get("/nb_pcs/online")
-def get_nb_pcs_online(db: Session = Depends(get_db)):
-    """Retourne le nombre de PCs (pc + laptop) assignés = en ligne"""
-    from sqlalchemy import func
-    nb = db.query(func.count(EquipmentModel.id)).filter(
-        EquipmentModel.equipment_type.in_(["pc", "laptop"]),
-        EquipmentModel.status == "assigned"
-    ).scalar()
-    return {"nb_pcs": nb or 0}
+async def get_nb_pcs_online(db: AsyncSession = Depends(get_async_db)):
+    """Retourne le nombre de PCs (pc + laptop) assignés = en ligne (lu dans les compteurs)"""
+    return {"nb_pcs": await db.run_sync(stats.pcs_online)}
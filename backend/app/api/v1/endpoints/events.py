@@ -0,0 +1,92 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+
+from app.core.auth_cache import Principal
+from app.core.config import settings
+from app.core.deps import get_stream_user
+from app.services import outbox
+
+router = APIRouter()
+
+# Délai de reconnexion suggéré au navigateur (ms)
+RETRY_MS = 3000
+
+
+def _reset_frame(horizon: int) -> bytes:
+    # Position perdue (purgée ou inconnue) : le client relit tout, puis reprend ici
+    return b"id: %d\nevent: reset\ndata: {\"id\":%d}\n\n" % (horizon, horizon)
+
+
+async def _stream(request: Request, after: Optional[int], resources: Optional[set]):
+    feed = outbox.feed
+    await run_in_threadpool(feed.start)
+    subscriber = feed.subscribe()
+    try:
+        yield b"retry: %d\n\n" % RETRY_MS
+        last = feed.horizon if after is None else after
+        ahead = False
+        while True:
+            events, horizon = feed.read(last)
+            if last > horizon and not ahead:
+                # Position lue sur un pod plus avancé : attendre que ce relevé la rattrape
+                if not await run_in_threadpool(feed.issued, last):
+                    # Id jamais attribué par cette base : position inconnue
+                    yield _reset_frame(horizon)
+                    last = horizon
+                    continue
+                ahead = True
+                feed.notify()
+            if events is None:
+                # Reprise d'une position antérieure au tampon : lecture en base
+                events, purged = await run_in_threadpool(feed.backfill, last)
+                if purged:
+                    yield _reset_frame(horizon)
+                    last = horizon
+                    continue
+            if events:
+                frames = [item.frame for item in events if resources is None or item.resource in resources]
+                if frames:
+                    yield b"".join(frames)
+                last = events[-1].id
+                continue
+
+            if await request.is_disconnected():
+                return
+            if not await subscriber.wait(settings.EVENTS_HEARTBEAT_SECONDS):
+                # Commentaire SSE : garde la connexion ouverte à travers les proxys
+                yield b": ping\n\n"
+    finally:
+        feed.unsubscribe(subscriber)
+
+
+@router.get("")
+async def stream_events(
+    request: Request,
+    after: Optional[int] = Query(default=None, ge=0, description="Reprendre après cet id d'événement"),
+    resources: Optional[str] = Query(default=None, description="Ressources suivies, séparées par des virgules"),
+    last_event_id: Optional[str] = Header(default=None, description="Envoyé par EventSource à la reconnexion"),
+    current_user: Principal = Depends(get_stream_user),
+):
+    """Flux SSE des modifications de l'inventaire (reprise après ``after`` ou Last-Event-ID)"""
+    if after is None and last_event_id:
+        try:
+            after = int(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Last-Event-ID invalide")
+        if after < 0:
+            raise HTTPException(status_code=400, detail="Last-Event-ID invalide")
+
+    selected = None
+    if resources:
+        selected = {resource.strip() for resource in resources.split(",") if resource.strip()}
+        unknown = selected - outbox.RESOURCES
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Ressources inconnues : {', '.join(sorted(unknown))}")
+
+    return StreamingResponse(
+        _stream(request, after, selected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
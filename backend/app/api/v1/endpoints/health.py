@@ -1,8 +1,37 @@
 from fastapi import APIRouter
 
+from app.core.auth_cache import principal_cache
+from app.core.security import password_hasher
+from app.db.pool import pool_stats
+from app.db.session import replica_router
+
 router = APIRouter()
 
 @router.get("/")
 def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
+
+
+@router.get("/auth-cache")
+def auth_cache_stats():
+    """Statistiques du cache des utilisateurs authentifiés"""
+    return principal_cache.stats()
+
+
+@router.get("/password-hash")
+def password_hash_stats():
+    """Charge et temps d'attente de l'exécuteur de hachage des mots de passe"""
+    return password_hasher.stats()
+
+
+@router.get("/pool")
+def connection_pool_stats():
+    """Occupation des pools de connexions, attente au checkout, timeouts et invalidations"""
+    return pool_stats()
+
+
+@router.get("/replicas")
+def replica_stats():
+    """Position et retard des réplicas en lecture, et répartition des lectures routées"""
+    return replica_router.stats()
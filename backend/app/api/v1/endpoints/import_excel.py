@@ -1,45 +1,49 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from app.core.deps import get_current_user
-from app.models.equipment import Equipment, EquipmentType, EquipmentCondition, EquipmentStatus
-from app.db.session import get_db
-import pandas as pd
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.deps import get_async_db, get_current_user
+from app.schemas.job import JobResponse
+from app.services import importer
+from app.services.jobs import job_queue
 
 router = APIRouter()
 
 
-@router.post("/import", status_code=status.HTTP_200_OK)
-def import_equipment(
+@router.post("/import", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def import_equipment(
+    response: Response,
     file: UploadFile = File(...),
     current_user=Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    if not file.filename.endswith((".xlsx", ".xls")):
+    """
+    Importer des équipements depuis un fichier Excel ou CSV.
+
+    Le fichier est mis en file et traité par un worker ; la réponse contient
+    l'identifiant de la tâche à suivre via ``GET /jobs/{id}``, dont le résultat
+    final est le rapport d'import ligne à ligne.
+    """
+    if not file.filename.lower().endswith(importer.SUPPORTED_EXTENSIONS):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Le fichier doit être au format Excel (.xlsx ou .xls)"
+            detail="Le fichier doit être au format Excel (.xlsx, .xls) ou CSV"
         )
 
     try:
-        df = pd.read_excel(file.file)
-
-        for _, row in df.iterrows():
-            eq = Equipment(
-                serial_number=str(row["serial_number"]),
-                model=row["model"],
-                equipment_type=row.get("equipment_type", EquipmentType.PC),
-                condition=row.get("condition", EquipmentCondition.NEW),
-                status=row.get("status", EquipmentStatus.IN_STOCK)
-            )
-            db.add(eq)
-
-        db.commit()
-        return JSONResponse(content={"detail": "Import réussi ✅"})
-
+        # Fichier stocké en base avec la tâche : lisible par le worker de n'importe quel pod
+        job = await db.run_sync(
+            job_queue.submit,
+            "import_equipment",
+            payload={"filename": file.filename},
+            created_by=current_user.id,
+            files={importer.UPLOAD_FILE: file.file},
+        )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erreur lors de l'import : {str(e)}"
         )
+
+    response.headers["Location"] = f"{settings.API_V1_STR}/jobs/{job.id}"
+    return job
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from app.core.auth_cache import Principal
+from app.core.deps import get_async_db, get_current_user
+from app.models.job import Job
+from app.schemas.job import JobResponse
+
+router = APIRouter()
+
+
+@router.get("", response_model=List[JobResponse])
+async def get_jobs(
+    kind: Optional[str] = None,
+    limit: int = Query(default=20, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Lister les dernières tâches lancées par l'utilisateur courant"""
+    stmt = select(Job).where(Job.created_by == current_user.id)
+    if kind:
+        stmt = stmt.where(Job.kind == kind)
+    return (await db.scalars(stmt.order_by(Job.created_at.desc()).limit(limit))).all()
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Suivre l'avancement d'une tâche : lignes traitées, en erreur, débit et ETA"""
+    job = await db.get(Job, job_id)
+    # Tâche d'un autre utilisateur : même réponse qu'une tâche inexistante
+    if not job or job.created_by != current_user.id:
+        raise HTTPException(status_code=404, detail="Tâche non trouvée")
+    return job
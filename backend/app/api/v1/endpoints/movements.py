@@ -0,0 +1,40 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from app.core.auth_cache import Principal
+from app.core.deps import get_async_db, get_current_user
+from app.core.serialization import FastJSONResponse
+from app.schemas.movement import MovementResponse
+from app.services import movements
+
+router = APIRouter()
+
+
+@router.get("", response_model=List[MovementResponse])
+async def list_movements(
+    equipment_id: Optional[int] = None,
+    user_id: Optional[int] = Query(default=None, description="Utilisateur auteur du mouvement"),
+    start: Optional[datetime] = Query(default=None, description="Début inclus (ISO 8601, UTC si sans fuseau)"),
+    end: Optional[datetime] = Query(default=None, description="Fin exclue (ISO 8601, UTC si sans fuseau)"),
+    limit: int = Query(default=100, ge=1, le=500),
+    cursor: Optional[str] = Query(default=None, description="Curseur X-Next-Cursor de la page précédente"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    """Mouvements d'équipements sur une période, du plus récent au plus ancien (seuls les mois concernés sont lus)"""
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(status_code=400, detail="start doit précéder end")
+    try:
+        rows, next_cursor = await db.run_sync(
+            movements.query, equipment_id=equipment_id, user_id=user_id, start=start, end=end,
+            limit=limit, cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    response = FastJSONResponse(rows)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
@@ -0,0 +1,78 @@
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.auth_cache import Principal
+from app.core.config import settings
+from app.core.deps import get_async_db, get_current_user
+from app.db.session import get_async_session_factory
+from app.models.job import Job, JobFile, JobStatus
+from app.schemas.job import JobResponse
+from app.services import reports
+from app.services.jobs import block_query, job_queue
+
+router = APIRouter()
+
+ReportName = Literal["inventory", "history"]
+
+
+@router.post("/{report}.xlsx", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def request_report(
+    report: ReportName,
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Lancer la génération d'un rapport Excel.
+
+    Le classeur est écrit par un worker ; la réponse contient l'identifiant
+    de la tâche à suivre via ``GET /jobs/{id}``, puis le fichier se télécharge
+    via ``GET /reports/{report}.xlsx``.
+    """
+    job = await db.run_sync(job_queue.submit, reports.REPORT_KINDS[report], created_by=current_user.id)
+    response.headers["Location"] = f"{settings.API_V1_STR}/jobs/{job.id}"
+    return job
+
+
+@router.get("/{report}.xlsx", response_class=StreamingResponse)
+async def download_report(
+    report: ReportName,
+    job_id: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    session_factory=Depends(get_async_session_factory),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Télécharger le dernier rapport généré (ou celui de la tâche ``job_id``)"""
+    stmt = select(Job).where(Job.kind == reports.REPORT_KINDS[report])
+    if job_id:
+        stmt = stmt.where(Job.id == job_id)
+    else:
+        stmt = stmt.where(Job.status == JobStatus.SUCCEEDED.value).order_by(Job.finished_at.desc()).limit(1)
+    job = (await db.scalars(stmt)).first()
+    if job is None:
+        raise HTTPException(status_code=404, detail="Aucun rapport disponible")
+    if job.status != JobStatus.SUCCEEDED.value:
+        raise HTTPException(status_code=409, detail=f"Rapport non disponible (tâche {job.status})")
+
+    blocks = await db.scalar(
+        select(func.count()).select_from(JobFile)
+        .where(JobFile.job_id == job.id, JobFile.name == reports.REPORT_FILE)
+    )
+    if not blocks:
+        raise HTTPException(status_code=410, detail="Rapport expiré, à régénérer")
+
+    async def body():
+        # Session propre au flux (celle de la dépendance est fermée avant l'envoi), un bloc à la fois
+        async with session_factory() as stream_db:
+            for seq in range(blocks):
+                yield await stream_db.scalar(block_query(job.id, reports.REPORT_FILE, seq))
+
+    headers = {
+        "Content-Disposition": f'attachment; filename="{job.result["filename"]}"',
+        "Content-Length": str(job.result["size_bytes"]),
+    }
+    return StreamingResponse(body(), media_type=reports.XLSX_MEDIA_TYPE, headers=headers)
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+
+from app.core.deps import get_async_db
+from app.schemas.search import SearchResponse
+from app.services.search import SearchService
+
+router = APIRouter()
+
+
+@router.get("", response_model=SearchResponse)
+async def search(
+    q: str = Query(..., min_length=2, max_length=100, description="Fragment de numéro de série, modèle, nom, CUID..."),
+    types: Optional[List[Literal["equipment", "employee", "emplacement"]]] = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Recherche floue mixte (équipements, employés, emplacements) classée par pertinence"""
+    def run(session):
+        service = SearchService(session)
+        return SearchResponse(query=q, engine=service.engine_name, results=service.search(q, types=types, limit=limit))
+
+    return await db.run_sync(run)
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.deps import get_async_db
+from app.schemas.stats import StatsResponse
+from app.services import stats
+
+router = APIRouter()
+
+
+@router.get("", response_model=StatsResponse)
+async def get_stats(db: AsyncSession = Depends(get_async_db)):
+    """Statistiques du dashboard (par statut, type, état, site et étage)"""
+    return await db.run_sync(stats.read)
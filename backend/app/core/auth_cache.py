@@ -0,0 +1,105 @@
+"""
+Cache en mémoire des utilisateurs authentifiés.
+
+``get_current_user`` résout le sujet du JWT (l'email) en ``Principal`` :
+une copie figée des champs utiles à l'autorisation, détachée de toute
+session. Les entrées expirent après ``AUTH_CACHE_TTL_SECONDS`` et les moins
+récemment utilisées sont évincées au-delà de ``AUTH_CACHE_MAX_ENTRIES``.
+``crud/user.py`` invalide explicitement l'entrée à chaque modification ou
+suppression ; dans un déploiement multi-process, le TTL borne le délai
+avant qu'un autre worker voie le changement.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.models.user import User, UserRole
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Utilisateur authentifié, sans mot de passe ni lien avec la session."""
+    id: int
+    email: str
+    first_name: str
+    last_name: str
+    role: UserRole
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            role=user.role,
+            is_active=bool(user.is_active),
+        )
+
+
+class PrincipalCache:
+    """Cache LRU à durée de vie, sûr entre threads."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Principal]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, subject: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[subject]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(subject)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, subject: str, principal: Principal) -> None:
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[subject] = (time.monotonic() + self.ttl_seconds, principal)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *subjects: Optional[str]) -> None:
+        """Oublier les sujets donnés (tous si aucun n'est passé)."""
+        with self._lock:
+            if not subjects:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                return
+            for subject in subjects:
+                if subject is not None and self._entries.pop(subject, None) is not None:
+                    self.invalidations += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+principal_cache = PrincipalCache(settings.AUTH_CACHE_TTL_SECONDS, settings.AUTH_CACHE_MAX_ENTRIES)
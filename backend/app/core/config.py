@@ -1,3 +1,4 @@
+import os
 from typing import Optional, List, Union
 from pydantic import validator
 from pydantic_settings import BaseSettings
@@ -12,6 +13,37 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str = "postgres"
     POSTGRES_DB: str = "inventory_db"
     POSTGRES_PORT: int = 5432
+    # URL complète optionnelle (ex. sqlite:///./local.db), prioritaire sur POSTGRES_*
+    DATABASE_URL: Optional[str] = None
+    # Pilote asynchrone : déduit de DATABASE_URL (asyncpg / aiosqlite) si absent
+    ASYNC_DATABASE_URL: Optional[str] = None
+
+    # Réplicas en lecture (URLs séparées par des virgules ou liste JSON) : ils
+    # servent les requêtes GET / HEAD et celles des chemins DB_READ_ONLY_PATHS.
+    # Repli sur le primaire si le réplica est injoignable, en retard de plus de
+    # DB_REPLICA_MAX_LAG_SECONDS, ou pas encore à la position de la dernière
+    # écriture du client (cookie valable DB_READ_YOUR_WRITES_SECONDS)
+    DATABASE_REPLICA_URLS: Union[List[str], str] = []
+    DB_READ_ONLY_PATHS: Union[List[str], str] = ["/api/v1/chatbot"]
+    DB_REPLICA_MAX_LAG_SECONDS: float = 5.0
+    DB_REPLICA_CHECK_INTERVAL_SECONDS: float = 1.0
+    DB_READ_YOUR_WRITES_SECONDS: int = 60
+
+    # Pool de connexions (appliqué à chacun des moteurs sync et async)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = 300
+    # Ping à chaque checkout, ou (si False) contrôle périodique en tâche de fond
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_LIVENESS_INTERVAL_SECONDS: float = 30.0
+
+    # Diagnostic SQL (développement) : journalise les requêtes HTTP qui
+    # dépassent QUERY_DEBUG_MAX_PER_REQUEST requêtes SQL (0 = pas de limite)
+    # ou répètent une même instruction QUERY_DEBUG_REPEAT_THRESHOLD fois (N+1)
+    QUERY_DEBUG: bool = False
+    QUERY_DEBUG_MAX_PER_REQUEST: int = 20
+    QUERY_DEBUG_REPEAT_THRESHOLD: int = 5
 
     # Security
     SECRET_KEY: str = "change-this-in-production"
@@ -21,7 +53,7 @@ class Settings(BaseSettings):
     # CORS - ✅ Accepte string ou liste JSON
     BACKEND_CORS_ORIGINS: Union[List[str], str] = ["http://localhost:4200"]
 
-    @validator("BACKEND_CORS_ORIGINS", pre=True)
+    @validator("BACKEND_CORS_ORIGINS", "DATABASE_REPLICA_URLS", "DB_READ_ONLY_PATHS", pre=True)
     def assemble_cors_origins(cls, v: Union[str, List[str]]) -> List[str]:
         if isinstance(v, str):
             # ✅ Gérer "url1,url2" ou '["url1","url2"]'
@@ -29,7 +61,7 @@ class Settings(BaseSettings):
             if v.startswith("["):
                 import json
                 return json.loads(v)
-            return [i.strip() for i in v.split(",")]
+            return [i.strip() for i in v.split(",") if i.strip()]
         return v
 
     # LLM API
@@ -37,6 +69,73 @@ class Settings(BaseSettings):
     LLM_API_KEY: Optional[str] = None
     LLM_MODEL: str = "gpt-3.5-turbo"
 
+    # Import Excel / CSV
+    IMPORT_CHUNK_SIZE: int = 1000
+    IMPORT_MAX_ERRORS: int = 1000
+
+    # Opérations en masse sur les équipements (POST/PATCH/DELETE /equipment/bulk)
+    EQUIPMENT_BULK_MAX_ITEMS: int = 10000
+
+    # Cache HTTP des ressources d'inventaire : le client garde la réponse et
+    # la revalide à chaque fois par If-None-Match (304 sans corps si inchangée)
+    HTTP_CACHE_CONTROL: str = "private, no-cache"
+
+    # Exports en flux (GET /equipment/export...) : lignes lues et encodées par lot
+    EXPORT_BATCH_SIZE: int = 2000
+
+    # Tâches de fond (file d'attente et fichiers stockés en base ; JOB_SPOOL_DIR : copies de travail locales)
+    JOB_WORKERS: int = 2
+    JOB_POLL_INTERVAL_SECONDS: float = 2.0
+    # Une tâche "running" sans battement de cœur depuis JOB_STALE_AFTER_SECONDS
+    # est remise en file ; son worker le signale toutes les JOB_HEARTBEAT_SECONDS
+    JOB_STALE_AFTER_SECONDS: int = 600
+    JOB_HEARTBEAT_SECONDS: float = 30.0
+    JOB_SPOOL_DIR: str = "/tmp/it-inventory-jobs"
+
+    # Rapports Excel (/reports/*.xlsx) : régénérés toutes les
+    # REPORT_INTERVAL_SECONDS (0 = à la demande seulement)
+    REPORT_INTERVAL_SECONDS: int = 7 * 24 * 3600
+    REPORT_KEEP_FILES: int = 8
+
+    # Journal des mouvements, partitionné par mois : partitions créées
+    # MOVEMENT_PARTITIONS_AHEAD mois à l'avance par la maintenance périodique ;
+    # les mois plus anciens que MOVEMENT_RETENTION_MONTHS (0 = tout garder) sont
+    # archivés en NDJSON gzip dans MOVEMENT_ARCHIVE_DIR puis supprimés.
+    # MOVEMENT_ARCHIVE_DIR doit être un volume persistant : sans lui, aucune
+    # partition n'est supprimée (pas de défaut local perdu au redémarrage du pod)
+    MOVEMENT_PARTITIONS_AHEAD: int = 2
+    MOVEMENT_RETENTION_MONTHS: int = 0
+    MOVEMENT_ARCHIVE_DIR: Optional[str] = None
+    MOVEMENT_MAINTENANCE_INTERVAL_SECONDS: int = 24 * 3600
+
+    # Flux des modifications (GET /events) : chaque transaction qui écrit dans
+    # l'inventaire ajoute ses événements à la table outbox_events, relue par un
+    # seul thread par process toutes les OUTBOX_POLL_INTERVAL_SECONDS et
+    # diffusée depuis un tampon mémoire de OUTBOX_BUFFER_SIZE événements
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 0.5
+    OUTBOX_BUFFER_SIZE: int = 10000
+    # Au-delà, l'événement ne liste pas les ids (le client relit la ressource)
+    OUTBOX_MAX_IDS: int = 1000
+    # Id manquant : transaction en cours de validation, attendue au plus ce délai
+    OUTBOX_GAP_TIMEOUT_SECONDS: float = 5.0
+    OUTBOX_RETENTION_SECONDS: int = 24 * 3600
+    OUTBOX_PURGE_INTERVAL_SECONDS: int = 3600
+    EVENTS_HEARTBEAT_SECONDS: float = 15.0
+
+    # Statistiques du dashboard : recalcul complet périodique des compteurs
+    STATS_RECONCILE_INTERVAL_SECONDS: int = 3600
+
+    # Cache des utilisateurs authentifiés (0 pour le désactiver)
+    AUTH_CACHE_TTL_SECONDS: float = 60.0
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+
+    # Hachage des mots de passe : coût bcrypt (un changement déclenche un
+    # re-hachage à la connexion) et exécuteur dédié borné, qui laisse au
+    # moins la moitié des cœurs aux autres requêtes
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = max(1, (os.cpu_count() or 2) // 2)
+    PASSWORD_HASH_MAX_PENDING_PER_WORKER: int = 16
+
     class Config:
         case_sensitive = True
         env_file = ".env"
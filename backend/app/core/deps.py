@@ -1,15 +1,17 @@
-from typing import Generator, List
-from fastapi import Depends, HTTPException, status
+from typing import Generator, List, Optional
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.auth_cache import Principal, principal_cache
 from app.core.config import settings
-from app.db.session import SessionLocal
-from app.models.user import User, UserRole
+from app.db.session import SessionLocal, get_async_db, get_async_session_factory
+from app.models.user import UserRole
 from app.crud import user as user_crud
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login", auto_error=False)
 
 
 def get_db() -> Generator:
@@ -21,41 +23,77 @@ def get_db() -> Generator:
         db.close()
 
 
-def get_current_user(
-    db: Session = Depends(get_db),
-    token: str = Depends(oauth2_scheme)
-) -> User:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def _token_subject(token: str) -> str:
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+    email: str = payload.get("sub")
+    if email is None:
+        raise _credentials_exception()
+    return email
+
+
+async def get_current_user(
+    db: AsyncSession = Depends(get_async_db),
+    token: str = Depends(oauth2_scheme)
+) -> Principal:
+    email = _token_subject(token)
+
+    # La session n'ouvre de connexion qu'en cas d'absence du cache
+    principal = principal_cache.get(email)
+    if principal is None:
+        user = await user_crud.get_by_email_async(db, email=email)
+        if user is None:
+            raise _credentials_exception()
+        principal = Principal.from_user(user)
+        principal_cache.put(email, principal)
+    return principal
+
+
+async def get_stream_user(
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    access_token: Optional[str] = Query(default=None, description="Jeton, si l'en-tête Authorization est impossible"),
+    session_factory=Depends(get_async_session_factory),
+) -> Principal:
+    """Utilisateur d'un flux long (EventSource n'envoie pas d'en-tête : jeton accepté en paramètre)"""
+    token = token or access_token
+    if not token:
+        raise _credentials_exception()
+    email = _token_subject(token)
 
-    user = user_crud.get_by_email(db, email=email)
-    if user is None:
-        raise credentials_exception
-    return user
+    principal = principal_cache.get(email)
+    if principal is None:
+        # Session courte : aucune connexion gardée pendant toute la durée du flux
+        async with session_factory() as db:
+            user = await user_crud.get_by_email_async(db, email=email)
+        if user is None:
+            raise _credentials_exception()
+        principal = Principal.from_user(user)
+        principal_cache.put(email, principal)
+    return principal
 
 
 def get_current_active_user(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: Principal = Depends(get_current_user),
+) -> Principal:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 
 def require_roles(allowed_roles: List[UserRole]):
-    def role_checker(current_user: User = Depends(get_current_active_user)) -> User:
+    def role_checker(current_user: Principal = Depends(get_current_active_user)) -> Principal:
         if current_user.role not in allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
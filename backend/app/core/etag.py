@@ -0,0 +1,47 @@
+"""
+ETag forts et GET conditionnels (``If-None-Match`` -> 304 sans corps).
+
+- détail : ETag calculé depuis l'identifiant et ``updated_at`` de la ligne
+  déjà lue par l'endpoint, sans requête supplémentaire ;
+- liste : ETag calculé depuis la requête (chemin + paramètres) et la version
+  des tables lues (``app.services.versions``), lue AVANT les données : une
+  écriture concurrente ne peut que rendre l'ETag trop ancien, donc provoquer
+  un rechargement, jamais un 304 à tort.
+"""
+import hashlib
+from datetime import datetime
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+from app.core.config import settings
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.blake2b("|".join(map(str, parts)).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def row_etag(resource: str, row_id: int, updated_at: Optional[datetime]) -> str:
+    return make_etag(resource, row_id, updated_at.isoformat() if updated_at else "")
+
+
+def list_etag(request: Request, versions: Dict[str, int]) -> str:
+    return make_etag(request.url.path, request.url.query, *sorted(versions.items()))
+
+
+def is_fresh(request: Request, etag: str) -> bool:
+    """La copie du client (``If-None-Match``, comparaison faible) correspond-elle à ``etag`` ?"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = (candidate.strip() for candidate in header.split(","))
+    return any(candidate == "*" or candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def cache_headers(etag: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": settings.HTTP_CACHE_CONTROL}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag))
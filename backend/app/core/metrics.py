@@ -0,0 +1,91 @@
+"""
+Primitives de métriques en mémoire, sans dépendance externe.
+
+Les histogrammes ont des bornes fixées à la création (comme Prometheus) :
+une observation coûte une recherche dichotomique et un incrément. Le verrou
+est optionnel : un histogramme mis à jour depuis un seul thread (la boucle
+asyncio) s'en passe.
+"""
+import bisect
+import threading
+from contextlib import nullcontext
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+# Bornes par défaut (secondes), de la milliseconde à la dizaine de secondes
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Histogramme cumulatif à bornes fixes."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS, threadsafe: bool = True):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock() if threadsafe else nullcontext()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> Dict[str, object]:
+        """Compteurs cumulés par borne (``le``), total et somme."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative, running = {}, 0
+        for bound, count in zip(self.buckets, counts):
+            running += count
+            cumulative[str(bound)] = running
+        running += counts[-1]
+        cumulative["+Inf"] = running
+        return {"buckets": cumulative, "count": running, "sum": round(total, 6)}
+
+
+# ---------------------------------------------------------------------------
+# Format texte Prometheus
+# ---------------------------------------------------------------------------
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Iterable[Tuple[str, str]]) -> str:
+    pairs = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+    return "{" + pairs + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class PrometheusWriter:
+    """Accumule les familles de métriques et produit le format texte 0.0.4."""
+
+    def __init__(self):
+        self._lines: List[str] = []
+
+    def header(self, name: str, kind: str, help_text: str) -> None:
+        self._lines.append(f"# HELP {name} {help_text}")
+        self._lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, value: float, labels: Labels = ()) -> None:
+        self._lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    def metric(self, name: str, kind: str, help_text: str, value: float, labels: Labels = ()) -> None:
+        self.header(name, kind, help_text)
+        self.sample(name, value, labels)
+
+    def histogram(self, name: str, snapshot: Dict[str, object], labels: Labels = ()) -> None:
+        for bound, count in snapshot["buckets"].items():
+            self.sample(f"{name}_bucket", count, labels + (("le", bound),))
+        self.sample(f"{name}_sum", snapshot["sum"], labels)
+        self.sample(f"{name}_count", snapshot["count"], labels)
+
+    def render(self) -> str:
+        return "\n".join(self._lines) + "\n"
@@ -0,0 +1,201 @@
+"""
+Comptage des requêtes SQL par requête HTTP et détection des N+1.
+
+Les hooks ``before/after_cursor_execute``, enregistrés sur toutes les
+``Engine``, alimentent le ``RequestStats`` ouvert dans la ContextVar
+``current_request`` (par ``MetricsMiddleware`` ou par ``max_queries``). La
+ContextVar suit la requête dans le threadpool comme dans les greenlets de
+l'AsyncSession. Un ``RequestStats`` imbriqué reverse ses compteurs dans son
+parent à la fermeture : un budget posé autour d'un appel au client de test
+voit donc les requêtes de l'endpoint.
+
+Le détail des instructions (forme -> nombre d'exécutions) n'est conservé
+qu'en mode diagnostic (``QUERY_DEBUG``) ou sous ``max_queries`` ; une même
+forme exécutée ``QUERY_DEBUG_REPEAT_THRESHOLD`` fois signale un N+1.
+
+Dans un test ::
+
+    with max_queries(2):
+        client.get("/api/v1/employees/1/history")
+
+    @max_queries(3)
+    def test_update(client): ...
+"""
+import asyncio
+import functools
+import logging
+import re
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RequestStats:
+    """Compteurs SQL d'une requête HTTP (ou d'un bloc ``max_queries``)."""
+    __slots__ = ("queries", "db_seconds", "statements", "parent")
+
+    def __init__(self, parent: Optional["RequestStats"] = None, record_statements: bool = False):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.parent = parent
+        # Instruction SQL brute -> nombre d'exécutions ; None hors diagnostic
+        record = record_statements or (parent is not None and parent.statements is not None)
+        self.statements: Optional[Dict[str, int]] = {} if record else None
+
+    def close(self) -> None:
+        """Reporter les compteurs dans le parent (bloc englobant)."""
+        parent = self.parent
+        if parent is None:
+            return
+        parent.queries += self.queries
+        parent.db_seconds += self.db_seconds
+        if parent.statements is not None and self.statements:
+            for statement, count in self.statements.items():
+                parent.statements[statement] = parent.statements.get(statement, 0) + count
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+# ---------------------------------------------------------------------------
+# Hooks SQLAlchemy
+# ---------------------------------------------------------------------------
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_request.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_request.get()
+    if stats is None:
+        return
+    starts = conn.info.get("query_start")
+    if starts:
+        stats.db_seconds += time.perf_counter() - starts.pop()
+    stats.queries += 1
+    if stats.statements is not None:
+        stats.statements[statement] = stats.statements.get(statement, 0) + 1
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    # Requête en échec : pas d'after_cursor_execute, on retire son horodatage
+    if current_request.get() is not None and context.connection is not None:
+        starts = context.connection.info.get("query_start")
+        if starts:
+            starts.pop()
+
+
+# ---------------------------------------------------------------------------
+# Formes d'instructions et N+1
+# ---------------------------------------------------------------------------
+
+_LITERAL = re.compile(r"'(?:[^']|'')*'|(?<![\w$])\d+(?:\.\d+)?\b")
+_PLACEHOLDER = r"(?:\?|%s|%\(\w+\)s|\$\d+)"
+_PLACEHOLDER_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Forme normalisée d'une instruction : littéraux et listes ``IN (...)`` effacés."""
+    shape = _LITERAL.sub("?", statement)
+    shape = _PLACEHOLDER_LIST.sub("(...)", shape)
+    return _SPACES.sub(" ", shape).strip()
+
+
+def statement_shapes(stats: RequestStats) -> List[Tuple[str, int]]:
+    """Formes exécutées, de la plus répétée à la moins répétée."""
+    shapes: Dict[str, int] = {}
+    for statement, count in (stats.statements or {}).items():
+        shape = statement_shape(statement)
+        shapes[shape] = shapes.get(shape, 0) + count
+    return sorted(shapes.items(), key=lambda item: item[1], reverse=True)
+
+
+def repeated_statements(stats: RequestStats, threshold: int) -> List[Tuple[str, int]]:
+    """Formes exécutées au moins ``threshold`` fois (N+1 probable)."""
+    return [(shape, count) for shape, count in statement_shapes(stats) if count >= threshold]
+
+
+def _summary(shapes: List[Tuple[str, int]], limit: int = 5) -> str:
+    return "\n".join(f"  {count} x {shape[:300]}" for shape, count in shapes[:limit])
+
+
+def report_request(label: str, stats: RequestStats) -> None:
+    """Mode diagnostic : journaliser les requêtes HTTP trop bavardes."""
+    repeated = repeated_statements(stats, settings.QUERY_DEBUG_REPEAT_THRESHOLD)
+    if repeated:
+        logger.warning("N+1 probable sur %s (%d requêtes SQL) :\n%s", label, stats.queries, _summary(repeated))
+    elif settings.QUERY_DEBUG_MAX_PER_REQUEST and stats.queries > settings.QUERY_DEBUG_MAX_PER_REQUEST:
+        logger.warning(
+            "%s : %d requêtes SQL (budget %d) :\n%s",
+            label, stats.queries, settings.QUERY_DEBUG_MAX_PER_REQUEST, _summary(statement_shapes(stats)),
+        )
+
+
+# ---------------------------------------------------------------------------
+# Budget de requêtes (tests)
+# ---------------------------------------------------------------------------
+
+class QueryBudgetExceeded(AssertionError):
+    """Levée quand un bloc ``max_queries`` dépasse son budget ou contient un N+1."""
+
+
+class max_queries:
+    """
+    Budget de requêtes SQL, en gestionnaire de contexte ou en décorateur
+    (fonctions sync ou async).
+
+    ``repeat_threshold`` : nombre d'exécutions d'une même forme à partir
+    duquel le bloc échoue même sous le budget (None pour ne pas vérifier).
+    """
+
+    def __init__(self, limit: int, repeat_threshold: Optional[int] = None):
+        self.limit = limit
+        self.repeat_threshold = repeat_threshold
+        self.stats: Optional[RequestStats] = None
+        self._token = None
+
+    def __enter__(self) -> RequestStats:
+        self.stats = RequestStats(parent=current_request.get(), record_statements=True)
+        self._token = current_request.set(self.stats)
+        return self.stats
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        current_request.reset(self._token)
+        stats = self.stats
+        stats.close()
+        if exc_type is not None:
+            return
+        if stats.queries > self.limit:
+            raise QueryBudgetExceeded(
+                f"{stats.queries} requêtes SQL pour un budget de {self.limit} :\n{_summary(statement_shapes(stats))}"
+            )
+        if self.repeat_threshold is not None:
+            repeated = repeated_statements(stats, self.repeat_threshold)
+            if repeated:
+                raise QueryBudgetExceeded(f"N+1 probable :\n{_summary(repeated)}")
+
+    def __call__(self, func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with max_queries(self.limit, self.repeat_threshold):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with max_queries(self.limit, self.repeat_threshold):
+                return func(*args, **kwargs)
+        return wrapper
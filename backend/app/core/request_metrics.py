@@ -0,0 +1,159 @@
+"""
+Métriques HTTP et base de données par route, exposées sur ``/metrics``.
+
+``MetricsMiddleware`` est un middleware ASGI pur : il mesure chaque requête
+(nombre, statut, latence, requêtes en cours) et ouvre un ``RequestStats``
+(voir ``app.core.query_budget``) qui compte les requêtes SQL et leur durée.
+En mode diagnostic (``QUERY_DEBUG``), les requêtes HTTP trop bavardes ou
+suspectes de N+1 sont journalisées.
+
+Pas de verrou sur le chemin critique : les hooks SQL n'écrivent que dans
+l'objet propre à la requête, et les agrégats par route ne sont mis à jour
+que par le middleware, donc depuis l'unique thread de la boucle asyncio.
+"""
+import time
+from typing import Dict, Tuple
+
+from app.core.config import settings
+from app.core.metrics import DEFAULT_BUCKETS, Histogram, PrometheusWriter
+from app.core.query_budget import RequestStats, current_request, report_request
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+# Routes non résolues regroupées sous une seule étiquette (cardinalité bornée)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class RouteMetrics:
+    __slots__ = ("statuses", "latency", "queries", "db_seconds")
+
+    def __init__(self):
+        self.statuses: Dict[int, int] = {}
+        self.latency = Histogram(DEFAULT_BUCKETS, threadsafe=False)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS, threadsafe=False)
+        self.db_seconds = Histogram(DEFAULT_BUCKETS, threadsafe=False)
+
+
+_routes: Dict[Tuple[str, str], RouteMetrics] = {}
+_in_flight = 0
+
+
+# ---------------------------------------------------------------------------
+# Middleware
+# ---------------------------------------------------------------------------
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        global _in_flight
+        status = 500
+        stats = RequestStats(parent=current_request.get(), record_statements=settings.QUERY_DEBUG)
+        token = current_request.set(stats)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        _in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _in_flight -= 1
+            current_request.reset(token)
+            stats.close()
+            route = scope.get("route")
+            key = (scope["method"], getattr(route, "path", UNMATCHED_ROUTE))
+            if stats.statements is not None:
+                report_request(" ".join(key), stats)
+            metrics = _routes.get(key)
+            if metrics is None:
+                metrics = _routes[key] = RouteMetrics()
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+            metrics.latency.observe(elapsed)
+            metrics.queries.observe(stats.queries)
+            metrics.db_seconds.observe(stats.db_seconds)
+
+
+# ---------------------------------------------------------------------------
+# Exposition
+# ---------------------------------------------------------------------------
+
+def _write_http(writer: PrometheusWriter) -> None:
+    routes = sorted(_routes.items())
+    writer.metric("http_requests_in_flight", "gauge", "Requêtes HTTP en cours de traitement.", _in_flight)
+
+    writer.header("http_requests_total", "counter", "Requêtes HTTP par route et statut.")
+    for (method, path), metrics in routes:
+        for status, count in sorted(metrics.statuses.items()):
+            writer.sample(
+                "http_requests_total", count, (("method", method), ("route", path), ("status", str(status)))
+            )
+
+    families = (
+        ("http_request_duration_seconds", "latency", "Durée des requêtes HTTP."),
+        ("http_request_db_queries", "queries", "Nombre de requêtes SQL par requête HTTP."),
+        ("http_request_db_seconds", "db_seconds", "Temps passé en base par requête HTTP."),
+    )
+    for name, attribute, help_text in families:
+        writer.header(name, "histogram", help_text)
+        for (method, path), metrics in routes:
+            writer.histogram(name, getattr(metrics, attribute).snapshot(), (("method", method), ("route", path)))
+
+
+def _write_components(writer: PrometheusWriter) -> None:
+    # Imports locaux : ces modules importent eux-mêmes la configuration de la base
+    from app.core.auth_cache import principal_cache
+    from app.core.security import password_hasher
+    from app.db.pool import pool_stats
+
+    cache = principal_cache.stats()
+    writer.metric("auth_cache_entries", "gauge", "Utilisateurs en cache.", cache["size"])
+    for counter in ("hits", "misses", "evictions", "invalidations"):
+        writer.metric(f"auth_cache_{counter}_total", "counter", f"Cache d'authentification : {counter}.",
+                      cache[counter])
+
+    hasher = password_hasher.stats()
+    writer.metric("password_hash_pending", "gauge", "Hachages en cours ou en attente.", hasher["pending"])
+    writer.metric("password_hash_completed_total", "counter", "Hachages exécutés.", hasher["completed"])
+    writer.metric("password_hash_rejected_total", "counter", "Hachages refusés (file pleine).", hasher["rejected"])
+    writer.metric("password_hash_queue_seconds_max", "gauge", "Attente maximale avant hachage.",
+                  hasher["queue_seconds_max"])
+
+    pools = pool_stats()
+    gauges = (
+        ("size", "Taille nominale du pool."),
+        ("checked_out", "Connexions empruntées."),
+        ("checked_in", "Connexions disponibles."),
+        ("overflow", "Connexions en débordement."),
+    )
+    for field, help_text in gauges:
+        writer.header(f"db_pool_{field}", "gauge", help_text)
+        for name, stats in pools.items():
+            if field in stats:
+                writer.sample(f"db_pool_{field}", stats[field], (("pool", name),))
+    for field in ("timeouts", "invalidations", "liveness_failures"):
+        writer.header(f"db_pool_{field}_total", "counter", f"Pool de connexions : {field}.")
+        for name, stats in pools.items():
+            writer.sample(f"db_pool_{field}_total", stats.get(field, 0), (("pool", name),))
+    writer.header("db_pool_checkout_wait_seconds", "histogram", "Attente pour obtenir une connexion.")
+    for name, stats in pools.items():
+        if "checkout_wait_seconds" in stats:
+            writer.histogram("db_pool_checkout_wait_seconds", stats["checkout_wait_seconds"], (("pool", name),))
+
+
+def render_metrics() -> str:
+    """Toutes les métriques au format texte Prometheus (à appeler depuis la boucle asyncio)."""
+    writer = PrometheusWriter()
+    _write_http(writer)
+    _write_components(writer)
+    return writer.render()
@@ -1,11 +1,83 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Dict, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import settings
 
 # Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many password hashes are already running or queued."""
+
+
+class PasswordHasher:
+    """
+    Bounded executor dedicated to bcrypt.
+
+    Hashing runs outside the event loop and outside the request threadpool,
+    on at most ``workers`` threads (bcrypt releases the GIL). Beyond
+    ``max_pending`` running or queued operations, new ones are rejected
+    immediately instead of piling up behind a login burst.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.queue_seconds_total = 0.0
+        self.queue_seconds_max = 0.0
+
+    async def run(self, func: Callable, *args):
+        """Run ``func(*args)`` on the executor, or raise ``PasswordHasherBusy``."""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy()
+            self.pending += 1
+        future = self._executor.submit(self._timed, time.perf_counter(), func, *args)
+        # Released when hashing ends, even if the request was cancelled meanwhile
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self.pending -= 1
+
+    def _timed(self, submitted_at: float, func: Callable, *args):
+        waited = time.perf_counter() - submitted_at
+        with self._lock:
+            self.completed += 1
+            self.queue_seconds_total += waited
+            self.queue_seconds_max = max(self.queue_seconds_max, waited)
+        return func(*args)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "queue_seconds_avg": round(self.queue_seconds_total / self.completed, 6) if self.completed else 0.0,
+                "queue_seconds_max": round(self.queue_seconds_max, 6),
+            }
+
+
+password_hasher = PasswordHasher(
+    settings.PASSWORD_HASH_WORKERS,
+    settings.PASSWORD_HASH_WORKERS * settings.PASSWORD_HASH_MAX_PENDING_PER_WORKER,
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -18,6 +90,27 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def verify_and_update_password(
+    plain_password: str, hashed_password: Optional[str]
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password on the dedicated executor.
+
+    Args:
+        plain_password: Password submitted by the user
+        hashed_password: Stored hash, or None for an unknown user (a dummy
+            verification keeps the response time identical)
+
+    Returns:
+        (valid, new_hash) where new_hash is set when the stored hash uses
+        outdated parameters and should be replaced
+    """
+    if hashed_password is None:
+        await password_hasher.run(pwd_context.dummy_verify)
+        return False, None
+    return await password_hasher.run(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     Create a JWT access token.
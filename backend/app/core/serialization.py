@@ -0,0 +1,47 @@
+"""
+Sérialisation rapide des listes : colonnes lues en tuples, JSON produit par orjson.
+
+Pour une page de 500 lignes, l'essentiel du temps partait dans la
+construction des objets ORM puis leur validation par les schémas Pydantic
+(``from_attributes``). ``RowSerializer`` lit directement les colonnes du
+schéma de réponse et les convertit en dictionnaires dans l'ordre de ses
+champs ; ``FastJSONResponse`` les encode avec orjson. Le JSON produit est
+identique à celui du chemin Pydantic (vérifié par ``benchmarks.serialization``),
+datetimes compris : UTC en ``Z``, autres fuseaux en ``+hh:mm``.
+"""
+from typing import Any, Dict, Iterable, List, Sequence, Type
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+# Même rendu des datetimes UTC que Pydantic
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+
+class FastJSONResponse(JSONResponse):
+    """``JSONResponse`` encodée par orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+class RowSerializer:
+    """Projection SQL des champs d'un schéma de réponse, sans objets ORM ni validation."""
+
+    def __init__(self, schema: Type[BaseModel], model):
+        self.schema = schema
+        self.fields = tuple(schema.model_fields)
+        self.columns = tuple(getattr(model, name) for name in self.fields)
+
+    def project(self, stmt):
+        """Remplacer les colonnes de ``stmt`` (``select(Model)`` filtré, joint...) par celles du schéma."""
+        return stmt.with_only_columns(*self.columns, maintain_column_froms=True)
+
+    def to_dicts(self, rows: Iterable[Sequence[Any]]) -> List[Dict[str, Any]]:
+        # Colonnes ajoutées en fin de ligne (clés de tri) : ignorées par zip
+        fields = self.fields
+        return [dict(zip(fields, row)) for row in rows]
+
+    def dumps(self, rows: Iterable[Sequence[Any]]) -> bytes:
+        return orjson.dumps(self.to_dicts(rows), option=ORJSON_OPTIONS)
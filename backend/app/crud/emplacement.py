@@ -1,17 +1,67 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from app.core.serialization import RowSerializer
+from app.crud.pagination import paginate, paginate_async, paginate_rows_async, parse_sort
 from app.models.emplacements import Emplacement
 from app.models.equipment import Equipment
-from app.schemas.emplacements import EmplacementCreate, EmplacementUpdate
-from typing import List, Optional
+from app.schemas.emplacements import EmplacementCreate, EmplacementUpdate, EmplacementResponse
+from typing import List, Optional, Tuple
+
+SORTABLE_FIELDS = {
+    "id": Emplacement.id,
+    "updated_at": Emplacement.updated_at,
+    "site": Emplacement.site,
+}
+
+EMPLACEMENT_ROWS = RowSerializer(EmplacementResponse, Emplacement)
 
 def get_emplacement(db: Session, emplacement_id: int) -> Optional[Emplacement]:
     return db.query(Emplacement).filter(Emplacement.id == emplacement_id).first()
 
+async def get_emplacement_async(db: AsyncSession, emplacement_id: int) -> Optional[Emplacement]:
+    return await db.get(Emplacement, emplacement_id)
+
 def get_emplacement_by_equipment(db: Session, equipment_id: int) -> Optional[Emplacement]:
     return db.query(Emplacement).filter(Emplacement.equipment_id == equipment_id).first()
 
-def get_emplacements(db: Session, skip: int = 0, limit: int = 100) -> List[Emplacement]:
-    return db.query(Emplacement).offset(skip).limit(limit).all()
+def list_emplacements_query():
+    return select(Emplacement)
+
+def get_emplacements(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: Optional[str] = None,
+) -> Tuple[List[Emplacement], Optional[str]]:
+    sort_keys = parse_sort(sort, SORTABLE_FIELDS)
+    return paginate(db, list_emplacements_query(), sort_keys, Emplacement.id, limit, cursor=cursor, skip=skip)
+
+async def get_emplacements_async(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: Optional[str] = None,
+) -> Tuple[List[Emplacement], Optional[str]]:
+    sort_keys = parse_sort(sort, SORTABLE_FIELDS)
+    stmt = list_emplacements_query()
+    return await paginate_async(db, stmt, sort_keys, Emplacement.id, limit, cursor=cursor, skip=skip)
+
+async def get_emplacement_rows_async(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: Optional[str] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    sort_keys = parse_sort(sort, SORTABLE_FIELDS)
+    stmt = EMPLACEMENT_ROWS.project(list_emplacements_query())
+    rows, next_cursor = await paginate_rows_async(
+        db, stmt, sort_keys, Emplacement.id, limit, cursor=cursor, skip=skip
+    )
+    return EMPLACEMENT_ROWS.to_dicts(rows), next_cursor
 
 def create_emplacement(db: Session, emplacement: EmplacementCreate) -> Emplacement:
     # Vérifier que l'équipement existe
@@ -64,14 +114,3 @@ def delete_emplacement(db: Session, emplacement_id: int) -> bool:
 
 def get_emplacements_count(db: Session) -> int:
     return db.query(Emplacement).count()
-
-def update_designation_for_equipment(db: Session, equipment_id: int):
-    """
-    Mettre à jour la désignation d'un emplacement quand l'équipement change de statut
-    """
-    emplacement = get_emplacement_by_equipment(db, equipment_id)
-    if emplacement:
-        emplacement.generate_designation()
-        db.commit()
-        db.refresh(emplacement)
-    return emplacement
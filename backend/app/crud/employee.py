@@ -1,19 +1,69 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from app.core.serialization import RowSerializer
+from app.crud.pagination import paginate, paginate_async, paginate_rows_async, parse_sort
 from app.models.employee import Employee
-from app.schemas.employee import EmployeeCreate, EmployeeUpdate
+from app.schemas.employee import Employee as EmployeeSchema, EmployeeCreate, EmployeeUpdate
+
+SORTABLE_FIELDS = {
+    "id": Employee.id,
+    "updated_at": Employee.updated_at,
+    "name": Employee.name,
+}
+
+EMPLOYEE_ROWS = RowSerializer(EmployeeSchema, Employee)
 
 def get(db: Session, employee_id: int) -> Optional[Employee]:
     """Récupérer un employé par ID"""
     return db.query(Employee).filter(Employee.id == employee_id).first()
 
+async def get_async(db: AsyncSession, employee_id: int) -> Optional[Employee]:
+    """Récupérer un employé par ID (session asynchrone)"""
+    return await db.get(Employee, employee_id)
+
 def get_by_email(db: Session, email: str) -> Optional[Employee]:
     """Récupérer un employé par email"""
     return db.query(Employee).filter(Employee.email == email).first()
 
-def get_multi(db: Session, skip: int = 0, limit: int = 100) -> List[Employee]:
-    """Récupérer plusieurs employés"""
-    return db.query(Employee).offset(skip).limit(limit).all()
+def list_query():
+    return select(Employee)
+
+def get_multi(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: Optional[str] = None,
+) -> Tuple[List[Employee], Optional[str]]:
+    """Récupérer une page d'employés et le curseur de la page suivante"""
+    sort_keys = parse_sort(sort, SORTABLE_FIELDS)
+    return paginate(db, list_query(), sort_keys, Employee.id, limit, cursor=cursor, skip=skip)
+
+async def get_multi_async(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: Optional[str] = None,
+) -> Tuple[List[Employee], Optional[str]]:
+    """Récupérer une page d'employés (session asynchrone)"""
+    sort_keys = parse_sort(sort, SORTABLE_FIELDS)
+    return await paginate_async(db, list_query(), sort_keys, Employee.id, limit, cursor=cursor, skip=skip)
+
+async def get_rows_async(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: Optional[str] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """Page d'employés lue en colonnes, prête à sérialiser"""
+    sort_keys = parse_sort(sort, SORTABLE_FIELDS)
+    stmt = EMPLOYEE_ROWS.project(list_query())
+    rows, next_cursor = await paginate_rows_async(db, stmt, sort_keys, Employee.id, limit, cursor=cursor, skip=skip)
+    return EMPLOYEE_ROWS.to_dicts(rows), next_cursor
 
 def create(db: Session, employee_in: EmployeeCreate) -> Employee:
     """Créer un nouvel employé"""
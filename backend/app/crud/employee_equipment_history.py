@@ -0,0 +1,62 @@
+from typing import List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.crud.pagination import paginate_rows
+from app.models.employee import Employee
+from app.models.employee_equipment_history import EmployeeEquipmentHistory
+from app.models.equipment import Equipment
+
+# Colonnes d'une entrée d'historique, nommées comme les champs de HistoryResponse
+HISTORY_FIELDS = (
+    ("id", EmployeeEquipmentHistory.id),
+    ("employee_id", EmployeeEquipmentHistory.employee_id),
+    ("equipment_id", EmployeeEquipmentHistory.equipment_id),
+    ("assigned_at", EmployeeEquipmentHistory.assigned_at),
+    ("returned_at", EmployeeEquipmentHistory.returned_at),
+    ("notes", EmployeeEquipmentHistory.notes),
+    ("created_at", EmployeeEquipmentHistory.created_at),
+    ("equipment_serial", Equipment.serial_number),
+    ("equipment_model", Equipment.model),
+    ("equipment_type", Equipment.equipment_type),
+    ("employee_name", Employee.name),
+    ("employee_cuid", Employee.cuid),
+    ("employee_department", Employee.department),
+)
+
+# Du plus récent au plus ancien (index (employee_id | equipment_id, assigned_at, id))
+RECENT_FIRST = [(EmployeeEquipmentHistory.assigned_at, True)]
+
+def rows_query():
+    """Entrées d'historique avec l'équipement et l'employé concernés"""
+    return (
+        select(*(column.label(name) for name, column in HISTORY_FIELDS))
+        .select_from(EmployeeEquipmentHistory)
+        .outerjoin(Equipment, EmployeeEquipmentHistory.equipment_id == Equipment.id)
+        .outerjoin(Employee, EmployeeEquipmentHistory.employee_id == Employee.id)
+    )
+
+def to_dicts(rows) -> List[dict]:
+    # Colonnes ajoutées en fin de ligne (clés de tri) : ignorées par zip
+    fields = [name for name, _ in HISTORY_FIELDS]
+    return [dict(zip(fields, row)) for row in rows]
+
+def get_by_employee(
+    db: Session, employee_id: int, limit: int = 100, cursor: Optional[str] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """Page de l'historique d'un employé, du plus récent au plus ancien"""
+    stmt = rows_query().where(EmployeeEquipmentHistory.employee_id == employee_id)
+    rows, next_cursor = paginate_rows(db, stmt, RECENT_FIRST, EmployeeEquipmentHistory.id, limit, cursor=cursor)
+    return to_dicts(rows), next_cursor
+
+def get_by_equipment(
+    db: Session, equipment_id: int, limit: int = 100, cursor: Optional[str] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """Page de l'historique d'un équipement (détenteurs successifs), du plus récent au plus ancien"""
+    stmt = rows_query().where(EmployeeEquipmentHistory.equipment_id == equipment_id)
+    rows, next_cursor = paginate_rows(db, stmt, RECENT_FIRST, EmployeeEquipmentHistory.id, limit, cursor=cursor)
+    return to_dicts(rows), next_cursor
+
+def has_history(db: Session, equipment_id: int) -> bool:
+    """Vrai si l'équipement a au moins une entrée d'historique (attribution passée ou en cours)"""
+    stmt = select(EmployeeEquipmentHistory.id).where(EmployeeEquipmentHistory.equipment_id == equipment_id).limit(1)
+    return db.scalar(stmt) is not None
@@ -1,17 +1,109 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from app.core.serialization import RowSerializer
+from app.crud.pagination import paginate, paginate_async, paginate_rows_async, parse_sort
+from app.models.emplacements import Emplacement
 from app.models.equipment import Equipment
-from app.schemas.equipment import EquipmentCreate, EquipmentUpdate
-from typing import List, Optional
+from app.schemas.equipment import EquipmentCreate, EquipmentUpdate, EquipmentFilter, EquipmentResponse
+from typing import List, Optional, Tuple
 
-def get_equipment(db: Session, skip: int = 0, limit: int = 100) -> List[Equipment]:
-    return db.query(Equipment).offset(skip).limit(limit).all()
+SORTABLE_FIELDS = {
+    "id": Equipment.id,
+    "updated_at": Equipment.updated_at,
+    "created_at": Equipment.created_at,
+    "serial_number": Equipment.serial_number,
+    "status": Equipment.status,
+    "equipment_type": Equipment.equipment_type,
+    "condition": Equipment.condition,
+}
+
+# Projection des listes : colonnes d'EquipmentResponse, sérialisées sans ORM
+EQUIPMENT_ROWS = RowSerializer(EquipmentResponse, Equipment)
+
+def list_equipment_query(filters: Optional[EquipmentFilter] = None):
+    """Requête de liste avec les filtres serveur (chacun servi par un index)"""
+    return filter_equipment(select(Equipment), filters)
+
+def filter_equipment(stmt, filters: Optional[EquipmentFilter], emplacement_joined: bool = False):
+    """Appliquer ``filters`` à une requête sur Equipment (jointure des emplacements ajoutée si besoin)"""
+    if filters is None:
+        return stmt
+
+    if filters.status:
+        stmt = stmt.where(Equipment.status.in_([value.value for value in filters.status]))
+    if filters.equipment_type:
+        stmt = stmt.where(Equipment.equipment_type.in_([value.value for value in filters.equipment_type]))
+    if filters.condition:
+        stmt = stmt.where(Equipment.condition.in_([value.value for value in filters.condition]))
+    if filters.employee_id is not None:
+        stmt = stmt.where(Equipment.employee_id == filters.employee_id)
+    if filters.emplacement_id is not None:
+        stmt = stmt.where(Equipment.emplacement_id == filters.emplacement_id)
+    if filters.updated_since is not None:
+        stmt = stmt.where(Equipment.updated_at >= filters.updated_since)
+
+    if filters.site or filters.etage:
+        if not emplacement_joined:
+            stmt = stmt.join(Emplacement, Equipment.emplacement_id == Emplacement.id)
+        if filters.site:
+            stmt = stmt.where(Emplacement.site == filters.site)
+        if filters.etage:
+            stmt = stmt.where(Emplacement.etage == filters.etage)
+    return stmt
+
+def get_equipment(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: Optional[str] = None,
+    filters: Optional[EquipmentFilter] = None,
+) -> Tuple[List[Equipment], Optional[str]]:
+    """Page d'équipements filtrée et triée de façon stable, avec le curseur de la page suivante"""
+    sort_keys = parse_sort(sort, SORTABLE_FIELDS)
+    stmt = list_equipment_query(filters)
+    return paginate(db, stmt, sort_keys, Equipment.id, limit, cursor=cursor, skip=skip)
+
+async def get_equipment_async(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: Optional[str] = None,
+    filters: Optional[EquipmentFilter] = None,
+) -> Tuple[List[Equipment], Optional[str]]:
+    """Version asynchrone de get_equipment"""
+    sort_keys = parse_sort(sort, SORTABLE_FIELDS)
+    stmt = list_equipment_query(filters)
+    return await paginate_async(db, stmt, sort_keys, Equipment.id, limit, cursor=cursor, skip=skip)
+
+async def get_equipment_rows_async(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    sort: Optional[str] = None,
+    filters: Optional[EquipmentFilter] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """Page d'équipements lue en colonnes, prête à sérialiser (mêmes champs qu'EquipmentResponse)"""
+    sort_keys = parse_sort(sort, SORTABLE_FIELDS)
+    stmt = EQUIPMENT_ROWS.project(list_equipment_query(filters))
+    rows, next_cursor = await paginate_rows_async(db, stmt, sort_keys, Equipment.id, limit, cursor=cursor, skip=skip)
+    return EQUIPMENT_ROWS.to_dicts(rows), next_cursor
 
 def get_equipment_by_id(db: Session, equipment_id: int) -> Optional[Equipment]:
     return db.query(Equipment).filter(Equipment.id == equipment_id).first()
 
+async def get_equipment_by_id_async(db: AsyncSession, equipment_id: int) -> Optional[Equipment]:
+    return await db.get(Equipment, equipment_id)
+
 def get_equipment_by_serial(db: Session, serial_number: str) -> Optional[Equipment]:
     return db.query(Equipment).filter(Equipment.serial_number == serial_number).first()
 
+async def get_equipment_by_serial_async(db: AsyncSession, serial_number: str) -> Optional[Equipment]:
+    return await db.scalar(select(Equipment).where(Equipment.serial_number == serial_number))
+
 def create_equipment(db: Session, equipment: EquipmentCreate) -> Equipment:
     db_equipment = Equipment(
         serial_number=equipment.serial_number,
@@ -29,9 +121,6 @@ def create_equipment(db: Session, equipment: EquipmentCreate) -> Equipment:
 def update_equipment(db: Session, equipment_id: int, equipment: EquipmentUpdate) -> Optional[Equipment]:
     db_equipment = get_equipment_by_id(db, equipment_id)
     if db_equipment:
-        # Sauvegarder l'ancien statut
-        old_status = db_equipment.status
-        
         # Mettre à jour l'équipement
         update_data = equipment.dict(exclude_unset=True)
         for key, value in update_data.items():
@@ -39,11 +128,6 @@ def update_equipment(db: Session, equipment_id: int, equipment: EquipmentUpdate)
         
         db.commit()
         db.refresh(db_equipment)
-        
-        # Si le statut a changé et que c'est un laptop, mettre à jour la désignation
-        if old_status != db_equipment.status and db_equipment.equipment_type.lower() == "laptop":
-            from app.crud.emplacement import update_designation_for_equipment
-            update_designation_for_equipment(db, equipment_id)
     
     return db_equipment
 
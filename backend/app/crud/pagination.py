@@ -0,0 +1,226 @@
+"""
+Pagination par curseur (keyset) pour les listes.
+
+Le curseur est opaque pour le client : il encode les valeurs de tri de la
+dernière ligne renvoyée, suivies de son ``id``. La page suivante est lue par
+``WHERE (cle, id) > (:cle, :id) ORDER BY cle, id LIMIT n``, ce qui suit
+l'index au lieu de parcourir les ``OFFSET`` premières lignes.
+
+Un ``id`` explicite dans le tri garde sa place ; sinon il est ajouté en
+dernier pour départager les ex-aequo. Une clé nullable (``updated_at``)
+range NULL après toute valeur, comme l'index PostgreSQL : ``NULLS LAST``
+en ordre croissant, ``NULLS FIRST`` en décroissant, sur toutes les bases.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, false, func, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+# (attribut de colonne, tri descendant)
+SortKey = Tuple[Any, bool]
+
+COUNT_MODES = ("exact", "estimate")
+
+
+def parse_sort(sort: Optional[str], allowed: Dict[str, Any], default: str = "id") -> List[SortKey]:
+    """Convertir ``"-updated_at,serial_number"`` en liste de clés de tri validées."""
+    keys = []
+    for raw in (sort or default).split(","):
+        name = raw.strip()
+        descending = name.startswith("-")
+        name = name.lstrip("+-")
+        if name not in allowed:
+            raise ValueError(f"Tri non supporté : {name} (valeurs possibles : {', '.join(allowed)})")
+        keys.append((allowed[name], descending))
+    return keys
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    payload = [{"dt": value.isoformat()} if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list):
+            raise ValueError
+        return [datetime.fromisoformat(value["dt"]) if isinstance(value, dict) else value for value in payload]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Curseur invalide")
+
+
+def _nullable(column) -> bool:
+    return bool(getattr(column, "nullable", False))
+
+
+def _equal(column, value):
+    return column.is_(None) if value is None else column == value
+
+
+def _after(column, descending: bool, value):
+    # NULL est plus grand que toute valeur
+    if descending:
+        return column.is_not(None) if value is None else column < value
+    if value is None:
+        return None
+    return or_(column > value, column.is_(None)) if _nullable(column) else column > value
+
+
+def _keyset_condition(columns: List[Any], directions: List[bool], values: List[Any]):
+    if len(set(directions)) == 1 and not any(_nullable(column) for column in columns):
+        # Même sens partout : comparaison de tuples, directement servie par l'index composite
+        if directions[0]:
+            return tuple_(*columns) < tuple_(*values)
+        return tuple_(*columns) > tuple_(*values)
+
+    # Sens mixtes ou clés nullables : (c1 > v1) OR (c1 = v1 AND c2 < v2) OR ...
+    clauses = []
+    for index, (column, descending) in enumerate(zip(columns, directions)):
+        after = _after(column, descending, values[index])
+        if after is not None:
+            clauses.append(and_(*[_equal(columns[i], values[i]) for i in range(index)], after))
+    return or_(*clauses) if clauses else false()
+
+
+def _order(column, descending: bool):
+    if not _nullable(column):
+        return column.desc() if descending else column.asc()
+    return column.desc().nulls_first() if descending else column.asc().nulls_last()
+
+
+def _page_statement(stmt, sort_keys: List[SortKey], id_column, limit: int, cursor: Optional[str], skip: int):
+    keys = list(sort_keys)
+    ids = [index for index, (column, _) in enumerate(keys) if column is id_column]
+    if ids:
+        # id unique : les clés suivantes ne départagent plus rien
+        keys = keys[:ids[0] + 1]
+    else:
+        # L'id départage les ex-aequo et suit le sens de la dernière clé
+        keys.append((id_column, keys[-1][1] if keys else False))
+    columns = [column for column, _ in keys]
+    directions = [descending for _, descending in keys]
+
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(columns):
+            raise ValueError("Curseur invalide pour ce tri")
+        stmt = stmt.where(_keyset_condition(columns, directions, values))
+    elif skip:
+        stmt = stmt.offset(skip)
+
+    stmt = stmt.order_by(*[_order(column, descending) for column, descending in keys])
+    return stmt.limit(limit + 1), columns
+
+
+def _page(rows: List[Any], limit: int, columns: List[Any]) -> Tuple[List[Any], Optional[str]]:
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, column.key) for column in columns])
+    return rows, next_cursor
+
+
+def paginate(
+    db: Session,
+    stmt,
+    sort_keys: List[SortKey],
+    id_column,
+    limit: int,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Exécuter ``stmt`` trié de façon stable et retourner ``(lignes, curseur_suivant)``.
+
+    ``skip`` reste accepté pour les anciens clients mais n'est utilisé
+    qu'en l'absence de curseur.
+    """
+    stmt, columns = _page_statement(stmt, sort_keys, id_column, limit, cursor, skip)
+    return _page(db.scalars(stmt).all(), limit, columns)
+
+
+async def paginate_async(
+    db: AsyncSession,
+    stmt,
+    sort_keys: List[SortKey],
+    id_column,
+    limit: int,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+) -> Tuple[List[Any], Optional[str]]:
+    """Équivalent de ``paginate`` pour une session asynchrone."""
+    stmt, columns = _page_statement(stmt, sort_keys, id_column, limit, cursor, skip)
+    return _page((await db.scalars(stmt)).all(), limit, columns)
+
+
+def _rows_statement(stmt, sort_keys: List[SortKey], id_column, limit: int, cursor: Optional[str], skip: int):
+    # Clés de tri absentes de la projection : ajoutées en fin de ligne pour le curseur
+    stmt, columns = _page_statement(stmt, sort_keys, id_column, limit, cursor, skip)
+    missing = [column for column in columns if column.key not in stmt.selected_columns]
+    if missing:
+        stmt = stmt.add_columns(*missing)
+    return stmt, columns
+
+
+def paginate_rows(
+    db: Session,
+    stmt,
+    sort_keys: List[SortKey],
+    id_column,
+    limit: int,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+) -> Tuple[List[Any], Optional[str]]:
+    """Variante de ``paginate`` pour une requête de colonnes : renvoie des ``Row``."""
+    stmt, columns = _rows_statement(stmt, sort_keys, id_column, limit, cursor, skip)
+    return _page(db.execute(stmt).all(), limit, columns)
+
+
+async def paginate_rows_async(
+    db: AsyncSession,
+    stmt,
+    sort_keys: List[SortKey],
+    id_column,
+    limit: int,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Variante de ``paginate_async`` pour une requête de colonnes : renvoie des ``Row``.
+
+    Les clés de tri absentes de la projection sont ajoutées en fin de ligne
+    pour calculer le curseur.
+    """
+    stmt, columns = _rows_statement(stmt, sort_keys, id_column, limit, cursor, skip)
+    return _page((await db.execute(stmt)).all(), limit, columns)
+
+
+def count_rows(db: Session, stmt, mode: str) -> Optional[int]:
+    """
+    Compter les lignes de ``stmt``.
+
+    ``estimate`` lit l'estimation du planificateur PostgreSQL (``EXPLAIN``)
+    au lieu de parcourir la table ; sur les autres bases on compte exactement.
+    """
+    if mode not in COUNT_MODES:
+        return None
+    if mode == "estimate" and db.get_bind().dialect.name == "postgresql":
+        compiled = stmt.compile(dialect=db.get_bind().dialect, compile_kwargs={"render_postcompile": True})
+        plan = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    return db.scalar(select(func.count()).select_from(stmt.order_by(None).subquery()))
+
+
+async def count_rows_async(db: AsyncSession, stmt, mode: str) -> Optional[int]:
+    """Équivalent de ``count_rows`` pour une session asynchrone."""
+    return await db.run_sync(count_rows, stmt, mode)
@@ -1,12 +1,19 @@
 from typing import Optional
+from sqlalchemy import select, update as sql_update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models.user import User
-from app.core.security import verify_password, get_password_hash
+from app.core.auth_cache import principal_cache
+from app.core.security import verify_password, verify_and_update_password, get_password_hash
 
 def get_by_email(db: Session, email: str) -> Optional[User]:
     """Récupérer un utilisateur par email"""
     return db.query(User).filter(User.email == email).first()
 
+async def get_by_email_async(db: AsyncSession, email: str) -> Optional[User]:
+    """Récupérer un utilisateur par email (session asynchrone)"""
+    return await db.scalar(select(User).where(User.email == email))
+
 def authenticate(db: Session, email: str, password: str) -> Optional[User]:
     """Authentifier un utilisateur"""
     user = get_by_email(db, email=email)
@@ -16,6 +23,21 @@ def authenticate(db: Session, email: str, password: str) -> Optional[User]:
         return None
     return user
 
+async def authenticate_async(db: AsyncSession, email: str, password: str) -> Optional[User]:
+    """Authentifier sans bloquer : bcrypt tourne dans l'exécuteur dédié, re-hachage si le coût a changé"""
+    user = await get_by_email_async(db, email=email)
+    if user is not None:
+        db.expunge(user)
+    # Connexion rendue au pool avant le hachage
+    await db.rollback()
+    valid, new_hash = await verify_and_update_password(password, user.hashed_password if user else None)
+    if not user or not valid:
+        return None
+    if new_hash:
+        await db.execute(sql_update(User).where(User.id == user.id).values(hashed_password=new_hash))
+        await db.commit()
+    return user
+
 def create(db: Session, email: str, password: str, first_name: str, last_name: str, role: str = "user") -> User:
     """Créer un nouvel utilisateur"""
     hashed_password = get_password_hash(password)
@@ -42,18 +64,22 @@ def get_multi(db: Session, skip: int = 0, limit: int = 100):
 
 def update(db: Session, user: User, **kwargs) -> User:
     """Mettre à jour un utilisateur"""
+    previous_email = user.email
     for key, value in kwargs.items():
         if hasattr(user, key):
             setattr(user, key, value)
     db.commit()
     db.refresh(user)
+    principal_cache.invalidate(previous_email, user.email)
     return user
 
 def delete(db: Session, user_id: int) -> bool:
     """Supprimer un utilisateur"""
     user = get(db, user_id)
     if user:
+        email = user.email
         db.delete(user)
         db.commit()
+        principal_cache.invalidate(email)
         return True
     return False
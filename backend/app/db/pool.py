@@ -0,0 +1,182 @@
+"""
+Pools de connexions instrumentés et contrôle de vivacité en tâche de fond.
+
+``InstrumentedQueuePool`` (et sa variante asynchrone) mesure le temps
+d'attente de chaque checkout et compte les dépassements de ``pool_timeout`` ;
+les invalidations sont comptées par événement. ``pool_stats`` expose ces
+mesures avec l'occupation courante de chaque pool.
+
+Avec ``DB_POOL_PRE_PING`` désactivé, ``PoolLivenessMonitor`` envoie un
+``SELECT 1`` toutes les ``DB_POOL_LIVENESS_INTERVAL_SECONDS`` secondes au lieu
+d'un ping à chaque checkout : sur une déconnexion, SQLAlchemy invalide alors
+tout le pool et les connexions plus anciennes sont remplacées au checkout.
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, Optional, Sequence
+
+from sqlalchemy import event, exc, text
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    def __init__(self, name: str):
+        self.name = name
+        self.checkout_wait = Histogram()
+        self.timeouts = 0
+        self.invalidations = 0
+        self.liveness_failures = 0
+        self._lock = threading.Lock()
+
+    def increment(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+class _InstrumentedPoolMixin:
+    metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.increment("timeouts")
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.checkout_wait.observe(time.perf_counter() - start)
+
+    def recreate(self):
+        # engine.dispose() recrée le pool : les métriques sont conservées
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+_engines: Dict[str, object] = {}
+
+
+def instrument(engine, name: str) -> None:
+    """Rattacher des métriques au pool de ``engine`` (moteur sync ou async)."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    metrics = PoolMetrics(name)
+    sync_engine.pool.metrics = metrics
+
+    @event.listens_for(sync_engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.increment("invalidations")
+
+    _engines[name] = sync_engine
+
+
+def pool_stats() -> Dict[str, Dict[str, object]]:
+    """Occupation courante et compteurs de chaque pool instrumenté."""
+    result = {}
+    for name, sync_engine in _engines.items():
+        pool = sync_engine.pool
+        metrics: PoolMetrics = pool.metrics
+        stats = {"class": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            stats.update(
+                size=pool.size(),
+                checked_in=pool.checkedin(),
+                checked_out=pool.checkedout(),
+                overflow=pool.overflow(),
+                max_overflow=pool._max_overflow,
+                timeout_seconds=pool.timeout(),
+            )
+        if metrics is not None:
+            stats.update(
+                timeouts=metrics.timeouts,
+                invalidations=metrics.invalidations,
+                liveness_failures=metrics.liveness_failures,
+                checkout_wait_seconds=metrics.checkout_wait.snapshot(),
+            )
+        result[name] = stats
+    return result
+
+
+class PoolLivenessMonitor:
+    """Ping périodique des moteurs sync (thread) et async (tâche asyncio), primaire et réplicas."""
+
+    def __init__(self, engines: Sequence, async_engines: Sequence, interval_seconds: float):
+        self.engines = list(engines)
+        self.async_engines = list(async_engines)
+        self.interval_seconds = interval_seconds
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Démarrer les contrôles ; à appeler depuis la boucle asyncio de l'application."""
+        if self.interval_seconds <= 0 or self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._sync_loop, name="db-liveness", daemon=True)
+        self._thread.start()
+        self._task = asyncio.get_running_loop().create_task(self._async_loop())
+
+    async def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._thread.join()
+        self._thread = None
+        self._task = None
+
+    def _failed(self, engine) -> None:
+        metrics = getattr(engine.pool, "metrics", None)
+        if metrics is not None:
+            metrics.increment("liveness_failures")
+
+    def check(self) -> None:
+        """Un contrôle de chaque moteur sync ; un moteur injoignable n'empêche pas les suivants."""
+        for engine in self.engines:
+            try:
+                with engine.connect() as connection:
+                    connection.execute(text("SELECT 1"))
+            except Exception:
+                logger.warning("Contrôle de vivacité du pool %s échoué", engine.url.render_as_string(), exc_info=True)
+                self._failed(engine)
+
+    async def check_async(self) -> None:
+        """Équivalent de ``check`` pour les moteurs asynchrones."""
+        for engine in self.async_engines:
+            try:
+                async with engine.connect() as connection:
+                    await connection.execute(text("SELECT 1"))
+            except Exception:
+                logger.warning(
+                    "Contrôle de vivacité du pool asynchrone %s échoué", engine.url.render_as_string(), exc_info=True
+                )
+                self._failed(engine.sync_engine)
+
+    def _sync_loop(self) -> None:
+        while not self._stopping.wait(self.interval_seconds):
+            self.check()
+
+    async def _async_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            await self.check_async()
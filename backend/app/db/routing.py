@@ -0,0 +1,429 @@
+"""
+Routage des sessions entre la base primaire et ses réplicas en lecture.
+
+``RoutingSession`` choisit le moteur de chaque requête SQL dans ``get_bind`` :
+
+- hors requête HTTP en lecture seule (tâches de fond, POST / PUT / DELETE...),
+  tout va au primaire ;
+- dans une requête en lecture seule (GET / HEAD et ``DB_READ_ONLY_PATHS``,
+  marquée par ``ReplicaRoutingMiddleware``), les SELECT vont à un réplica
+  sain, en retard de moins de ``DB_REPLICA_MAX_LAG_SECONDS`` et déjà à la
+  position de la dernière écriture du client ; sinon au primaire ;
+- dès que la session écrit (flush, INSERT / UPDATE / DELETE, SELECT ... FOR
+  UPDATE, SQL textuel), elle reste sur le primaire jusqu'à sa fermeture.
+
+Lire ses propres écritures : après le commit d'une écriture, la position du
+primaire est retenue par le pod pour l'utilisateur authentifié (sujet du
+jeton), pendant ``DB_READ_YOUR_WRITES_SECONDS`` ; ses lectures suivantes
+n'iront qu'à un réplica qui l'a rejointe, sans rien attendre du client. Elle
+est aussi renvoyée (cookie et en-tête ``X-Read-After``) : un client qui la
+renvoie garde la garantie quand sa lecture suivante arrive sur un autre pod.
+La position est le LSN du WAL sur PostgreSQL ; ailleurs (SQLite en local), le
+dernier id de ``outbox_events``, qui n'avance qu'avec les ressources suivies
+par l'outbox.
+
+``ReplicaRouter`` relève dans un thread la position et le retard de chaque
+réplica ; un réplica qui perd sa connexion est écarté jusqu'au relevé suivant.
+"""
+import itertools
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.selectable import GenerativeSelect
+from starlette.requests import cookie_parser
+
+from app.core.config import settings
+from app.core.security import decode_access_token
+
+logger = logging.getLogger(__name__)
+
+READ_AFTER_COOKIE = "db_read_after"
+READ_AFTER_HEADER = "X-Read-After"
+
+# Un relevé plus ancien que ce nombre d'intervalles : le réplica n'est plus choisi
+_STALE_INTERVALS = 3
+# Utilisateurs dont la dernière écriture est retenue (les plus anciens sont oubliés)
+_MAX_WRITERS = 10000
+
+
+class Route:
+    """Routage de la requête en cours (une instance par requête HTTP)."""
+
+    __slots__ = ("read_only", "after", "position")
+
+    def __init__(self, read_only: bool = False, after: Optional[int] = None):
+        self.read_only = read_only
+        # Position que doit avoir atteinte un réplica (dernière écriture du client)
+        self.after = after
+        # Position du primaire après une écriture validée pendant la requête
+        self.position: Optional[int] = None
+
+
+_route: ContextVar[Optional[Route]] = ContextVar("db_route", default=None)
+
+
+@contextmanager
+def route(read_only: bool, after: Optional[int] = None):
+    """Router les sessions ouvertes dans ce bloc (lectures sur réplica si ``read_only``)."""
+    current = Route(read_only, after)
+    token = _route.set(current)
+    try:
+        yield current
+    finally:
+        _route.reset(token)
+
+
+# ---------------------------------------------------------------------------
+# Positions de réplication
+# ---------------------------------------------------------------------------
+
+def _lsn(value: Optional[str]) -> Optional[int]:
+    # "16/B374D848" -> entier comparable
+    if value is None:
+        return None
+    high, low = value.split("/")
+    return (int(high, 16) << 32) + int(low, 16)
+
+
+def primary_position(connection) -> int:
+    if connection.dialect.name == "postgresql":
+        return _lsn(connection.scalar(text("SELECT pg_current_wal_lsn()::text")))
+    return connection.scalar(text("SELECT max(id) FROM outbox_events")) or 0
+
+
+def replica_lag(replica, primary, position: int) -> Tuple[Optional[int], Optional[float]]:
+    """Position atteinte par ``replica`` et son retard en secondes (None : pas un réplica)."""
+    if replica.dialect.name == "postgresql":
+        row = replica.execute(text(
+            "SELECT pg_last_wal_replay_lsn()::text, "
+            "extract(epoch FROM now() - pg_last_xact_replay_timestamp())"
+        )).one()
+        reached = _lsn(row[0])
+        if reached is None:
+            return None, None
+        # Primaire inactif : le dernier rejeu est ancien sans que le réplica soit en retard
+        return reached, 0.0 if reached >= position else float(row[1] or 0.0)
+
+    reached = replica.scalar(text("SELECT max(id) FROM outbox_events")) or 0
+    if reached >= position:
+        return reached, 0.0
+    # Retard : âge du plus ancien événement que le réplica n'a pas encore
+    oldest = primary.scalar(
+        text("SELECT min(created_at) FROM outbox_events WHERE id > :reached"), {"reached": reached}
+    )
+    if oldest is None:
+        return reached, 0.0
+    if isinstance(oldest, str):
+        # SQLite : CURRENT_TIMESTAMP, en UTC
+        oldest = datetime.fromisoformat(oldest)
+    if oldest.tzinfo is None:
+        oldest = oldest.replace(tzinfo=timezone.utc)
+    return reached, max(0.0, time.time() - oldest.timestamp())
+
+
+# ---------------------------------------------------------------------------
+# État des réplicas
+# ---------------------------------------------------------------------------
+
+class ReplicaStatus:
+    __slots__ = ("name", "healthy", "position", "lag_seconds", "checked_at", "error")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.healthy = False
+        self.position: Optional[int] = None
+        self.lag_seconds: Optional[float] = None
+        self.checked_at = 0.0
+        self.error: Optional[str] = None
+
+
+class ReplicaRouter:
+    """Relevé périodique des réplicas et choix du réplica d'une lecture."""
+
+    def __init__(self, primary, replicas: Sequence, interval_seconds: float, max_lag_seconds: float):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.interval_seconds = interval_seconds
+        self.max_lag_seconds = max_lag_seconds
+        self.statuses = [ReplicaStatus(f"replica{index}") for index in range(len(self.replicas))]
+        self._next = itertools.count()
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        for index, replica in enumerate(self.replicas):
+            self.watch(index, replica)
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def watch(self, index: int, engine) -> None:
+        """Écarter le réplica ``index`` dès qu'une connexion de ``engine`` (sync ou async) est perdue."""
+        status = self.statuses[index]
+
+        @event.listens_for(getattr(engine, "sync_engine", engine), "handle_error")
+        def _on_error(context):
+            if context.is_disconnect:
+                status.healthy = False
+                status.error = "déconnecté"
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._counts[key] += 1
+
+    def choose(self, after: Optional[int]) -> Optional[int]:
+        """Indice d'un réplica utilisable pour une lecture, ou None (lecture sur le primaire)."""
+        fresh_since = time.monotonic() - self.interval_seconds * _STALE_INTERVALS
+        eligible = []
+        reason = "unavailable"
+        for index, status in enumerate(self.statuses):
+            if not status.healthy or status.checked_at < fresh_since:
+                continue
+            if status.lag_seconds > self.max_lag_seconds:
+                reason = "lag"
+                continue
+            if after is not None and status.position < after:
+                reason = "read_your_writes"
+                continue
+            eligible.append(index)
+        if not eligible:
+            self._count(f"primary_{reason}")
+            return None
+        index = eligible[next(self._next) % len(eligible)]
+        self._count(self.statuses[index].name)
+        return index
+
+    def refresh(self) -> None:
+        """Relever la position du primaire puis celle et le retard de chaque réplica."""
+        try:
+            with self.primary.connect() as primary:
+                position = primary_position(primary)
+                for replica, status in zip(self.replicas, self.statuses):
+                    try:
+                        with replica.connect() as connection:
+                            status.position, status.lag_seconds = replica_lag(connection, primary, position)
+                        status.healthy = status.position is not None
+                        status.error = None if status.healthy else "pas en réplication"
+                    except Exception as e:
+                        status.healthy = False
+                        status.error = type(e).__name__
+                        logger.warning("Relevé du réplica %s échoué", status.name, exc_info=True)
+                    status.checked_at = time.monotonic()
+        except Exception:
+            # Primaire injoignable : les relevés vieillissent et les lectures y retournent
+            logger.warning("Relevé de la position du primaire échoué", exc_info=True)
+
+    def start(self) -> None:
+        if not self.replicas or self._thread is not None:
+            return
+        self.refresh()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._loop, name="db-replicas", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+
+    def _loop(self) -> None:
+        while not self._stopping.wait(self.interval_seconds):
+            self.refresh()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            reads = dict(self._counts)
+        return {
+            "max_lag_seconds": self.max_lag_seconds,
+            "replicas": [
+                {"name": status.name, "healthy": status.healthy, "position": status.position,
+                 "lag_seconds": status.lag_seconds, "error": status.error}
+                for status in self.statuses
+            ],
+            "reads": reads,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Session
+# ---------------------------------------------------------------------------
+
+def _is_read(clause) -> bool:
+    # SELECT / UNION sans FOR UPDATE ; le SQL textuel est traité comme une écriture
+    return isinstance(clause, GenerativeSelect) and clause._for_update_arg is None
+
+
+_UNSET = object()
+
+
+class RoutingSession(Session):
+    """Session qui envoie les lectures des requêtes en lecture seule à un réplica."""
+
+    def __init__(self, *args, router: Optional[ReplicaRouter] = None, replicas: Sequence = (), **kw):
+        super().__init__(*args, **kw)
+        # ``replicas`` : moteurs de cette session (sync, ou sync_engine des moteurs async),
+        # dans l'ordre de ceux relevés par ``router``
+        self._router = router if router else None
+        self._replicas: List = list(replicas)
+        self._wrote = False
+        self._uncommitted = False
+        # Réplica choisi à la première lecture (None : primaire), gardé pour toute la session
+        self._read_bind = _UNSET
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._router is None:
+            return super().get_bind(mapper, clause=clause, **kw)
+        if self._flushing or (clause is not None and not _is_read(clause)):
+            self._wrote = self._uncommitted = True
+        elif not self._wrote:
+            if self._read_bind is _UNSET:
+                current = _route.get()
+                index = None
+                if current is not None and current.read_only:
+                    index = self._router.choose(current.after)
+                self._read_bind = None if index is None else self._replicas[index]
+            if self._read_bind is not None:
+                return self._read_bind
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _after_commit(session):
+    if not session._uncommitted:
+        return
+    session._uncommitted = False
+    current = _route.get()
+    if current is not None:
+        # Les lectures suivantes du client attendront un réplica à cette position
+        try:
+            # Moteur primaire de la session : sync_engine du moteur async pour une AsyncSession
+            with session.bind.connect() as connection:
+                current.position = primary_position(connection)
+            # ... y compris les sessions ouvertes ensuite par la même requête
+            current.after = max(current.position, current.after or 0)
+        except Exception:
+            logger.warning("Position du primaire indisponible après écriture", exc_info=True)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _after_rollback(session):
+    session._uncommitted = False
+
+
+# ---------------------------------------------------------------------------
+# Dernières écritures par utilisateur
+# ---------------------------------------------------------------------------
+
+class WritePositions:
+    """Position de la dernière écriture de chaque utilisateur, retenue ``ttl_seconds``."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int = _MAX_WRITERS):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # sujet -> (position, échéance) ; ordre d'insertion = ordre des écritures
+        self._positions: Dict[str, Tuple[int, float]] = {}
+
+    def get(self, subject: str) -> Optional[int]:
+        with self._lock:
+            entry = self._positions.get(subject)
+        if entry is None or entry[1] < time.monotonic():
+            return None
+        return entry[0]
+
+    def put(self, subject: str, position: int) -> None:
+        now = time.monotonic()
+        with self._lock:
+            previous = self._positions.pop(subject, None)
+            if previous is not None and previous[1] >= now:
+                position = max(position, previous[0])
+            self._positions[subject] = (position, now + self.ttl_seconds)
+            if len(self._positions) > self.max_entries:
+                for key in [key for key, (_, expires) in self._positions.items() if expires < now]:
+                    del self._positions[key]
+                while len(self._positions) > self.max_entries:
+                    del self._positions[next(iter(self._positions))]
+
+
+# ---------------------------------------------------------------------------
+# Middleware
+# ---------------------------------------------------------------------------
+
+def _read_after(scope) -> Optional[int]:
+    value = None
+    for name, raw in scope["headers"]:
+        if name == b"x-read-after":
+            value = raw.decode("latin-1")
+            break
+        if name == b"cookie":
+            value = cookie_parser(raw.decode("latin-1")).get(READ_AFTER_COOKIE, value)
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def _subject(scope) -> Optional[str]:
+    """Sujet du jeton vérifié (en-tête Authorization ou paramètre ``access_token`` des flux)."""
+    token = None
+    for name, raw in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, credentials = raw.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer":
+                token = credentials.strip()
+            break
+    if token is None:
+        token = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("access_token", [None])[0]
+    payload = decode_access_token(token) if token else None
+    return payload.get("sub") if payload else None
+
+
+class ReplicaRoutingMiddleware:
+    """Marque les requêtes en lecture seule et retient la position de la dernière écriture du client."""
+
+    def __init__(self, app, router: ReplicaRouter, positions: Optional[WritePositions] = None):
+        self.app = app
+        self.router = router
+        self.positions = positions or WritePositions(settings.DB_READ_YOUR_WRITES_SECONDS)
+        self.read_only_paths = tuple(settings.DB_READ_ONLY_PATHS)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.router:
+            await self.app(scope, receive, send)
+            return
+
+        read_only = scope["method"] in ("GET", "HEAD") or scope["path"].startswith(self.read_only_paths)
+        subject = _subject(scope)
+        # Dernière écriture connue : retenue ici pour l'utilisateur, ou renvoyée par le client
+        known = [_read_after(scope), self.positions.get(subject) if subject else None]
+        known = [position for position in known if position is not None]
+        after = max(known) if known else None
+
+        with route(read_only, after) as current:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start" and current.position is not None:
+                    position = max(current.position, after or 0)
+                    if subject:
+                        self.positions.put(subject, position)
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [
+                        (READ_AFTER_HEADER.lower().encode(), str(position).encode()),
+                        (b"set-cookie", (
+                            f"{READ_AFTER_COOKIE}={position}; Max-Age={settings.DB_READ_YOUR_WRITES_SECONDS}; "
+                            "Path=/; HttpOnly; SameSite=Lax"
+                        ).encode()),
+                    ]
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,100 @@
+"""
+Mises à niveau idempotentes du schéma d'une base déjà déployée.
+
+``Base.metadata.create_all`` crée les tables manquantes mais ne touche pas à
+celles qui existent : une colonne ou un index ajouté depuis à un modèle reste
+absent d'une base en service. ``upgrade`` les ajoute ; relancé, il ne fait rien.
+
+Sous PostgreSQL, les index sont construits ``CONCURRENTLY`` (sans bloquer les
+écritures), hors transaction ; un index laissé invalide par une construction
+interrompue est supprimé puis reconstruit.
+"""
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from sqlalchemy import Index, inspect, text
+
+from app.db.session import Base
+
+# Colonnes ajoutées à des tables existantes : (table, colonne, type SQL)
+COLUMNS = [
+    # Jeton de la réclamation en cours (app.services.jobs)
+    ("jobs", "claim_token", "VARCHAR(36)"),
+]
+
+# Extensions requises par les index (GIN trigrammes de la recherche floue)
+EXTENSIONS = ("pg_trgm",)
+
+
+def upgrade(engine) -> List[str]:
+    """Ajouter les colonnes et index manquants ; renvoie ceux qui ont été ajoutés."""
+    applied = _add_columns(engine)
+    applied += _create_indexes(engine)
+    return applied
+
+
+def _add_columns(engine) -> List[str]:
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    applied = []
+    with engine.begin() as connection:
+        for table, column, sql_type in COLUMNS:
+            if table in tables and column not in {info["name"] for info in inspector.get_columns(table)}:
+                # Noms et types fixés ici (jamais saisis) : pas d'injection possible
+                connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {sql_type}"))
+                applied.append(f"{table}.{column}")
+    return applied
+
+
+def _indexes(engine) -> List[Index]:
+    """Index des modèles sur des tables existantes (tables partitionnées exclues : index créés avec elles)."""
+    tables = set(inspect(engine).get_table_names())
+    return [
+        index
+        for table in Base.metadata.sorted_tables
+        if table.name in tables and not table.dialect_options["postgresql"].get("partition_by")
+        for index in sorted(table.indexes, key=lambda index: index.name)
+    ]
+
+
+@contextmanager
+def _concurrently(index: Index, enabled: bool) -> Iterator[None]:
+    # Option posée le temps de la construction : create_all garde un CREATE INDEX transactionnel
+    options = index.dialect_options["postgresql"]
+    previous = options["concurrently"]
+    options["concurrently"] = enabled
+    try:
+        yield
+    finally:
+        options["concurrently"] = previous
+
+
+def _create_indexes(engine) -> List[str]:
+    native = engine.dialect.name == "postgresql"
+    indexes = _indexes(engine)
+    applied = []
+    # CREATE INDEX CONCURRENTLY est refusé dans une transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        if native:
+            for extension in EXTENSIONS:
+                connection.execute(text(f"CREATE EXTENSION IF NOT EXISTS {extension}"))
+            invalid = set(connection.execute(text(
+                "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE NOT i.indisvalid"
+            )).scalars())
+            for index in indexes:
+                if index.name in invalid:
+                    connection.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+        inspector = inspect(connection)
+        existing = {
+            (table, info["name"]) for table in {index.table.name for index in indexes}
+            for info in inspector.get_indexes(table)
+        }
+        for index in indexes:
+            if (index.table.name, index.name) in existing:
+                continue
+            with _concurrently(index, native):
+                # checkfirst et ddl_if respectés (index propres à PostgreSQL ignorés ailleurs)
+                index.create(connection, checkfirst=True)
+            if inspect(connection).has_index(index.table.name, index.name):
+                applied.append(index.name)
+    return applied
@@ -1,26 +1,128 @@
-from sqlalchemy import create_engine
+from sqlalchemy import DDL, create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.db.pool import (
+    InstrumentedAsyncAdaptedQueuePool,
+    InstrumentedQueuePool,
+    PoolLivenessMonitor,
+    instrument,
+)
+from app.db.routing import ReplicaRouter, RoutingSession
 
-# ✅ URL PostgreSQL depuis les variables d'environnement
-SQLALCHEMY_DATABASE_URL = (
+# ✅ URL PostgreSQL depuis les variables d'environnement (ou DATABASE_URL)
+SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL or (
     f"postgresql://{settings.POSTGRES_USER}:{settings.POSTGRES_PASSWORD}"
     f"@{settings.POSTGRES_SERVER}:{settings.POSTGRES_PORT}/{settings.POSTGRES_DB}"
 )
 
+# Pilote asynchrone associé à chaque base
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+_url = make_url(SQLALCHEMY_DATABASE_URL)
+ASYNC_SQLALCHEMY_DATABASE_URL = settings.ASYNC_DATABASE_URL or _url.set(
+    drivername=ASYNC_DRIVERS[_url.get_backend_name()]
+)
+
+# ✅ Paramètres du pool pilotés par Settings
+_pool_options = {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+    "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+    "pool_pre_ping": settings.DB_POOL_PRE_PING,
+}
+# Base locale (tests) : une connexion SQLite peut changer de thread
+_connect_args = {"check_same_thread": False} if _url.get_backend_name() == "sqlite" else {}
+
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
-    pool_pre_ping=True,        # Vérifie la connexion avant utilisation
-    pool_recycle=300,          # Recycle les connexions toutes les 5 min
-    pool_size=5,
-    max_overflow=10
+    poolclass=InstrumentedQueuePool,
+    connect_args=_connect_args,
+    **_pool_options,
+)
+
+# ✅ Moteur asynchrone pour les routes async : pas de thread par requête en attente de la base
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    poolclass=InstrumentedAsyncAdaptedQueuePool,
+    **_pool_options,
+)
+
+# ✅ Réplicas en lecture : mêmes réglages de pool, un moteur sync et un async par URL
+replica_engines = []
+async_replica_engines = []
+for _replica_url in settings.DATABASE_REPLICA_URLS:
+    _replica = make_url(_replica_url)
+    replica_engines.append(create_engine(
+        _replica,
+        poolclass=InstrumentedQueuePool,
+        connect_args=_connect_args,
+        **_pool_options,
+    ))
+    async_replica_engines.append(create_async_engine(
+        _replica.set(drivername=ASYNC_DRIVERS[_replica.get_backend_name()]),
+        poolclass=InstrumentedAsyncAdaptedQueuePool,
+        **_pool_options,
+    ))
+
+# ✅ Métriques des pools (/api/v1/health/pool) et ping périodique si pas de pre-ping
+instrument(engine, "sync")
+instrument(async_engine, "async")
+for _index, (_replica_engine, _async_replica_engine) in enumerate(zip(replica_engines, async_replica_engines)):
+    instrument(_replica_engine, f"replica{_index}-sync")
+    instrument(_async_replica_engine, f"replica{_index}-async")
+liveness_monitor = PoolLivenessMonitor(
+    [engine, *replica_engines],
+    [async_engine, *async_replica_engines],
+    0 if settings.DB_POOL_PRE_PING else settings.DB_POOL_LIVENESS_INTERVAL_SECONDS,
+)
+
+# ✅ Lectures des requêtes en lecture seule sur les réplicas (voir app.db.routing)
+replica_router = ReplicaRouter(
+    engine,
+    replica_engines,
+    settings.DB_REPLICA_CHECK_INTERVAL_SECONDS,
+    settings.DB_REPLICA_MAX_LAG_SECONDS,
+)
+for _index, _async_replica_engine in enumerate(async_replica_engines):
+    replica_router.watch(_index, _async_replica_engine)
+
+SessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=engine,
+    class_=RoutingSession,
+    router=replica_router,
+    replicas=replica_engines,
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False : les objets restent lisibles après commit sans
+# rechargement implicite (impossible hors d'un contexte await)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    autoflush=False,
+    expire_on_commit=False,
+    router=replica_router,
+    replicas=[e.sync_engine for e in async_replica_engines],
+)
 
 Base = declarative_base()
 
+# ✅ Extension pg_trgm nécessaire aux index GIN de la recherche floue
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
 
 def get_db():
     """Générateur de session de base de données."""
@@ -29,3 +131,14 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Générateur de session asynchrone."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_async_session_factory():
+    """Fabrique de sessions asynchrones, pour les réponses en flux qui ouvrent leur propre session."""
+    return AsyncSessionLocal
@@ -0,0 +1,13 @@
+from sqlalchemy.orm import Session
+
+
+def dialect_insert(db: Session):
+    """Retourner ``insert`` du dialecte courant, qui expose ``on_conflict_do_update``."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise ValueError(f"Upsert non supporté pour le dialecte {dialect}")
+    return insert
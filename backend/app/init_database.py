@@ -1,16 +1,23 @@
 from app.db.session import SessionLocal, engine
+from app.db import schema
 from app.db.base import Base
 from app.models.user import User
 from app.models.employee import Employee
 from app.models.equipment import Equipment
 from app.core.security import get_password_hash
+from app.services import movements
 
 print("🔧 Création des tables...")
 Base.metadata.create_all(bind=engine)
 print("✅ Tables créées !")
+# Colonnes ajoutées depuis la création des tables existantes
+for change in schema.upgrade(engine):
+    print(f"✅ Schéma mis à niveau : {change}")
 
 db = SessionLocal()
 try:
+    # Partitions mensuelles des mouvements
+    movements.maintain(db)
     admin = db.query(User).filter(User.email == "admin@sofrecom.com").first()
     if not admin:
         admin = User(
@@ -1,12 +1,19 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.core.config import settings
+from app.core.request_metrics import MetricsMiddleware, render_metrics
 from app.api.v1.api import api_router
+from app.db.routing import ReplicaRoutingMiddleware
+from app.db.session import liveness_monitor, replica_router
+from app.services.jobs import job_queue
+from app.services.movements import MAINTENANCE_JOB as MOVEMENTS_MAINTENANCE_JOB
+from app.services.outbox import PURGE_JOB as OUTBOX_PURGE_JOB, feed as event_feed
+from app.services.reports import REPORT_KINDS
 import logging
 
 # ✅ Import des modèles AVANT tout le reste
-from app.models import User, Employee, Equipment, Emplacement, EquipmentMovement, EmployeeEquipmentHistory
+from app.models import User, Employee, Equipment, Emplacement, EquipmentMovement, EmployeeEquipmentHistory, Job
 
 # ✅ Configuration du logging
 logging.basicConfig(level=logging.INFO)
@@ -24,8 +31,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # ✅ En-têtes de pagination et de cache lisibles par le frontend
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag", "X-Read-After"],
 )
 
+# ✅ Métriques par route (latence, statuts, requêtes SQL) exposées sur /metrics
+app.add_middleware(MetricsMiddleware)
+
+# ✅ Lectures des requêtes GET / HEAD (et DB_READ_ONLY_PATHS) sur les réplicas
+app.add_middleware(ReplicaRoutingMiddleware, router=replica_router)
+
 # ✅ Gestionnaire d'erreurs global
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -35,6 +50,52 @@ async def global_exception_handler(request: Request, exc: Exception):
         content={"detail": "Une erreur interne est survenue"}
     )
 
+# ✅ Workers des tâches de fond (imports, exports...)
+@app.on_event("startup")
+def start_job_queue():
+    job_queue.schedule("stats_reconcile", settings.STATS_RECONCILE_INTERVAL_SECONDS)
+    # ✅ Rapports Excel hebdomadaires
+    if settings.REPORT_INTERVAL_SECONDS:
+        for kind in REPORT_KINDS.values():
+            job_queue.schedule(kind, settings.REPORT_INTERVAL_SECONDS)
+    # ✅ Partitions mensuelles des mouvements (création à l'avance, rétention)
+    job_queue.schedule(MOVEMENTS_MAINTENANCE_JOB, settings.MOVEMENT_MAINTENANCE_INTERVAL_SECONDS)
+    # ✅ Purge des événements de l'outbox diffusés par /events
+    job_queue.schedule(OUTBOX_PURGE_JOB, settings.OUTBOX_PURGE_INTERVAL_SECONDS)
+    job_queue.start()
+
+
+@app.on_event("shutdown")
+def stop_job_queue():
+    job_queue.stop()
+
+
+# ✅ Relevé de l'outbox : démarré à la première connexion à /events
+@app.on_event("shutdown")
+def stop_event_feed():
+    event_feed.stop()
+
+
+# ✅ Contrôle de vivacité des pools (actif seulement si DB_POOL_PRE_PING=False)
+@app.on_event("startup")
+async def start_liveness_monitor():
+    liveness_monitor.start()
+
+
+@app.on_event("shutdown")
+async def stop_liveness_monitor():
+    await liveness_monitor.stop()
+
+# ✅ Relevé de la position et du retard des réplicas (sans effet sans DATABASE_REPLICA_URLS)
+@app.on_event("startup")
+async def start_replica_router():
+    replica_router.start()
+
+
+@app.on_event("shutdown")
+async def stop_replica_router():
+    replica_router.stop()
+
 # Inclure les routes API
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -46,3 +107,9 @@ def root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+# ✅ Métriques au format Prometheus
+# async : les agrégats par route ne sont modifiés que sur la boucle, les lire ailleurs serait une course
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -4,6 +4,10 @@ from app.models.equipment import Equipment
 from app.models.emplacements import Emplacement
 from app.models.movement import EquipmentMovement
 from app.models.employee_equipment_history import EmployeeEquipmentHistory
+from app.models.job import Job, JobFile
+from app.models.stats import EquipmentStat
+from app.models.resource_version import ResourceVersion
+from app.models.outbox import OutboxEvent
 
 __all__ = [
     "User",
@@ -12,4 +16,9 @@ __all__ = [
     "Emplacement",
     "EquipmentMovement",
     "EmployeeEquipmentHistory",
+    "Job",
+    "JobFile",
+    "EquipmentStat",
+    "ResourceVersion",
+    "OutboxEvent",
 ]
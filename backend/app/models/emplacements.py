@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.session import Base
@@ -6,6 +6,33 @@ from app.db.session import Base
 
 class Emplacement(Base):
     __tablename__ = "emplacements"
+    __table_args__ = (
+        # Pagination par curseur triée sur updated_at ou site
+        Index("ix_emplacements_updated_at_id", "updated_at", "id"),
+        Index("ix_emplacements_site_id", "site", "id"),
+        # Filtres site / étage / rosace
+        Index("ix_emplacements_site_etage_rosace", "site", "etage", "rosace"),
+        Index("ix_emplacements_etage_rosace", "etage", "rosace"),
+        # Recherche floue (pg_trgm)
+        Index(
+            "ix_emplacements_site_trgm",
+            "site",
+            postgresql_using="gin",
+            postgresql_ops={"site": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_emplacements_rosace_trgm",
+            "rosace",
+            postgresql_using="gin",
+            postgresql_ops={"rosace": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_emplacements_exact_position_trgm",
+            "exact_position",
+            postgresql_using="gin",
+            postgresql_ops={"exact_position": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     site = Column(String(100), nullable=False)
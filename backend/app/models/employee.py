@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.session import Base
@@ -6,6 +6,23 @@ from app.db.session import Base
 
 class Employee(Base):
     __tablename__ = "employees"
+    __table_args__ = (
+        # Pagination par curseur triée sur updated_at
+        Index("ix_employees_updated_at_id", "updated_at", "id"),
+        # Recherche floue (pg_trgm) sur le nom et le CUID
+        Index(
+            "ix_employees_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_employees_cuid_trgm",
+            "cuid",
+            postgresql_using="gin",
+            postgresql_ops={"cuid": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False, index=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, Text, String
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Text, String, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.session import Base
@@ -7,6 +7,11 @@ from app.db.session import Base
 class EmployeeEquipmentHistory(Base):
     """Historique complet des équipements attribués à chaque employé."""
     __tablename__ = "employee_equipment_history"
+    __table_args__ = (
+        # Historique paginé d'un employé / d'un équipement, du plus récent au plus ancien
+        Index("ix_employee_equipment_history_employee_assigned", "employee_id", "assigned_at", "id"),
+        Index("ix_employee_equipment_history_equipment_assigned", "equipment_id", "assigned_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     employee_id = Column(Integer, ForeignKey("employees.id"), nullable=False, index=True)
@@ -21,3 +26,15 @@ class EmployeeEquipmentHistory(Base):
     # Relations
     employee = relationship("Employee", back_populates="equipment_history")
     equipment = relationship("Equipment", back_populates="assignment_history")
+
+
+# Période d'attribution [assigned_at, returned_at) : borne haute NULL = en cours.
+# tstzrange à deux arguments est fermé à gauche, ouvert à droite.
+ASSIGNMENT_PERIOD = func.tstzrange(EmployeeEquipmentHistory.assigned_at, EmployeeEquipmentHistory.returned_at)
+
+# Requêtes « à la date D » (période @> D) servies par un index GiST sur la période
+Index(
+    "ix_employee_equipment_history_period",
+    ASSIGNMENT_PERIOD,
+    postgresql_using="gist",
+).ddl_if(dialect="postgresql")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.session import Base
@@ -30,24 +30,42 @@ class EquipmentStatus(str, enum.Enum):
 
 class Equipment(Base):
     __tablename__ = "equipment"
+    __table_args__ = (
+        # Pagination par curseur triée sur updated_at (et filtre updated_since)
+        Index("ix_equipment_updated_at_id", "updated_at", "id"),
+        # Filtres statut / statut + type, parcourus dans l'ordre des id
+        Index("ix_equipment_status_type_id", "status", "equipment_type", "id"),
+        # Recherche floue (pg_trgm) sur les numéros de série et modèles
+        Index(
+            "ix_equipment_serial_number_trgm",
+            "serial_number",
+            postgresql_using="gin",
+            postgresql_ops={"serial_number": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_equipment_model_trgm",
+            "model",
+            postgresql_using="gin",
+            postgresql_ops={"model": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     serial_number = Column(String(100), unique=True, nullable=False, index=True)
     model = Column(String(255), nullable=False)
-    equipment_type = Column(String(50), nullable=False)
-    condition = Column(String(50), nullable=False)
+    equipment_type = Column(String(50), nullable=False, index=True)
+    condition = Column(String(50), nullable=False, index=True)
     status = Column(String(50), nullable=False, default="in_stock")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), server_default=func.now())
 
     # FK vers Emplacement
-    emplacement_id = Column(Integer, ForeignKey("emplacements.id"), nullable=True)
+    emplacement_id = Column(Integer, ForeignKey("emplacements.id"), nullable=True, index=True)
     emplacement = relationship("Emplacement", back_populates="equipments")
 
     # FK vers Employee
-    employee_id = Column(Integer, ForeignKey("employees.id"), nullable=True)
+    employee_id = Column(Integer, ForeignKey("employees.id"), nullable=True, index=True)
     employee = relationship("Employee", back_populates="equipments")
 
-    # Relations mouvements et historique
-    movements = relationship("EquipmentMovement", back_populates="equipment")
+    # Relation historique (mouvements : journal partitionné, lu par app.services.movements)
     assignment_history = relationship("EmployeeEquipmentHistory", back_populates="equipment")
@@ -0,0 +1,77 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, JSON, LargeBinary
+from sqlalchemy.sql import func
+from datetime import datetime, timezone
+from app.db.session import Base
+import enum
+import uuid
+
+
+class JobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+def as_utc(value: datetime) -> datetime:
+    # SQLite renvoie des datetimes naïfs : ils sont stockés en UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+class Job(Base):
+    """Tâche de fond (import, export, mise à jour en masse) et sa progression."""
+    __tablename__ = "jobs"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    kind = Column(String(50), nullable=False, index=True)
+    status = Column(String(20), nullable=False, default=JobStatus.QUEUED.value, index=True)
+    payload = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+
+    rows_total = Column(Integer, nullable=True)
+    rows_processed = Column(Integer, nullable=False, default=0)
+    rows_failed = Column(Integer, nullable=False, default=0)
+
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    # Sert aussi de battement de cœur pour détecter les workers morts
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Réclamation en cours : seul le worker qui la détient publie et termine la tâche
+    claim_token = Column(String(36), nullable=True)
+
+    @property
+    def elapsed_seconds(self) -> float:
+        if not self.started_at:
+            return 0.0
+        end = as_utc(self.finished_at) if self.finished_at else datetime.now(timezone.utc)
+        return max((end - as_utc(self.started_at)).total_seconds(), 0.0)
+
+    @property
+    def throughput(self) -> float:
+        """Lignes traitées par seconde depuis le démarrage."""
+        elapsed = self.elapsed_seconds
+        return round(self.rows_processed / elapsed, 2) if elapsed and self.rows_processed else 0.0
+
+    @property
+    def eta_seconds(self):
+        """Temps restant estimé, ou None si le total est inconnu."""
+        if self.status != JobStatus.RUNNING.value or not self.rows_total or not self.throughput:
+            return None
+        return round(max(self.rows_total - self.rows_processed, 0) / self.throughput, 1)
+
+
+class JobFile(Base):
+    """
+    Fichier attaché à une tâche (fichier importé, rapport généré), découpé en
+    blocs : stocké en base, il est lisible par tous les pods, quel que soit
+    celui qui a reçu l'upload ou exécuté la tâche.
+    """
+    __tablename__ = "job_files"
+
+    job_id = Column(String(36), ForeignKey("jobs.id", ondelete="CASCADE"), primary_key=True)
+    name = Column(String(50), primary_key=True)
+    seq = Column(Integer, primary_key=True)
+    data = Column(LargeBinary, nullable=False)
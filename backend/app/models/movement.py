@@ -1,26 +1,43 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text
-from sqlalchemy.orm import relationship
-from datetime import datetime
+from datetime import datetime, timezone
+
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Identity, Index, Integer, String, Text
+from sqlalchemy.sql import func
 from app.db.session import Base
 
 
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
 class EquipmentMovement(Base):
-    """Equipment movement history for tracking who moved what, when, and where."""
+    """
+    Journal des mouvements d'équipements (qui a déplacé quoi, quand et où), en ajout seul.
+
+    Partitionné par mois sur ``timestamp`` : nativement sous PostgreSQL, par une
+    table par mois sous SQLite (la table parente reste alors vide). Écritures et
+    lectures passent par ``app.services.movements``.
+    """
     __tablename__ = "equipment_movements"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    equipment_id = Column(Integer, ForeignKey("equipment.id"), nullable=False, index=True)
-    employee_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
-    
+    __table_args__ = (
+        # Pages du plus récent au plus ancien ; lectures par équipement / par utilisateur sur une période
+        Index("ix_equipment_movements_timestamp_id", "timestamp", "id"),
+        Index("ix_equipment_movements_equipment_timestamp", "equipment_id", "timestamp"),
+        Index("ix_equipment_movements_employee_timestamp", "employee_id", "timestamp"),
+        # La clé de partitionnement fait partie de la clé primaire
+        {"postgresql_partition_by": 'RANGE ("timestamp")'},
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), Identity(), primary_key=True)
+    equipment_id = Column(Integer, ForeignKey("equipment.id"), nullable=False)
+    employee_id = Column(Integer, ForeignKey("users.id"), nullable=False)  # utilisateur auteur du mouvement
+
     # Movement details
     action = Column(String, nullable=False)  # e.g., "assigned", "returned", "moved"
     from_location = Column(String, nullable=True)
     to_location = Column(String, nullable=True)
     notes = Column(Text, nullable=True)
-    
-    # Timestamp
-    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
-    
-    # Relationships
-    equipment = relationship("Equipment", back_populates="movements")
-    employee = relationship("User", back_populates="movement_history")
+
+    # Horodatage UTC, clé de partitionnement
+    timestamp = Column(
+        DateTime(timezone=True), primary_key=True, default=_utcnow, server_default=func.now()
+    )
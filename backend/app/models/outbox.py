@@ -0,0 +1,21 @@
+from sqlalchemy import JSON, BigInteger, Column, DateTime, Identity, Integer, String
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+
+class OutboxEvent(Base):
+    """
+    Modification de l'inventaire, écrite dans la transaction qui la produit (outbox).
+
+    L'id, croissant, sert de position de reprise aux clients de ``/events``.
+    """
+    __tablename__ = "outbox_events"
+    # SQLite : AUTOINCREMENT, pour qu'un id ne soit jamais réutilisé après la purge
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), Identity(), primary_key=True)
+    resource = Column(String(50), nullable=False)  # table modifiée
+    action = Column(String(20), nullable=False)  # created, updated, deleted ou changed
+    # Ids des lignes touchées ; None si inconnus ou trop nombreux : relire la ressource
+    ids = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
@@ -0,0 +1,12 @@
+from sqlalchemy import BigInteger, Column, DateTime, String
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+
+class ResourceVersion(Base):
+    """Version d'une ressource (table), incrémentée à chaque transaction qui l'écrit."""
+    __tablename__ = "resource_versions"
+
+    resource = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+
+class EquipmentStat(Base):
+    """Compteur d'équipements pour une dimension (status, site...) et une valeur."""
+    __tablename__ = "equipment_stats"
+
+    dimension = Column(String(30), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,5 +1,4 @@
 from sqlalchemy import Column, Integer, String, Boolean, Enum as SQLEnum
-from sqlalchemy.orm import relationship
 import enum
 from app.db.session import Base
 
@@ -24,5 +23,4 @@ class User(Base):
     is_active = Column(Boolean, default=True)
 
     # ✅ Suppression de equipment_assignments (pas de FK dans Equipment vers User)
-    # ✅ Uniquement la relation vers les mouvements
-    movement_history = relationship("EquipmentMovement", back_populates="employee")
+    # ✅ Mouvements signés par l'utilisateur : journal partitionné, lu par app.services.movements
@@ -0,0 +1,30 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+from app.schemas.equipment import EquipmentResponse
+
+
+class AssignmentItem(BaseModel):
+    equipment_id: int
+    employee_id: Optional[int] = None  # ✅ None = restitution (retour en stock)
+
+
+class AssignmentBatch(BaseModel):
+    items: List[AssignmentItem]
+    notes: Optional[str] = None
+
+
+class AssignmentResult(BaseModel):
+    """Résultat d'une attribution : assigned, returned, unchanged, not_found ou invalid."""
+    equipment_id: int
+    employee_id: Optional[int] = None
+    previous_employee_id: Optional[int] = None
+    result: str
+    error: Optional[str] = None
+    equipment: Optional[EquipmentResponse] = None
+
+
+class AssignmentBatchResult(BaseModel):
+    succeeded: int = 0
+    failed: int = 0
+    items: List[AssignmentResult] = []
@@ -24,5 +24,10 @@ class HistoryResponse(HistoryBase):
     equipment_model: Optional[str] = None
     equipment_type: Optional[str] = None
 
+    # Infos employé
+    employee_name: Optional[str] = None
+    employee_cuid: Optional[str] = None
+    employee_department: Optional[str] = None
+
     class Config:
         from_attributes = True
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from app.models.equipment import EquipmentType, EquipmentCondition, EquipmentStatus
 
@@ -38,4 +38,59 @@ class EquipmentResponse(EquipmentBase):
     updated_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class EquipmentFilter(BaseModel):
+    """Filtres serveur de la liste des équipements (listes = OU, champs = ET)."""
+    status: Optional[List[EquipmentStatus]] = None
+    equipment_type: Optional[List[EquipmentType]] = None
+    condition: Optional[List[EquipmentCondition]] = None
+    employee_id: Optional[int] = None
+    emplacement_id: Optional[int] = None
+    site: Optional[str] = None
+    etage: Optional[str] = None
+    updated_since: Optional[datetime] = None
+
+
+# ---------------------------------------------------------------------------
+# Opérations en masse
+# ---------------------------------------------------------------------------
+
+class EquipmentBulkCreate(BaseModel):
+    items: List[EquipmentCreate]
+
+
+class EquipmentBulkSelection(BaseModel):
+    """Équipements visés, par identifiant et/ou numéro de série (``index`` des résultats : ids puis serial_numbers)."""
+    ids: List[int] = []
+    serial_numbers: List[str] = []
+
+
+class EquipmentBulkChanges(BaseModel):
+    """Champs appliqués à tous les équipements sélectionnés (numéro de série exclu)."""
+    model: Optional[str] = None
+    equipment_type: Optional[EquipmentType] = None
+    condition: Optional[EquipmentCondition] = None
+    status: Optional[EquipmentStatus] = None
+    emplacement_id: Optional[int] = None
+    employee_id: Optional[int] = None
+
+
+class EquipmentBulkUpdate(EquipmentBulkSelection):
+    changes: EquipmentBulkChanges
+
+
+class EquipmentBulkItemResult(BaseModel):
+    """Résultat d'un élément : ``index`` dans la requête, ou identifiant / numéro de série visé."""
+    index: Optional[int] = None
+    id: Optional[int] = None
+    serial_number: Optional[str] = None
+    result: str
+    error: Optional[str] = None
+
+
+class EquipmentBulkResult(BaseModel):
+    succeeded: int = 0
+    failed: int = 0
+    items: List[EquipmentBulkItemResult] = []
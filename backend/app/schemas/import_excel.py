@@ -0,0 +1,19 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class ImportRowError(BaseModel):
+    """Ligne rejetée lors d'un import, avec son numéro dans le fichier source."""
+    row: int
+    serial_number: Optional[str] = None
+    error: str
+
+
+class ImportReport(BaseModel):
+    """Rapport d'import renvoyé au client."""
+    detail: str
+    rows_total: int = 0
+    rows_imported: int = 0
+    rows_failed: int = 0
+    errors: List[ImportRowError] = []
+    errors_truncated: bool = False
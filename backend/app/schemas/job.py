@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import Optional, Dict, Any
+from datetime import datetime
+
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    status: str
+    rows_total: Optional[int] = None
+    rows_processed: int = 0
+    rows_failed: int = 0
+    throughput: float = 0.0
+    eta_seconds: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+
+class MovementResponse(BaseModel):
+    id: int
+    equipment_id: int
+    user_id: int  # utilisateur auteur du mouvement
+    action: str
+    from_location: Optional[str] = None
+    to_location: Optional[str] = None
+    notes: Optional[str] = None
+    timestamp: datetime
+
+    class Config:
+        from_attributes = True
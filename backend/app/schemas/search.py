@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import Dict, List
+
+
+class SearchHit(BaseModel):
+    """Résultat de recherche ; les highlights entourent les passages trouvés de <mark>."""
+    type: str
+    id: int
+    label: str
+    sublabel: str = ""
+    score: float
+    highlights: Dict[str, str] = {}
+
+
+class SearchResponse(BaseModel):
+    query: str
+    engine: str
+    results: List[SearchHit]
@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import Dict
+
+
+class StatsResponse(BaseModel):
+    """Compteurs du dashboard ; by_etage est indexé par site puis par étage."""
+    total: int = 0
+    by_status: Dict[str, int] = {}
+    by_type: Dict[str, int] = {}
+    by_condition: Dict[str, int] = {}
+    by_site: Dict[str, int] = {}
+    by_etage: Dict[str, Dict[str, int]] = {}
+    pcs_online: int = 0
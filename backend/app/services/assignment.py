@@ -0,0 +1,192 @@
+"""
+Attribution et restitution d'équipements, à l'unité ou par lots.
+
+Une attribution met à jour la ligne ``equipment``, clôt la ligne ouverte de
+``employee_equipment_history``, en ouvre une nouvelle pour le nouveau
+détenteur et ajoute un ``EquipmentMovement`` signé par l'utilisateur courant,
+le tout dans une seule transaction. Le nombre d'allers-retours ne dépend pas
+de la taille du lot : lecture verrouillée des équipements, lecture des
+employés, ``UPDATE ... SET employee_id = CASE ... RETURNING``, clôture de
+l'historique, puis insertions multi-lignes de l'historique et des mouvements.
+"""
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models.emplacements import Emplacement
+from app.models.employee import Employee
+from app.models.employee_equipment_history import EmployeeEquipmentHistory
+from app.models.equipment import Equipment, EquipmentStatus
+from app.schemas.assignment import AssignmentBatchResult, AssignmentItem, AssignmentResult
+from app.schemas.equipment import EquipmentResponse
+from app.services import movements as movement_log, outbox, stats
+from app.services.equipment_bulk import check_size, chunks
+
+ASSIGNED = "assigned"
+RETURNED = "returned"
+UNCHANGED = "unchanged"
+NOT_FOUND = "not_found"
+INVALID = "invalid"
+
+# Libellé de l'emplacement "logique" d'un équipement non attribué
+STOCK = "stock"
+
+
+def _holder(employee_id: Optional[int], cuids: Dict[int, str]) -> str:
+    return cuids.get(employee_id, f"employé {employee_id}") if employee_id is not None else STOCK
+
+
+def holder_status(employee_id: Optional[int]) -> str:
+    """Statut que donne l'attribution : assigned avec un détenteur, in_stock sans."""
+    return EquipmentStatus.ASSIGNED.value if employee_id is not None else EquipmentStatus.IN_STOCK.value
+
+
+def status_error(employee_id: Optional[int], status) -> Optional[str]:
+    """Message d'erreur si ``status`` contredit le détenteur ``employee_id`` (assigned <=> détenteur)."""
+    if status is None:
+        return None
+    if (status == EquipmentStatus.ASSIGNED.value) != (employee_id is not None):
+        if employee_id is None:
+            return "Le statut assigned s'obtient en attribuant l'équipement (employee_id)"
+        return "Un équipement attribué a le statut assigned : le restituer d'abord"
+    return None
+
+
+def apply_assignments(
+    db: Session, items: List[AssignmentItem], actor_id: int, notes: Optional[str] = None, commit: bool = True
+) -> AssignmentBatchResult:
+    """
+    Attribuer (``employee_id``) ou restituer (``employee_id=None``) chaque équipement de ``items``.
+
+    ``commit=False`` : les écritures restent dans la transaction de l'appelant,
+    qui la valide avec ses propres modifications.
+    """
+    check_size(len(items))
+    results: Dict[int, AssignmentResult] = {}
+    targets: Dict[int, Optional[int]] = {}
+    for item in items:
+        if item.equipment_id in targets or item.equipment_id in results:
+            targets.pop(item.equipment_id, None)
+            results[item.equipment_id] = AssignmentResult(
+                equipment_id=item.equipment_id, result=INVALID, error="Équipement présent plusieurs fois dans le lot"
+            )
+        else:
+            targets[item.equipment_id] = item.employee_id
+
+    # Lignes verrouillées jusqu'au commit : deux lots concurrents ne ferment pas la même ligne d'historique
+    current = {}
+    for chunk in chunks(list(targets)):
+        rows = db.execute(
+            select(Equipment, Emplacement.site, Emplacement.etage)
+            .outerjoin(Emplacement, Equipment.emplacement_id == Emplacement.id)
+            .where(Equipment.id.in_(chunk))
+            .with_for_update(of=Equipment)
+        )
+        current.update({row.Equipment.id: row for row in rows})
+
+    employee_ids = {value for value in targets.values() if value is not None}
+    employee_ids |= {row.Equipment.employee_id for row in current.values() if row.Equipment.employee_id is not None}
+    cuids: Dict[int, str] = {}
+    for chunk in chunks(list(employee_ids)):
+        cuids.update(db.execute(select(Employee.id, Employee.cuid).where(Employee.id.in_(chunk))).all())
+
+    changes: Dict[int, Optional[int]] = {}
+    before, after = Counter(), Counter()
+    for equipment_id, employee_id in targets.items():
+        row = current.get(equipment_id)
+        if row is None:
+            results[equipment_id] = AssignmentResult(
+                equipment_id=equipment_id, employee_id=employee_id, result=NOT_FOUND, error="Equipment not found"
+            )
+            continue
+        equipment = row.Equipment
+        if employee_id is not None and employee_id not in cuids:
+            results[equipment_id] = AssignmentResult(
+                equipment_id=equipment_id, employee_id=employee_id, previous_employee_id=equipment.employee_id,
+                result=INVALID, error="Employé non trouvé",
+            )
+            continue
+        status = holder_status(employee_id)
+        if equipment.employee_id == employee_id and equipment.status == status:
+            results[equipment_id] = AssignmentResult(
+                equipment_id=equipment_id, employee_id=employee_id, previous_employee_id=equipment.employee_id,
+                result=UNCHANGED, equipment=EquipmentResponse.model_validate(equipment),
+            )
+            continue
+        changes[equipment_id] = employee_id
+        before += stats.contribution(equipment.status, equipment.equipment_type, equipment.condition,
+                                     row.site, row.etage)
+        after += stats.contribution(status, equipment.equipment_type, equipment.condition, row.site, row.etage)
+
+    if changes:
+        _write(db, changes, current, cuids, actor_id, notes, results)
+        stats.apply_changes(db, before, after)
+    if commit:
+        db.commit()
+
+    ordered = [results[item.equipment_id] for item in {item.equipment_id: item for item in items}.values()]
+    succeeded = sum(1 for result in ordered if result.result in (ASSIGNED, RETURNED, UNCHANGED))
+    return AssignmentBatchResult(succeeded=succeeded, failed=len(ordered) - succeeded, items=ordered)
+
+
+def _write(db: Session, changes: Dict[int, Optional[int]], current, cuids: Dict[int, str], actor_id: int,
+           notes: Optional[str], results: Dict[int, AssignmentResult]) -> None:
+    now = datetime.now(timezone.utc)
+    history, movements = [], []
+    # Détenteurs avant l'UPDATE, qui rafraîchit les objets chargés
+    holders = {equipment_id: current[equipment_id].Equipment.employee_id for equipment_id in changes}
+    for chunk in chunks(sorted(changes)):
+        statuses = {equipment_id: holder_status(changes[equipment_id]) for equipment_id in chunk}
+        updated = db.scalars(
+            update(Equipment)
+            .where(Equipment.id.in_(chunk))
+            .values(
+                # else_ : donne son type au CASE même si toutes les branches valent NULL
+                employee_id=case(
+                    {equipment_id: changes[equipment_id] for equipment_id in chunk},
+                    value=Equipment.id, else_=Equipment.employee_id,
+                ),
+                status=case(statuses, value=Equipment.id, else_=Equipment.status),
+                updated_at=func.now(),
+            )
+            .returning(Equipment),
+            # "fetch" s'appuie sur le RETURNING (pas de SELECT en plus) et met à
+            # jour les objets déjà chargés par la lecture verrouillée
+            execution_options={"synchronize_session": "fetch"},
+        ).all()
+        outbox.note(db, Equipment.__tablename__, outbox.UPDATED, [equipment.id for equipment in updated])
+        db.execute(
+            update(EmployeeEquipmentHistory)
+            .where(EmployeeEquipmentHistory.equipment_id.in_(chunk), EmployeeEquipmentHistory.returned_at.is_(None))
+            .values(returned_at=now),
+            execution_options={"synchronize_session": False},
+        )
+
+        for equipment in updated:
+            employee_id = changes[equipment.id]
+            previous = holders[equipment.id]
+            if employee_id is not None:
+                history.append({"employee_id": employee_id, "equipment_id": equipment.id,
+                                "assigned_at": now, "notes": notes})
+            movements.append({
+                "equipment_id": equipment.id,
+                "employee_id": actor_id,
+                "action": ASSIGNED if employee_id is not None else RETURNED,
+                "from_location": _holder(previous, cuids),
+                "to_location": _holder(employee_id, cuids),
+                "notes": notes,
+                "timestamp": now,
+            })
+            results[equipment.id] = AssignmentResult(
+                equipment_id=equipment.id, employee_id=employee_id, previous_employee_id=previous,
+                result=ASSIGNED if employee_id is not None else RETURNED,
+                equipment=EquipmentResponse.model_validate(equipment),
+            )
+
+    for chunk in chunks(history):
+        db.execute(insert(EmployeeEquipmentHistory), chunk)
+    for chunk in chunks(movements):
+        movement_log.record(db, chunk)
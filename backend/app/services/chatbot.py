@@ -1,26 +1,40 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.crud.pagination import decode_cursor, encode_cursor
 from app.models.equipment import Equipment
 from app.models.emplacements import Emplacement
-from typing import Dict, Any, Optional
-import re
+from app.models.employee import Employee
+from app.models.stats import EquipmentStat
+from app.services import intent
+from typing import Dict, Any, List, Optional, Tuple
+
+# Nombre maximal d'équipements listés par réponse ; la suite est obtenue en
+# renvoyant data["next_cursor"] dans le contexte de la question suivante
+MAX_RESULTS = 20
+
+
+def _variants(value: str) -> set:
+    # Casse telle que saisie, majuscules, minuscules : reste une égalité indexée
+    return {value, value.upper(), value.lower(), value.title()}
 
 
 class ChatbotService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def process_query(self, question: str) -> Dict[str, Any]:
+    async def process_query(self, question: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Traiter une question en langage naturel et retourner une réponse structurée."""
-        message_lower = question.lower()
+        parsed = intent.parse(question)
+        cursor = (context or {}).get("cursor")
 
-        if any(word in message_lower for word in ["emplacement", "localisation", "où", "location"]):
-            return self._handle_location_query(message_lower)
+        if parsed.intent in (intent.COUNT, intent.INVENTORY):
+            return await self._handle_equipment_query(parsed.entities)
 
-        if any(word in message_lower for word in ["étage", "rosace", "salle"]):
-            return self._handle_equipment_at_location_query(message_lower)
+        if parsed.intent == intent.LOCATE:
+            return await self._handle_location_query(parsed.entities, cursor)
 
-        if any(word in message_lower for word in ["équipement", "matériel", "stock", "inventaire"]):
-            return self._handle_equipment_query(message_lower)
+        if parsed.intent == intent.LIST:
+            return await self._handle_equipment_at_location_query(parsed.entities, cursor)
 
         return {
             "answer": "Je n'ai pas compris votre demande. Pouvez-vous reformuler ?",
@@ -28,36 +42,98 @@ class ChatbotService:
             "confidence": 0.0
         }
 
-    def _handle_location_query(self, message: str) -> Dict[str, Any]:
+    def _apply_entities(self, stmt, entities: Dict[str, str], located: bool = False):
+        """Ajouter jointures et filtres (égalités indexées) correspondant aux entités."""
+        if located or any(name in entities for name in intent.LOCATION_ENTITIES):
+            stmt = stmt.join(Emplacement, Equipment.emplacement_id == Emplacement.id)
+        if any(name in entities for name in intent.EMPLOYEE_ENTITIES):
+            stmt = stmt.join(Employee, Equipment.employee_id == Employee.id)
+
+        filters = {
+            "serial": Equipment.serial_number,
+            "site": Emplacement.site,
+            "etage": Emplacement.etage,
+            "rosace": Emplacement.rosace,
+            "cuid": Employee.cuid,
+            "employee": Employee.name,
+        }
+        for name, column in filters.items():
+            if name in entities:
+                stmt = stmt.where(column.in_(_variants(entities[name])))
+        if "status" in entities:
+            stmt = stmt.where(Equipment.status == entities["status"])
+        if "equipment_type" in entities:
+            stmt = stmt.where(Equipment.equipment_type == entities["equipment_type"])
+        return stmt
+
+    def _located_equipment(self, entities: Dict[str, str], located: bool = True):
+        """Projection équipement + emplacement en une seule requête jointe."""
+        stmt = select(
+            Equipment.id,
+            Equipment.model,
+            Equipment.serial_number,
+            Emplacement.site,
+            Emplacement.etage,
+            Emplacement.rosace,
+            Emplacement.exact_position,
+        ).select_from(Equipment)
+        stmt = self._apply_entities(stmt, entities, located=located)
+        if not located and not any(name in entities for name in intent.LOCATION_ENTITIES):
+            stmt = stmt.outerjoin(Emplacement, Equipment.emplacement_id == Emplacement.id)
+        return stmt
+
+    async def _fetch_page(self, stmt, cursor: Optional[str]) -> Tuple[List[Any], Optional[str]]:
+        """Lire au plus MAX_RESULTS lignes après ``cursor`` (ordre des id)."""
+        if cursor:
+            try:
+                stmt = stmt.where(Equipment.id > int(decode_cursor(cursor)[0]))
+            except (ValueError, IndexError, TypeError):
+                pass  # curseur invalide : on repart du début
+        rows = (await self.db.execute(stmt.order_by(Equipment.id).limit(MAX_RESULTS + 1))).all()
+        if len(rows) > MAX_RESULTS:
+            rows = rows[:MAX_RESULTS]
+            return rows, encode_cursor([rows[-1].id])
+        return rows, None
+
+    @staticmethod
+    def _with_more(answer: str, next_cursor: Optional[str]) -> str:
+        if next_cursor:
+            answer += f"\n… d'autres résultats sont disponibles (affichage limité à {MAX_RESULTS})."
+        return answer
+
+    @staticmethod
+    def _location_str(row) -> Optional[str]:
+        if row.site is None:
+            return None
+        location_str = (
+            f"{row.site}, "
+            f"Étage {row.etage}, "
+            f"Rosace {row.rosace}"
+        )
+        if row.exact_position:
+            location_str += f", {row.exact_position}"
+        return location_str
+
+    async def _handle_location_query(self, entities: Dict[str, str], cursor: Optional[str] = None) -> Dict[str, Any]:
         """Gérer les questions sur les emplacements."""
-        equipments = self.db.query(Equipment).filter(
-            Equipment.emplacement_id.isnot(None)
-        ).all()
+        rows, next_cursor = await self._fetch_page(self._located_equipment(entities), cursor)
 
         results = []
         data_list = []
 
-        for eq in equipments:
-            if eq.emplacement:
-                emp_loc = eq.emplacement
-                location_str = (
-                    f"{emp_loc.site}, "
-                    f"Étage {emp_loc.etage}, "
-                    f"Rosace {emp_loc.rosace}"
-                )
-                if emp_loc.exact_position:
-                    location_str += f", {emp_loc.exact_position}"
-                results.append(f"- {eq.model} ({eq.serial_number}) : {location_str}")
-                data_list.append({
-                    "equipment": eq.model,
-                    "serial_number": eq.serial_number,
-                    "location": location_str
-                })
+        for row in rows:
+            location_str = self._location_str(row)
+            results.append(f"- {row.model} ({row.serial_number}) : {location_str}")
+            data_list.append({
+                "equipment": row.model,
+                "serial_number": row.serial_number,
+                "location": location_str
+            })
 
         if results:
             return {
-                "answer": "Équipements localisés :\n" + "\n".join(results),
-                "data": {"equipments": data_list},
+                "answer": self._with_more("Équipements localisés :\n" + "\n".join(results), next_cursor),
+                "data": {"equipments": data_list, "next_cursor": next_cursor},
                 "confidence": 0.9
             }
         return {
@@ -66,42 +142,53 @@ class ChatbotService:
             "confidence": 0.8
         }
 
-    def _handle_equipment_at_location_query(self, message: str) -> Dict[str, Any]:
-        """Gérer les questions sur les équipements à un emplacement."""
-        query = self.db.query(Equipment).join(Emplacement)
-
-        floor_match = re.search(r"étage\s*(\w+)", message)
-        room_match = re.search(r"rosace\s*(\w+)", message)
-
-        if floor_match:
-            floor = floor_match.group(1)
-            query = query.filter(Emplacement.etage.like(f"%{floor}%"))
-
-        if room_match:
-            room = room_match.group(1)
-            query = query.filter(Emplacement.rosace.like(f"%{room}%"))
-
-        equipments = query.all()
-
-        if equipments:
-            results = [f"- {eq.model} ({eq.serial_number})" for eq in equipments]
-            data_list = [{"equipment": eq.model, "serial_number": eq.serial_number} for eq in equipments]
+    async def _handle_equipment_at_location_query(
+        self, entities: Dict[str, str], cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Gérer les questions listant des équipements (emplacement, employé, statut, type)."""
+        rows, next_cursor = await self._fetch_page(self._located_equipment(entities, located=False), cursor)
+
+        if rows:
+            results = [f"- {row.model} ({row.serial_number})" for row in rows]
+            data_list = [
+                {"equipment": row.model, "serial_number": row.serial_number, "location": self._location_str(row)}
+                for row in rows
+            ]
             return {
-                "answer": "Équipements trouvés :\n" + "\n".join(results),
-                "data": {"equipments": data_list},
+                "answer": self._with_more("Équipements trouvés :\n" + "\n".join(results), next_cursor),
+                "data": {"equipments": data_list, "next_cursor": next_cursor},
                 "confidence": 0.85
             }
         return {
-            "answer": "Aucun équipement trouvé à cet emplacement.",
+            "answer": "Aucun équipement trouvé pour ces critères.",
             "data": None,
             "confidence": 0.8
         }
 
-    def _handle_equipment_query(self, message: str) -> Dict[str, Any]:
-        """Gérer les questions sur les équipements."""
-        total = self.db.query(Equipment).count()
+    async def _handle_equipment_query(self, entities: Dict[str, str]) -> Dict[str, Any]:
+        """Gérer les questions de comptage d'équipements."""
+        if set(entities) <= {"status", "equipment_type"}:
+            # Comptage par statut / type : lu directement dans les compteurs du dashboard
+            if {"status", "equipment_type"} <= set(entities):
+                key = ("type_status", f"{entities['equipment_type']}|{entities['status']}")
+            elif entities:
+                dimension = next(iter(entities))
+                key = (dimension, entities[dimension])
+            else:
+                key = ("total", "all")
+            total = await self.db.scalar(
+                select(EquipmentStat.count).where(EquipmentStat.dimension == key[0], EquipmentStat.key == key[1])
+            ) or 0
+        else:
+            stmt = self._apply_entities(select(func.count(Equipment.id)).select_from(Equipment), entities)
+            total = await self.db.scalar(stmt)
+
+        if entities:
+            answer = f"{total} équipement(s) correspondent à votre demande."
+        else:
+            answer = f"Il y a actuellement {total} équipement(s) dans le stock."
         return {
-            "answer": f"Il y a actuellement {total} équipement(s) dans le stock.",
-            "data": {"total": total},
+            "answer": answer,
+            "data": {"total": total, "filters": entities or None},
             "confidence": 0.95
         }
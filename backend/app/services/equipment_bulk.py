@@ -0,0 +1,324 @@
+"""
+Création, mise à jour et suppression d'équipements en masse.
+
+Chaque opération s'exécute en quelques instructions ensemblistes (par lots de
+``CHUNK_SIZE`` identifiants) et une seule transaction, au lieu d'un SELECT,
+d'une écriture, d'un commit et d'un refresh par équipement. Les éléments
+invalides (numéro de série déjà pris, référence inexistante, statut contraire
+au détenteur, équipement introuvable ou encore référencé) sont écartés et signalés dans le résultat
+ligne à ligne, dans l'ordre de la requête, sans annuler le reste. Les
+compteurs du dashboard suivent l'état avant / après des lignes touchées,
+comme pour l'import. Un détenteur (``employee_id``) n'est jamais écrit
+directement : il passe par ``assignment.apply_assignments``.
+"""
+import enum
+from collections import Counter
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.upsert import dialect_insert
+from app.models.emplacements import Emplacement
+from app.models.employee import Employee
+from app.models.employee_equipment_history import EmployeeEquipmentHistory
+from app.models.equipment import Equipment, EquipmentStatus
+from app.schemas.equipment import (
+    EquipmentBulkChanges,
+    EquipmentBulkItemResult,
+    EquipmentBulkResult,
+    EquipmentBulkSelection,
+    EquipmentCreate,
+)
+from app.services import movements, outbox, stats
+
+# Taille des listes IN (...) et des lots d'INSERT : sous les limites de
+# paramètres de SQLite et PostgreSQL
+CHUNK_SIZE = 1000
+
+CREATED = "created"
+UPDATED = "updated"
+DELETED = "deleted"
+NOT_FOUND = "not_found"
+CONFLICT = "conflict"
+INVALID = "invalid"
+
+
+def chunks(values: Sequence[Any], size: int = CHUNK_SIZE) -> Iterator[List[Any]]:
+    iterator = iter(values)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _value(value: Any) -> Any:
+    return value.value if isinstance(value, enum.Enum) else value
+
+
+def check_size(count: int) -> None:
+    if count > settings.EQUIPMENT_BULK_MAX_ITEMS:
+        raise ValueError(f"Trop d'éléments : {count} (maximum {settings.EQUIPMENT_BULK_MAX_ITEMS})")
+
+
+def _existing(db: Session, column, values: Iterable[Any]) -> Set[Any]:
+    """Valeurs de ``values`` présentes dans ``column``."""
+    found = set()
+    for chunk in chunks(list(set(values))):
+        found.update(db.scalars(select(column).where(column.in_(chunk))))
+    return found
+
+
+def _capture(db: Session, ids: Sequence[int]) -> Counter:
+    counts = Counter()
+    for chunk in chunks(ids):
+        counts.update(stats.capture(db, Equipment.id.in_(chunk)))
+    return counts
+
+
+def _summarize(items: List[EquipmentBulkItemResult], success: str) -> EquipmentBulkResult:
+    succeeded = sum(1 for item in items if item.result == success)
+    return EquipmentBulkResult(succeeded=succeeded, failed=len(items) - succeeded, items=items)
+
+
+def _reference_errors(db: Session, emplacement_ids: Iterable[int], employee_ids: Iterable[int]) -> Dict:
+    """Message d'erreur par référence (emplacement / employé) inexistante."""
+    emplacement_ids = {value for value in emplacement_ids if value is not None}
+    employee_ids = {value for value in employee_ids if value is not None}
+    errors = {}
+    for value in emplacement_ids - _existing(db, Emplacement.id, emplacement_ids):
+        errors[("emplacement_id", value)] = f"Emplacement {value} non trouvé"
+    for value in employee_ids - _existing(db, Employee.id, employee_ids):
+        errors[("employee_id", value)] = f"Employé {value} non trouvé"
+    return errors
+
+
+# ---------------------------------------------------------------------------
+# Création
+# ---------------------------------------------------------------------------
+
+def bulk_create(db: Session, items: List[EquipmentCreate], actor_id: int) -> EquipmentBulkResult:
+    """
+    Créer ``items`` ; un numéro de série déjà pris est signalé en conflit. Un
+    équipement créé avec un détenteur passe par le moteur d'attribution
+    (historique et mouvement), dans la même transaction.
+    """
+    # Import local : assignment importe ce module
+    from app.services import assignment
+    from app.schemas.assignment import AssignmentItem
+
+    check_size(len(items))
+    results: List[Optional[EquipmentBulkItemResult]] = [None] * len(items)
+    reference_errors = _reference_errors(
+        db, (item.emplacement_id for item in items), (item.employee_id for item in items)
+    )
+
+    records, indexes = [], {}
+    for index, item in enumerate(items):
+        error = (
+            assignment.status_error(item.employee_id, _value(item.status))
+            or reference_errors.get(("emplacement_id", item.emplacement_id))
+            or reference_errors.get(("employee_id", item.employee_id))
+        )
+        if error:
+            results[index] = EquipmentBulkItemResult(
+                index=index, serial_number=item.serial_number, result=INVALID, error=error
+            )
+        elif item.serial_number in indexes:
+            results[index] = EquipmentBulkItemResult(
+                index=index, serial_number=item.serial_number, result=CONFLICT,
+                error="Numéro de série en double dans la requête",
+            )
+        else:
+            indexes[item.serial_number] = index
+            record = {key: _value(value) for key, value in item.dict().items()}
+            if item.employee_id is not None:
+                # Créé en stock : le détenteur est posé par l'attribution ci-dessous
+                record.update(employee_id=None, status=assignment.holder_status(None))
+            records.append(record)
+
+    # ON CONFLICT DO NOTHING : les numéros de série déjà en base ne reviennent pas du RETURNING
+    statement = (
+        dialect_insert(db)(Equipment.__table__)
+        .on_conflict_do_nothing(index_elements=[Equipment.serial_number])
+        .returning(Equipment.id, Equipment.serial_number)
+    )
+    created = {}
+    for chunk in chunks(records):
+        for equipment_id, serial_number in db.execute(statement, chunk):
+            created[serial_number] = equipment_id
+    outbox.note(db, Equipment.__tablename__, outbox.CREATED, created.values())
+
+    stats.apply_changes(db, Counter(), _capture(db, list(created.values())))
+    holders = [
+        AssignmentItem(equipment_id=created[serial_number], employee_id=items[index].employee_id)
+        for serial_number, index in indexes.items()
+        if serial_number in created and items[index].employee_id is not None
+    ]
+    if holders:
+        assignment.apply_assignments(db, holders, actor_id, commit=False)
+    db.commit()
+
+    for serial_number, index in indexes.items():
+        if serial_number in created:
+            results[index] = EquipmentBulkItemResult(
+                index=index, id=created[serial_number], serial_number=serial_number, result=CREATED
+            )
+        else:
+            results[index] = EquipmentBulkItemResult(
+                index=index, serial_number=serial_number, result=CONFLICT, error="Serial number already exists"
+            )
+    return _summarize(results, CREATED)
+
+
+# ---------------------------------------------------------------------------
+# Sélection par identifiant / numéro de série
+# ---------------------------------------------------------------------------
+
+def _resolve(db: Session, selection: EquipmentBulkSelection):
+    """
+    Équipements sélectionnés (id -> numéro de série), position de chacun dans la
+    requête (identifiants puis numéros de série) et résultats par position, déjà
+    remplis pour les références introuvables ou en double.
+    """
+    check_size(len(selection.ids) + len(selection.serial_numbers))
+    found: Dict[int, str] = {}
+    for chunk in chunks(list(set(selection.ids))):
+        found.update(db.execute(select(Equipment.id, Equipment.serial_number).where(Equipment.id.in_(chunk))).all())
+    serials: Dict[str, int] = {}
+    for chunk in chunks(list(set(selection.serial_numbers))):
+        rows = db.execute(
+            select(Equipment.serial_number, Equipment.id).where(Equipment.serial_number.in_(chunk))
+        ).all()
+        serials.update(rows)
+    found.update({equipment_id: serial_number for serial_number, equipment_id in serials.items()})
+
+    requested = [
+        ({"id": equipment_id}, equipment_id if equipment_id in found else None) for equipment_id in selection.ids
+    ]
+    requested += [
+        ({"serial_number": serial_number}, serials.get(serial_number)) for serial_number in selection.serial_numbers
+    ]
+    results: List[Optional[EquipmentBulkItemResult]] = [None] * len(requested)
+    positions: Dict[int, int] = {}
+    for index, (reference, equipment_id) in enumerate(requested):
+        if equipment_id is None:
+            results[index] = EquipmentBulkItemResult(
+                index=index, **reference, result=NOT_FOUND, error="Equipment not found"
+            )
+        elif equipment_id in positions:
+            results[index] = EquipmentBulkItemResult(
+                index=index, id=equipment_id, serial_number=found[equipment_id], result=CONFLICT,
+                error="Équipement sélectionné plusieurs fois dans la requête",
+            )
+        else:
+            positions[equipment_id] = index
+    return found, positions, results
+
+
+def _report(
+    results: List[Optional[EquipmentBulkItemResult]], positions: Dict[int, int], found: Dict[int, str],
+    equipment_ids: Iterable[int], result: str, error: Optional[str] = None,
+) -> None:
+    """Résultat des équipements ``equipment_ids``, à leur position dans la requête."""
+    for equipment_id in equipment_ids:
+        index = positions[equipment_id]
+        results[index] = EquipmentBulkItemResult(
+            index=index, id=equipment_id, serial_number=found[equipment_id], result=result, error=error
+        )
+
+
+# ---------------------------------------------------------------------------
+# Mise à jour
+# ---------------------------------------------------------------------------
+
+def bulk_update(
+    db: Session, selection: EquipmentBulkSelection, changes: EquipmentBulkChanges, actor_id: int
+) -> EquipmentBulkResult:
+    """
+    Appliquer ``changes`` à tous les équipements sélectionnés. Un changement de
+    détenteur passe par le moteur d'attribution (historique et mouvements),
+    dans la même transaction.
+    """
+    # Import local : assignment importe ce module
+    from app.services import assignment
+    from app.schemas.assignment import AssignmentItem
+
+    values = {key: _value(value) for key, value in changes.dict(exclude_unset=True).items()}
+    if not values:
+        raise ValueError("Aucune modification demandée")
+    for key in ("model", "equipment_type", "condition", "status"):
+        if key in values and values[key] is None:
+            raise ValueError(f"Le champ {key} ne peut pas être vide")
+    reassign = "employee_id" in values
+    employee_id = values.pop("employee_id", None)
+    status = values.get("status")
+    if reassign:
+        error = assignment.status_error(employee_id, status)
+        if status == assignment.holder_status(employee_id):
+            # Statut donné par l'attribution elle-même
+            values.pop("status")
+    else:
+        error = assignment.status_error(None, status) if status == EquipmentStatus.ASSIGNED.value else None
+    if error:
+        raise ValueError(error)
+    reference_errors = _reference_errors(db, [values.get("emplacement_id")], [employee_id])
+    if reference_errors:
+        raise ValueError(", ".join(reference_errors.values()))
+
+    found, positions, results = _resolve(db, selection)
+    ids = sorted(found)
+    if status is not None and not reassign:
+        # Statut hors attribution : refusé pour les équipements qui ont un détenteur
+        held = {}
+        for chunk in chunks(ids):
+            held.update(db.execute(
+                select(Equipment.id, Equipment.employee_id)
+                .where(Equipment.id.in_(chunk), Equipment.employee_id.is_not(None))
+            ).all())
+        for equipment_id, holder_id in held.items():
+            _report(results, positions, found, [equipment_id], INVALID, assignment.status_error(holder_id, status))
+        ids = [equipment_id for equipment_id in ids if equipment_id not in held]
+
+    if reassign and ids:
+        assignment.apply_assignments(
+            db, [AssignmentItem(equipment_id=equipment_id, employee_id=employee_id) for equipment_id in ids],
+            actor_id, commit=False,
+        )
+    if values:
+        before = _capture(db, ids)
+        for chunk in chunks(ids):
+            db.execute(
+                update(Equipment).where(Equipment.id.in_(chunk)).values(**values, updated_at=func.now()),
+                execution_options={"synchronize_session": False},
+            )
+        outbox.note(db, Equipment.__tablename__, outbox.UPDATED, ids)
+        stats.apply_changes(db, before, _capture(db, ids))
+    db.commit()
+
+    _report(results, positions, found, ids, UPDATED)
+    return _summarize(results, UPDATED)
+
+
+# ---------------------------------------------------------------------------
+# Suppression
+# ---------------------------------------------------------------------------
+
+def bulk_delete(db: Session, selection: EquipmentBulkSelection) -> EquipmentBulkResult:
+    """Supprimer les équipements sélectionnés qui n'ont ni historique ni mouvement."""
+    found, positions, results = _resolve(db, selection)
+    referenced = _existing(db, EmployeeEquipmentHistory.equipment_id, found)
+    for chunk in chunks(list(found)):
+        referenced |= movements.equipment_with_movements(db, chunk)
+
+    ids = sorted(equipment_id for equipment_id in found if equipment_id not in referenced)
+    before = _capture(db, ids)
+    for chunk in chunks(ids):
+        db.execute(delete(Equipment).where(Equipment.id.in_(chunk)), execution_options={"synchronize_session": False})
+    outbox.note(db, Equipment.__tablename__, outbox.DELETED, ids)
+    stats.apply_changes(db, before, Counter())
+    db.commit()
+
+    _report(results, positions, found, referenced, CONFLICT, "Équipement référencé par l'historique ou les mouvements")
+    _report(results, positions, found, ids, DELETED)
+    return _summarize(results, DELETED)
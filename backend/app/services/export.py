@@ -0,0 +1,162 @@
+"""
+Export complet de l'inventaire en flux (NDJSON ou CSV, gzip en option).
+
+Les lignes sont lues par un curseur côté serveur (``AsyncSession.stream`` avec
+``yield_per``) et encodées par lots de ``EXPORT_BATCH_SIZE`` : la mémoire
+reste constante quel que soit le volume, et le premier octet part avant la
+fin de la lecture. Le flux ouvre sa propre session, puisque celle des
+dépendances est fermée avant l'envoi du corps de la réponse. Toutes les
+lignes viennent d'une seule instruction SQL, donc d'un même instantané.
+"""
+import csv
+import io
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Optional, Sequence, Tuple
+
+import orjson
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.serialization import ORJSON_OPTIONS
+from app.crud.equipment import filter_equipment
+from app.models.emplacements import Emplacement
+from app.models.employee import Employee
+from app.models.employee_equipment_history import EmployeeEquipmentHistory
+from app.models.equipment import Equipment
+from app.schemas.equipment import EquipmentFilter
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# (nom du champ exporté, colonne)
+Columns = Sequence[Tuple[str, object]]
+
+EQUIPMENT_COLUMNS: Columns = (
+    ("id", Equipment.id),
+    ("serial_number", Equipment.serial_number),
+    ("model", Equipment.model),
+    ("equipment_type", Equipment.equipment_type),
+    ("condition", Equipment.condition),
+    ("status", Equipment.status),
+    ("employee_id", Equipment.employee_id),
+    ("employee_cuid", Employee.cuid),
+    ("employee_name", Employee.name),
+    ("emplacement_id", Equipment.emplacement_id),
+    ("site", Emplacement.site),
+    ("etage", Emplacement.etage),
+    ("rosace", Emplacement.rosace),
+    ("exact_position", Emplacement.exact_position),
+    ("created_at", Equipment.created_at),
+    ("updated_at", Equipment.updated_at),
+)
+
+EMPLOYEE_COLUMNS: Columns = (
+    ("id", Employee.id),
+    ("name", Employee.name),
+    ("email", Employee.email),
+    ("cuid", Employee.cuid),
+    ("contract_type", Employee.contract_type),
+    ("department", Employee.department),
+    ("created_at", Employee.created_at),
+    ("updated_at", Employee.updated_at),
+)
+
+HISTORY_COLUMNS: Columns = (
+    ("id", EmployeeEquipmentHistory.id),
+    ("employee_id", EmployeeEquipmentHistory.employee_id),
+    ("employee_cuid", Employee.cuid),
+    ("equipment_id", EmployeeEquipmentHistory.equipment_id),
+    ("serial_number", Equipment.serial_number),
+    ("assigned_at", EmployeeEquipmentHistory.assigned_at),
+    ("returned_at", EmployeeEquipmentHistory.returned_at),
+    ("notes", EmployeeEquipmentHistory.notes),
+)
+
+
+def _select(columns: Columns):
+    return select(*(column for _, column in columns))
+
+
+def equipment_query(filters: Optional[EquipmentFilter] = None):
+    """Équipements avec leur détenteur et leur emplacement, par id croissant."""
+    stmt = (
+        _select(EQUIPMENT_COLUMNS)
+        .select_from(Equipment)
+        .outerjoin(Employee, Equipment.employee_id == Employee.id)
+        .outerjoin(Emplacement, Equipment.emplacement_id == Emplacement.id)
+    )
+    return filter_equipment(stmt, filters, emplacement_joined=True).order_by(Equipment.id)
+
+
+def employees_query():
+    return _select(EMPLOYEE_COLUMNS).order_by(Employee.id)
+
+
+def history_query(employee_id: Optional[int] = None, equipment_id: Optional[int] = None):
+    """Historique des attributions avec cuid et numéro de série, par id croissant."""
+    stmt = (
+        _select(HISTORY_COLUMNS)
+        .select_from(EmployeeEquipmentHistory)
+        .join(Employee, EmployeeEquipmentHistory.employee_id == Employee.id)
+        .join(Equipment, EmployeeEquipmentHistory.equipment_id == Equipment.id)
+    )
+    if employee_id is not None:
+        stmt = stmt.where(EmployeeEquipmentHistory.employee_id == employee_id)
+    if equipment_id is not None:
+        stmt = stmt.where(EmployeeEquipmentHistory.equipment_id == equipment_id)
+    return stmt.order_by(EmployeeEquipmentHistory.id)
+
+
+# ---------------------------------------------------------------------------
+# Encodage
+# ---------------------------------------------------------------------------
+
+def encode_ndjson(fields: Sequence[str], rows) -> bytes:
+    option = ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE
+    return b"".join(orjson.dumps(dict(zip(fields, row)), option=option) for row in rows)
+
+
+def _csv_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def encode_csv(rows) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+
+async def stream_rows(session_factory, stmt, fields: Sequence[str], fmt: str, compress: bool) -> AsyncIterator[bytes]:
+    """Lignes de ``stmt`` encodées en ``fmt``, par lots, éventuellement compressées en gzip."""
+    # wbits=31 : conteneur gzip (en-tête et CRC) plutôt que zlib brut
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def output(chunk: bytes) -> bytes:
+        return compressor.compress(chunk) if compressor else chunk
+
+    if fmt == "csv":
+        yield output(encode_csv([fields]))
+    async with session_factory() as db:
+        result = await db.stream(stmt.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            chunk = output(encode_ndjson(fields, rows) if fmt == "ndjson" else encode_csv(rows))
+            if chunk:
+                yield chunk
+    if compressor:
+        yield compressor.flush()
+
+
+def export_response(session_factory, name: str, columns: Columns, stmt, fmt: str, compress: bool):
+    """Réponse en flux, téléchargée sous ``<name>.<fmt>``."""
+    headers = {"Content-Disposition": f'attachment; filename="{name}.{fmt}"'}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    fields = [field for field, _ in columns]
+    return StreamingResponse(
+        stream_rows(session_factory, stmt, fields, fmt, compress), media_type=MEDIA_TYPES[fmt], headers=headers
+    )
@@ -0,0 +1,235 @@
+"""
+Historique des attributions à une date donnée : « qui avait ce matériel le D ? ».
+
+Une attribution couvre la période ``[assigned_at, returned_at)`` (borne haute
+absente = encore attribuée). Sur PostgreSQL la requête ``période @> D`` est
+servie par l'index GiST déclaré sur ``tstzrange(assigned_at, returned_at)``.
+Sur les autres bases (SQLite en test), un arbre d'intervalles est construit en
+mémoire et reconstruit quand la version de la table (``versions``) change ;
+l'historique d'un seul équipement ou employé, court, y est lu directement par
+index. Les résultats sont paginés par id croissant.
+"""
+import bisect
+import threading
+import weakref
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import DateTime, and_, cast, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.crud import employee_equipment_history as history_crud
+from app.crud.pagination import decode_cursor, encode_cursor, paginate_rows
+from app.models.employee import Employee
+from app.models.employee_equipment_history import ASSIGNMENT_PERIOD, EmployeeEquipmentHistory
+from app.models.equipment import Equipment
+from app.services import versions
+
+HISTORY_RESOURCE = EmployeeEquipmentHistory.__tablename__
+
+# Borne haute des attributions en cours dans l'arbre
+_OPEN = datetime.max
+
+
+def _utc(value: datetime) -> datetime:
+    """Instant en UTC naïf : SQLite rend des datetimes sans fuseau, stockés en UTC."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class IntervalTree:
+    """
+    Arbre d'intervalles centré, statique : retrouve les attributions en cours à
+    un instant en O(log n + k).
+
+    Chaque nœud garde les intervalles ``[début, fin)`` qui contiennent son centre
+    (la médiane des débuts), triés par début et par fin ; ceux qui finissent avant
+    le centre vont à gauche, ceux qui commencent après vont à droite. À chaque
+    nœud, les intervalles retenus forment une tranche contiguë trouvée par
+    bisection. Ids et détenteurs sont rangés dans des tableaux ``array`` : les
+    tranches sont copiées sans créer d'objet par attribution.
+    """
+
+    __slots__ = ("center", "starts", "ids_by_start", "holders_by_start",
+                 "ends", "ids_by_end", "holders_by_end", "left", "right")
+
+    def __init__(self, intervals: List[Tuple[datetime, datetime, int, int]]):
+        # Intervalles vides écartés : ils ne contiennent aucun instant
+        intervals = [interval for interval in intervals if interval[0] < interval[1]]
+        self.left = self.right = self.center = None
+        if not intervals:
+            self.starts = self.ends = []
+            self.ids_by_start = self.holders_by_start = self.ids_by_end = self.holders_by_end = array("l")
+            return
+
+        starts = sorted(interval[0] for interval in intervals)
+        # Centre pris parmi les débuts : au moins un intervalle reste au nœud
+        self.center = center = starts[len(starts) // 2]
+        left, right, here = [], [], []
+        for interval in intervals:
+            if interval[1] <= center:
+                left.append(interval)
+            elif interval[0] > center:
+                right.append(interval)
+            else:
+                here.append(interval)
+        here.sort(key=lambda interval: interval[0])
+        self.starts = [interval[0] for interval in here]
+        self.ids_by_start = array("l", [interval[2] for interval in here])
+        self.holders_by_start = array("l", [interval[3] for interval in here])
+        here.sort(key=lambda interval: interval[1])
+        self.ends = [interval[1] for interval in here]
+        self.ids_by_end = array("l", [interval[2] for interval in here])
+        self.holders_by_end = array("l", [interval[3] for interval in here])
+        self.left = IntervalTree(left) if left else None
+        self.right = IntervalTree(right) if right else None
+
+    def __len__(self) -> int:
+        return len(self.starts) + len(self.left or ()) + len(self.right or ())
+
+    def stab(self, point: datetime) -> Tuple[array, array]:
+        """Ids des attributions en cours à ``point`` et leurs détenteurs (tableaux parallèles)."""
+        ids, holders = array("l"), array("l")
+        node = self
+        while node is not None and node.center is not None:
+            if point < node.center:
+                # Tous finissent après le centre, donc après point : ceux qui ont commencé
+                cut = bisect.bisect_right(node.starts, point)
+                ids.extend(node.ids_by_start[:cut])
+                holders.extend(node.holders_by_start[:cut])
+                node = node.left
+            else:
+                # Tous commencent au plus tard au centre : ceux qui ne sont pas encore finis
+                cut = bisect.bisect_right(node.ends, point)
+                ids.extend(node.ids_by_end[cut:])
+                holders.extend(node.holders_by_end[cut:])
+                node = node.right if point > node.center else None
+        return ids, holders
+
+
+class AssignmentIndex:
+    """Arbre d'intervalles des attributions de la base."""
+
+    def __init__(self, rows: Iterable[Tuple[int, int, datetime, Optional[datetime]]]):
+        self.signature = None
+        self.tree = IntervalTree([
+            (_utc(assigned_at), _utc(returned_at) if returned_at else _OPEN, history_id, employee_id)
+            for history_id, employee_id, assigned_at, returned_at in rows
+            if assigned_at is not None
+        ])
+
+    def ids_at(self, at: datetime, employee_ids: Optional[Set[int]] = None) -> List[int]:
+        """Ids (croissants) des attributions en cours à ``at``, éventuellement limitées à ``employee_ids``."""
+        ids, holders = self.tree.stab(_utc(at))
+        if employee_ids is None:
+            return sorted(ids)
+        return sorted([history_id for history_id, holder in zip(ids, holders) if holder in employee_ids])
+
+
+_fallback_indexes: "weakref.WeakKeyDictionary[Any, AssignmentIndex]" = weakref.WeakKeyDictionary()
+_fallback_lock = threading.Lock()
+
+
+def _table_signature(db: Session) -> Tuple:
+    # Version tenue par les événements de session ; max(id) voit aussi les insertions hors session
+    return (
+        versions.read(db, [HISTORY_RESOURCE])[HISTORY_RESOURCE],
+        db.scalar(select(func.max(EmployeeEquipmentHistory.id))),
+    )
+
+
+def _fallback_index(db: Session) -> AssignmentIndex:
+    """Arbre de la base courante, reconstruit si la table a changé."""
+    engine = db.get_bind()
+    signature = _table_signature(db)
+    with _fallback_lock:
+        index = _fallback_indexes.get(engine)
+    if index is not None and index.signature == signature:
+        return index
+
+    history = EmployeeEquipmentHistory
+    index = AssignmentIndex(db.execute(select(
+        history.id, history.employee_id, history.assigned_at, history.returned_at
+    )))
+    index.signature = signature
+    with _fallback_lock:
+        _fallback_indexes[engine] = index
+    return index
+
+
+def _period_contains(at: datetime):
+    # Même condition que période @> at, servie ici par les index (…_id, assigned_at)
+    history = EmployeeEquipmentHistory
+    return and_(history.assigned_at <= at, or_(history.returned_at.is_(None), history.returned_at > at))
+
+
+class AsOfService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    @property
+    def engine_name(self) -> str:
+        return "gist" if self.db.get_bind().dialect.name == "postgresql" else "interval_tree"
+
+    def holders(
+        self,
+        at: datetime,
+        serial_number: Optional[str] = None,
+        equipment_id: Optional[int] = None,
+        employee_id: Optional[int] = None,
+        department: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Attributions en cours à ``at`` (détenteur, matériel), par id croissant."""
+        # Date sans fuseau : comprise en UTC, comme les dates stockées
+        at = at.replace(tzinfo=timezone.utc) if at.tzinfo is None else at.astimezone(timezone.utc)
+        filters = {
+            "serial_number": serial_number, "equipment_id": equipment_id,
+            "employee_id": employee_id, "department": department,
+        }
+        if self.engine_name == "gist":
+            # Même expression que l'index ; instant typé timestamptz pour l'opérateur @>
+            period = ASSIGNMENT_PERIOD.op("@>", is_comparison=True)(cast(at, DateTime(timezone=True)))
+            return self._holders_sql(period, filters, limit, cursor)
+        if serial_number is not None or equipment_id is not None or employee_id is not None:
+            # Un seul équipement ou employé : son historique est court, lu par index
+            return self._holders_sql(_period_contains(at), filters, limit, cursor)
+        return self._holders_tree(at, department, limit, cursor)
+
+    def _holders_sql(self, period, filters: dict, limit: int, cursor: Optional[str]):
+        history = EmployeeEquipmentHistory
+        stmt = history_crud.rows_query().where(period)
+        if filters["serial_number"] is not None:
+            stmt = stmt.where(Equipment.serial_number == filters["serial_number"])
+        if filters["equipment_id"] is not None:
+            stmt = stmt.where(history.equipment_id == filters["equipment_id"])
+        if filters["employee_id"] is not None:
+            stmt = stmt.where(history.employee_id == filters["employee_id"])
+        if filters["department"] is not None:
+            stmt = stmt.where(Employee.department == filters["department"])
+        rows, next_cursor = paginate_rows(self.db, stmt, [(history.id, False)], history.id, limit, cursor=cursor)
+        return history_crud.to_dicts(rows), next_cursor
+
+    def _holders_tree(self, at: datetime, department: Optional[str], limit: int, cursor: Optional[str]):
+        employee_ids = None
+        if department is not None:
+            employee_ids = set(self.db.scalars(select(Employee.id).where(Employee.department == department)))
+
+        ids = _fallback_index(self.db).ids_at(at, employee_ids)
+        start = 0
+        if cursor:
+            values = decode_cursor(cursor)
+            if len(values) != 1:
+                raise ValueError("Curseur invalide pour ce tri")
+            start = bisect.bisect_right(ids, values[0])
+        page = ids[start:start + limit]
+        next_cursor = encode_cursor([page[-1]]) if len(ids) > start + limit else None
+        if not page:
+            return [], None
+
+        history = EmployeeEquipmentHistory
+        rows = self.db.execute(history_crud.rows_query().where(history.id.in_(page)).order_by(history.id)).all()
+        return history_crud.to_dicts(rows), next_cursor
@@ -0,0 +1,406 @@
+"""
+Import d'équipements en streaming depuis un fichier Excel (.xlsx) ou CSV.
+
+Le fichier est lu ligne à ligne (openpyxl en mode read_only, csv.reader),
+découpé en lots de taille fixe, normalisé de façon vectorisée avec pandas
+puis écrit par ``INSERT ... ON CONFLICT (serial_number) DO UPDATE``.
+La mémoire reste constante quelle que soit la taille du fichier et une
+ligne invalide n'annule plus le reste de l'import.
+
+L'import ne touche pas aux détenteurs : le statut ``assigned`` est refusé, et
+le statut d'un équipement attribué ne change pas (ligne rejetée) ; seule
+l'attribution (``assignment.apply_assignments``) les modifie.
+"""
+import csv
+import io
+import os
+import zipfile
+from itertools import islice
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+from sqlalchemy import case, func, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.upsert import dialect_insert
+from app.models.equipment import Equipment, EquipmentType, EquipmentCondition, EquipmentStatus
+from app.models.job import Job
+from app.schemas.import_excel import ImportReport, ImportRowError
+from app.services import stats
+from app.services.jobs import JobProgress, JobReclaimed, delete_file, job_handler, local_copy
+
+SUPPORTED_EXTENSIONS = (".xlsx", ".xls", ".csv")
+
+REQUIRED_COLUMNS = ("serial_number", "model")
+
+UPDATABLE_COLUMNS = ("model", "equipment_type", "condition", "status")
+
+MAX_LENGTHS = {"serial_number": 100, "model": 255}
+
+ENUM_COLUMNS = {
+    "equipment_type": (EquipmentType, EquipmentType.PC),
+    "condition": (EquipmentCondition, EquipmentCondition.NEW),
+    "status": (EquipmentStatus, EquipmentStatus.IN_STOCK),
+}
+
+ASSIGNED_ERROR = "statut assigned refusé à l'import : attribuer l'équipement à un employé"
+HELD_ERROR = "équipement attribué : statut non modifiable à l'import, le restituer d'abord"
+
+# Libellés français fréquents dans les fichiers d'inventaire
+ENUM_ALIASES = {
+    "equipment_type": {
+        "portable": "laptop",
+        "ordinateur portable": "laptop",
+        "ordinateur": "pc",
+        "écran": "monitor",
+        "ecran": "monitor",
+        "téléphone": "phone",
+        "telephone": "phone",
+        "imprimante": "printer",
+        "autre": "other",
+    },
+    "condition": {
+        "neuf": "new",
+        "bon": "good",
+        "moyen": "fair",
+        "mauvais": "poor",
+    },
+    "status": {
+        "stock": "in_stock",
+        "en stock": "in_stock",
+        "assigné": "assigned",
+        "assigne": "assigned",
+        "affecté": "assigned",
+        "affecte": "assigned",
+        "réformé": "retired",
+        "reforme": "retired",
+    },
+}
+
+
+def import_equipment_file(
+    db: Session,
+    fileobj: BinaryIO,
+    filename: str,
+    chunk_size: int = None,
+    on_progress: Callable[[ImportReport], None] = None,
+) -> ImportReport:
+    """Importer un fichier d'équipements lot par lot et retourner le rapport ligne à ligne."""
+    chunk_size = chunk_size or settings.IMPORT_CHUNK_SIZE
+    rows = iter_file_rows(fileobj, filename)
+
+    header = next(rows, None)
+    if header is None:
+        raise ValueError("Le fichier est vide")
+    columns = _normalize_header(header)
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing:
+        raise ValueError(f"Colonnes obligatoires manquantes : {', '.join(missing)}")
+
+    # Seules les colonnes présentes dans le fichier écrasent les valeurs existantes
+    statement = upsert_statement(db, [column for column in UPDATABLE_COLUMNS if column in columns])
+    report = ImportReport(detail="")
+
+    for chunk in _iter_chunks(rows, chunk_size):
+        records, row_numbers, errors = normalize_chunk(columns, chunk)
+        if records and "status" in columns:
+            records, row_numbers, held_errors = _reject_held(db, records, row_numbers)
+            errors.extend(held_errors)
+        imported = 0
+        if records:
+            imported, db_errors = _write_chunk(db, statement, records, row_numbers)
+            errors.extend(db_errors)
+
+        report.rows_total += len(chunk)
+        report.rows_imported += imported
+        report.rows_failed += len(errors)
+        _collect_errors(report, errors)
+        if on_progress:
+            on_progress(report)
+
+    if report.rows_failed:
+        report.detail = f"Import terminé : {report.rows_failed} ligne(s) rejetée(s)"
+    else:
+        report.detail = "Import réussi ✅"
+    return report
+
+
+# ---------------------------------------------------------------------------
+# Exécution en tâche de fond
+# ---------------------------------------------------------------------------
+
+# Nom du fichier importé parmi les fichiers de la tâche (``job_files``)
+UPLOAD_FILE = "upload"
+
+
+@job_handler("import_equipment")
+def run_import_job(db: Session, job: Job, progress: JobProgress) -> Dict[str, Any]:
+    filename = job.payload["filename"]
+    extension = os.path.splitext(filename)[1].lower()
+    reclaimed = False
+    try:
+        # Copie locale : openpyxl a besoin d'un fichier qu'il peut parcourir librement
+        with local_copy(db, job.id, UPLOAD_FILE, extension) as path, open(path, "rb") as fileobj:
+            progress.set_total(count_data_rows(fileobj, filename))
+            fileobj.seek(0)
+            report = import_equipment_file(
+                db,
+                fileobj,
+                filename,
+                on_progress=lambda current: progress.update(current.rows_total, current.rows_failed),
+            )
+    except JobReclaimed:
+        # Tâche reprise par un autre worker : le fichier importé lui revient
+        reclaimed = True
+        db.rollback()
+        raise
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        # Le fichier importé n'est plus utile, que l'import ait abouti ou non
+        if not reclaimed:
+            delete_file(db, job.id, UPLOAD_FILE)
+            db.commit()
+    return report.model_dump()
+
+
+def count_data_rows(fileobj: BinaryIO, filename: str) -> Optional[int]:
+    """Estimer le nombre de lignes de données sans parser le fichier (pour l'ETA)."""
+    name = filename.lower()
+    if name.endswith(".csv"):
+        lines = sum(block.count(b"\n") for block in iter(lambda: fileobj.read(1024 * 1024), b""))
+        return max(lines - 1, 0)
+    if name.endswith(".xlsx"):
+        from openpyxl import load_workbook
+
+        try:
+            workbook = load_workbook(fileobj, read_only=True)
+        except Exception:
+            return None
+        try:
+            max_row = workbook.active.max_row
+        finally:
+            workbook.close()
+        return max(max_row - 1, 0) if max_row else None
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Lecture du fichier
+# ---------------------------------------------------------------------------
+
+def iter_file_rows(fileobj: BinaryIO, filename: str) -> Iterator[Sequence[Any]]:
+    """Itérer sur les lignes brutes du fichier (en-tête comprise) sans le charger entièrement."""
+    name = filename.lower()
+    if name.endswith(".csv"):
+        yield from _iter_csv_rows(fileobj)
+    elif name.endswith(".xlsx"):
+        yield from _iter_xlsx_rows(fileobj)
+    elif name.endswith(".xls"):
+        # Le format binaire .xls ne se lit pas en streaming : repli sur pandas
+        df = pd.read_excel(fileobj, header=None, dtype=object)
+        yield from df.itertuples(index=False, name=None)
+    else:
+        raise ValueError("Le fichier doit être au format Excel (.xlsx, .xls) ou CSV")
+
+
+def _iter_xlsx_rows(fileobj: BinaryIO) -> Iterator[Sequence[Any]]:
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError):
+        raise ValueError("Fichier Excel illisible")
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _iter_csv_rows(fileobj: BinaryIO) -> Iterator[Sequence[Any]]:
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    try:
+        sample = text.read(4096)
+        text.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.reader(text, dialect)
+    finally:
+        # Ne pas fermer le fichier sous-jacent, il appartient à l'appelant
+        text.detach()
+
+
+def _normalize_header(header: Sequence[Any]) -> List[str]:
+    columns = []
+    for index, value in enumerate(header):
+        name = str(value).strip().lower().replace(" ", "_") if value is not None else ""
+        # Une colonne en double ne doit pas masquer la première occurrence
+        columns.append(name if name and name not in columns else f"__ignored_{index}")
+    return columns
+
+
+def _is_blank(row: Sequence[Any]) -> bool:
+    return all(value is None or (isinstance(value, str) and not value.strip()) for value in row)
+
+
+def _iter_chunks(
+    rows: Iterator[Sequence[Any]], chunk_size: int
+) -> Iterator[List[Tuple[int, Sequence[Any]]]]:
+    # Numéros de ligne tels qu'affichés dans le tableur (l'en-tête est la ligne 1)
+    numbered = ((number, row) for number, row in enumerate(rows, start=2) if not _is_blank(row))
+    while True:
+        chunk = list(islice(numbered, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# ---------------------------------------------------------------------------
+# Validation / normalisation vectorisée
+# ---------------------------------------------------------------------------
+
+def normalize_chunk(
+    columns: List[str], chunk: List[Tuple[int, Sequence[Any]]]
+) -> Tuple[List[Dict[str, Any]], List[int], List[ImportRowError]]:
+    """Valider un lot de lignes et retourner (enregistrements valides, numéros de ligne, erreurs)."""
+    width = len(columns)
+    df = pd.DataFrame(
+        [tuple(row[:width]) + (None,) * (width - len(row)) for _, row in chunk],
+        columns=columns,
+        index=[number for number, _ in chunk],
+        dtype=object,
+    )
+    errors = pd.Series("", index=df.index, dtype=object)
+
+    values = {}
+    for column in REQUIRED_COLUMNS:
+        text = _as_text(df[column])
+        _flag(errors, text.isna(), f"{column} manquant")
+        _flag(errors, text.str.len() > MAX_LENGTHS[column], f"{column} trop long")
+        values[column] = text
+
+    for column, (enum_cls, default) in ENUM_COLUMNS.items():
+        if column in df.columns:
+            text = _as_text(df[column]).str.lower()
+            text = text.replace(ENUM_ALIASES[column]).str.replace(r"[\s-]+", "_", regex=True)
+            text = text.fillna(default.value)
+        else:
+            text = pd.Series(default.value, index=df.index, dtype="string")
+        allowed = [member.value for member in enum_cls]
+        _flag(errors, ~text.isin(allowed), f"valeur invalide pour {column} : " + text.astype(object))
+        values[column] = text
+
+    _flag(errors, values["status"].eq(EquipmentStatus.ASSIGNED.value), ASSIGNED_ERROR)
+
+    # Un même serial_number ne peut apparaître qu'une fois par INSERT ... ON CONFLICT ;
+    # seules les lignes valides comptent : une dernière occurrence rejetée n'écarte pas les autres
+    serial = values["serial_number"]
+    candidates = errors.eq("")
+    duplicated = candidates & serial.where(candidates).duplicated(keep="last")
+    _flag(errors, duplicated, "serial_number en double dans le fichier (dernière occurrence valide conservée)")
+
+    valid = errors.eq("")
+    records = pd.DataFrame({column: text[valid] for column, text in values.items()}).astype(object)
+    row_errors = [
+        ImportRowError(row=number, serial_number=None if pd.isna(serial_number) else serial_number, error=message)
+        for number, serial_number, message in zip(df.index[~valid], serial[~valid], errors[~valid])
+    ]
+    return records.to_dict("records"), list(records.index), row_errors
+
+
+def _as_text(series: pd.Series) -> pd.Series:
+    text = series.astype("string").str.strip()
+    return text.mask(text.eq(""))
+
+
+def _flag(errors: pd.Series, mask: pd.Series, message) -> None:
+    # Seule la première erreur de chaque ligne est conservée
+    mask = mask.fillna(False).astype(bool) & errors.eq("")
+    errors[mask] = message[mask] if isinstance(message, pd.Series) else message
+
+
+# ---------------------------------------------------------------------------
+# Écriture en base
+# ---------------------------------------------------------------------------
+
+def _reject_held(
+    db: Session, records: List[Dict[str, Any]], row_numbers: List[int]
+) -> Tuple[List[Dict[str, Any]], List[int], List[ImportRowError]]:
+    """Écarter les lignes qui changeraient le statut d'un équipement attribué."""
+    held = set(db.scalars(select(Equipment.serial_number).where(
+        Equipment.serial_number.in_([record["serial_number"] for record in records]),
+        Equipment.employee_id.is_not(None),
+    )))
+    if not held:
+        return records, row_numbers, []
+    kept, kept_numbers, errors = [], [], []
+    for number, record in zip(row_numbers, records):
+        if record["serial_number"] in held:
+            errors.append(ImportRowError(row=number, serial_number=record["serial_number"], error=HELD_ERROR))
+        else:
+            kept.append(record)
+            kept_numbers.append(number)
+    return kept, kept_numbers, errors
+
+
+def upsert_statement(db: Session, update_columns: Sequence[str] = UPDATABLE_COLUMNS):
+    """Construire l'``INSERT ... ON CONFLICT (serial_number) DO UPDATE`` adapté au dialecte."""
+    statement = dialect_insert(db)(Equipment.__table__)
+    updates = {column: statement.excluded[column] for column in update_columns}
+    if "status" in updates:
+        # Attribué entre la vérification et l'écriture : son statut reste celui de l'attribution
+        table = Equipment.__table__
+        updates["status"] = case((table.c.employee_id.is_(None), updates["status"]), else_=table.c.status)
+    updates["updated_at"] = func.now()
+    return statement.on_conflict_do_update(index_elements=[Equipment.serial_number], set_=updates)
+
+
+def _upsert(db: Session, statement, records: List[Dict[str, Any]]) -> None:
+    # Les compteurs du dashboard suivent l'état avant / après des lignes touchées
+    touched = Equipment.serial_number.in_([record["serial_number"] for record in records])
+    before = stats.capture(db, touched)
+    db.execute(statement, records)
+    stats.apply_changes(db, before, stats.capture(db, touched))
+    db.commit()
+
+
+def _write_chunk(
+    db: Session, statement, records: List[Dict[str, Any]], row_numbers: List[int]
+) -> Tuple[int, List[ImportRowError]]:
+    try:
+        _upsert(db, statement, records)
+        return len(records), []
+    except SQLAlchemyError:
+        db.rollback()
+
+    # Le lot a échoué : on rejoue ligne par ligne pour isoler les lignes fautives
+    imported = 0
+    errors = []
+    for number, record in zip(row_numbers, records):
+        try:
+            _upsert(db, statement, [record])
+            imported += 1
+        except SQLAlchemyError as exc:
+            db.rollback()
+            errors.append(
+                ImportRowError(row=number, serial_number=record["serial_number"], error=_db_error_message(exc))
+            )
+    return imported, errors
+
+
+def _db_error_message(exc: SQLAlchemyError) -> str:
+    message = str(getattr(exc, "orig", None) or exc)
+    return message.strip().splitlines()[0] if message.strip() else exc.__class__.__name__
+
+
+def _collect_errors(report: ImportReport, errors: List[ImportRowError]) -> None:
+    room = settings.IMPORT_MAX_ERRORS - len(report.errors)
+    if len(errors) > room:
+        report.errors_truncated = True
+    report.errors.extend(errors[:max(room, 0)])
@@ -0,0 +1,158 @@
+"""
+Analyse des questions du chatbot : intention et entités.
+
+Toutes les expressions sont compilées une seule fois, à l'import, en un seul
+motif combiné (un groupe nommé par motif). La question est parcourue en une
+passe par ``finditer`` : chaque correspondance est soit un mot-clé
+d'intention, soit une entité (site, étage, rosace, numéro de série, employé,
+CUID, statut, type). ``ChatbotService`` transforme ensuite le résultat en une
+seule requête SQL paramétrée.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from app.models.equipment import EquipmentStatus, EquipmentType
+
+COUNT = "count"
+LOCATE = "locate"
+LIST = "list"
+INVENTORY = "inventory"
+UNKNOWN = "unknown"
+
+# Entités qui désignent un emplacement ou un employé
+LOCATION_ENTITIES = ("site", "etage", "rosace")
+EMPLOYEE_ENTITIES = ("employee", "cuid")
+
+_WORD = r"[\w'-]+"
+_NAME = r"(?-i:[A-ZÀ-Ý][\w'-]+(?:\s+[A-ZÀ-Ý][\w'-]+)*)"
+
+# Mots-clés (formes fléchies acceptées) -> valeur normalisée
+STATUS_WORDS = {
+    "en stock": EquipmentStatus.IN_STOCK.value,
+    "disponible": EquipmentStatus.IN_STOCK.value,
+    "assigné": EquipmentStatus.ASSIGNED.value,
+    "assigne": EquipmentStatus.ASSIGNED.value,
+    "affecté": EquipmentStatus.ASSIGNED.value,
+    "affecte": EquipmentStatus.ASSIGNED.value,
+    "en maintenance": EquipmentStatus.MAINTENANCE.value,
+    "en réparation": EquipmentStatus.MAINTENANCE.value,
+    "en reparation": EquipmentStatus.MAINTENANCE.value,
+    "réformé": EquipmentStatus.RETIRED.value,
+    "reforme": EquipmentStatus.RETIRED.value,
+}
+TYPE_WORDS = {
+    "ordinateur portable": EquipmentType.LAPTOP.value,
+    "ordinateurs portables": EquipmentType.LAPTOP.value,
+    "portable": EquipmentType.LAPTOP.value,
+    "laptop": EquipmentType.LAPTOP.value,
+    "pc": EquipmentType.PC.value,
+    "ordinateur": EquipmentType.PC.value,
+    "écran": EquipmentType.MONITOR.value,
+    "ecran": EquipmentType.MONITOR.value,
+    "moniteur": EquipmentType.MONITOR.value,
+    "téléphone": EquipmentType.PHONE.value,
+    "telephone": EquipmentType.PHONE.value,
+    "imprimante": EquipmentType.PRINTER.value,
+}
+INTENT_WORDS = {
+    COUNT: ("combien", "nombre", "total"),
+    LOCATE: ("où", "emplacement", "localisation", "location", "situé", "situe", "trouve"),
+    LIST: ("liste", "lister", "quels", "quelles", "affiche", "afficher", "montre", "montrer", "salle"),
+    INVENTORY: ("équipement", "equipement", "matériel", "materiel", "stock", "inventaire"),
+}
+
+
+def _alternation(words) -> str:
+    # Formes longues d'abord ("ordinateur portable" avant "ordinateur"), pluriel toléré
+    return "|".join(re.escape(word) + "s?" for word in sorted(words, key=len, reverse=True))
+
+
+# (nom du groupe, motif) ; l'ordre fixe la priorité à position égale.
+# Les groupes ``v_*`` capturent la valeur de l'entité correspondante.
+_PATTERNS: List[Tuple[str, str]] = [
+    ("cuid", rf"\bcuid\s*:?\s*(?P<v_cuid>{_WORD})"),
+    ("serial", rf"(?:num[ée]ro\s+de\s+s[ée]rie|s[ée]rie|\bs/?n\b)\s*:?\s*(?P<v_serial>{_WORD})"),
+    ("employee", rf"(?:\bemploy[ée]e?|\bcollaborat(?:eur|rice)|\bappartenant\s+à|\bassign[ée]e?s?\s+à|"
+                 rf"\baffect[ée]e?s?\s+à|\bchez)\s+(?P<v_employee>{_NAME})"),
+    ("site", rf"\bsite\s+(?:de\s+|d')?(?P<v_site>{_WORD})"),
+    ("etage", rf"(?:\b[ée]tage\s*(?:n°\s*)?(?P<v_etage>{_WORD})|\b(?P<v_etage_ord>\d+)\s*(?:er|e|[èe]me)\s+[ée]tage)"),
+    ("rosace", rf"\brosace\s*(?:n°\s*)?(?P<v_rosace>{_WORD})"),
+    ("status", rf"\b(?:{_alternation(STATUS_WORDS)})\b"),
+    ("type", rf"\b(?:{_alternation(TYPE_WORDS)})\b"),
+    # Identifiants nus : CUID (4 lettres + 4 chiffres) puis numéro de série (majuscules et chiffres)
+    ("cuid_bare", r"(?-i:\b(?P<v_cuid_bare>[A-Z]{4}\d{4})\b)"),
+    ("serial_bare", r"(?-i:\b(?P<v_serial_bare>(?=[A-Z0-9-]*\d)(?=[A-Z0-9-]*[A-Z])[A-Z0-9][A-Z0-9-]{4,})\b)"),
+] + [(intent, rf"(?<!\w)(?:{_alternation(words)})(?!\w)") for intent, words in INTENT_WORDS.items()]
+
+_MATCHER = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in _PATTERNS), re.IGNORECASE)
+
+# Groupe de valeur -> nom d'entité
+_VALUE_GROUPS = {
+    "cuid": ("v_cuid", "cuid"),
+    "cuid_bare": ("v_cuid_bare", "cuid"),
+    "serial": ("v_serial", "serial"),
+    "serial_bare": ("v_serial_bare", "serial"),
+    "employee": ("v_employee", "employee"),
+    "site": ("v_site", "site"),
+    "rosace": ("v_rosace", "rosace"),
+}
+
+_STATUS_LOOKUP = {word.lower(): value for word, value in STATUS_WORDS.items()}
+_TYPE_LOOKUP = {word.lower(): value for word, value in TYPE_WORDS.items()}
+_PLURAL = re.compile(r"s(?=\s|$)")
+_CUID = re.compile(r"[A-Z]{4}\d{4}")
+
+
+@dataclass
+class ParsedQuery:
+    intent: str
+    entities: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def has_location(self) -> bool:
+        return any(name in self.entities for name in LOCATION_ENTITIES)
+
+    @property
+    def has_employee(self) -> bool:
+        return any(name in self.entities for name in EMPLOYEE_ENTITIES)
+
+
+def _keyword(lookup: Dict[str, str], text: str) -> Optional[str]:
+    text = " ".join(text.lower().split())
+    return lookup.get(text) or lookup.get(_PLURAL.sub("", text))
+
+
+def parse(question: str) -> ParsedQuery:
+    """Extraire en une passe l'intention et les entités de ``question``."""
+    keywords = set()
+    entities: Dict[str, str] = {}
+
+    for match in _MATCHER.finditer(question):
+        kind = match.lastgroup
+        if kind in INTENT_WORDS:
+            keywords.add(kind)
+        elif kind == "etage":
+            entities.setdefault("etage", match.group("v_etage") or match.group("v_etage_ord"))
+        elif kind == "status":
+            entities.setdefault("status", _keyword(_STATUS_LOOKUP, match.group(kind)))
+        elif kind == "type":
+            entities.setdefault("equipment_type", _keyword(_TYPE_LOOKUP, match.group(kind)))
+        else:
+            group, name = _VALUE_GROUPS[kind]
+            entities.setdefault(name, match.group(group))
+    entities = {name: value for name, value in entities.items() if value}
+    if _CUID.fullmatch(entities.get("employee", "")):
+        entities.setdefault("cuid", entities.pop("employee"))
+
+    if COUNT in keywords:
+        intent = COUNT
+    elif LOCATE in keywords:
+        intent = LOCATE
+    elif LIST in keywords or entities:
+        intent = LIST
+    elif INVENTORY in keywords:
+        intent = INVENTORY
+    else:
+        intent = UNKNOWN
+    return ParsedQuery(intent=intent, entities=entities)
@@ -0,0 +1,363 @@
+"""
+File de tâches de fond sans broker externe.
+
+Les tâches sont persistées dans la table ``jobs`` qui sert de file d'attente :
+un thread de dispatch réclame atomiquement les tâches ``queued`` et les confie
+à un pool de threads. Chaque type de tâche est associé à un handler enregistré
+avec ``@job_handler("type")`` ; le handler reçoit une session, la tâche et un
+objet ``JobProgress`` pour publier son avancement.
+
+Les fichiers d'une tâche (fichier importé, rapport produit) sont stockés en
+base par blocs (``job_files``) : la tâche peut être réclamée par n'importe
+quel pod, et le résultat téléchargé depuis n'importe lequel. ``JOB_SPOOL_DIR``
+ne sert que de répertoire de travail local, le temps d'une exécution.
+
+Chaque réclamation reçoit un jeton (``claim_token``). Le dispatcher rafraîchit
+``updated_at`` des tâches de son process toutes les ``JOB_HEARTBEAT_SECONDS``,
+même pendant une étape longue du handler ; une tâche sans battement depuis
+``JOB_STALE_AFTER_SECONDS`` est remise en file avec un nouveau jeton à venir.
+Progression et fin ne sont écrites que sous le jeton courant : un worker
+dépossédé s'arrête (``JobReclaimed``) sans terminer la tâche une seconde fois.
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, BinaryIO, Callable, Dict, Iterator, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.job import Job, JobFile, JobStatus, as_utc
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Session, Job, "JobProgress"], Optional[Dict[str, Any]]]
+
+_handlers: Dict[str, JobHandler] = {}
+
+
+def job_handler(kind: str):
+    """Enregistrer la fonction décorée comme handler des tâches ``kind``."""
+    def decorator(handler: JobHandler) -> JobHandler:
+        _handlers[kind] = handler
+        return handler
+    return decorator
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# ---------------------------------------------------------------------------
+# Fichiers des tâches
+# ---------------------------------------------------------------------------
+
+# Taille d'un bloc de ``job_files`` : une ligne lue ou écrite à la fois
+FILE_CHUNK_BYTES = 1024 * 1024
+
+
+def store_file(db: Session, job_id: str, name: str, fileobj: BinaryIO) -> int:
+    """Copier ``fileobj`` dans le fichier ``name`` de la tâche (sans commit) ; renvoie sa taille."""
+    size = 0
+    seq = 0
+    while block := fileobj.read(FILE_CHUNK_BYTES):
+        db.execute(insert(JobFile), {"job_id": job_id, "name": name, "seq": seq, "data": block})
+        size += len(block)
+        seq += 1
+    return size
+
+
+def file_blocks(db: Session, job_id: str, name: str) -> int:
+    """Nombre de blocs du fichier ``name`` de la tâche (0 s'il n'existe pas)."""
+    return db.scalar(
+        select(func.count()).select_from(JobFile).where(JobFile.job_id == job_id, JobFile.name == name)
+    )
+
+
+def block_query(job_id: str, name: str, seq: int):
+    """Requête d'un bloc (partagée avec les téléchargements en session asynchrone)."""
+    return select(JobFile.data).where(JobFile.job_id == job_id, JobFile.name == name, JobFile.seq == seq)
+
+
+def iter_file(db: Session, job_id: str, name: str) -> Iterator[bytes]:
+    """Contenu du fichier bloc par bloc (un seul bloc en mémoire)."""
+    for seq in range(file_blocks(db, job_id, name)):
+        yield db.scalar(block_query(job_id, name, seq))
+
+
+def delete_file(db: Session, job_id: str, name: str) -> None:
+    """Supprimer le fichier ``name`` de la tâche (sans commit)."""
+    db.execute(delete(JobFile).where(JobFile.job_id == job_id, JobFile.name == name))
+
+
+@contextmanager
+def local_copy(db: Session, job_id: str, name: str, suffix: str = "") -> Iterator[str]:
+    """Copie locale (dans ``JOB_SPOOL_DIR``) du fichier de la tâche, supprimée en sortie."""
+    os.makedirs(settings.JOB_SPOOL_DIR, exist_ok=True)
+    descriptor, path = tempfile.mkstemp(suffix=suffix, dir=settings.JOB_SPOOL_DIR)
+    try:
+        with os.fdopen(descriptor, "wb") as target:
+            for block in iter_file(db, job_id, name):
+                target.write(block)
+        yield path
+    finally:
+        os.remove(path)
+
+
+@contextmanager
+def local_output(suffix: str = "") -> Iterator[str]:
+    """Chemin local où écrire un fichier à stocker ensuite par ``store_file``, supprimé en sortie."""
+    os.makedirs(settings.JOB_SPOOL_DIR, exist_ok=True)
+    descriptor, path = tempfile.mkstemp(suffix=suffix, dir=settings.JOB_SPOOL_DIR)
+    os.close(descriptor)
+    try:
+        yield path
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class JobReclaimed(Exception):
+    """La tâche a été remise en file et réclamée à nouveau : ce worker n'en est plus le détenteur."""
+
+
+class JobProgress:
+    """Publie l'avancement d'une tâche, au plus une écriture par ``min_interval``."""
+
+    def __init__(self, session_factory, job_id: str, claim_token: str = None, min_interval: float = 0.5):
+        self._session_factory = session_factory
+        self._job_id = job_id
+        self._claim_token = claim_token
+        self._min_interval = min_interval
+        self._last_flush = 0.0
+        self.rows_total: Optional[int] = None
+        self.rows_processed = 0
+        self.rows_failed = 0
+
+    def set_total(self, rows_total: Optional[int]) -> None:
+        self.rows_total = rows_total
+        self.flush()
+
+    def update(self, rows_processed: int, rows_failed: int = 0) -> None:
+        self.rows_processed = rows_processed
+        self.rows_failed = rows_failed
+        if time.monotonic() - self._last_flush >= self._min_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        # Session dédiée : la progression est visible même si le handler
+        # n'a pas encore validé sa propre transaction
+        with self._session_factory() as db:
+            updated = db.execute(
+                update(Job)
+                .where(Job.id == self._job_id, Job.claim_token == self._claim_token)
+                .values(
+                    rows_total=self.rows_total,
+                    rows_processed=self.rows_processed,
+                    rows_failed=self.rows_failed,
+                    updated_at=_utcnow(),
+                )
+            ).rowcount
+            db.commit()
+        if not updated:
+            raise JobReclaimed(self._job_id)
+        self._last_flush = time.monotonic()
+
+
+class JobQueue:
+    """Pool de workers alimenté par la table ``jobs``."""
+
+    def __init__(self, session_factory=SessionLocal, workers: int = None):
+        self.session_factory = session_factory
+        self._workers = workers or settings.JOB_WORKERS
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[threading.Semaphore] = None
+        self._schedules: Dict[str, float] = {}
+        # Tâches en cours dans ce process : id -> jeton de réclamation
+        self._running: Dict[str, str] = {}
+        self._last_heartbeat = 0.0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopping.clear()
+            self._slots = threading.Semaphore(self._workers)
+            self._executor = ThreadPoolExecutor(self._workers, thread_name_prefix="job-worker")
+            self._thread = threading.Thread(target=self._dispatch_loop, name="job-dispatcher", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                return
+            self._stopping.set()
+            self._wakeup.set()
+            self._thread.join()
+            self._executor.shutdown(wait=True)
+            self._thread = None
+            self._executor = None
+
+    def schedule(self, kind: str, interval_seconds: float) -> None:
+        """Mettre une tâche ``kind`` en file toutes les ``interval_seconds`` secondes."""
+        if kind not in _handlers:
+            raise ValueError(f"Type de tâche inconnu : {kind}")
+        self._schedules[kind] = interval_seconds
+
+    def submit(
+        self, db: Session, kind: str, payload: Dict[str, Any] = None, created_by: int = None,
+        files: Dict[str, BinaryIO] = None,
+    ) -> Job:
+        """Mettre une tâche en file, avec ses fichiers (``files`` : nom -> contenu), et réveiller le dispatcher."""
+        if kind not in _handlers:
+            raise ValueError(f"Type de tâche inconnu : {kind}")
+        job = Job(kind=kind, payload=payload, created_by=created_by, status=JobStatus.QUEUED.value)
+        db.add(job)
+        # Fichiers validés avec la tâche : aucun worker ne la réclame sans eux
+        db.flush()
+        for name, fileobj in (files or {}).items():
+            store_file(db, job.id, name, fileobj)
+        db.commit()
+        db.refresh(job)
+        self._wakeup.set()
+        return job
+
+    def _dispatch_loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                self._heartbeat()
+                self._requeue_stale()
+                self._enqueue_scheduled()
+                self._dispatch_pending()
+            except Exception:
+                logger.exception("Erreur du dispatcher de tâches")
+            self._wakeup.wait(settings.JOB_POLL_INTERVAL_SECONDS)
+            self._wakeup.clear()
+
+    def _dispatch_pending(self) -> None:
+        while not self._stopping.is_set() and self._slots.acquire(blocking=False):
+            claim = self._claim_next()
+            if claim is None:
+                self._slots.release()
+                return
+            self._executor.submit(self._run, *claim)
+
+    def _claim_next(self) -> Optional[Tuple[str, str]]:
+        """Réclamer la plus ancienne tâche en file ; renvoie (id, jeton de réclamation)."""
+        with self.session_factory() as db:
+            candidates = db.scalars(
+                select(Job.id)
+                .where(Job.status == JobStatus.QUEUED.value)
+                .order_by(Job.created_at)
+                .limit(10)
+            ).all()
+            for job_id in candidates:
+                # Réclamation atomique : un seul process passe la tâche à "running"
+                now = _utcnow()
+                token = str(uuid.uuid4())
+                claimed = db.execute(
+                    update(Job)
+                    .where(Job.id == job_id, Job.status == JobStatus.QUEUED.value)
+                    .values(status=JobStatus.RUNNING.value, started_at=now, updated_at=now, claim_token=token)
+                ).rowcount
+                db.commit()
+                if claimed:
+                    with self._lock:
+                        self._running[job_id] = token
+                    return job_id, token
+        return None
+
+    def _heartbeat(self) -> None:
+        # Battement indépendant du handler : une étape longue sans progression ne rend pas la tâche orpheline
+        if time.monotonic() - self._last_heartbeat < settings.JOB_HEARTBEAT_SECONDS:
+            return
+        with self._lock:
+            tokens = list(self._running.values())
+        if tokens:
+            with self.session_factory() as db:
+                db.execute(
+                    update(Job)
+                    .where(Job.claim_token.in_(tokens), Job.status == JobStatus.RUNNING.value)
+                    .values(updated_at=_utcnow())
+                )
+                db.commit()
+        self._last_heartbeat = time.monotonic()
+
+    def _enqueue_scheduled(self) -> None:
+        # L'échéance est lue en base : plusieurs réplicas ne dupliquent pas la tâche
+        if not self._schedules:
+            return
+        now = _utcnow()
+        with self.session_factory() as db:
+            for kind, interval in self._schedules.items():
+                last = db.scalar(select(func.max(Job.created_at)).where(Job.kind == kind))
+                if last is None or as_utc(last) <= now - timedelta(seconds=interval):
+                    db.add(Job(kind=kind, status=JobStatus.QUEUED.value, created_at=now))
+            db.commit()
+
+    def _requeue_stale(self) -> None:
+        # Une tâche "running" sans battement de cœur a perdu son worker
+        deadline = _utcnow() - timedelta(seconds=settings.JOB_STALE_AFTER_SECONDS)
+        with self.session_factory() as db:
+            db.execute(
+                update(Job)
+                .where(Job.status == JobStatus.RUNNING.value, Job.updated_at < deadline)
+                .values(status=JobStatus.QUEUED.value, updated_at=_utcnow(), claim_token=None)
+            )
+            db.commit()
+
+    def _run(self, job_id: str, claim_token: str) -> None:
+        try:
+            with self.session_factory() as db:
+                job = db.get(Job, job_id)
+                progress = JobProgress(self.session_factory, job_id, claim_token)
+                try:
+                    result = _handlers[job.kind](db, job, progress)
+                    progress.flush()
+                    self._finish(job_id, claim_token, JobStatus.SUCCEEDED, result=result)
+                except JobReclaimed:
+                    logger.warning("Tâche %s (%s) réclamée par un autre worker : abandon", job_id, job.kind)
+                    db.rollback()
+                except Exception as exc:
+                    logger.exception("Échec de la tâche %s (%s)", job_id, job.kind)
+                    db.rollback()
+                    try:
+                        progress.flush()
+                        self._finish(job_id, claim_token, JobStatus.FAILED, error=str(exc))
+                    except JobReclaimed:
+                        logger.warning("Tâche %s (%s) réclamée par un autre worker : abandon", job_id, job.kind)
+        finally:
+            with self._lock:
+                self._running.pop(job_id, None)
+            self._slots.release()
+            self._wakeup.set()
+
+    def _finish(
+        self, job_id: str, claim_token: str, status: JobStatus, result: Dict[str, Any] = None, error: str = None
+    ) -> None:
+        """Terminer la tâche, seulement sous la réclamation ``claim_token`` (sinon ``JobReclaimed``)."""
+        now = _utcnow()
+        with self.session_factory() as db:
+            finished = db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.claim_token == claim_token, Job.status == JobStatus.RUNNING.value)
+                .values(status=status.value, result=result, error=error, finished_at=now, updated_at=now)
+            ).rowcount
+            db.commit()
+        if not finished:
+            raise JobReclaimed(job_id)
+
+
+job_queue = JobQueue()
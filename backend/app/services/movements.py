@@ -0,0 +1,448 @@
+"""
+Journal des mouvements d'équipements, en ajout seul et partitionné par mois.
+
+Chaque partition couvre un mois UTC et s'appelle ``equipment_movements_AAAA_MM`` :
+
+- PostgreSQL : partitionnement natif (``PARTITION BY RANGE ("timestamp")``).
+  Les écritures visent la table parente, et une lecture bornée dans le temps
+  n'ouvre que les partitions de la période (élagage du planificateur). Une
+  écriture ne crée jamais de partition : le DDL prendrait sur ``equipment``
+  et ``users`` (clés étrangères) des verrous incompatibles avec ceux que la
+  transaction appelante détient déjà. Un mois sans partition est reçu par la
+  partition par défaut ``equipment_movements_default`` ;
+- SQLite (tests) : émulé par une table par mois, la table parente restant vide.
+  Les écritures sont réparties ici (tables manquantes créées sur la connexion
+  de l'appelant), et une lecture parcourt les mois de la période du plus
+  récent au plus ancien jusqu'à remplir la page.
+
+La maintenance périodique (et l'initialisation de la base) crée les partitions
+à l'avance, y range les mouvements reçus par la partition par défaut et
+applique la rétention : un mois plus ancien que ``MOVEMENT_RETENTION_MONTHS``
+est archivé en NDJSON gzip dans ``MOVEMENT_ARCHIVE_DIR`` puis supprimé d'un
+bloc (DROP, sans DELETE ligne à ligne). Sans répertoire d'archives configuré,
+rien n'est supprimé. ``(timestamp, id)`` identifie un mouvement : sous
+SQLite, l'id n'est unique que dans sa partition.
+"""
+import gzip
+import logging
+import os
+import re
+import threading
+import weakref
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import Column, Index, Integer, MetaData, Table, event, insert, select, text, tuple_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud.pagination import decode_cursor, encode_cursor
+from app.models.job import Job
+from app.models.movement import EquipmentMovement
+from app.services import export
+from app.services.jobs import JobProgress, job_handler
+
+logger = logging.getLogger(__name__)
+
+PARENT = EquipmentMovement.__tablename__
+DEFAULT_PARTITION = f"{PARENT}_default"
+MAINTENANCE_JOB = "movements_maintenance"
+
+# Champs exposés, dans l'ordre des colonnes lues (employee_id du modèle = utilisateur auteur)
+MOVEMENT_FIELDS = ("id", "equipment_id", "user_id", "action", "from_location", "to_location", "notes", "timestamp")
+
+_PARTITION_NAME = re.compile(rf"^{PARENT}_(\d{{4}})_(\d{{2}})$")
+
+# Clé de Session.info : partitions SQLite créées par la transaction en cours
+_CREATED = "created_movement_partitions"
+
+
+def _utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def month_start(value: datetime) -> datetime:
+    """Début (UTC) du mois de ``value`` ; une date sans fuseau est comprise en UTC."""
+    return _utc(value).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(start: datetime, months: int) -> datetime:
+    index = start.year * 12 + start.month - 1 + months
+    return start.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(start: datetime) -> str:
+    return f"{PARENT}_{start:%Y_%m}"
+
+
+def _native(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+# ---------------------------------------------------------------------------
+# Partitions
+# ---------------------------------------------------------------------------
+
+_emulated = MetaData()
+_known: "weakref.WeakKeyDictionary[Any, Set[datetime]]" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def _emulated_table(start: datetime) -> Table:
+    """Table SQLite d'un mois : colonnes du modèle, id propre à la table, index préfixés par son nom."""
+    name = partition_name(start)
+    with _lock:
+        table = _emulated.tables.get(name)
+        if table is None:
+            # Sans clés étrangères : elles désigneraient des tables absentes de cette MetaData
+            columns = [Column("id", Integer, primary_key=True)] + [
+                Column(column.name, column.type, nullable=column.nullable)
+                for column in EquipmentMovement.__table__.columns
+                if column.name != "id"
+            ]
+            table = Table(
+                name, _emulated, *columns,
+                Index(f"ix_{name}_timestamp_id", "timestamp", "id"),
+                Index(f"ix_{name}_equipment_timestamp", "equipment_id", "timestamp"),
+                Index(f"ix_{name}_employee_timestamp", "employee_id", "timestamp"),
+            )
+    return table
+
+
+def _list_partitions(connection) -> Set[datetime]:
+    """Mois couverts par une partition, lus dans le catalogue de la base."""
+    if connection.dialect.name == "postgresql":
+        names = connection.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = :parent"
+            ),
+            {"parent": PARENT},
+        ).scalars()
+    else:
+        names = connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'")).scalars()
+    months = set()
+    for name in names:
+        match = _PARTITION_NAME.match(name)
+        if match:
+            months.add(datetime(int(match[1]), int(match[2]), 1, tzinfo=timezone.utc))
+    return months
+
+
+def partitions(db: Session) -> List[datetime]:
+    """Début de chaque mois partitionné, par ordre croissant."""
+    return sorted(_list_partitions(db.connection()))
+
+
+def _ensure_default(connection) -> None:
+    connection.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT} DEFAULT"))
+
+
+def _create_native(connection, start: datetime) -> None:
+    """
+    Créer la partition d'un mois. Les mouvements de ce mois déjà reçus par la
+    partition par défaut y sont déplacés avant l'ATTACH, qui sinon échouerait.
+    """
+    # Noms et bornes produits ici (jamais saisis) : pas d'injection possible
+    name, end = partition_name(start), add_months(start, 1)
+    connection.execute(text(f"CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS)"))
+    connection.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+            f'WHERE "timestamp" >= :start AND "timestamp" < :end RETURNING *) '
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ),
+        {"start": start, "end": end},
+    )
+    connection.execute(text(
+        f"ALTER TABLE {PARENT} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+
+
+def _default_months(connection) -> Set[datetime]:
+    """Mois des mouvements reçus par la partition par défaut (faute de partition au moment de l'écriture)."""
+    rows = connection.execute(text(
+        f"SELECT DISTINCT date_trunc('month', \"timestamp\" AT TIME ZONE 'UTC') FROM {DEFAULT_PARTITION}"
+    )).scalars()
+    return {row.replace(tzinfo=timezone.utc) for row in rows}
+
+
+def ensure_partitions(db: Session, months: Iterable[datetime]) -> List[datetime]:
+    """
+    Créer les partitions manquantes pour les mois ``months``, sur la connexion
+    de ``db`` ; renvoie les mois créés, retenus comme existants au commit.
+
+    Sous PostgreSQL, à n'appeler que depuis une transaction sans autre verrou
+    (maintenance, initialisation) : l'ATTACH attend les transactions qui
+    modifient ``equipment`` ou ``users``.
+    """
+    engine = db.get_bind()
+    months = {month_start(month) for month in months}
+    with _lock:
+        missing = months - _known.get(engine, set())
+    if not missing:
+        return []
+
+    # Même connexion que l'appelant : aucune attente d'une connexion sur l'autre
+    connection = db.connection()
+    pending = db.info.setdefault(_CREATED, set())
+    existing = _list_partitions(connection)
+    created = sorted(missing - existing)
+    if created and _native(db):
+        _ensure_default(connection)
+    for start in created:
+        if _native(db):
+            _create_native(connection, start)
+        else:
+            _emulated_table(start).create(connection, checkfirst=True)
+    pending.update(created)
+
+    with _lock:
+        _known.setdefault(engine, set()).update(existing - pending)
+    return created
+
+
+def _forget(engine, months: Iterable[datetime]) -> None:
+    with _lock:
+        _known.get(engine, set()).difference_update(months)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    created = session.info.pop(_CREATED, None)
+    if created:
+        with _lock:
+            _known.setdefault(session.get_bind(), set()).update(created)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop(_CREATED, None)
+
+
+# ---------------------------------------------------------------------------
+# Écriture et lecture
+# ---------------------------------------------------------------------------
+
+def record(db: Session, rows: Sequence[Dict[str, Any]]) -> None:
+    """Ajouter des mouvements (colonnes du modèle) dans la transaction courante, sans commit."""
+    by_month: Dict[datetime, List[Dict[str, Any]]] = defaultdict(list)
+    now = datetime.now(timezone.utc)
+    for row in rows:
+        timestamp = _utc(row.get("timestamp") or now)
+        by_month[month_start(timestamp)].append({**row, "timestamp": timestamp})
+    if _native(db):
+        # Routage par PostgreSQL ; aucun DDL dans la transaction de l'appelant
+        db.execute(insert(EquipmentMovement.__table__), [row for group in by_month.values() for row in group])
+        return
+    ensure_partitions(db, by_month)
+    for start, group in by_month.items():
+        db.execute(insert(_emulated_table(start)), group)
+
+
+def _sources(db: Session, start: Optional[datetime], end: Optional[datetime],
+             last: Optional[datetime] = None) -> List[Table]:
+    """Tables à lire pour [start, end) jusqu'à l'instant ``last`` inclus, de la plus récente à la plus ancienne."""
+    if _native(db):
+        return [EquipmentMovement.__table__]
+    months = [
+        month for month in sorted(_list_partitions(db.connection()), reverse=True)
+        if (end is None or month < end) and (start is None or add_months(month, 1) > start)
+        and (last is None or month <= last)
+    ]
+    return [_emulated_table(month) for month in months]
+
+
+def _select(table: Table):
+    columns = table.c
+    return select(
+        columns.id, columns.equipment_id, columns.employee_id.label("user_id"), columns.action,
+        columns.from_location, columns.to_location, columns.notes, columns.timestamp,
+    )
+
+
+def query(
+    db: Session,
+    equipment_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Mouvements de [start, end) filtrés, du plus récent au plus ancien, et curseur de la page suivante."""
+    start = _utc(start) if start else None
+    end = _utc(end) if end else None
+    after = None
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != 2 or not isinstance(values[0], datetime):
+            raise ValueError("Curseur invalide")
+        after = (_utc(values[0]), values[1])
+
+    rows = []
+    # Après un curseur, les mois postérieurs à sa position sont déjà lus
+    for table in _sources(db, start, end, after[0] if after else None):
+        stmt = _select(table)
+        if equipment_id is not None:
+            stmt = stmt.where(table.c.equipment_id == equipment_id)
+        if user_id is not None:
+            stmt = stmt.where(table.c.employee_id == user_id)
+        if start is not None:
+            stmt = stmt.where(table.c.timestamp >= start)
+        if end is not None:
+            stmt = stmt.where(table.c.timestamp < end)
+        if after is not None:
+            stmt = stmt.where(tuple_(table.c.timestamp, table.c.id) < tuple_(*after))
+        stmt = stmt.order_by(table.c.timestamp.desc(), table.c.id.desc()).limit(limit + 1 - len(rows))
+        rows.extend(db.execute(stmt).all())
+        if len(rows) > limit:
+            break
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1].timestamp, rows[-1].id])
+    return [dict(zip(MOVEMENT_FIELDS, row)) for row in rows], next_cursor
+
+
+def equipment_with_movements(db: Session, equipment_ids: Sequence[int]) -> Set[int]:
+    """Équipements de ``equipment_ids`` qui ont au moins un mouvement, toutes partitions confondues."""
+    found = set()
+    for table in _sources(db, None, None):
+        found.update(db.scalars(select(table.c.equipment_id).where(table.c.equipment_id.in_(equipment_ids)).distinct()))
+    return found
+
+
+# ---------------------------------------------------------------------------
+# Rétention et maintenance
+# ---------------------------------------------------------------------------
+
+def archive_partition(db: Session, start: datetime, directory: Optional[str] = None) -> Dict[str, Any]:
+    """Écrire les mouvements d'un mois dans ``<partition>.ndjson.gz`` ; la partition est conservée."""
+    directory = directory or settings.MOVEMENT_ARCHIVE_DIR
+    if not directory:
+        raise ValueError("MOVEMENT_ARCHIVE_DIR non configuré : aucun répertoire persistant pour les archives")
+    os.makedirs(directory, exist_ok=True)
+    name = partition_name(start)
+    path = os.path.join(directory, f"{name}.ndjson.gz")
+    if _native(db):
+        # Bornes du mois : le planificateur ne lit que sa partition
+        table = EquipmentMovement.__table__
+        stmt = _select(table).where(table.c.timestamp >= start, table.c.timestamp < add_months(start, 1))
+    else:
+        table = _emulated_table(start)
+        stmt = _select(table)
+    stmt = stmt.order_by(table.c.timestamp, table.c.id)
+
+    count = 0
+    # Fichier complet ou absent : écrit à côté, forcé sur disque puis renommé, avant tout DROP
+    with open(f"{path}.part", "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as archive:
+            for rows in db.execute(stmt.execution_options(yield_per=settings.EXPORT_BATCH_SIZE)).partitions():
+                archive.write(export.encode_ndjson(MOVEMENT_FIELDS, rows))
+                count += len(rows)
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(f"{path}.part", path)
+    return {"partition": name, "rows": count, "path": path, "size_bytes": os.path.getsize(path)}
+
+
+def drop_partition(db: Session, start: datetime) -> None:
+    """Supprimer la partition d'un mois et ses mouvements (validé aussitôt)."""
+    name = partition_name(start)
+    if _native(db):
+        db.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+        db.execute(text(f"DROP TABLE {name}"))
+    else:
+        _emulated_table(start).drop(db.connection(), checkfirst=True)
+    db.commit()
+    _forget(db.get_bind(), [start])
+
+
+def maintain(db: Session, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Créer les partitions du mois courant et des ``MOVEMENT_PARTITIONS_AHEAD``
+    suivants, puis archiver et supprimer les mois sortis de la rétention
+    (seulement si ``MOVEMENT_ARCHIVE_DIR`` est configuré).
+    """
+    convert_legacy_table(db.get_bind())
+    current = month_start(now or datetime.now(timezone.utc))
+    months = [add_months(current, k) for k in range(settings.MOVEMENT_PARTITIONS_AHEAD + 1)]
+    if _native(db):
+        connection = db.connection()
+        _ensure_default(connection)
+        months += _default_months(connection)
+    created = ensure_partitions(db, months)
+    db.commit()
+
+    archived = []
+    if settings.MOVEMENT_RETENTION_MONTHS > 0 and not settings.MOVEMENT_ARCHIVE_DIR:
+        # Archive sur un disque éphémère = mouvements perdus : on garde tout
+        logger.warning("MOVEMENT_RETENTION_MONTHS ignoré : MOVEMENT_ARCHIVE_DIR non configuré, rien supprimé")
+    elif settings.MOVEMENT_RETENTION_MONTHS > 0:
+        oldest_kept = add_months(current, -settings.MOVEMENT_RETENTION_MONTHS)
+        for start in partitions(db):
+            if start >= oldest_kept:
+                break
+            archived.append(archive_partition(db, start))
+            drop_partition(db, start)
+    return {"created": [partition_name(start) for start in created], "archived": archived}
+
+
+@job_handler(MAINTENANCE_JOB)
+def run_maintenance(db: Session, job: Job, progress: JobProgress) -> Dict[str, Any]:
+    return maintain(db)
+
+
+def convert_legacy_table(engine) -> bool:
+    """
+    Convertir la table ``equipment_movements`` d'avant le partitionnement
+    (PostgreSQL) : ses lignes sont recopiées dans la table partitionnée, puis
+    elle est supprimée. Renvoie False s'il n'y a rien à convertir.
+    """
+    if engine.dialect.name != "postgresql":
+        return False
+    with engine.begin() as connection:
+        kind = connection.execute(
+            text("SELECT relkind FROM pg_class WHERE relname = :name AND relkind IN ('r', 'p')"), {"name": PARENT}
+        ).scalar()
+        if kind != "r":
+            return False
+
+        # Table, index et séquence renommés : leurs noms reviennent à la nouvelle table
+        legacy = f"{PARENT}_legacy"
+        connection.execute(text(f"ALTER TABLE {PARENT} RENAME TO {legacy}"))
+        indexes = connection.execute(
+            text("SELECT indexname FROM pg_indexes WHERE tablename = :name"), {"name": legacy}
+        ).scalars().all()
+        for index in indexes:
+            connection.execute(text(f'ALTER INDEX "{index}" RENAME TO "{index}_legacy"'))
+        connection.execute(text(f"ALTER SEQUENCE IF EXISTS {PARENT}_id_seq RENAME TO {PARENT}_id_seq_legacy"))
+        EquipmentMovement.__table__.create(connection)
+
+        # Anciennes dates naïves, en UTC
+        first = connection.execute(text(f'SELECT min("timestamp") FROM {legacy}')).scalar()
+        current = month_start(datetime.now(timezone.utc))
+        month = month_start(first) if first is not None and month_start(first) < current else current
+        _ensure_default(connection)
+        while month <= add_months(current, settings.MOVEMENT_PARTITIONS_AHEAD):
+            _create_native(connection, month)
+            month = add_months(month, 1)
+
+        columns = "id, equipment_id, employee_id, action, from_location, to_location, notes"
+        connection.execute(text(
+            f'INSERT INTO {PARENT} ({columns}, "timestamp") '
+            f"SELECT {columns}, COALESCE(\"timestamp\", now() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' FROM {legacy}"
+        ))
+        connection.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{PARENT}', 'id'), "
+            f"GREATEST((SELECT max(id) FROM {PARENT}), 1))"
+        ))
+        connection.execute(text(f"DROP TABLE {legacy}"))
+    with _lock:
+        _known.pop(engine, None)
+    return True
@@ -0,0 +1,338 @@
+"""
+Flux des modifications de l'inventaire : outbox transactionnelle et diffusion.
+
+Écriture — chaque transaction qui écrit dans une ressource suivie ajoute,
+juste avant son commit et sur sa propre connexion, un événement compact par
+(ressource, action) à ``outbox_events`` : l'événement existe si et seulement si
+la modification est validée. Comme pour ``versions``, les écritures sont
+repérées par les événements de ``Session`` :
+
+- objets flushés : ``created`` / ``updated`` / ``deleted`` avec leurs ids ;
+- INSERT / UPDATE / DELETE passés par ``Session.execute`` : les ids ne sont
+  pas connus, d'où un événement ``changed`` sans ids (le client relit la
+  ressource), sauf si le service les a décrits par ``note()``.
+
+Diffusion — un seul thread par process (``EventFeed``) relit la table après
+la dernière position connue et garde les derniers événements en mémoire ;
+les clients de ``/events`` lisent ce tampon, et la base seulement pour
+reprendre d'une position plus ancienne.
+
+Les ids sont pris à l'INSERT (séquence PostgreSQL), juste avant le commit, et
+non au commit : une transaction peut valider un id plus grand avant qu'une
+autre ne valide le sien. Un id manquant est donc une transaction entre son
+INSERT et son commit, attendue au plus ``OUTBOX_GAP_TIMEOUT_SECONDS`` ; au-delà
+elle est tenue pour annulée et le relevé passe outre. Si elle valide plus tard,
+son événement est sauté pour de bon : aucun client ne le reçoit, seule une
+relecture de la ressource fait apparaître la modification.
+"""
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import orjson
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.serialization import ORJSON_OPTIONS
+from app.db.session import SessionLocal
+from app.models.job import Job, as_utc
+from app.models.outbox import OutboxEvent
+from app.services.jobs import JobProgress, job_handler
+
+logger = logging.getLogger(__name__)
+
+RESOURCES = frozenset({"equipment", "employees", "emplacements", "employee_equipment_history"})
+
+CREATED, UPDATED, DELETED, CHANGED = "created", "updated", "deleted", "changed"
+
+PURGE_JOB = "outbox_purge"
+
+# Clés de Session.info pour la transaction en cours : ids par (ressource, action),
+# ressources écrites en masse sans ids, ressources décrites par note(), événements écrits
+_PENDING = "outbox_pending"
+_BULK = "outbox_bulk"
+_NOTED = "outbox_noted"
+_WRITTEN = "outbox_written"
+
+_READ_BATCH = 500
+# Commits locaux regroupés pendant ce délai : au plus une lecture par fenêtre
+_COALESCE_SECONDS = 0.02
+
+
+# ---------------------------------------------------------------------------
+# Écriture dans l'outbox
+# ---------------------------------------------------------------------------
+
+def _add(session: Session, resource: str, action: str, ids: Iterable[Any]) -> None:
+    session.info.setdefault(_PENDING, {}).setdefault((resource, action), set()).update(ids)
+
+
+def note(db: Session, resource: str, action: str, ids: Iterable[Any]) -> None:
+    """
+    Décrire une écriture en masse de ``resource`` (ids touchés) : l'événement
+    ``changed`` sans ids n'est alors pas émis pour cette ressource.
+    """
+    _add(db, resource, action, ids)
+    db.info.setdefault(_NOTED, set()).add(resource)
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    # Les collections new / dirty / deleted décrivent encore l'état d'avant le flush
+    for objects, action in ((session.new, CREATED), (session.dirty, UPDATED), (session.deleted, DELETED)):
+        for obj in objects:
+            resource = getattr(type(obj), "__tablename__", None)
+            if resource not in RESOURCES:
+                continue
+            if action == UPDATED and not session.is_modified(obj, include_collections=False):
+                continue
+            _add(session, resource, action, [obj.id])
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _do_orm_execute(state):
+    if state.is_insert or state.is_update or state.is_delete:
+        resource = state.statement.table.name
+        if resource in RESOURCES:
+            state.session.info.setdefault(_BULK, set()).add(resource)
+
+
+def _pending_events(session: Session) -> List[Dict[str, Any]]:
+    pending = session.info.pop(_PENDING, {})
+    noted = session.info.pop(_NOTED, set())
+    bulk = session.info.pop(_BULK, set())
+    rows = [
+        {"resource": resource, "action": action,
+         "ids": sorted(ids) if len(ids) <= settings.OUTBOX_MAX_IDS else None}
+        for (resource, action), ids in sorted(pending.items())
+        if ids
+    ]
+    rows += [{"resource": resource, "action": CHANGED, "ids": None} for resource in sorted(bulk - noted)]
+    return rows
+
+
+@event.listens_for(Session, "before_commit")
+def _before_commit(session):
+    # Le flush du commit a lieu après cet événement : on le déclenche d'abord
+    session.flush()
+    rows = _pending_events(session)
+    if rows:
+        # Connexion directe : pas de do_orm_execute ; id attribué juste avant le commit
+        session.connection().execute(insert(OutboxEvent.__table__), rows)
+        session.info[_WRITTEN] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    if session.info.pop(_WRITTEN, False):
+        # Écriture de ce process : diffusée sans attendre le prochain relevé
+        feed.notify()
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    for key in (_PENDING, _BULK, _NOTED, _WRITTEN):
+        session.info.pop(key, None)
+
+
+def purge(db: Session, now: Optional[datetime] = None) -> int:
+    """Supprimer les événements plus anciens que ``OUTBOX_RETENTION_SECONDS`` ; renvoie leur nombre."""
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(seconds=settings.OUTBOX_RETENTION_SECONDS)
+    last = db.scalar(select(func.max(OutboxEvent.id)).where(OutboxEvent.created_at < cutoff))
+    if last is None:
+        return 0
+    # Par id : les clients qui reprennent avant ``last`` reçoivent un « reset »
+    deleted = db.execute(delete(OutboxEvent).where(OutboxEvent.id <= last)).rowcount
+    db.commit()
+    return deleted
+
+
+@job_handler(PURGE_JOB)
+def run_purge(db: Session, job: Job, progress: JobProgress) -> Dict[str, Any]:
+    return {"deleted": purge(db)}
+
+
+# ---------------------------------------------------------------------------
+# Diffusion
+# ---------------------------------------------------------------------------
+
+class FeedEvent(NamedTuple):
+    id: int
+    resource: str
+    frame: bytes  # trame SSE prête à l'envoi, partagée par tous les clients
+
+    @classmethod
+    def from_row(cls, row) -> "FeedEvent":
+        payload = {
+            "id": row.id, "resource": row.resource, "action": row.action, "ids": row.ids,
+            "at": as_utc(row.created_at),
+        }
+        frame = b"id: %d\ndata: %s\n\n" % (row.id, orjson.dumps(payload, option=ORJSON_OPTIONS))
+        return cls(row.id, row.resource, frame)
+
+
+class Subscriber:
+    """Client connecté : réveillé (depuis le thread de relevé) quand le tampon avance."""
+
+    def __init__(self):
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+
+    def wake(self) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._event.set)
+        except RuntimeError:
+            # Boucle fermée : le client est parti
+            pass
+
+    async def wait(self, timeout: float) -> bool:
+        """Attendre un réveil ; False si ``timeout`` est écoulé sans nouvel événement."""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._event.clear()
+
+
+def _events_query():
+    event_table = OutboxEvent
+    return select(
+        event_table.id, event_table.resource, event_table.action, event_table.ids, event_table.created_at
+    ).order_by(event_table.id)
+
+
+class EventFeed:
+    """
+    Relevé de l'outbox et tampon des derniers événements du process.
+
+    Le tampon contient tous les événements validés d'ids dans ``(floor, horizon]``.
+    """
+
+    def __init__(self, session_factory=SessionLocal, buffer_size: int = None):
+        self.session_factory = session_factory
+        self._buffer_size = buffer_size or settings.OUTBOX_BUFFER_SIZE
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._ids: List[int] = []
+        self._events: List[FeedEvent] = []
+        self._subscribers: Set[Subscriber] = set()
+        self._gap_since: Optional[float] = None
+        self.floor = self.horizon = 0
+
+    def start(self) -> None:
+        """Démarrer le relevé à la fin actuelle de l'outbox (sans effet s'il tourne déjà)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            with self.session_factory() as db:
+                tail = db.scalar(select(func.max(OutboxEvent.id))) or 0
+            self.floor = self.horizon = tail
+            self._ids, self._events = [], []
+            self._gap_since = None
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._poll_loop, name="outbox-feed", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopping.set()
+            self._wakeup.set()
+            thread.join()
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    def subscribe(self) -> Subscriber:
+        subscriber = Subscriber()
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def _poll_loop(self) -> None:
+        while not self._stopping.is_set():
+            more = False
+            try:
+                more = self.poll()
+            except Exception:
+                logger.exception("Erreur de relevé de l'outbox")
+            if not more:
+                if self._wakeup.wait(settings.OUTBOX_POLL_INTERVAL_SECONDS):
+                    self._stopping.wait(_COALESCE_SECONDS)
+                self._wakeup.clear()
+
+    def poll(self) -> bool:
+        """Ajouter au tampon les événements validés qui suivent ``horizon`` ; True s'il en reste à lire."""
+        with self.session_factory() as db:
+            rows = db.execute(_events_query().where(OutboxEvent.id > self.horizon).limit(_READ_BATCH)).all()
+
+        accepted = []
+        expected = self.horizon + 1
+        for row in rows:
+            if row.id != expected:
+                now = time.monotonic()
+                if self._gap_since is None:
+                    self._gap_since = now
+                if now - self._gap_since < settings.OUTBOX_GAP_TIMEOUT_SECONDS:
+                    break
+            self._gap_since = None
+            accepted.append(FeedEvent.from_row(row))
+            expected = row.id + 1
+        if not accepted:
+            return False
+
+        with self._lock:
+            self._ids.extend(item.id for item in accepted)
+            self._events.extend(accepted)
+            self.horizon = accepted[-1].id
+            overflow = len(self._events) - self._buffer_size
+            if overflow > 0:
+                self.floor = self._ids[overflow - 1]
+                del self._ids[:overflow], self._events[:overflow]
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.wake()
+        return len(rows) == _READ_BATCH and len(accepted) == len(rows)
+
+    def read(self, after: int, limit: int = _READ_BATCH) -> Tuple[Optional[List[FeedEvent]], int]:
+        """Événements du tampon après ``after`` (None s'il faut relire la base) et horizon courant."""
+        with self._lock:
+            if after < self.floor:
+                return None, self.horizon
+            index = bisect.bisect_right(self._ids, after)
+            return self._events[index:index + limit], self.horizon
+
+    def issued(self, event_id: int) -> bool:
+        """Vrai si ``event_id`` a été attribué par la base (le relevé finira par l'atteindre)."""
+        with self.session_factory() as db:
+            return (db.scalar(select(func.max(OutboxEvent.id))) or 0) >= event_id
+
+    def backfill(self, after: int, limit: int = _READ_BATCH) -> Tuple[List[FeedEvent], bool]:
+        """
+        Événements après ``after`` antérieurs au tampon, lus en base, et True si
+        une partie a déjà été purgée (le client doit alors tout relire).
+        """
+        with self.session_factory() as db:
+            oldest = db.scalar(select(func.min(OutboxEvent.id)))
+            rows = db.execute(
+                _events_query().where(OutboxEvent.id > after, OutboxEvent.id <= self.floor).limit(limit)
+            ).all()
+        purged = oldest is None or after + 1 < oldest
+        return [FeedEvent.from_row(row) for row in rows], purged
+
+
+feed = EventFeed()
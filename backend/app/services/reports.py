@@ -0,0 +1,241 @@
+"""
+Rapports Excel (.xlsx) de l'inventaire et de l'historique, générés en tâche de fond.
+
+Le classeur est écrit par openpyxl en mode ``write_only`` (lignes envoyées au
+fil de l'eau dans des fichiers temporaires, chaînes écrites en ligne) depuis
+un curseur côté serveur (``yield_per``) : la mémoire reste bornée quel que
+soit le volume. Rapports :
+
+- ``inventory`` : une feuille par site (équipements avec détenteur et
+  emplacement) et une feuille « Synthèse » des équipements par site et statut ;
+- ``history`` : l'historique des attributions et une synthèse par année.
+
+Une feuille qui atteint la limite d'Excel (1 048 576 lignes) continue sur
+« <nom> (2) ». Le classeur, écrit dans un fichier de travail local, est
+ensuite stocké en base avec sa tâche (``job_files``) : il se télécharge depuis
+n'importe quel pod. Seuls les ``REPORT_KEEP_FILES`` derniers de chaque
+rapport sont conservés.
+"""
+import re
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.employee_equipment_history import EmployeeEquipmentHistory
+from app.models.job import Job, JobFile
+from app.services import export, stats
+from app.services.jobs import JobProgress, delete_file, job_handler, local_output, store_file
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Rapport -> type de tâche
+REPORT_KINDS = {
+    "inventory": "report_inventory",
+    "history": "report_history",
+}
+
+EXCEL_MAX_ROWS = 1_048_576
+SUMMARY_SHEET = "Synthèse"
+NO_SITE = "Sans emplacement"
+
+_INVALID_TITLE_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+
+# Nom du classeur parmi les fichiers de la tâche (``job_files``)
+REPORT_FILE = "report"
+
+
+def _excel_value(value: Any) -> Any:
+    # Excel ne connaît pas les fuseaux : datetimes ramenés en UTC naïf
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _partitions(db: Session, stmt):
+    return db.execute(stmt.execution_options(yield_per=settings.EXPORT_BATCH_SIZE)).partitions()
+
+
+class _Sheets:
+    """Feuilles de données d'un classeur write-only, créées à la demande par clé."""
+
+    def __init__(self, workbook, header: Sequence[str]):
+        self.workbook = workbook
+        self.header = list(header)
+        self.titles: List[str] = []
+        # clé -> [feuille, lignes écrites, numéro de partie]
+        self._sheets: Dict[str, list] = {}
+
+    def _title(self, name: str, part: int) -> str:
+        # Titre Excel : 31 caractères, sans []:*?/\, unique sans tenir compte de la casse
+        base = _INVALID_TITLE_CHARS.sub("-", name).strip("'") or "-"
+        suffix = f" ({part})" if part > 1 else ""
+        title = base[:31 - len(suffix)] + suffix
+        taken = {existing.lower() for existing in self.titles} | {SUMMARY_SHEET.lower()}
+        counter = 2
+        while title.lower() in taken:
+            extra = f"~{counter}"
+            title = base[:31 - len(suffix) - len(extra)] + extra + suffix
+            counter += 1
+        return title
+
+    def open(self, key: str) -> list:
+        previous = self._sheets.get(key)
+        part = previous[2] + 1 if previous else 1
+        title = self._title(key, part)
+        sheet = self.workbook.create_sheet(title)
+        sheet.freeze_panes = "A2"
+        sheet.append(self.header)
+        self.titles.append(title)
+        entry = self._sheets[key] = [sheet, 1, part]
+        return entry
+
+    def append(self, key: str, row: Sequence[Any]) -> None:
+        entry = self._sheets.get(key)
+        if entry is None or entry[1] >= EXCEL_MAX_ROWS:
+            entry = self.open(key)
+        entry[0].append([_excel_value(value) for value in row])
+        entry[1] += 1
+
+
+def _workbook():
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    # Synthèse en premier onglet, remplie une fois les données parcourues
+    summary = workbook.create_sheet(SUMMARY_SHEET)
+    return workbook, summary
+
+
+def _header(summary, title: str, rows: int) -> None:
+    summary.append(["Rapport", title])
+    summary.append(["Généré le (UTC)", datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)])
+    summary.append(["Lignes", rows])
+    summary.append([])
+
+
+def write_inventory(db: Session, path: str, progress: Optional[JobProgress] = None) -> Dict[str, Any]:
+    """Inventaire : une feuille par site, synthèse des équipements par site et statut."""
+    fields = [field for field, _ in export.EQUIPMENT_COLUMNS]
+    site_index, status_index = fields.index("site"), fields.index("status")
+    workbook, summary = _workbook()
+    sheets = _Sheets(workbook, fields)
+
+    # Onglets dans l'ordre alphabétique des sites, lus dans les compteurs du dashboard
+    current = stats.read(db)
+    for site in sorted(current.by_site):
+        sheets.open(site)
+    if progress:
+        progress.set_total(current.total)
+
+    counts: Counter = Counter()
+    rows = 0
+    for partition in _partitions(db, export.equipment_query()):
+        for row in partition:
+            site = row[site_index] or NO_SITE
+            sheets.append(site, row)
+            counts[(site, row[status_index])] += 1
+        rows += len(partition)
+        if progress:
+            progress.update(rows)
+
+    _header(summary, "Inventaire des équipements", rows)
+    statuses = sorted({status for _, status in counts})
+    sites = sorted({site for site, _ in counts})
+    summary.append(["Site", *statuses, "Total"])
+    for site in sites:
+        values = [counts[(site, status)] for status in statuses]
+        summary.append([site, *values, sum(values)])
+    totals = [sum(counts[(site, status)] for site in sites) for status in statuses]
+    summary.append(["Total", *totals, rows])
+
+    workbook.save(path)
+    return {"rows": rows, "sheets": [SUMMARY_SHEET, *sheets.titles]}
+
+
+def write_history(db: Session, path: str, progress: Optional[JobProgress] = None) -> Dict[str, Any]:
+    """Historique des attributions, synthèse par année (attributions, retours, en cours)."""
+    fields = [field for field, _ in export.HISTORY_COLUMNS]
+    assigned_index, returned_index = fields.index("assigned_at"), fields.index("returned_at")
+    workbook, summary = _workbook()
+    sheets = _Sheets(workbook, fields)
+    sheets.open("Historique")
+    if progress:
+        progress.set_total(db.scalar(select(func.count()).select_from(EmployeeEquipmentHistory)))
+
+    by_year: Counter = Counter()
+    open_by_year: Counter = Counter()
+    rows = 0
+    for partition in _partitions(db, export.history_query()):
+        for row in partition:
+            sheets.append("Historique", row)
+            year = row[assigned_index].year if row[assigned_index] else None
+            by_year[year] += 1
+            if row[returned_index] is None:
+                open_by_year[year] += 1
+        rows += len(partition)
+        if progress:
+            progress.update(rows)
+
+    _header(summary, "Historique des attributions", rows)
+    summary.append(["Année", "Attributions", "Rendues", "En cours"])
+    for year in sorted(by_year, key=lambda value: (value is None, value)):
+        summary.append([year, by_year[year], by_year[year] - open_by_year[year], open_by_year[year]])
+    summary.append(["Total", rows, rows - sum(open_by_year.values()), sum(open_by_year.values())])
+
+    workbook.save(path)
+    return {"rows": rows, "sheets": [SUMMARY_SHEET, *sheets.titles]}
+
+
+WRITERS = {
+    "inventory": write_inventory,
+    "history": write_history,
+}
+
+
+def _prune(db: Session, report: str) -> None:
+    """Ne garder que les ``REPORT_KEEP_FILES`` derniers classeurs du rapport."""
+    expired = (
+        select(JobFile.job_id)
+        .join(Job, Job.id == JobFile.job_id)
+        .where(Job.kind == REPORT_KINDS[report], JobFile.name == REPORT_FILE, JobFile.seq == 0)
+        .order_by(Job.started_at.desc())
+        .offset(settings.REPORT_KEEP_FILES)
+    )
+    job_ids = db.scalars(expired).all()
+    if job_ids:
+        db.execute(delete(JobFile).where(JobFile.job_id.in_(job_ids), JobFile.name == REPORT_FILE))
+
+
+def generate(db: Session, report: str, job: Job, progress: JobProgress) -> Dict[str, Any]:
+    with local_output(".xlsx") as path:
+        result = WRITERS[report](db, path, progress)
+        # Classeur stocké en une transaction : jamais de téléchargement d'un fichier incomplet.
+        # Celui d'une exécution précédente de la même tâche (remise en file) est remplacé
+        delete_file(db, job.id, REPORT_FILE)
+        with open(path, "rb") as fileobj:
+            size = store_file(db, job.id, REPORT_FILE, fileobj)
+    _prune(db, report)
+    db.commit()
+    day = datetime.now(timezone.utc).date().isoformat()
+    return {
+        **result,
+        "report": report,
+        "filename": f"{report}-{day}.xlsx",
+        "size_bytes": size,
+        "download_url": f"{settings.API_V1_STR}/reports/{report}.xlsx?job_id={job.id}",
+    }
+
+
+@job_handler(REPORT_KINDS["inventory"])
+def run_inventory_report(db: Session, job: Job, progress: JobProgress) -> Dict[str, Any]:
+    return generate(db, "inventory", job, progress)
+
+
+@job_handler(REPORT_KINDS["history"])
+def run_history_report(db: Session, job: Job, progress: JobProgress) -> Dict[str, Any]:
+    return generate(db, "history", job, progress)
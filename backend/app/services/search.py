@@ -0,0 +1,234 @@
+"""
+Recherche floue sur les équipements, employés et emplacements.
+
+Sur PostgreSQL la recherche s'appuie sur pg_trgm : ``ILIKE '%q%'`` et
+l'opérateur de similarité par mot ``<%`` sont servis par les index GIN
+trigrammes déclarés sur les modèles, et ``word_similarity`` sert de score.
+Sur les autres bases (SQLite en test), un index inversé de trigrammes est
+construit en mémoire et reconstruit dès que les tables changent.
+"""
+import html
+import threading
+import unicodedata
+import weakref
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import func, literal, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.emplacements import Emplacement
+from app.models.employee import Employee
+from app.models.equipment import Equipment
+from app.schemas.search import SearchHit
+
+SEARCH_FIELDS = {
+    "equipment": (Equipment, ("serial_number", "model")),
+    "employee": (Employee, ("name", "cuid")),
+    "emplacement": (Emplacement, ("site", "etage", "rosace", "exact_position")),
+}
+
+# Score minimal retenu par l'index de repli (seuil par défaut de word_similarity)
+FALLBACK_MIN_SCORE = 0.6
+
+
+class SearchService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    @property
+    def engine_name(self) -> str:
+        return "pg_trgm" if self.db.get_bind().dialect.name == "postgresql" else "ngram"
+
+    def search(self, query: str, types: Optional[Sequence[str]] = None, limit: int = 20) -> List[SearchHit]:
+        """Rechercher ``query`` et retourner des résultats mixtes classés par score."""
+        query = query.strip()
+        types = [kind for kind in (types or SEARCH_FIELDS) if kind in SEARCH_FIELDS]
+        if not query or not types:
+            return []
+
+        if self.engine_name == "pg_trgm":
+            matches = self._search_trigram(query, types, limit)
+        else:
+            matches = _fallback_index(self.db).search(query, types, limit)
+
+        hits = [_build_hit(kind, values, score, query) for kind, values, score in matches]
+        hits.sort(key=lambda hit: hit.score, reverse=True)
+        return hits[:limit]
+
+    def _search_trigram(self, query: str, types: List[str], limit: int) -> List[Tuple[str, Dict[str, Any], float]]:
+        pattern = f"%{_escape_like(query)}%"
+        matches = []
+        for kind in types:
+            model, fields = SEARCH_FIELDS[kind]
+            columns = [getattr(model, field) for field in fields]
+            score = func.greatest(*[func.word_similarity(query, column) for column in columns])
+            condition = or_(
+                *[column.ilike(pattern) for column in columns],
+                *[literal(query).op("<%")(column) for column in columns],
+            )
+            stmt = (
+                select(model.id, *columns, score.label("score"))
+                .where(condition)
+                .order_by(score.desc())
+                .limit(limit)
+            )
+            for row in self.db.execute(stmt):
+                values = dict(row._mapping)
+                matches.append((kind, values, float(values.pop("score") or 0.0)))
+        return matches
+
+
+# ---------------------------------------------------------------------------
+# Index n-grammes en mémoire (repli hors PostgreSQL)
+# ---------------------------------------------------------------------------
+
+def _fold(text: str) -> str:
+    # Minuscules sans accents, caractère par caractère pour garder les positions
+    return "".join(unicodedata.normalize("NFKD", char)[0] for char in text.lower())
+
+
+def _ngrams(text: str, size: int = 3) -> Set[str]:
+    grams = set()
+    for word in _fold(text).split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + size] for i in range(len(padded) - size + 1))
+    return grams
+
+
+class NgramIndex:
+    """Index inversé trigramme -> documents, équivalent en mémoire de pg_trgm."""
+
+    def __init__(self):
+        self.signature = None
+        self._docs: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        self._postings: Dict[str, Set[Tuple[str, int]]] = defaultdict(set)
+
+    def add(self, kind: str, values: Dict[str, Any]) -> None:
+        key = (kind, values["id"])
+        self._docs[key] = values
+        for field in SEARCH_FIELDS[kind][1]:
+            if values.get(field):
+                for gram in _ngrams(str(values[field])):
+                    self._postings[gram].add(key)
+
+    def search(self, query: str, types: Iterable[str], limit: int) -> List[Tuple[str, Dict[str, Any], float]]:
+        types = set(types)
+        grams = _ngrams(query)
+        folded = _fold(query)
+
+        shared = Counter()
+        for gram in grams:
+            for key in self._postings.get(gram, ()):
+                shared[key] += 1
+        if len(folded) < 3:
+            # Trop court pour des trigrammes internes : on teste la sous-chaîne partout
+            shared.update({key: 0 for key in self._docs if key not in shared})
+
+        scored = []
+        for key, common in shared.items():
+            if key[0] not in types:
+                continue
+            values = self._docs[key]
+            fields = [_fold(str(values[field])) for field in SEARCH_FIELDS[key[0]][1] if values.get(field)]
+            score = common / len(grams)
+            if folded in fields:
+                score = 1.0
+            elif any(folded in field for field in fields):
+                score = max(score, 0.9)
+            if score >= FALLBACK_MIN_SCORE:
+                scored.append((key[0], values, round(score, 4)))
+
+        scored.sort(key=lambda match: match[2], reverse=True)
+        return scored[:limit * len(types)]
+
+
+_fallback_indexes: "weakref.WeakKeyDictionary[Any, NgramIndex]" = weakref.WeakKeyDictionary()
+_fallback_lock = threading.Lock()
+
+
+def _table_signature(db: Session) -> Tuple:
+    signature = []
+    for model, _ in SEARCH_FIELDS.values():
+        signature.append(tuple(db.execute(select(func.count(model.id), func.max(model.updated_at))).one()))
+    return tuple(signature)
+
+
+def _fallback_index(db: Session) -> NgramIndex:
+    """Index de repli de la base courante, reconstruit si une table a changé."""
+    engine = db.get_bind()
+    signature = _table_signature(db)
+    with _fallback_lock:
+        index = _fallback_indexes.get(engine)
+    if index is not None and index.signature == signature:
+        return index
+
+    # Lectures hors verrou : sous AsyncSession.run_sync, ce code tourne dans le
+    # thread de la boucle asyncio et cède la main à chaque requête SQL ; une
+    # autre recherche bloquée sur le verrou figerait alors toute la boucle
+    index = NgramIndex()
+    for kind, (model, fields) in SEARCH_FIELDS.items():
+        columns = [model.id] + [getattr(model, field) for field in fields]
+        for row in db.execute(select(*columns)):
+            index.add(kind, dict(row._mapping))
+    index.signature = signature
+    with _fallback_lock:
+        _fallback_indexes[engine] = index
+    return index
+
+
+# ---------------------------------------------------------------------------
+# Mise en forme des résultats
+# ---------------------------------------------------------------------------
+
+def _escape_like(value: str) -> str:
+    # Antislash = caractère d'échappement par défaut de LIKE sous PostgreSQL
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _build_hit(kind: str, values: Dict[str, Any], score: float, query: str) -> SearchHit:
+    if kind == "equipment":
+        label, sublabel = values["serial_number"], values["model"]
+    elif kind == "employee":
+        label, sublabel = values["name"], values["cuid"]
+    else:
+        label = f"{values['site']} - Étage {values['etage']} - Rosace {values['rosace']}"
+        sublabel = values.get("exact_position") or ""
+
+    highlights = {}
+    for field in SEARCH_FIELDS[kind][1]:
+        marked = highlight(values.get(field), query)
+        if marked:
+            highlights[field] = marked
+    return SearchHit(type=kind, id=values["id"], label=label, sublabel=sublabel, score=score, highlights=highlights)
+
+
+def highlight(value: Optional[str], query: str) -> Optional[str]:
+    """Entourer de <mark> les mots de ``query`` trouvés dans ``value`` (HTML échappé)."""
+    if not value:
+        return None
+    value = str(value)
+    folded = _fold(value)
+    spans = []
+    for token in _fold(query).split():
+        start = folded.find(token)
+        while start != -1:
+            spans.append((start, start + len(token)))
+            start = folded.find(token, start + 1)
+    if not spans:
+        return None
+
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+
+    parts, position = [], 0
+    for start, end in merged:
+        parts.append(html.escape(value[position:start]))
+        parts.append(f"<mark>{html.escape(value[start:end])}</mark>")
+        position = end
+    parts.append(html.escape(value[position:]))
+    return "".join(parts)
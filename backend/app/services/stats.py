@@ -0,0 +1,171 @@
+"""
+Compteurs du dashboard maintenus de façon incrémentale.
+
+Chaque écriture sur ``equipment`` applique, dans sa propre transaction, la
+différence entre les compteurs avant et après (``count = count + delta``) :
+la lecture des statistiques ne dépend donc plus de la taille de l'inventaire.
+La tâche périodique ``stats_reconcile`` recalcule tout pour corriger une
+éventuelle dérive (SQL manuel, restauration de sauvegarde...).
+"""
+import enum
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.db.upsert import dialect_insert
+from app.models.emplacements import Emplacement
+from app.models.equipment import Equipment, EquipmentStatus, EquipmentType
+from app.models.job import Job
+from app.models.stats import EquipmentStat
+from app.schemas.stats import StatsResponse
+from app.services.jobs import JobProgress, job_handler
+
+StatKey = Tuple[str, str]
+
+# Types comptés comme "PC en ligne" lorsqu'ils sont assignés
+ONLINE_TYPES = (EquipmentType.PC.value, EquipmentType.LAPTOP.value)
+
+
+def _value(value: Any) -> Any:
+    return value.value if isinstance(value, enum.Enum) else value
+
+
+def _keys(status: str, equipment_type: str, condition: str, site: Optional[str], etage: Optional[str]) -> List[StatKey]:
+    keys = [
+        ("total", "all"),
+        ("status", status),
+        ("equipment_type", equipment_type),
+        ("condition", condition),
+        ("type_status", f"{equipment_type}|{status}"),
+    ]
+    if site is not None:
+        keys.append(("site", site))
+        keys.append(("etage", f"{site}|{etage}"))
+    return keys
+
+
+def snapshot(db: Session, equipment: Optional[Equipment]) -> Counter:
+    """Contribution d'un équipement (état en mémoire) aux compteurs."""
+    if equipment is None:
+        return Counter()
+    site = etage = None
+    if equipment.emplacement_id is not None:
+        emplacement = db.get(Emplacement, equipment.emplacement_id)
+        if emplacement is not None:
+            site, etage = emplacement.site, emplacement.etage
+    return contribution(equipment.status, equipment.equipment_type, equipment.condition, site, etage)
+
+
+def contribution(status, equipment_type, condition, site: Optional[str], etage: Optional[str]) -> Counter:
+    """Contribution d'un équipement décrit par ses colonnes (site / étage de son emplacement)."""
+    return Counter(_keys(_value(status), _value(equipment_type), _value(condition), site, etage))
+
+
+def capture(db: Session, condition=None) -> Counter:
+    """Contribution, calculée en SQL, des équipements qui vérifient ``condition``."""
+    stmt = (
+        select(
+            Equipment.status,
+            Equipment.equipment_type,
+            Equipment.condition,
+            Emplacement.site,
+            Emplacement.etage,
+            func.count(),
+        )
+        .select_from(Equipment)
+        .outerjoin(Emplacement, Equipment.emplacement_id == Emplacement.id)
+        .group_by(Equipment.status, Equipment.equipment_type, Equipment.condition, Emplacement.site, Emplacement.etage)
+    )
+    if condition is not None:
+        stmt = stmt.where(condition)
+
+    counts = Counter()
+    for status, equipment_type, equipment_condition, site, etage, count in db.execute(stmt):
+        for key in _keys(status, equipment_type, equipment_condition, site, etage):
+            counts[key] += count
+    return counts
+
+
+def apply_changes(db: Session, before: Counter, after: Counter) -> None:
+    """Ajouter ``after - before`` aux compteurs, dans la transaction courante."""
+    delta = {key: after.get(key, 0) - before.get(key, 0) for key in set(before) | set(after)}
+    rows = [
+        {"dimension": dimension, "key": key, "count": count}
+        for (dimension, key), count in sorted(delta.items())  # ordre fixe : pas d'interblocage
+        if count
+    ]
+    if not rows:
+        return
+
+    statement = dialect_insert(db)(EquipmentStat.__table__)
+    statement = statement.on_conflict_do_update(
+        index_elements=["dimension", "key"],
+        set_={"count": EquipmentStat.__table__.c.count + statement.excluded.count, "updated_at": func.now()},
+    )
+    db.execute(statement, rows)
+
+
+def reconcile(db: Session) -> int:
+    """Recalculer tous les compteurs depuis la table ``equipment``."""
+    # Les compteurs sont verrouillés avant l'agrégat : une écriture concurrente
+    # applique son delta après ce recalcul, jamais dessus
+    db.execute(select(EquipmentStat.dimension).with_for_update()).all()
+    counts = capture(db)
+
+    db.execute(update(EquipmentStat).values(count=0))
+    if counts:
+        statement = dialect_insert(db)(EquipmentStat.__table__)
+        statement = statement.on_conflict_do_update(
+            index_elements=["dimension", "key"],
+            set_={"count": statement.excluded.count, "updated_at": func.now()},
+        )
+        rows = [{"dimension": dimension, "key": key, "count": count} for (dimension, key), count in counts.items()]
+        db.execute(statement, sorted(rows, key=lambda row: (row["dimension"], row["key"])))
+    db.commit()
+    return counts.get(("total", "all"), 0)
+
+
+@job_handler("stats_reconcile")
+def run_reconcile_job(db: Session, job: Job, progress: JobProgress) -> Dict[str, Any]:
+    total = reconcile(db)
+    progress.update(total)
+    return {"total": total}
+
+
+def read(db: Session) -> StatsResponse:
+    """Lire les statistiques depuis les compteurs (quelques dizaines de lignes)."""
+    by_dimension: Dict[str, Dict[str, int]] = defaultdict(dict)
+    rows = db.execute(
+        select(EquipmentStat.dimension, EquipmentStat.key, EquipmentStat.count).where(EquipmentStat.count != 0)
+    )
+    for dimension, key, count in rows:
+        by_dimension[dimension][key] = count
+
+    by_etage: Dict[str, Dict[str, int]] = defaultdict(dict)
+    for key, count in by_dimension["etage"].items():
+        site, _, etage = key.rpartition("|")
+        by_etage[site][etage] = count
+
+    assigned = EquipmentStatus.ASSIGNED.value
+    return StatsResponse(
+        total=by_dimension["total"].get("all", 0),
+        by_status=by_dimension["status"],
+        by_type=by_dimension["equipment_type"],
+        by_condition=by_dimension["condition"],
+        by_site=by_dimension["site"],
+        by_etage=by_etage,
+        pcs_online=sum(by_dimension["type_status"].get(f"{kind}|{assigned}", 0) for kind in ONLINE_TYPES),
+    )
+
+
+def pcs_online(db: Session) -> int:
+    """Nombre de PC et portables assignés, lu dans les compteurs."""
+    keys = [f"{kind}|{EquipmentStatus.ASSIGNED.value}" for kind in ONLINE_TYPES]
+    total = db.scalar(
+        select(func.sum(EquipmentStat.count)).where(
+            EquipmentStat.dimension == "type_status", EquipmentStat.key.in_(keys)
+        )
+    )
+    return total or 0
@@ -0,0 +1,90 @@
+"""
+Versions des ressources servies avec un ETag de liste, et de l'historique des
+attributions (invalidation de l'arbre d'intervalles de ``services.history``).
+
+Chaque transaction qui écrit dans une table suivie incrémente, juste avant son
+commit, la ligne ``resource_versions`` de cette table : l'ETag d'une liste se
+calcule en lisant quelques entiers, sans relire les données. Les écritures
+sont repérées par des événements de ``Session`` : objets flushés, et
+INSERT / UPDATE / DELETE passés par ``Session.execute`` (opérations en masse,
+imports). Le SQL exécuté hors session (console, script) n'est pas vu.
+"""
+from itertools import chain
+from typing import Dict, Iterable
+
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.db.upsert import dialect_insert
+from app.models.resource_version import ResourceVersion
+
+TRACKED = frozenset({"equipment", "employees", "emplacements", "employee_equipment_history"})
+
+# Clé de Session.info : tables suivies écrites par la transaction en cours
+_CHANGED = "changed_resources"
+
+
+def _mark(session: Session, tables: Iterable[str]) -> None:
+    changed = {table for table in tables if table in TRACKED}
+    if changed:
+        session.info.setdefault(_CHANGED, set()).update(changed)
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    # Les collections new / dirty / deleted décrivent encore l'état d'avant le flush
+    objects = chain(session.new, session.dirty, session.deleted)
+    _mark(session, (getattr(type(obj), "__tablename__", None) for obj in objects))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _do_orm_execute(state):
+    if state.is_insert or state.is_update or state.is_delete:
+        _mark(state.session, [state.statement.table.name])
+
+
+@event.listens_for(Session, "before_commit")
+def _before_commit(session):
+    # Le flush du commit a lieu après cet événement : on le déclenche d'abord
+    session.flush()
+    changed = session.info.pop(_CHANGED, None)
+    if changed:
+        bump(session, changed)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop(_CHANGED, None)
+
+
+def bump(db: Session, resources: Iterable[str]) -> None:
+    """Incrémenter la version de ``resources`` dans la transaction courante."""
+    table = ResourceVersion.__table__
+    statement = dialect_insert(db)(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=["resource"],
+        set_={"version": table.c.version + 1, "updated_at": func.now()},
+    )
+    # Connexion directe : pas de do_orm_execute ; ordre fixe : pas d'interblocage
+    db.connection().execute(statement, [{"resource": resource, "version": 1} for resource in sorted(resources)])
+
+
+def _versions_query(resources: Iterable[str]):
+    return select(ResourceVersion.resource, ResourceVersion.version).where(
+        ResourceVersion.resource.in_(list(resources))
+    )
+
+
+def read(db: Session, resources: Iterable[str]) -> Dict[str, int]:
+    """Version de chaque ressource (0 si jamais écrite)."""
+    resources = list(resources)
+    versions = dict(db.execute(_versions_query(resources)).all())
+    return {resource: versions.get(resource, 0) for resource in resources}
+
+
+async def read_async(db: AsyncSession, resources: Iterable[str]) -> Dict[str, int]:
+    """Version de chaque ressource (session asynchrone)."""
+    resources = list(resources)
+    versions = dict((await db.execute(_versions_query(resources))).all())
+    return {resource: versions.get(resource, 0) for resource in resources}
@@ -0,0 +1,6 @@
+"""
+Benchmarks du backend.
+
+Chaque module s'exécute depuis ``backend/`` avec ``python -m benchmarks.<nom>``
+et affiche ses résultats (``--json`` pour une sortie exploitable en CI).
+"""
@@ -0,0 +1,272 @@
+"""
+Débit et latence des routes de l'API sous clients concurrents.
+
+    python -m benchmarks.api [--database-url URL] [--scale 0.01] [--concurrency 8]
+                             [--requests 200] [--routes list,by_serial] [--output results.json]
+                             [--baseline previous.json] [--json]
+
+Sans ``--database-url``, une base SQLite temporaire est remplie par
+``benchmarks.seed`` au volume ``--scale`` ; une URL pointe sur une base déjà
+remplie par ``python -m benchmarks.seed``. Chaque scénario envoie
+``--requests`` requêtes via ``--concurrency`` clients simultanés, branchés
+directement sur l'application (transport ASGI, sans réseau), et rapporte
+débit, p50/p90/p99 et statuts. Les paramètres (identifiants, numéros de série,
+questions) sont tirés d'un générateur initialisé par ``--seed``.
+
+``--output`` écrit le résultat JSON (révision git, volumes, scénarios) ;
+``--baseline`` compare à un résultat précédent. L'import ne mesure que la
+mise en file : les workers de tâches ne tournent pas pendant le benchmark.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import func, select
+
+from app.core.security import password_hasher
+from app.models.emplacements import Emplacement
+from app.models.employee import Employee
+from app.models.equipment import Equipment
+from app.models.user import User
+from benchmarks import seed as seeder
+from benchmarks.common import asgi_client, make_session_factory, percentile
+
+API = "/api/v1"
+
+CHATBOT_QUESTIONS = (
+    "combien de laptops assignés",
+    "combien d'équipements en maintenance",
+    "où est le laptop {serial}",
+    "liste des équipements à Tunis étage 3",
+    "équipements de {cuid}",
+    "inventaire des pc",
+)
+IMPORT_ROWS = 20
+
+
+class Context:
+    """Volumes de la base et tirages aléatoires des paramètres des requêtes."""
+
+    def __init__(self, session_factory, rng: random.Random):
+        self.rng = rng
+        with session_factory() as db:
+            self.equipment = db.scalar(select(func.count()).select_from(Equipment))
+            self.employees = db.scalar(select(func.count()).select_from(Employee))
+            self.emplacements = db.scalar(select(func.count()).select_from(Emplacement))
+            self.users = db.scalar(select(func.count()).select_from(User))
+        self.sequence = 0
+
+    def equipment_id(self) -> int:
+        return self.rng.randint(1, self.equipment)
+
+    def employee_id(self) -> int:
+        return self.rng.randint(1, self.employees)
+
+    def serial(self) -> str:
+        return seeder.serial_number(self.equipment_id())
+
+    def next_sequence(self) -> int:
+        self.sequence += 1
+        return self.sequence
+
+    def sizes(self) -> Dict[str, int]:
+        return {"equipment": self.equipment, "employees": self.employees,
+                "emplacements": self.emplacements, "users": self.users}
+
+
+def _import_file(ctx: Context) -> bytes:
+    batch = ctx.next_sequence()
+    lines = ["serial_number,model,equipment_type,condition,status"]
+    lines += [f"BENCH{batch:06d}{row:03d},Bench model,laptop,new,in_stock" for row in range(IMPORT_ROWS)]
+    return ("\n".join(lines) + "\n").encode()
+
+
+# Scénario -> requête (méthode, chemin, arguments httpx) tirée du contexte
+SCENARIOS: Dict[str, Callable[[Context], tuple]] = {
+    "list": lambda ctx: ("GET", f"{API}/equipment", {"params": {"limit": 50}}),
+    "list_sorted": lambda ctx: ("GET", f"{API}/equipment", {"params": {"limit": 50, "sort": "-updated_at"}}),
+    "filter": lambda ctx: ("GET", f"{API}/equipment", {"params": {
+        "status": "assigned", "equipment_type": ctx.rng.choice(("laptop", "pc", "monitor")), "limit": 50,
+    }}),
+    "filter_site": lambda ctx: ("GET", f"{API}/equipment", {"params": {
+        "site": ctx.rng.choice(seeder.SITES), "etage": str(ctx.rng.randint(0, 9)), "limit": 50,
+    }}),
+    "detail": lambda ctx: ("GET", f"{API}/equipment/{ctx.equipment_id()}", {}),
+    "by_serial": lambda ctx: ("GET", f"{API}/equipment/by-serial/{ctx.serial()}", {}),
+    "employees": lambda ctx: ("GET", f"{API}/employees", {"params": {"limit": 50}}),
+    "emplacements": lambda ctx: ("GET", f"{API}/emplacements", {"params": {"limit": 50}}),
+    "history": lambda ctx: ("GET", f"{API}/employees/{ctx.employee_id()}/history", {}),
+    "search": lambda ctx: ("GET", f"{API}/search", {"params": {"q": ctx.serial()[-6:]}}),
+    "stats": lambda ctx: ("GET", f"{API}/stats", {}),
+    "assign": lambda ctx: ("POST", f"{API}/equipment/{ctx.equipment_id()}/assign",
+                           {"params": {"employee_id": ctx.employee_id()}}),
+    "unassign": lambda ctx: ("POST", f"{API}/equipment/{ctx.equipment_id()}/unassign", {}),
+    "import": lambda ctx: ("POST", f"{API}/import/import",
+                           {"files": {"file": ("bench.csv", _import_file(ctx), "text/csv")}}),
+    "chatbot": lambda ctx: ("POST", f"{API}/chatbot/query", {"json": {
+        "question": ctx.rng.choice(CHATBOT_QUESTIONS).format(
+            serial=ctx.serial(), cuid=seeder.cuid(ctx.employee_id())
+        ),
+    }}),
+    "login": lambda ctx: ("POST", f"{API}/auth/login", {"data": {
+        "username": f"user{ctx.rng.randrange(ctx.users)}@bench.local", "password": seeder.PASSWORD,
+    }}),
+}
+
+
+async def run_scenario(client, ctx: Context, name: str, requests: int, concurrency: int, headers) -> Dict:
+    build = SCENARIOS[name]
+    samples: List[float] = []
+    statuses: Counter = Counter()
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            method, path, kwargs = build(ctx)
+            start = time.perf_counter()
+            try:
+                status = (await client.request(method, path, headers=headers, **kwargs)).status_code
+            except Exception as exc:
+                status = type(exc).__name__
+            samples.append((time.perf_counter() - start) * 1000)
+            statuses[status] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    elapsed = time.perf_counter() - start
+    errors = sum(count for status, count in statuses.items() if not isinstance(status, int) or status >= 400)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(samples, 0.5), 2),
+        "p90_ms": round(percentile(samples, 0.9), 2),
+        "p99_ms": round(percentile(samples, 0.99), 2),
+        "max_ms": round(max(samples, default=0.0), 2),
+        "errors": errors,
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args) -> Dict:
+    session_factory = make_session_factory(args.database_url)
+    seeding = None
+    if args.database_url is None:
+        sizes = seeder.scaled_sizes(args.scale, **{name: getattr(args, name) for name in seeder.DEFAULT_SIZES})
+        seeding = seeder.seed(session_factory, sizes, users=args.users, random_seed=args.seed,
+                              batch_size=args.batch_size)
+
+    ctx = Context(session_factory, random.Random(args.seed))
+    names = args.routes.split(",") if args.routes else list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Scénarios inconnus : {', '.join(unknown)} (disponibles : {', '.join(SCENARIOS)})")
+
+    scenarios = {}
+    async with asgi_client(session_factory) as client:
+        token = (await client.post(
+            f"{API}/auth/login", data={"username": "user0@bench.local", "password": seeder.PASSWORD}
+        )).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        for name in names:
+            # bcrypt domine la connexion : volume réduit pour garder un run court
+            requests = min(args.requests, args.login_requests) if name == "login" else args.requests
+            if args.warmup:
+                await run_scenario(client, ctx, name, args.warmup, args.concurrency, headers)
+            scenarios[name] = await run_scenario(client, ctx, name, requests, args.concurrency, headers)
+
+    return {
+        "meta": {
+            "git_revision": _git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "database": session_factory.kw["bind"].dialect.name,
+            "dataset": ctx.sizes(),
+            "seeding": seeding,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "password_hasher": password_hasher.stats(),
+        },
+        "scenarios": scenarios,
+    }
+
+
+def _ratio(current: float, previous: float) -> str:
+    if not previous:
+        return "n/a"
+    return f"{(current - previous) / previous:+.0%}"
+
+
+def compare(result: Dict, baseline: Dict) -> List[str]:
+    """Écarts de p50, p99 et débit par rapport à un résultat précédent."""
+    lines = [f"comparaison avec {baseline['meta'].get('git_revision')} ({baseline['meta'].get('timestamp')})"]
+    for name, current in result["scenarios"].items():
+        previous = baseline["scenarios"].get(name)
+        if previous is None:
+            continue
+        lines.append(
+            f"  {name:<14} p50 {_ratio(current['p50_ms'], previous['p50_ms']):>6}  "
+            f"p99 {_ratio(current['p99_ms'], previous['p99_ms']):>6}  "
+            f"débit {_ratio(current['throughput_rps'], previous['throughput_rps']):>6}"
+        )
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default=None, help="base déjà remplie ; SQLite temporaire sinon")
+    parser.add_argument("--routes", default=None, help=f"scénarios séparés par des virgules ({', '.join(SCENARIOS)})")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--login-requests", type=int, default=40)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--output", default=None, help="fichier JSON de résultats")
+    parser.add_argument("--baseline", default=None, help="résultat JSON précédent à comparer")
+    parser.add_argument("--json", action="store_true")
+    seeder.add_arguments(parser, default_scale=0.01)
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run(args))
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2), encoding="utf-8")
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"{result['meta']['database']} {result['meta']['dataset']}, {args.concurrency} clients")
+        for name, scenario in result["scenarios"].items():
+            print(
+                f"  {name:<14} {scenario['throughput_rps']:>8} req/s  p50 {scenario['p50_ms']:>8} ms  "
+                f"p99 {scenario['p99_ms']:>8} ms  erreurs {scenario['errors']}  {scenario['statuses']}"
+            )
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        print("\n".join(compare(result, baseline)), file=sys.stderr if args.json else sys.stdout)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
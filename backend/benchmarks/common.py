@@ -0,0 +1,69 @@
+"""Outils partagés par les benchmarks : base dédiée et client ASGI en mémoire."""
+import os
+import tempfile
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401  (enregistre toutes les tables)
+from app.core import deps
+from app.db import session as db_session
+from app.db.session import Base
+from app.main import app
+
+
+def make_session_factory(url: str = None):
+    """Créer (si besoin) le schéma sur ``url`` (SQLite temporaire par défaut)."""
+    if url is None:
+        url = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="bench-"), "bench.db")
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine, autoflush=False)
+
+
+def async_session_factory(session_factory):
+    """Sessions asynchrones sur la même base que ``session_factory``."""
+    url = session_factory.kw["bind"].url
+    url = url.set(drivername=db_session.ASYNC_DRIVERS[url.get_backend_name()])
+    return async_sessionmaker(
+        create_async_engine(url), class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+
+
+def asgi_client(session_factory) -> httpx.AsyncClient:
+    """Client httpx branché directement sur l'application, avec la base de bench."""
+    async_factory = async_session_factory(session_factory)
+
+    def get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db():
+        async with async_factory() as db:
+            yield db
+
+    app.dependency_overrides[deps.get_db] = get_db
+    app.dependency_overrides[db_session.get_db] = get_db
+    app.dependency_overrides[deps.get_async_db] = get_async_db
+    app.dependency_overrides[db_session.get_async_db] = get_async_db
+    app.dependency_overrides[db_session.get_async_session_factory] = lambda: async_factory
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+
+def rss_bytes() -> int:
+    """Mémoire résidente du processus (Linux)."""
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def percentile(samples, fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
@@ -0,0 +1,195 @@
+"""
+Flux des modifications (/events) : coût à l'écriture et diffusion aux clients.
+
+    python -m benchmarks.events [--database-url URL] [--clients 200]
+                                [--writes 500] [--poll-interval 5] [--json]
+
+- ``write`` : durée d'une transaction (mise à jour d'un équipement) avec et
+  sans l'événement d'outbox écrit avant le commit ;
+- ``fanout`` : ``--clients`` abonnés au même ``EventFeed`` pendant que les
+  écritures sont validées depuis un autre thread ; délai commit -> réception
+  et nombre de requêtes SQL du relevé, comparé au nombre de requêtes qu'il
+  faudrait à autant de clients qui relisent la liste toutes les
+  ``--poll-interval`` secondes.
+
+Chaque abonné doit recevoir chaque événement, dans l'ordre.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import threading
+import time
+from typing import Dict, List
+
+from sqlalchemy import event, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.equipment import Equipment
+from app.models.outbox import OutboxEvent
+from app.services import outbox
+from benchmarks.common import make_session_factory
+
+
+def summary(runs: List[float]) -> Dict:
+    runs = sorted(runs)
+    return {
+        "p50_ms": round(statistics.median(runs), 2),
+        "p95_ms": round(runs[int(len(runs) * 0.95) - 1], 2),
+        "max_ms": round(runs[-1], 2),
+    }
+
+
+def _write(session_factory, equipment_ids: List[int], count: int, pause: float = 0.0) -> List[float]:
+    """Valider ``count`` mises à jour ; renvoie l'instant de chaque commit (perf_counter)."""
+    committed = []
+    with session_factory() as db:
+        for index in range(count):
+            equipment = db.get(Equipment, equipment_ids[index % len(equipment_ids)])
+            equipment.model = f"bench-{index}"
+            db.commit()
+            committed.append(time.perf_counter())
+            if pause:
+                time.sleep(pause)
+    return committed
+
+
+def measure_writes(session_factory, equipment_ids: List[int], count: int) -> Dict:
+    results = {}
+    for name, enabled in (("without_outbox", False), ("with_outbox", True)):
+        if not enabled:
+            event.remove(Session, "before_commit", outbox._before_commit)
+        try:
+            start = time.perf_counter()
+            committed = _write(session_factory, equipment_ids, count)
+            runs = [(b - a) * 1000 for a, b in zip([start] + committed, committed)]
+        finally:
+            if not enabled:
+                event.listen(Session, "before_commit", outbox._before_commit)
+        results[name] = summary(runs)
+    return results
+
+
+async def _subscriber(feed: outbox.EventFeed, after: int, count: int, received: List[float], order: List[int]):
+    subscriber = feed.subscribe()
+    last = after
+    try:
+        while len(order) < count:
+            events, _ = feed.read(last)
+            if events:
+                now = time.perf_counter()
+                for item in events:
+                    received.append(now)
+                    order.append(item.id)
+                last = events[-1].id
+                continue
+            await subscriber.wait(1.0)
+    finally:
+        feed.unsubscribe(subscriber)
+
+
+async def _fanout(feed: outbox.EventFeed, session_factory, equipment_ids, args) -> Dict:
+    feed.start()
+    after = feed.horizon
+    received = [[] for _ in range(args.clients)]
+    orders = [[] for _ in range(args.clients)]
+    tasks = [
+        asyncio.create_task(_subscriber(feed, after, args.writes, received[index], orders[index]))
+        for index in range(args.clients)
+    ]
+    committed: List[float] = []
+    start = time.perf_counter()
+    writer = threading.Thread(
+        target=lambda: committed.extend(_write(session_factory, equipment_ids, args.writes, args.pause))
+    )
+    writer.start()
+    await asyncio.wait_for(asyncio.gather(*tasks), timeout=args.writes * (args.pause + 1) + 60)
+    await asyncio.get_running_loop().run_in_executor(None, writer.join)
+    duration = time.perf_counter() - start
+    feed.stop()
+
+    expected = list(range(after + 1, after + args.writes + 1))
+    latencies = [
+        (receive - commit) * 1000
+        for times in received
+        for receive, commit in zip(times, committed)
+    ]
+    return {
+        "duration_s": round(duration, 2),
+        "delivery": summary(latencies),
+        "out_of_order_or_missing": sum(order != expected for order in orders),
+    }
+
+
+def run(args) -> Dict:
+    session_factory = make_session_factory(args.database_url)
+    engine = session_factory.kw["bind"]
+    with session_factory() as db:
+        db.execute(insert(Equipment), [
+            {"serial_number": f"EVB{i:06d}", "model": "bench", "equipment_type": "laptop",
+             "condition": "good", "status": "in_stock"}
+            for i in range(100)
+        ])
+        db.commit()
+        equipment_ids = db.scalars(select(Equipment.id).where(Equipment.serial_number.like("EVB%"))).all()
+
+    writes = measure_writes(session_factory, equipment_ids, args.writes)
+
+    # Requêtes du relevé : lectures de outbox_events
+    feed_queries = 0
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        nonlocal feed_queries
+        if statement.lstrip().upper().startswith("SELECT") and OutboxEvent.__tablename__ in statement:
+            feed_queries += 1
+
+    # Flux du process (réveillé aussitôt par les commits locaux), branché sur la base de bench
+    outbox.feed.session_factory = session_factory
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        fanout = asyncio.run(_fanout(outbox.feed, session_factory, equipment_ids, args))
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    fanout["feed_queries"] = feed_queries
+    fanout["polling_queries_equivalent"] = round(args.clients * fanout["duration_s"] / args.poll_interval)
+
+    return {
+        "database": engine.dialect.name,
+        "clients": args.clients,
+        "writes": args.writes,
+        "write": writes,
+        "fanout": fanout,
+        "mismatches": fanout["out_of_order_or_missing"],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default=None, help="base de test ; SQLite temporaire sinon")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--writes", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.01, help="pause entre deux écritures (s)")
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="intervalle du polling remplacé (s)")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    result = run(args)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"{result['database']}, {result['clients']} clients, {result['writes']} écritures")
+        for name, item in result["write"].items():
+            print(f"  écriture {name:<15} p50 {item['p50_ms']:>8} ms  p95 {item['p95_ms']:>8} ms")
+        fanout = result["fanout"]
+        delivery = fanout["delivery"]
+        print(f"  diffusion commit -> client  p50 {delivery['p50_ms']} ms  p95 {delivery['p95_ms']} ms  "
+              f"max {delivery['max_ms']} ms")
+        print(f"  requêtes SQL en {fanout['duration_s']} s : relevé {fanout['feed_queries']}, "
+              f"polling équivalent {fanout['polling_queries_equivalent']}")
+        print(f"  écarts : {result['mismatches']}")
+    return 0 if result["mismatches"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""
+Export complet en flux : débit et mémoire pour un inventaire d'un million de lignes.
+
+    python -m benchmarks.export [--database-url URL] [--equipment 1000000]
+                                [--formats ndjson,csv,ndjson.gz] [--json]
+
+Sans ``--database-url``, une base SQLite temporaire est remplie par
+``benchmarks.seed`` (``--equipment`` lignes, sans historique). Chaque format
+appelle ``GET /equipment/export`` directement sur l'application ASGI : le
+corps est compté puis jeté au fil de l'eau (httpx le garderait en entier en
+mémoire). La mémoire rapportée est la hausse de RSS du processus pendant
+l'export, échantillonnée toutes les ``--sample-ms`` ms : elle doit rester
+à peu près constante quand ``--equipment`` augmente.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+import zlib
+from typing import Dict
+from urllib.parse import urlencode
+
+from sqlalchemy import func, select
+
+from app.main import app
+from app.models.equipment import Equipment
+from benchmarks import seed as seeder
+from benchmarks.common import asgi_client, make_session_factory, rss_bytes
+
+# Format -> paramètres de la requête
+FORMATS = {
+    "ndjson": {"format": "ndjson"},
+    "csv": {"format": "csv"},
+    "ndjson.gz": {"format": "ndjson", "gzip": "true"},
+}
+
+
+async def export(path: str, params: Dict[str, str], sample_ms: float) -> Dict:
+    """Appeler l'export en ASGI brut ; compter octets et lignes sans garder le corps."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "server": ("bench", 80), "client": ("bench", 1234), "root_path": "",
+        "path": path, "raw_path": path.encode(), "query_string": urlencode(params).encode(), "headers": [],
+    }
+    disconnected = asyncio.Event()
+    gzip = params.get("gzip") == "true"
+    decompressor = zlib.decompressobj(wbits=31)
+    counts = {"status": None, "bytes": 0, "lines": 0, "first_byte_s": None}
+    requested = False
+    baseline = peak = rss_bytes()
+    start = time.perf_counter()
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            counts["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            body = message.get("body", b"")
+            if body and counts["first_byte_s"] is None:
+                counts["first_byte_s"] = time.perf_counter() - start
+            counts["bytes"] += len(body)
+            counts["lines"] += (decompressor.decompress(body) if gzip else body).count(b"\n")
+
+    async def sample():
+        nonlocal peak
+        while True:
+            peak = max(peak, rss_bytes())
+            await asyncio.sleep(sample_ms / 1000)
+
+    sampler = asyncio.create_task(sample())
+    try:
+        await app(scope, receive, send)
+    finally:
+        sampler.cancel()
+        disconnected.set()
+    elapsed = time.perf_counter() - start
+    peak = max(peak, rss_bytes())
+    return {
+        "status": counts["status"],
+        "lines": counts["lines"],
+        "megabytes": round(counts["bytes"] / 1e6, 1),
+        "seconds": round(elapsed, 2),
+        "rows_per_s": round(counts["lines"] / elapsed) if elapsed else 0,
+        "first_byte_ms": round((counts["first_byte_s"] or 0) * 1000, 1),
+        "rss_growth_mb": round((peak - baseline) / 1e6, 1),
+    }
+
+
+async def run(args) -> Dict:
+    session_factory = make_session_factory(args.database_url)
+    seeding = None
+    if args.database_url is None:
+        sizes = seeder.scaled_sizes(args.scale, **{name: getattr(args, name) for name in seeder.DEFAULT_SIZES})
+        seeding = seeder.seed(session_factory, sizes, users=1, random_seed=args.seed, batch_size=args.batch_size)
+    with session_factory() as db:
+        total = db.scalar(select(func.count()).select_from(Equipment))
+
+    # Installe les dépendances (sessions de la base de bench) sur l'application
+    await asgi_client(session_factory).aclose()
+
+    results = {}
+    for name in args.formats.split(","):
+        if name not in FORMATS:
+            raise SystemExit(f"Format inconnu : {name} (disponibles : {', '.join(FORMATS)})")
+        results[name] = await export("/api/v1/equipment/export", FORMATS[name], args.sample_ms)
+        # CSV : ligne d'en-tête en plus
+        expected = total + (1 if FORMATS[name]["format"] == "csv" else 0)
+        results[name]["complete"] = results[name]["status"] == 200 and results[name]["lines"] == expected
+    return {
+        "database": session_factory.kw["bind"].dialect.name,
+        "rows": total,
+        "seeding": seeding,
+        "formats": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default=None, help="base déjà remplie ; SQLite temporaire sinon")
+    parser.add_argument("--formats", default=",".join(FORMATS))
+    parser.add_argument("--sample-ms", type=float, default=20)
+    parser.add_argument("--json", action="store_true")
+    seeder.add_arguments(parser, default_scale=0.1)
+    parser.set_defaults(equipment=1_000_000, history=0)
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"{result['database']}, {result['rows']} équipements")
+        for name, item in result["formats"].items():
+            print(
+                f"  {name:<10} {item['seconds']:>7} s  {item['rows_per_s']:>8} lignes/s  {item['megabytes']:>7} Mo  "
+                f"1er octet {item['first_byte_ms']:>6} ms  RSS +{item['rss_growth_mb']} Mo  "
+                f"{'complet' if item['complete'] else 'INCOMPLET'}"
+            )
+    return 0 if all(item["complete"] for item in result["formats"].values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Historique à une date : latence des requêtes « qui avait ce matériel le D ».
+
+    python -m benchmarks.history [--database-url URL] [--history 2000000]
+                                 [--queries 200] [--json]
+
+Sans ``--database-url``, une base SQLite temporaire est remplie par
+``benchmarks.seed``. Pour des instants tirés au hasard dans la période de
+l'historique, on compare le service (index GiST sur PostgreSQL, arbre
+d'intervalles en mémoire ailleurs) à la requête directe
+``assigned_at <= D AND (returned_at IS NULL OR returned_at > D)`` :
+
+- ``serial`` : détenteur d'un numéro de série à la date D ;
+- ``department`` : première page (``--limit``) de ce que détenait un département ;
+- ``sparse`` : idem au premier mois de l'historique, quand peu d'attributions
+  étaient en cours (la requête directe parcourt alors presque toute la table).
+
+Les deux chemins doivent renvoyer les mêmes ids.
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List
+
+from sqlalchemy import func, or_, select
+
+from app.crud import employee_equipment_history as history_crud
+from app.models.employee import Employee
+from app.models.employee_equipment_history import EmployeeEquipmentHistory
+from app.models.equipment import Equipment
+from app.services import history as history_service
+from benchmarks import seed as seeder
+from benchmarks.common import make_session_factory
+
+
+def direct_query(db, at: datetime, limit: int, serial_number: str = None, department: str = None) -> List[int]:
+    """Requête sans index de période : filtre sur les deux bornes."""
+    history = EmployeeEquipmentHistory
+    stmt = history_crud.rows_query().where(
+        history.assigned_at <= at, or_(history.returned_at.is_(None), history.returned_at > at)
+    )
+    if serial_number is not None:
+        stmt = stmt.where(Equipment.serial_number == serial_number)
+    if department is not None:
+        stmt = stmt.where(Employee.department == department)
+    return list(db.scalars(stmt.with_only_columns(history.id).order_by(history.id).limit(limit)))
+
+
+def timed(call: Callable[[], List[int]], runs: List[float]) -> List[int]:
+    start = time.perf_counter()
+    ids = call()
+    runs.append((time.perf_counter() - start) * 1000)
+    return ids
+
+
+def summary(runs: List[float]) -> Dict:
+    runs = sorted(runs)
+    return {
+        "p50_ms": round(statistics.median(runs), 2),
+        "p95_ms": round(runs[int(len(runs) * 0.95) - 1], 2),
+        "max_ms": round(runs[-1], 2),
+    }
+
+
+def run(args) -> Dict:
+    session_factory = make_session_factory(args.database_url)
+    seeding = None
+    if args.database_url is None:
+        sizes = seeder.scaled_sizes(args.scale, **{name: getattr(args, name) for name in seeder.DEFAULT_SIZES})
+        seeding = seeder.seed(session_factory, sizes, users=1, random_seed=args.seed, batch_size=args.batch_size)
+
+    rng = random.Random(args.seed)
+    results = {}
+    with session_factory() as db:
+        service = history_service.AsOfService(db)
+        history = EmployeeEquipmentHistory
+        rows = db.scalar(select(func.count()).select_from(history))
+        first, last = db.execute(select(func.min(history.assigned_at), func.max(history.assigned_at))).one()
+        serials = db.scalars(select(Equipment.serial_number).limit(10_000)).all()
+
+        # Premier appel : construction de l'arbre hors PostgreSQL
+        start = time.perf_counter()
+        service.holders(datetime.now(timezone.utc), limit=1)
+        warmup_ms = round((time.perf_counter() - start) * 1000, 1)
+
+        span = int((last - first).total_seconds())
+        month = 30 * 24 * 3600
+        # Cas -> (filtres, fin de la fenêtre des instants tirés, en secondes après le début)
+        cases = {
+            "serial": (lambda: {"serial_number": rng.choice(serials)}, span),
+            "department": (lambda: {"department": rng.choice(seeder.DEPARTMENTS)}, span),
+            "sparse": (lambda: {"department": rng.choice(seeder.DEPARTMENTS)}, min(span, month)),
+        }
+        mismatches = 0
+        for name, (make_filters, window) in cases.items():
+            engine_runs, direct_runs = [], []
+            for _ in range(args.queries):
+                at = (first + timedelta(seconds=rng.randint(0, window))).replace(tzinfo=timezone.utc)
+                filters = make_filters()
+                found = timed(lambda: [row["id"] for row in service.holders(at, limit=args.limit, **filters)[0]],
+                              engine_runs)
+                expected = timed(lambda: direct_query(db, at, args.limit, **filters), direct_runs)
+                mismatches += found != expected
+            results[name] = {"engine": summary(engine_runs), "direct": summary(direct_runs)}
+
+    return {
+        "database": session_factory.kw["bind"].dialect.name,
+        "engine": service.engine_name,
+        "rows": rows,
+        "seeding": seeding,
+        "warmup_ms": warmup_ms,
+        "queries": results,
+        "mismatches": mismatches,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default=None, help="base déjà remplie ; SQLite temporaire sinon")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--json", action="store_true")
+    seeder.add_arguments(parser, default_scale=0.1)
+    args = parser.parse_args(argv)
+
+    result = run(args)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"{result['database']} ({result['engine']}), {result['rows']} attributions, "
+              f"1er appel {result['warmup_ms']} ms")
+        for name, item in result["queries"].items():
+            engine, direct = item["engine"], item["direct"]
+            print(f"  {name:<10} service p50 {engine['p50_ms']:>8} ms  p95 {engine['p95_ms']:>8} ms   "
+                  f"direct p50 {direct['p50_ms']:>8} ms  p95 {direct['p95_ms']:>8} ms")
+        print(f"  écarts : {result['mismatches']}")
+    return 0 if result["mismatches"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
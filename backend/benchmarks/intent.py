@@ -0,0 +1,74 @@
+"""
+Précision et coût d'analyse du moteur d'intentions du chatbot.
+
+    python -m benchmarks.intent [--iterations 2000] [--json]
+
+La précision est mesurée sur ``tests/fixtures/intent_corpus.json`` (intention
+et entités attendues pour chaque question, vérifiées une à une par
+``tests/test_intent.py``) ; le script sort en erreur si elle passe sous
+``--min-accuracy``. Le coût est le temps d'un ``parse`` par question, en
+microsecondes.
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from app.services.intent import parse
+
+CORPUS = Path(__file__).parent.parent / "tests" / "fixtures" / "intent_corpus.json"
+
+
+def accuracy(corpus):
+    failures = []
+    for case in corpus:
+        parsed = parse(case["question"])
+        if parsed.intent != case["intent"] or parsed.entities != case["entities"]:
+            failures.append({"question": case["question"], "expected": case, "got": vars(parsed)})
+    return 1 - len(failures) / len(corpus), failures
+
+
+def timings(corpus, iterations):
+    questions = [case["question"] for case in corpus]
+    samples = []
+    for _ in range(iterations):
+        for question in questions:
+            start = time.perf_counter_ns()
+            parse(question)
+            samples.append((time.perf_counter_ns() - start) / 1000)
+    samples.sort()
+    return {
+        "p50_us": round(statistics.median(samples), 2),
+        "p99_us": round(samples[int(len(samples) * 0.99) - 1], 2),
+        "mean_us": round(statistics.fmean(samples), 2),
+        "samples": len(samples),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--min-accuracy", type=float, default=0.95)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    corpus = json.loads(CORPUS.read_text(encoding="utf-8"))
+    score, failures = accuracy(corpus)
+    result = {"accuracy": round(score, 4), "questions": len(corpus), **timings(corpus, args.iterations)}
+
+    if args.json:
+        print(json.dumps({**result, "failures": failures}, ensure_ascii=False, indent=2))
+    else:
+        for failure in failures:
+            print(f"ÉCHEC {failure['question']!r} : attendu {failure['expected']}, obtenu {failure['got']}")
+        print(
+            f"précision {score:.1%} sur {len(corpus)} questions | "
+            f"parse p50 {result['p50_us']} µs, p99 {result['p99_us']} µs"
+        )
+    return 0 if score >= args.min_accuracy else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
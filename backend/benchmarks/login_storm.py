@@ -0,0 +1,109 @@
+"""
+Rafale de connexions et latence des autres routes.
+
+    python -m benchmarks.login_storm [--logins 300] [--users 50] [--json]
+
+Mesure la latence d'une route authentifiée (``GET /api/v1/stats``) au repos,
+puis pendant ``--logins`` connexions simultanées. Le hachage bcrypt tournant
+dans l'exécuteur dédié, la latence de la route sonde doit rester stable ;
+les connexions au-delà de la file bornée de l'exécuteur reçoivent un 503.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import Counter
+
+from app.core.security import get_password_hash, password_hasher
+from app.models.user import User, UserRole
+from benchmarks.common import asgi_client, make_session_factory, percentile
+
+PASSWORD = "benchmark-password"
+
+
+def seed_users(session_factory, count: int) -> None:
+    hashed = get_password_hash(PASSWORD)
+    with session_factory() as db:
+        db.add_all(
+            User(email=f"user{i}@bench.local", hashed_password=hashed, first_name="Bench", last_name=str(i),
+                 role=UserRole.ADMIN, is_active=True)
+            for i in range(count)
+        )
+        db.commit()
+
+
+async def login(client, index: int, users: int) -> int:
+    form = {"username": f"user{index % users}@bench.local", "password": PASSWORD}
+    return (await client.post("/api/v1/auth/login", data=form)).status_code
+
+
+async def probe(client, headers, stop: asyncio.Event, samples: list) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/api/v1/stats", headers=headers)
+        samples.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.005)
+
+
+async def run(args) -> dict:
+    session_factory = make_session_factory(args.database_url)
+    seed_users(session_factory, args.users)
+
+    async with asgi_client(session_factory) as client:
+        token = (await client.post(
+            "/api/v1/auth/login", data={"username": "user0@bench.local", "password": PASSWORD}
+        )).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        idle, stop = [], asyncio.Event()
+        task = asyncio.create_task(probe(client, headers, stop, idle))
+        await asyncio.sleep(args.idle_seconds)
+        stop.set()
+        await task
+
+        storm, stop = [], asyncio.Event()
+        task = asyncio.create_task(probe(client, headers, stop, storm))
+        start = time.perf_counter()
+        statuses = Counter(await asyncio.gather(*(login(client, i, args.users) for i in range(args.logins))))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await task
+
+    return {
+        "logins": args.logins,
+        "login_seconds": round(elapsed, 3),
+        "logins_per_second": round(statuses[200] / elapsed, 1),
+        "statuses": dict(statuses),
+        "probe_idle_p50_ms": round(percentile(idle, 0.5), 2),
+        "probe_idle_p99_ms": round(percentile(idle, 0.99), 2),
+        "probe_storm_p50_ms": round(percentile(storm, 0.5), 2),
+        "probe_storm_p99_ms": round(percentile(storm, 0.99), 2),
+        "hasher": password_hasher.stats(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=300)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--idle-seconds", type=float, default=1.0)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(
+            f"{args.logins} connexions en {result['login_seconds']} s "
+            f"({result['logins_per_second']} /s, statuts {result['statuses']})\n"
+            f"sonde /stats au repos p50 {result['probe_idle_p50_ms']} ms / p99 {result['probe_idle_p99_ms']} ms, "
+            f"pendant la rafale p50 {result['probe_storm_p50_ms']} ms / p99 {result['probe_storm_p99_ms']} ms"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""
+Journal des mouvements partitionné par mois : écriture, lecture sur une période, rétention.
+
+    python -m benchmarks.movements [--database-url URL] [--movements 1000000]
+                                   [--months 24] [--queries 200] [--json]
+
+Les mouvements sont répartis sur ``--months`` mois et écrits par
+``movements.record`` ; les mêmes lignes sont copiées dans une table unique
+non partitionnée (mêmes index) qui sert de référence :
+
+- ``record`` : débit d'écriture du journal partitionné ;
+- ``equipment_month`` : mouvements d'un équipement sur un mois ;
+- ``user_recent`` : première page (``--limit``) d'un utilisateur sur un trimestre ;
+- ``retention`` : purge du mois le plus ancien, par archivage + DROP de sa
+  partition contre ``DELETE`` dans la table unique.
+
+Les deux lectures doivent renvoyer les mêmes mouvements.
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List
+
+from sqlalchemy import Column, Index, Integer, MetaData, Table, delete, func, insert, select
+
+from app.models.equipment import Equipment
+from app.models.movement import EquipmentMovement
+from app.models.user import User, UserRole
+from app.services import movements
+from benchmarks.common import make_session_factory
+
+FIRST_MONTH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def flat_table(metadata: MetaData) -> Table:
+    """Table de référence : une seule table, colonnes et index du journal."""
+    columns = [Column("id", Integer, primary_key=True)] + [
+        Column(column.name, column.type, nullable=column.nullable)
+        for column in EquipmentMovement.__table__.columns
+        if column.name != "id"
+    ]
+    return Table(
+        "bench_movements_flat", metadata, *columns,
+        Index("ix_bench_movements_flat_timestamp_id", "timestamp", "id"),
+        Index("ix_bench_movements_flat_equipment_timestamp", "equipment_id", "timestamp"),
+        Index("ix_bench_movements_flat_employee_timestamp", "employee_id", "timestamp"),
+    )
+
+
+def flat_query(db, table: Table, limit: int, equipment_id=None, user_id=None, start=None, end=None) -> List:
+    stmt = select(table.c.timestamp, table.c.equipment_id, table.c.employee_id, table.c.action)
+    if equipment_id is not None:
+        stmt = stmt.where(table.c.equipment_id == equipment_id)
+    if user_id is not None:
+        stmt = stmt.where(table.c.employee_id == user_id)
+    stmt = stmt.where(table.c.timestamp >= start, table.c.timestamp < end)
+    rows = db.execute(stmt.order_by(table.c.timestamp.desc(), table.c.id.desc()).limit(limit)).all()
+    return [(movements._utc(row[0]), row[1], row[2], row[3]) for row in rows]
+
+
+def timed(call: Callable[[], List], runs: List[float]) -> List:
+    start = time.perf_counter()
+    result = call()
+    runs.append((time.perf_counter() - start) * 1000)
+    return result
+
+
+def summary(runs: List[float]) -> Dict:
+    runs = sorted(runs)
+    return {
+        "p50_ms": round(statistics.median(runs), 2),
+        "p95_ms": round(runs[int(len(runs) * 0.95) - 1], 2),
+        "max_ms": round(runs[-1], 2),
+    }
+
+
+def _references(db, equipment: int, users: int):
+    """Équipements et utilisateurs référencés par les mouvements (créés si la base est vide)."""
+    if not db.scalar(select(func.count()).select_from(Equipment)):
+        db.execute(insert(Equipment), [
+            {"serial_number": f"MVB{i:07d}", "model": "bench", "equipment_type": "laptop",
+             "condition": "good", "status": "in_stock"}
+            for i in range(equipment)
+        ])
+    if not db.scalar(select(func.count()).select_from(User)):
+        db.execute(insert(User), [
+            {"email": f"bench{i}@inventaire-bench.fr", "hashed_password": "x", "first_name": "Bench",
+             "last_name": str(i), "role": UserRole.COLLABORATEUR, "is_active": True}
+            for i in range(users)
+        ])
+    db.commit()
+    return db.scalars(select(Equipment.id)).all(), db.scalars(select(User.id)).all()
+
+
+def run(args) -> Dict:
+    session_factory = make_session_factory(args.database_url)
+    engine = session_factory.kw["bind"]
+    metadata = MetaData()
+    flat = flat_table(metadata)
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+
+    rng = random.Random(args.seed)
+    span = int((movements.add_months(FIRST_MONTH, args.months) - FIRST_MONTH).total_seconds())
+    with session_factory() as db:
+        equipment_ids, user_ids = _references(db, args.equipment, args.users)
+        # Partitions de la période créées à l'avance, comme par la maintenance
+        movements.ensure_partitions(db, [movements.add_months(FIRST_MONTH, k) for k in range(args.months)])
+        db.commit()
+
+        # Écriture par lots, comme les attributions en masse
+        record_seconds = 0.0
+        for offset in range(0, args.movements, args.batch_size):
+            batch = [
+                {
+                    "equipment_id": rng.choice(equipment_ids), "employee_id": rng.choice(user_ids),
+                    "action": rng.choice(("assigned", "returned", "moved")),
+                    "timestamp": FIRST_MONTH + timedelta(seconds=rng.randrange(span)),
+                }
+                for _ in range(min(args.batch_size, args.movements - offset))
+            ]
+            start = time.perf_counter()
+            movements.record(db, batch)
+            db.commit()
+            record_seconds += time.perf_counter() - start
+            db.execute(insert(flat), batch)
+            db.commit()
+
+        # Cas -> (filtres, durée de la période en mois)
+        cases = {
+            "equipment_month": (lambda: {"equipment_id": rng.choice(equipment_ids)}, 1),
+            "user_recent": (lambda: {"user_id": rng.choice(user_ids)}, 3),
+        }
+        results = {}
+        mismatches = 0
+        for name, (make_filters, months) in cases.items():
+            partitioned_runs, flat_runs = [], []
+            for _ in range(args.queries):
+                month = movements.add_months(FIRST_MONTH, rng.randrange(args.months))
+                filters = make_filters()
+                window = {"start": month, "end": movements.add_months(month, months)}
+                found = timed(lambda: [
+                    (movements._utc(row["timestamp"]), row["equipment_id"], row["user_id"], row["action"])
+                    for row in movements.query(db, limit=args.limit, **filters, **window)[0]
+                ], partitioned_runs)
+                expected = timed(lambda: flat_query(db, flat, args.limit, **filters, **window), flat_runs)
+                # Même ordre (instant décroissant) ; à instant égal, l'ordre des ids diffère
+                mismatches += sorted(found) != sorted(expected) or [row[0] for row in found] != [
+                    row[0] for row in expected]
+            results[name] = {"partitioned": summary(partitioned_runs), "flat": summary(flat_runs)}
+
+        # Rétention du mois le plus ancien
+        oldest = movements.partitions(db)[0]
+        start = time.perf_counter()
+        archive = movements.archive_partition(db, oldest, tempfile.mkdtemp(prefix="bench-archives-"))
+        movements.drop_partition(db, oldest)
+        drop_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        deleted = db.execute(delete(flat).where(flat.c.timestamp < movements.add_months(oldest, 1))).rowcount
+        db.commit()
+        delete_ms = (time.perf_counter() - start) * 1000
+        mismatches += archive["rows"] != deleted
+
+    metadata.drop_all(engine)
+    return {
+        "database": engine.dialect.name,
+        "movements": args.movements,
+        "months": args.months,
+        "record_rows_per_s": round(args.movements / record_seconds),
+        "queries": results,
+        "retention": {
+            "rows": archive["rows"],
+            "archive_bytes": archive["size_bytes"],
+            "archive_and_drop_ms": round(drop_ms, 1),
+            "delete_ms": round(delete_ms, 1),
+        },
+        "mismatches": mismatches,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default=None, help="base de test ; SQLite temporaire sinon")
+    parser.add_argument("--movements", type=int, default=200_000)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--equipment", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    result = run(args)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"{result['database']}, {result['movements']} mouvements sur {result['months']} mois, "
+              f"écriture {result['record_rows_per_s']} lignes/s")
+        for name, item in result["queries"].items():
+            partitioned, flat = item["partitioned"], item["flat"]
+            print(f"  {name:<16} partitionné p50 {partitioned['p50_ms']:>8} ms  p95 {partitioned['p95_ms']:>8} ms   "
+                  f"table unique p50 {flat['p50_ms']:>8} ms  p95 {flat['p95_ms']:>8} ms")
+        retention = result["retention"]
+        print(f"  rétention ({retention['rows']} lignes) : archive + DROP {retention['archive_and_drop_ms']} ms, "
+              f"DELETE {retention['delete_ms']} ms, archive {retention['archive_bytes']} octets")
+        print(f"  écarts : {result['mismatches']}")
+    return 0 if result["mismatches"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
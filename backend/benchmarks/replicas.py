@@ -0,0 +1,202 @@
+"""
+Routage primaire / réplica : répartition des lectures et lecture de ses écritures.
+
+    python -m benchmarks.replicas [--clients 16] [--duration 5] [--write-ratio 0.02]
+                                  [--pause 0.01] [--replication-interval 0.5]
+                                  [--max-lag 2] [--json]
+
+Deux fichiers SQLite tiennent lieu de primaire et de réplica ; un thread
+recopie le primaire sur le réplica toutes les ``--replication-interval``
+secondes (retard simulé). ``--clients`` threads lisent une page
+d'équipements toutes les ``--pause`` secondes et, une fois sur
+``1 / --write-ratio``, modifient un équipement puis le relisent aussitôt avec
+la position renvoyée par le commit (jusqu'à ce que le réplica la rejoigne,
+les lectures de ce client vont au primaire) :
+
+- ``steady`` : part des requêtes SQL servies par le réplica ;
+- ``lagging`` : la copie est suspendue au-delà de ``--max-lag`` ; toutes les
+  lectures doivent repasser par le primaire.
+
+Chaque relecture après écriture doit voir la valeur écrite.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Dict
+
+from sqlalchemy import create_engine, event, insert, select
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401  (enregistre toutes les tables)
+from app.db.routing import ReplicaRouter, RoutingSession, route
+from app.db.session import Base
+from app.models.equipment import Equipment
+from app.services import outbox  # noqa: F401  (position SQLite : derniers événements de l'outbox)
+
+
+def _copy(primary: str, replica: str) -> None:
+    source, target = sqlite3.connect(primary), sqlite3.connect(replica, timeout=30)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+class Replication(threading.Thread):
+    """Copie périodique du primaire vers le réplica (suspendue par ``paused``)."""
+
+    def __init__(self, primary: str, replica: str, interval: float):
+        super().__init__(daemon=True)
+        self.primary, self.replica, self.interval = primary, replica, interval
+        self.paused = threading.Event()
+        self.stopping = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopping.wait(self.interval):
+            if not self.paused.is_set():
+                _copy(self.primary, self.replica)
+
+
+def _client(session_factory, equipment_ids, args, seed: int, deadline: float, result: Counter) -> None:
+    rng = random.Random(seed)
+    after = None
+    while time.monotonic() < deadline:
+        with route(read_only=True, after=after), session_factory() as db:
+            db.execute(select(Equipment.id, Equipment.model).order_by(Equipment.id).limit(100)).all()
+        result["reads"] += 1
+        time.sleep(args.pause)
+        if rng.random() >= args.write_ratio:
+            continue
+
+        equipment_id = rng.choice(equipment_ids)
+        model = f"bench-{seed}-{result['writes']}"
+        with route(read_only=False, after=after) as current, session_factory() as db:
+            db.get(Equipment, equipment_id).model = model
+            db.commit()
+        after = current.position
+        result["writes"] += 1
+        with route(read_only=True, after=after), session_factory() as db:
+            seen = db.scalar(select(Equipment.model).where(Equipment.id == equipment_id))
+        result["read_your_writes_violations"] += seen != model
+
+
+def _phase(session_factory, router, engines, equipment_ids, args) -> Dict:
+    queries = Counter()
+    listeners = []
+    for name, engine in engines.items():
+        def count(conn, cursor, statement, parameters, context, executemany, name=name):
+            queries[name] += 1
+        event.listen(engine, "before_cursor_execute", count)
+        listeners.append((engine, count))
+
+    result = Counter()
+    deadline = time.monotonic() + args.duration
+    threads = [
+        threading.Thread(target=_client, args=(session_factory, equipment_ids, args, seed, deadline, result))
+        for seed in range(args.clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for engine, count in listeners:
+        event.remove(engine, "before_cursor_execute", count)
+
+    # Requêtes de relevé du routeur comprises : elles sont comptées à part
+    total = queries["primary"] + queries["replica"]
+    return {
+        "reads": result["reads"],
+        "writes": result["writes"],
+        "queries": dict(queries),
+        "replica_share": round(queries["replica"] / total, 3) if total else 0.0,
+        "read_your_writes_violations": result["read_your_writes_violations"],
+    }
+
+
+def run(args) -> Dict:
+    directory = tempfile.mkdtemp(prefix="bench-replicas-")
+    primary_path, replica_path = os.path.join(directory, "primary.db"), os.path.join(directory, "replica.db")
+    connect_args = {"check_same_thread": False}
+    primary = create_engine("sqlite:///" + primary_path, connect_args={**connect_args, "timeout": 30})
+    replica = create_engine("sqlite:///" + replica_path, connect_args=connect_args)
+    Base.metadata.create_all(primary)
+    with primary.begin() as connection:
+        connection.execute(insert(Equipment), [
+            {"serial_number": f"RPB{i:06d}", "model": "bench", "equipment_type": "laptop",
+             "condition": "good", "status": "in_stock"}
+            for i in range(args.equipment)
+        ])
+        equipment_ids = connection.scalars(select(Equipment.id)).all()
+    _copy(primary_path, replica_path)
+
+    router = ReplicaRouter(primary, [replica], args.check_interval, args.max_lag)
+    session_factory = sessionmaker(
+        bind=primary, autoflush=False, class_=RoutingSession, router=router, replicas=[replica]
+    )
+    replication = Replication(primary_path, replica_path, args.replication_interval)
+    replication.start()
+    router.start()
+    try:
+        steady = _phase(session_factory, router, {"primary": primary, "replica": replica}, equipment_ids, args)
+        reads_before = Counter(router.stats()["reads"])
+        replication.paused.set()
+        time.sleep(args.max_lag + args.check_interval * 2)
+        lagging = _phase(session_factory, router, {"primary": primary, "replica": replica}, equipment_ids, args)
+        routed = Counter(router.stats()["reads"]) - reads_before
+    finally:
+        router.stop()
+        replication.stopping.set()
+        replication.join()
+
+    lagging["routed_to_replica"] = routed["replica0"]
+    return {
+        "database": "sqlite (2 fichiers)",
+        "clients": args.clients,
+        "steady": steady,
+        "lagging": lagging,
+        "reads_routed": router.stats()["reads"],
+        "mismatches": (
+            steady["read_your_writes_violations"] + lagging["read_your_writes_violations"]
+            + lagging["routed_to_replica"]
+        ),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0, help="durée de chaque phase (s)")
+    parser.add_argument("--equipment", type=int, default=2000)
+    parser.add_argument("--write-ratio", type=float, default=0.02)
+    parser.add_argument("--pause", type=float, default=0.01, help="pause entre deux lectures d'un client (s)")
+    parser.add_argument("--replication-interval", type=float, default=0.5, help="copie primaire -> réplica (s)")
+    parser.add_argument("--check-interval", type=float, default=0.2, help="relevé des réplicas (s)")
+    parser.add_argument("--max-lag", type=float, default=2.0, help="retard toléré (s)")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    result = run(args)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"{result['database']}, {result['clients']} clients")
+        for name in ("steady", "lagging"):
+            phase = result[name]
+            print(f"  {name:<8} lectures {phase['reads']:>6}  écritures {phase['writes']:>5}  "
+                  f"requêtes {phase['queries']}  part réplica {phase['replica_share']:.1%}  "
+                  f"relectures incohérentes {phase['read_your_writes_violations']}")
+        print(f"  lectures routées : {result['reads_routed']}")
+        print(f"  écarts : {result['mismatches']}")
+    return 0 if result["mismatches"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+Rapports Excel : durée, taille et mémoire de génération d'un classeur.
+
+    python -m benchmarks.reports [--database-url URL] [--equipment 1000000]
+                                 [--reports inventory,history] [--json]
+
+Sans ``--database-url``, une base SQLite temporaire est remplie par
+``benchmarks.seed``. Chaque rapport est écrit par le même code que la tâche
+de fond (``app.services.reports``) dans un répertoire temporaire. La mémoire
+rapportée est la hausse de RSS pendant la génération, échantillonnée par un
+thread toutes les ``--sample-ms`` ms : elle doit rester à peu près constante
+quand le volume augmente.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict
+
+from app.services import reports, stats
+from benchmarks import seed as seeder
+from benchmarks.common import make_session_factory, rss_bytes
+
+
+def measure(session_factory, report: str, directory: str, sample_ms: float) -> Dict:
+    path = os.path.join(directory, f"{report}.xlsx")
+    baseline = rss_bytes()
+    peak = baseline
+    done = threading.Event()
+
+    def sample():
+        nonlocal peak
+        while not done.wait(sample_ms / 1000):
+            peak = max(peak, rss_bytes())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        with session_factory() as db:
+            result = reports.WRITERS[report](db, path)
+    finally:
+        done.set()
+        sampler.join()
+    elapsed = time.perf_counter() - start
+    return {
+        "rows": result["rows"],
+        "sheets": len(result["sheets"]),
+        "seconds": round(elapsed, 2),
+        "rows_per_s": round(result["rows"] / elapsed) if elapsed else 0,
+        "megabytes": round(os.path.getsize(path) / 1e6, 1),
+        "rss_growth_mb": round((max(peak, rss_bytes()) - baseline) / 1e6, 1),
+    }
+
+
+def run(args) -> Dict:
+    session_factory = make_session_factory(args.database_url)
+    seeding = None
+    if args.database_url is None:
+        sizes = seeder.scaled_sizes(args.scale, **{name: getattr(args, name) for name in seeder.DEFAULT_SIZES})
+        seeding = seeder.seed(session_factory, sizes, users=1, random_seed=args.seed, batch_size=args.batch_size)
+    else:
+        with session_factory() as db:
+            stats.reconcile(db)
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bench-reports-") as directory:
+        for report in args.reports.split(","):
+            if report not in reports.WRITERS:
+                raise SystemExit(f"Rapport inconnu : {report} (disponibles : {', '.join(reports.WRITERS)})")
+            results[report] = measure(session_factory, report, directory, args.sample_ms)
+    return {"database": session_factory.kw["bind"].dialect.name, "seeding": seeding, "reports": results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default=None, help="base déjà remplie ; SQLite temporaire sinon")
+    parser.add_argument("--reports", default=",".join(reports.WRITERS))
+    parser.add_argument("--sample-ms", type=float, default=50)
+    parser.add_argument("--json", action="store_true")
+    seeder.add_arguments(parser, default_scale=0.1)
+    parser.set_defaults(equipment=1_000_000)
+    args = parser.parse_args(argv)
+
+    result = run(args)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(result["database"])
+        for name, item in result["reports"].items():
+            print(
+                f"  {name:<10} {item['rows']:>8} lignes  {item['sheets']:>3} feuilles  {item['seconds']:>7} s  "
+                f"{item['rows_per_s']:>7} lignes/s  {item['megabytes']:>6} Mo  RSS +{item['rss_growth_mb']} Mo"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
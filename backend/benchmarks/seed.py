@@ -0,0 +1,228 @@
+"""
+Inventaire synthétique reproductible pour les benchmarks.
+
+    python -m benchmarks.seed --database-url sqlite:///./bench.db [--scale 0.1] [--json]
+
+Volumes par défaut (``--scale 1``) : 10k employés, 50k emplacements,
+500k équipements et 2M lignes d'historique, plus ``--users`` comptes
+administrateurs (mot de passe ``PASSWORD``). Le générateur est initialisé
+par ``--seed`` : deux bases construites avec les mêmes paramètres sont
+identiques. Les compteurs du dashboard sont recalculés à la fin.
+"""
+import argparse
+import json
+import random
+import string
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List
+
+from sqlalchemy import func, insert, select, text
+
+from app.core.security import get_password_hash
+from app.models.emplacements import Emplacement
+from app.models.employee import Employee
+from app.models.employee_equipment_history import EmployeeEquipmentHistory
+from app.models.equipment import Equipment, EquipmentCondition, EquipmentStatus, EquipmentType
+from app.models.user import User, UserRole
+from app.services import stats
+from benchmarks.common import make_session_factory
+
+PASSWORD = "benchmark-password"
+
+DEFAULT_SIZES = {
+    "employees": 10_000,
+    "emplacements": 50_000,
+    "equipment": 500_000,
+    "history": 2_000_000,
+}
+
+SITES = ("Tunis", "Sfax", "Sousse", "Paris", "Lyon", "Rabat")
+DEPARTMENTS = ("IT", "RH", "Finance", "Ventes", "Support", "Direction")
+MODELS = {
+    EquipmentType.LAPTOP: ("Dell Latitude 5440", "HP EliteBook 840", "Lenovo ThinkPad T14"),
+    EquipmentType.PC: ("Dell OptiPlex 7010", "HP ProDesk 400", "Lenovo ThinkCentre M70"),
+    EquipmentType.MONITOR: ("Dell P2422H", "LG 27UL500", "Samsung S24"),
+    EquipmentType.PHONE: ("iPhone 13", "Samsung Galaxy A54", "Pixel 7"),
+    EquipmentType.PRINTER: ("HP LaserJet M404", "Brother HL-L2350", "Canon i-SENSYS"),
+    EquipmentType.OTHER: ("Station d'accueil", "Casque", "Webcam"),
+}
+TYPE_WEIGHTS = (35, 20, 25, 10, 3, 7)
+ASSIGNED_RATIO = 0.6
+HISTORY_SPAN_DAYS = 3 * 365
+
+
+def serial_number(index: int) -> str:
+    return f"SN{index:08d}"
+
+
+def employee_email(index: int) -> str:
+    return f"employe{index}@inventaire-bench.fr"
+
+
+def cuid(index: int) -> str:
+    letters, digits = divmod(index, 10_000)
+    prefix = ""
+    for _ in range(4):
+        letters, rest = divmod(letters, 26)
+        prefix = string.ascii_uppercase[rest] + prefix
+    return f"{prefix}{digits:04d}"
+
+
+def _chunks(rows: Iterator[Dict], size: int) -> Iterator[List[Dict]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _employees(count: int, rng: random.Random) -> Iterator[Dict]:
+    for i in range(1, count + 1):
+        yield {
+            "id": i,
+            "name": f"Employé {i}",
+            "email": employee_email(i),
+            "cuid": cuid(i),
+            "contract_type": rng.choice(("CDI", "CDD", "Stage")),
+            "department": rng.choice(DEPARTMENTS),
+        }
+
+
+def _emplacements(count: int, rng: random.Random) -> Iterator[Dict]:
+    for i in range(1, count + 1):
+        yield {
+            "id": i,
+            "site": rng.choice(SITES),
+            "etage": str(rng.randint(0, 9)),
+            "rosace": f"R{rng.randint(1, 99)}",
+            "exact_position": f"Bureau {i}",
+        }
+
+
+def _equipment(count: int, employees: int, emplacements: int, rng: random.Random) -> Iterator[Dict]:
+    types = list(EquipmentType)
+    conditions = [condition.value for condition in EquipmentCondition]
+    spare = [EquipmentStatus.IN_STOCK.value, EquipmentStatus.MAINTENANCE.value, EquipmentStatus.RETIRED.value]
+    for i in range(1, count + 1):
+        kind = rng.choices(types, TYPE_WEIGHTS)[0]
+        assigned = employees and rng.random() < ASSIGNED_RATIO
+        yield {
+            "id": i,
+            "serial_number": serial_number(i),
+            "model": rng.choice(MODELS[kind]),
+            "equipment_type": kind.value,
+            "condition": rng.choice(conditions),
+            "status": EquipmentStatus.ASSIGNED.value if assigned else rng.choices(spare, (80, 12, 8))[0],
+            "employee_id": rng.randint(1, employees) if assigned else None,
+            "emplacement_id": rng.randint(1, emplacements) if emplacements else None,
+        }
+
+
+def _history(count: int, employees: int, equipment: int, rng: random.Random) -> Iterator[Dict]:
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    for i in range(1, count + 1):
+        assigned_at = now - timedelta(minutes=rng.randint(0, HISTORY_SPAN_DAYS * 24 * 60))
+        returned = rng.random() < 0.8
+        yield {
+            "id": i,
+            "employee_id": rng.randint(1, employees),
+            "equipment_id": rng.randint(1, equipment),
+            "assigned_at": assigned_at,
+            "returned_at": assigned_at + timedelta(days=rng.randint(1, 365)) if returned else None,
+            "notes": None,
+        }
+
+
+def seed(session_factory, sizes: Dict[str, int], users: int = 10, random_seed: int = 42,
+         batch_size: int = 10_000) -> Dict[str, object]:
+    """Remplir une base vide ; renvoie les volumes insérés et la durée de chaque table."""
+    rng = random.Random(random_seed)
+    employees, emplacements, equipment = sizes["employees"], sizes["emplacements"], sizes["equipment"]
+    history = sizes["history"] if employees and equipment else 0
+    plan = (
+        (Employee, _employees(employees, rng)),
+        (Emplacement, _emplacements(emplacements, rng)),
+        (Equipment, _equipment(equipment, employees, emplacements, rng)),
+        (EmployeeEquipmentHistory, _history(history, employees, equipment, rng)),
+    )
+
+    timings = {}
+    with session_factory() as db:
+        if db.scalar(select(func.count()).select_from(Equipment)):
+            raise SystemExit("La base contient déjà des équipements : utiliser une base vide.")
+
+        hashed = get_password_hash(PASSWORD)
+        db.add_all(
+            User(email=f"user{i}@bench.local", hashed_password=hashed, first_name="Bench", last_name=str(i),
+                 role=UserRole.ADMIN, is_active=True)
+            for i in range(users)
+        )
+        db.commit()
+
+        for model, rows in plan:
+            start = time.perf_counter()
+            for chunk in _chunks(rows, batch_size):
+                db.execute(insert(model), chunk)
+                db.commit()
+            timings[model.__tablename__] = round(time.perf_counter() - start, 2)
+            if db.get_bind().dialect.name == "postgresql":
+                # Identifiants explicites : réaligner la séquence pour les créations suivantes
+                table = model.__tablename__
+                db.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), coalesce(max(id), 1)) FROM {table}"
+                ))
+                db.commit()
+
+        start = time.perf_counter()
+        stats.reconcile(db)
+        timings["equipment_stats"] = round(time.perf_counter() - start, 2)
+
+    return {
+        "sizes": {"users": users, "employees": employees, "emplacements": emplacements,
+                  "equipment": equipment, "history": history},
+        "seconds": timings,
+    }
+
+
+def scaled_sizes(scale: float, **overrides) -> Dict[str, int]:
+    sizes = {name: int(count * scale) for name, count in DEFAULT_SIZES.items()}
+    sizes.update({name: count for name, count in overrides.items() if count is not None})
+    return sizes
+
+
+def add_arguments(parser: argparse.ArgumentParser, default_scale: float) -> None:
+    parser.add_argument("--scale", type=float, default=default_scale,
+                        help="multiplicateur des volumes par défaut")
+    for name in DEFAULT_SIZES:
+        parser.add_argument(f"--{name}", type=int, default=None)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default=None, help="SQLite temporaire par défaut")
+    parser.add_argument("--json", action="store_true")
+    add_arguments(parser, default_scale=1.0)
+    args = parser.parse_args(argv)
+
+    session_factory = make_session_factory(args.database_url)
+    sizes = scaled_sizes(args.scale, **{name: getattr(args, name) for name in DEFAULT_SIZES})
+    result = seed(session_factory, sizes, users=args.users, random_seed=args.seed, batch_size=args.batch_size)
+    result["database_url"] = session_factory.kw["bind"].url.render_as_string(hide_password=True)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"{result['database_url']} : {result['sizes']} ({result['seconds']} s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""
+Sérialisation des listes : chemin ORM + Pydantic contre projection + orjson.
+
+    python -m benchmarks.serialization [--database-url URL] [--scale 0.05] [--limit 500]
+                                       [--pages 20] [--rounds 3] [--json]
+
+Pour chaque liste (équipements, employés, emplacements), parcourt ``--pages``
+pages de ``--limit`` lignes par curseur, des deux façons :
+
+- ``orm`` : entités ORM, validation ``from_attributes`` par le schéma de
+  réponse puis ``json.dumps`` (ce que fait FastAPI avec ``response_model``) ;
+- ``rows`` : projection des colonnes du schéma et ``orjson`` (chemin actuel
+  des endpoints).
+
+Chaque page est comparée champ à champ : une différence fait échouer le
+benchmark (code de sortie 1). Le temps rapporté est le meilleur de
+``--rounds`` parcours, requêtes SQL comprises ; ``serialize_ms`` isole la
+conversion en JSON.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Callable, Dict, List
+
+import orjson
+from pydantic import TypeAdapter
+
+from app.core.serialization import ORJSON_OPTIONS
+from app.crud import emplacement as emplacement_crud
+from app.crud import employee as employee_crud
+from app.crud import equipment as equipment_crud
+from app.schemas.emplacements import EmplacementResponse
+from app.schemas.employee import Employee as EmployeeSchema
+from app.schemas.equipment import EquipmentResponse
+from benchmarks import seed as seeder
+from benchmarks.common import async_session_factory, make_session_factory
+
+# Liste -> (lecture ORM, lecture en colonnes, schéma de réponse)
+LISTS: Dict[str, tuple] = {
+    "equipment": (equipment_crud.get_equipment_async, equipment_crud.get_equipment_rows_async, EquipmentResponse),
+    "employees": (employee_crud.get_multi_async, employee_crud.get_rows_async, EmployeeSchema),
+    "emplacements": (
+        emplacement_crud.get_emplacements_async, emplacement_crud.get_emplacement_rows_async, EmplacementResponse,
+    ),
+}
+
+
+def _orm_json(adapter: TypeAdapter, entities) -> bytes:
+    # Même enchaînement que FastAPI : validation, dump JSON-compatible, json.dumps
+    content = adapter.dump_python(adapter.validate_python(entities, from_attributes=True), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def _rows_json(rows) -> bytes:
+    return orjson.dumps(rows, option=ORJSON_OPTIONS)
+
+
+async def _walk(async_factory, fetch: Callable, encode: Callable, limit: int, pages: int):
+    """Parcourir ``pages`` pages ; renvoie (JSON de chaque page, durée totale, durée d'encodage)."""
+    bodies: List[bytes] = []
+    encoding = 0.0
+    cursor = None
+    start = time.perf_counter()
+    async with async_factory() as db:
+        for _ in range(pages):
+            items, cursor = await fetch(db, limit=limit, cursor=cursor, sort="id")
+            encode_start = time.perf_counter()
+            bodies.append(encode(items))
+            encoding += time.perf_counter() - encode_start
+            if cursor is None:
+                break
+    return bodies, time.perf_counter() - start, encoding
+
+
+async def run(args) -> Dict:
+    session_factory = make_session_factory(args.database_url)
+    if args.database_url is None:
+        sizes = seeder.scaled_sizes(args.scale, **{name: getattr(args, name) for name in seeder.DEFAULT_SIZES})
+        sizes["history"] = 0
+        seeder.seed(session_factory, sizes, users=1, random_seed=args.seed, batch_size=args.batch_size)
+    async_factory = async_session_factory(session_factory)
+
+    results, mismatches = {}, []
+    for name, (orm_fetch, rows_fetch, schema) in LISTS.items():
+        adapter = TypeAdapter(List[schema])
+        timings = {"orm": [], "rows": []}
+        for _ in range(args.rounds):
+            orm_bodies, orm_total, orm_encoding = await _walk(
+                async_factory, orm_fetch, lambda items: _orm_json(adapter, items), args.limit, args.pages
+            )
+            rows_bodies, rows_total, rows_encoding = await _walk(
+                async_factory, rows_fetch, _rows_json, args.limit, args.pages
+            )
+            timings["orm"].append((orm_total, orm_encoding))
+            timings["rows"].append((rows_total, rows_encoding))
+
+        for page, (expected, actual) in enumerate(zip(orm_bodies, rows_bodies)):
+            if json.loads(expected) != json.loads(actual):
+                mismatches.append(f"{name} page {page} : {expected[:200]!r} != {actual[:200]!r}")
+        if len(orm_bodies) != len(rows_bodies):
+            mismatches.append(f"{name} : {len(orm_bodies)} pages ORM contre {len(rows_bodies)} en colonnes")
+
+        pages = len(rows_bodies)
+        best = {path: min(samples) for path, samples in timings.items()}
+        results[name] = {
+            "pages": pages,
+            "rows": sum(len(json.loads(body)) for body in rows_bodies),
+            **{
+                f"{path}_{metric}_ms": round(value * 1000 / pages, 2)
+                for path, (total, encoding) in best.items()
+                for metric, value in (("page", total), ("serialize", encoding))
+            },
+            "speedup": round(best["orm"][0] / best["rows"][0], 2) if best["rows"][0] else None,
+        }
+
+    await async_factory.kw["bind"].dispose()
+    return {
+        "database": session_factory.kw["bind"].dialect.name,
+        "limit": args.limit,
+        "lists": results,
+        "mismatches": mismatches,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", default=None, help="base déjà remplie ; SQLite temporaire sinon")
+    parser.add_argument("--limit", type=int, default=500, help="lignes par page")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--json", action="store_true")
+    seeder.add_arguments(parser, default_scale=0.05)
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"{result['database']}, pages de {result['limit']} lignes")
+        for name, item in result["lists"].items():
+            print(
+                f"  {name:<13} {item['pages']:>3} pages  orm {item['orm_page_ms']:>8} ms/page "
+                f"(json {item['orm_serialize_ms']:>7})  rows {item['rows_page_ms']:>8} ms/page "
+                f"(json {item['rows_serialize_ms']:>7})  x{item['speedup']}"
+            )
+        for mismatch in result["mismatches"]:
+            print(f"DIFFÉRENCE {mismatch}", file=sys.stderr)
+    return 1 if result["mismatches"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
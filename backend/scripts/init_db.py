@@ -11,6 +11,7 @@ from app.db.session import engine, SessionLocal
 from app.db.base import Base
 from app.models.user import User
 from app.core.security import get_password_hash
+from app.services import movements
 
 def init_db():
     """Initialiser la base de données"""
@@ -21,6 +22,10 @@ def init_db():
     db: Session = SessionLocal()
     
     try:
+        # Partitions mensuelles des mouvements (et conversion d'une ancienne table non partitionnée)
+        movements.maintain(db)
+        print("✅ Partitions des mouvements prêtes!")
+
         admin = db.query(User).filter(User.email == "admin@sofrecom.com").first()
         
         if not admin:
@@ -0,0 +1,45 @@
+"""
+Réplica SQLite simulé pour le développement local
+
+Copie la base primaire vers le réplica toutes les ``--interval`` secondes
+(API de sauvegarde de sqlite3, sûre pendant que l'application lit les deux
+fichiers) : le réplica a jusqu'à ``--interval`` secondes de retard.
+
+    DATABASE_URL=sqlite:///./primary.db
+    DATABASE_REPLICA_URLS=sqlite:///./replica.db
+
+    python scripts/sqlite_replica.py primary.db replica.db --interval 2
+"""
+import argparse
+import sqlite3
+import time
+
+
+def copy(primary: str, replica: str) -> None:
+    source = sqlite3.connect(primary)
+    target = sqlite3.connect(replica, timeout=30)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Réplica SQLite simulé pour le développement local")
+    parser.add_argument("primary")
+    parser.add_argument("replica")
+    parser.add_argument("--interval", type=float, default=2.0, help="délai entre deux copies (s)")
+    parser.add_argument("--once", action="store_true", help="une seule copie")
+    args = parser.parse_args()
+
+    while True:
+        copy(args.primary, args.replica)
+        print(f"✅ {args.replica} à jour")
+        if args.once:
+            return
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
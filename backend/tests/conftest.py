@@ -0,0 +1,75 @@
+"""Fixtures partagées : base SQLite temporaire par test, sessions sync et async, client HTTP."""
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+import app.models  # noqa: F401  (enregistre toutes les tables)
+from app.core import deps
+from app.core.auth_cache import Principal
+from app.db import session as db_session
+from app.db.session import Base
+from app.main import app as api
+from app.models.user import User
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine, autoflush=False)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory):
+    with session_factory() as session:
+        yield session
+
+
+@pytest_asyncio.fixture
+async def async_factory(session_factory):
+    """Sessions asynchrones sur la même base que ``session_factory``."""
+    engine = create_async_engine(session_factory.kw["bind"].url.set(drivername="sqlite+aiosqlite"))
+    yield async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.fixture
+def user(db):
+    user = User(email="admin@example.com", hashed_password="-", first_name="Ada", last_name="Admin", role="admin")
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def client(session_factory, user):
+    """Client HTTP de l'application sur la base de test, authentifié comme ``user`` (sans lifespan)."""
+    # NullPool : aucune connexion aiosqlite ne survit à la boucle du TestClient
+    engine = create_async_engine(session_factory.kw["bind"].url.set(drivername="sqlite+aiosqlite"), poolclass=NullPool)
+    factory = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+    async def get_async_db():
+        async with factory() as session:
+            yield session
+
+    def get_db():
+        with session_factory() as session:
+            yield session
+
+    principal = Principal.from_user(user)
+    api.dependency_overrides.update({
+        deps.get_db: get_db,
+        db_session.get_db: get_db,
+        deps.get_async_db: get_async_db,
+        db_session.get_async_db: get_async_db,
+        db_session.get_async_session_factory: lambda: factory,
+        deps.get_current_user: lambda: principal,
+        deps.get_stream_user: lambda: principal,
+    })
+    yield TestClient(api)
+    api.dependency_overrides.clear()
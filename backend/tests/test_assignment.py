@@ -0,0 +1,165 @@
+"""Détenteur et statut : toute attribution passe par ``apply_assignments`` (historique et mouvement)."""
+import io
+
+import pytest
+from sqlalchemy import select
+
+from app.models.employee import Employee
+from app.models.employee_equipment_history import EmployeeEquipmentHistory
+from app.models.equipment import Equipment
+from app.schemas.assignment import AssignmentItem
+from app.services import assignment, importer, movements
+
+
+def item(serial_number: str, **fields) -> dict:
+    return {"serial_number": serial_number, "model": "Latitude 5440", "equipment_type": "laptop",
+            "condition": "new", "status": "in_stock", **fields}
+
+
+@pytest.fixture
+def employees(db):
+    rows = [Employee(name=f"Employé {index}", email=f"e{index}@example.com", cuid=f"CUID{index:04d}")
+            for index in range(2)]
+    db.add_all(rows)
+    db.commit()
+    return [row.id for row in rows]
+
+
+def open_history(db, equipment_id: int):
+    return db.scalars(select(EmployeeEquipmentHistory).where(
+        EmployeeEquipmentHistory.equipment_id == equipment_id, EmployeeEquipmentHistory.returned_at.is_(None)
+    )).all()
+
+
+def logged(db, equipment_id: int):
+    rows, _ = movements.query(db, equipment_id=equipment_id)
+    return [(row["action"], row["from_location"], row["to_location"]) for row in rows]
+
+
+# ---------------------------------------------------------------------------
+# Moteur d'attribution
+# ---------------------------------------------------------------------------
+
+def test_reassign_closes_history_and_logs_movements(db, user, employees):
+    first, second = employees
+    equipment = Equipment(**item("PC-1"))
+    db.add(equipment)
+    db.commit()
+
+    result = assignment.apply_assignments(db, [AssignmentItem(equipment_id=equipment.id, employee_id=first)], user.id)
+    assert result.items[0].result == assignment.ASSIGNED
+    result = assignment.apply_assignments(db, [AssignmentItem(equipment_id=equipment.id, employee_id=second)], user.id)
+    assert result.items[0].previous_employee_id == first
+
+    history = db.scalars(select(EmployeeEquipmentHistory).order_by(EmployeeEquipmentHistory.id)).all()
+    assert [(row.employee_id, row.returned_at is None) for row in history] == [(first, False), (second, True)]
+    db.refresh(equipment)
+    assert (equipment.employee_id, equipment.status) == (second, "assigned")
+
+    assignment.apply_assignments(db, [AssignmentItem(equipment_id=equipment.id, employee_id=None)], user.id)
+    db.refresh(equipment)
+    assert (equipment.employee_id, equipment.status) == (None, "in_stock")
+    assert open_history(db, equipment.id) == []
+    # Du plus récent au plus ancien
+    assert logged(db, equipment.id) == [
+        ("returned", "CUID0001", "stock"),
+        ("assigned", "CUID0000", "CUID0001"),
+        ("assigned", "stock", "CUID0000"),
+    ]
+
+
+def test_batch_reports_each_item(db, user, employees):
+    equipment = Equipment(**item("PC-1"))
+    db.add(equipment)
+    db.commit()
+    result = assignment.apply_assignments(db, [
+        AssignmentItem(equipment_id=999, employee_id=employees[0]),
+        AssignmentItem(equipment_id=equipment.id, employee_id=12345),
+    ], user.id)
+    assert [(row.equipment_id, row.result) for row in result.items] == [
+        (999, assignment.NOT_FOUND), (equipment.id, assignment.INVALID)
+    ]
+    assert result.failed == 2
+    assert logged(db, equipment.id) == []
+
+
+# ---------------------------------------------------------------------------
+# Création avec détenteur
+# ---------------------------------------------------------------------------
+
+def test_create_with_holder_goes_through_assignment(client, db, employees):
+    response = client.post("/api/v1/equipment", json=item("PC-1", status="assigned", employee_id=employees[0]))
+    assert response.status_code == 201
+    body = response.json()
+    assert (body["employee_id"], body["status"]) == (employees[0], "assigned")
+    assert [row.employee_id for row in open_history(db, body["id"])] == [employees[0]]
+    assert logged(db, body["id"]) == [("assigned", "stock", "CUID0000")]
+
+
+@pytest.mark.parametrize("fields", [
+    {"status": "assigned"},
+    {"status": "in_stock", "employee_id": 1},
+    {"status": "maintenance", "employee_id": 1},
+])
+def test_create_rejects_status_contradicting_holder(client, db, employees, fields):
+    response = client.post("/api/v1/equipment", json=item("PC-1", **fields))
+    assert response.status_code == 400
+    assert db.scalar(select(Equipment.id)) is None
+
+
+def test_bulk_create_assigns_holders(client, db, employees):
+    response = client.post("/api/v1/equipment/bulk", json={"items": [
+        item("PC-1", status="assigned", employee_id=employees[0]),
+        item("PC-2", status="in_stock", employee_id=employees[1]),
+        item("PC-3", status="maintenance"),
+    ]})
+    assert response.status_code == 200
+    results = response.json()["items"]
+    assert [row["result"] for row in results] == ["created", "invalid", "created"]
+
+    held = db.scalar(select(Equipment).where(Equipment.serial_number == "PC-1"))
+    assert (held.employee_id, held.status) == (employees[0], "assigned")
+    assert [row.employee_id for row in open_history(db, held.id)] == [employees[0]]
+    assert logged(db, held.id) == [("assigned", "stock", "CUID0000")]
+    assert db.scalar(select(Equipment.status).where(Equipment.serial_number == "PC-3")) == "maintenance"
+
+
+# ---------------------------------------------------------------------------
+# Import
+# ---------------------------------------------------------------------------
+
+def run_import(db, text: str):
+    return importer.import_equipment_file(db, io.BytesIO(text.encode()), "inventaire.csv")
+
+
+def test_import_rejects_assigned_status(db):
+    report = run_import(db, "serial_number,model,status\nPC-1,Latitude,assigné\nPC-2,Latitude,stock\n")
+    assert report.rows_imported == 1
+    assert [(error.row, error.error) for error in report.errors] == [(2, importer.ASSIGNED_ERROR)]
+
+
+def test_import_keeps_status_of_held_equipment(db, user, employees):
+    held, free = Equipment(**item("PC-1")), Equipment(**item("PC-2"))
+    db.add_all([held, free])
+    db.commit()
+    assignment.apply_assignments(db, [AssignmentItem(equipment_id=held.id, employee_id=employees[0])], user.id)
+
+    report = run_import(db, "serial_number,model,status\nPC-1,Latitude,réformé\nPC-2,Latitude,réformé\n")
+    assert report.rows_imported == 1
+    assert [(error.serial_number, error.error) for error in report.errors] == [("PC-1", importer.HELD_ERROR)]
+    db.expire_all()
+    assert (held.employee_id, held.status) == (employees[0], "assigned")
+    assert free.status == "retired"
+    assert len(open_history(db, held.id)) == 1
+
+
+def test_import_without_status_column_updates_held_equipment(db, user, employees):
+    held = Equipment(**item("PC-1"))
+    db.add(held)
+    db.commit()
+    assignment.apply_assignments(db, [AssignmentItem(equipment_id=held.id, employee_id=employees[0])], user.id)
+
+    report = run_import(db, "serial_number,model\nPC-1,Latitude 7450\n")
+    assert report.rows_failed == 0
+    db.expire_all()
+    assert (held.model, held.status) == ("Latitude 7450", "assigned")
@@ -0,0 +1,55 @@
+"""Chatbot : questions de localisation servies en une requête SQL par page."""
+import pytest
+
+from app.core.query_budget import max_queries
+from app.models.emplacements import Emplacement
+from app.models.equipment import Equipment
+from app.services.chatbot import MAX_RESULTS, ChatbotService
+
+SFAX_MONITORS = MAX_RESULTS + 5
+
+
+@pytest.fixture
+def inventory(db):
+    for index in range(SFAX_MONITORS):
+        emplacement = Emplacement(
+            site="Sfax", etage=str(index % 3), rosace=f"R{index}", exact_position=f"Poste {index}"
+        )
+        db.add(Equipment(serial_number=f"MON-{index:03d}", model="P2422H", equipment_type="monitor",
+                         condition="good", status="in_stock", emplacement=emplacement))
+    tunis = Emplacement(site="Tunis", etage="2", rosace="R1")
+    db.add(Equipment(serial_number="MON-TUN", model="P2422H", equipment_type="monitor",
+                     condition="good", status="in_stock", emplacement=tunis))
+    db.add(Equipment(serial_number="SN12345-X", model="OptiPlex 7010", equipment_type="pc",
+                     condition="new", status="in_stock", emplacement=tunis))
+    db.commit()
+
+
+@pytest.mark.asyncio
+async def test_locate_pages_use_one_query_each(inventory, async_factory):
+    async with async_factory() as db:
+        chatbot = ChatbotService(db)
+        # Emplacement joint à l'équipement : pas de requête par ligne (N+1)
+        with max_queries(1, repeat_threshold=2):
+            first = await chatbot.process_query("Où sont les écrans du site Sfax ?")
+        cursor = first["data"]["next_cursor"]
+        with max_queries(1, repeat_threshold=2):
+            second = await chatbot.process_query("Où sont les écrans du site Sfax ?", {"cursor": cursor})
+
+    assert len(first["data"]["equipments"]) == MAX_RESULTS
+    assert cursor is not None
+    assert second["data"]["next_cursor"] is None
+    serials = [item["serial_number"] for page in (first, second) for item in page["data"]["equipments"]]
+    assert serials == [f"MON-{index:03d}" for index in range(SFAX_MONITORS)]
+    assert first["data"]["equipments"][0]["location"] == "Sfax, Étage 0, Rosace R0, Poste 0"
+
+
+@pytest.mark.asyncio
+async def test_locate_by_serial_uses_one_query(inventory, async_factory):
+    async with async_factory() as db:
+        with max_queries(1):
+            result = await ChatbotService(db).process_query("Où se trouve le PC SN12345-X ?")
+
+    assert result["data"]["equipments"] == [
+        {"equipment": "OptiPlex 7010", "serial_number": "SN12345-X", "location": "Tunis, Étage 2, Rosace R1"}
+    ]
@@ -0,0 +1,89 @@
+"""Équipements en masse : un résultat par élément, dans l'ordre de la requête, sans annuler le reste."""
+import pytest
+from sqlalchemy import select
+
+from app.models.employee import Employee
+from app.models.equipment import Equipment
+from app.schemas.assignment import AssignmentItem
+from app.services import assignment, equipment_bulk, movements
+
+
+def item(serial_number: str, **fields) -> dict:
+    return {"serial_number": serial_number, "model": "Latitude 5440", "equipment_type": "laptop",
+            "condition": "new", "status": "in_stock", **fields}
+
+
+def outcome(response) -> list:
+    assert response.status_code == 200
+    return [(row["index"], row["result"]) for row in response.json()["items"]]
+
+
+@pytest.fixture
+def stock(db):
+    """Trois équipements en stock : PC-1, PC-2, PC-3."""
+    db.add_all([Equipment(**item(f"PC-{index}")) for index in (1, 2, 3)])
+    db.commit()
+    return dict(db.execute(select(Equipment.serial_number, Equipment.id)).all())
+
+
+def test_create_reports_conflicts_in_request_order(client, stock):
+    response = client.post("/api/v1/equipment/bulk", json={"items": [
+        item("PC-10"), item("PC-1"), item("PC-10"), item("PC-11", emplacement_id=999), item("PC-12"),
+    ]})
+    assert outcome(response) == [
+        (0, equipment_bulk.CREATED), (1, equipment_bulk.CONFLICT), (2, equipment_bulk.CONFLICT),
+        (3, equipment_bulk.INVALID), (4, equipment_bulk.CREATED),
+    ]
+    assert response.json()["succeeded"] == 2
+
+
+def test_update_reports_missing_and_duplicates(client, db, stock):
+    response = client.patch("/api/v1/equipment/bulk", json={
+        "ids": [stock["PC-1"], 999, stock["PC-2"]],
+        "serial_numbers": ["PC-3", "PC-1", "PC-404"],
+        "changes": {"condition": "good"},
+    })
+    assert outcome(response) == [
+        (0, equipment_bulk.UPDATED), (1, equipment_bulk.NOT_FOUND), (2, equipment_bulk.UPDATED),
+        (3, equipment_bulk.UPDATED), (4, equipment_bulk.CONFLICT), (5, equipment_bulk.NOT_FOUND),
+    ]
+    assert set(db.scalars(select(Equipment.condition))) == {"good"}
+
+
+def test_update_status_skips_held_equipment(client, db, user, stock):
+    employee = Employee(name="Employé", email="e@example.com", cuid="CUID0001")
+    db.add(employee)
+    db.commit()
+    assignment.apply_assignments(db, [AssignmentItem(equipment_id=stock["PC-2"], employee_id=employee.id)], user.id)
+
+    response = client.patch("/api/v1/equipment/bulk", json={
+        "ids": [stock["PC-1"], stock["PC-2"]], "changes": {"status": "maintenance"},
+    })
+    assert outcome(response) == [(0, equipment_bulk.UPDATED), (1, equipment_bulk.INVALID)]
+    db.expire_all()
+    assert db.get(Equipment, stock["PC-2"]).status == "assigned"
+
+
+def test_update_rejects_unknown_reference(client, stock):
+    response = client.patch("/api/v1/equipment/bulk", json={"ids": [stock["PC-1"]], "changes": {"emplacement_id": 999}})
+    assert response.status_code == 400
+
+
+def test_delete_keeps_referenced_equipment(client, db, stock):
+    movements.record(db, [{"equipment_id": stock["PC-2"], "employee_id": 1, "action": "moved"}])
+    db.commit()
+
+    response = client.request("DELETE", "/api/v1/equipment/bulk", json={
+        "serial_numbers": ["PC-2", "PC-404", "PC-1", "PC-1"],
+    })
+    assert outcome(response) == [
+        (0, equipment_bulk.CONFLICT), (1, equipment_bulk.NOT_FOUND),
+        (2, equipment_bulk.DELETED), (3, equipment_bulk.CONFLICT),
+    ]
+    assert sorted(db.scalars(select(Equipment.serial_number))) == ["PC-2", "PC-3"]
+
+
+def test_selection_size_is_bounded(client, monkeypatch):
+    monkeypatch.setattr(equipment_bulk.settings, "EQUIPMENT_BULK_MAX_ITEMS", 2)
+    response = client.patch("/api/v1/equipment/bulk", json={"ids": [1, 2, 3], "changes": {"condition": "good"}})
+    assert response.status_code == 400
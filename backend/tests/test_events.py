@@ -0,0 +1,116 @@
+"""Outbox : un événement par écriture validée, diffusé puis repris après Last-Event-ID."""
+import asyncio
+
+import orjson
+import pytest
+from sqlalchemy import insert, select
+
+from app.api.v1.endpoints import events
+from app.core.config import settings
+from app.models.equipment import Equipment
+from app.models.outbox import OutboxEvent
+from app.services import outbox
+
+
+class Connected:
+    """Requête dont le client reste connecté."""
+
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+@pytest.fixture
+def feed(session_factory, monkeypatch):
+    # Relevé lent : seul notify() ou le rattrapage d'une position le déclenche
+    monkeypatch.setattr(settings, "OUTBOX_POLL_INTERVAL_SECONDS", 0.3)
+    monkeypatch.setattr(settings, "EVENTS_HEARTBEAT_SECONDS", 0.1)
+    feed = outbox.EventFeed(session_factory)
+    monkeypatch.setattr(outbox, "feed", feed)
+    yield feed
+    feed.stop()
+
+
+def create(db, serial_number: str) -> int:
+    equipment = Equipment(serial_number=serial_number, model="Latitude", equipment_type="laptop",
+                          condition="new", status="in_stock")
+    db.add(equipment)
+    db.commit()
+    return equipment.id
+
+
+def stored(db):
+    return [(row.resource, row.action, row.ids) for row in db.scalars(select(OutboxEvent).order_by(OutboxEvent.id))]
+
+
+def external_event(session_factory) -> int:
+    # Écrit par un autre pod : aucune notification locale
+    with session_factory.kw["bind"].begin() as connection:
+        return connection.execute(
+            insert(OutboxEvent.__table__).values(resource="equipment", action="changed", ids=None)
+        ).inserted_primary_key[0]
+
+
+async def frames(after, count: int, timeout: float = 5.0):
+    """Les ``count`` premières trames d'événement (pings exclus) d'un flux repris après ``after``."""
+    stream = events._stream(Connected(), after, None)
+    received = []
+    try:
+        async def collect():
+            async for chunk in stream:
+                received.extend(frame for frame in chunk.split(b"\n\n") if frame.startswith(b"id:"))
+                if len(received) >= count:
+                    return
+        await asyncio.wait_for(collect(), timeout)
+    finally:
+        await stream.aclose()
+    return [frame.split(b"\n") for frame in received[:count]]
+
+
+def test_committed_writes_emit_events(db):
+    equipment_id = create(db, "PC-1")
+    equipment = db.get(Equipment, equipment_id)
+    equipment.model = "Latitude 7450"
+    db.commit()
+    db.delete(equipment)
+    db.commit()
+    assert stored(db) == [
+        ("equipment", "created", [equipment_id]),
+        ("equipment", "updated", [equipment_id]),
+        ("equipment", "deleted", [equipment_id]),
+    ]
+
+
+def test_rolled_back_write_emits_nothing(db):
+    db.add(Equipment(serial_number="PC-1", model="Latitude", equipment_type="laptop", condition="new"))
+    db.flush()
+    db.rollback()
+    assert stored(db) == []
+
+
+@pytest.mark.asyncio
+async def test_resume_after_last_event_id(db, feed):
+    ids = [create(db, f"PC-{index}") for index in range(3)]
+    first, *rest = db.scalars(select(OutboxEvent.id).order_by(OutboxEvent.id)).all()
+    received = await frames(first, 2)
+    assert [int(frame[0].split(b": ")[1]) for frame in received] == rest
+    assert [orjson.loads(frame[1][len(b"data: "):])["ids"] for frame in received] == [[ids[1]], [ids[2]]]
+
+
+@pytest.mark.asyncio
+async def test_position_ahead_of_horizon_waits_for_feed(db, session_factory, feed):
+    create(db, "PC-1")
+    await asyncio.to_thread(feed.start)
+    # Position reçue d'un pod plus avancé, pas encore relevée ici
+    ahead = external_event(session_factory)
+    assert feed.horizon < ahead
+    following = external_event(session_factory)
+
+    received = await frames(ahead, 1)
+    assert received[0][0] == b"id: %d" % following
+
+
+@pytest.mark.asyncio
+async def test_unknown_position_resets(db, feed):
+    create(db, "PC-1")
+    received = await frames(1000, 1)
+    assert received[0][1] == b"event: reset"
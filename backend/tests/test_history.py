@@ -0,0 +1,175 @@
+"""Détenteurs à une date : arbre d'intervalles et ``AsOfService`` aux bornes."""
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.models.employee import Employee
+from app.models.employee_equipment_history import EmployeeEquipmentHistory
+from app.models.equipment import Equipment
+from app.services.history import AsOfService, IntervalTree
+
+T0 = datetime(2024, 1, 1)
+OPEN = datetime.max
+
+
+def day(n: int) -> datetime:
+    return T0 + timedelta(days=n)
+
+
+def stab_ids(tree: IntervalTree, point: datetime) -> list:
+    ids, holders = tree.stab(point)
+    assert len(ids) == len(holders)
+    return sorted(ids)
+
+
+# ---------------------------------------------------------------------------
+# IntervalTree
+# ---------------------------------------------------------------------------
+
+def test_stab_empty_tree():
+    tree = IntervalTree([])
+    assert len(tree) == 0
+    assert stab_ids(tree, day(0)) == []
+
+
+def test_stab_half_open_bounds():
+    tree = IntervalTree([(day(1), day(3), 1, 10), (day(3), day(5), 2, 20)])
+
+    assert stab_ids(tree, day(1)) == [1]          # début inclus
+    assert stab_ids(tree, day(3)) == [2]          # fin exclue : restitué à cet instant
+    assert stab_ids(tree, day(3) - timedelta(microseconds=1)) == [1]
+    assert stab_ids(tree, day(5)) == []
+    assert stab_ids(tree, day(0)) == []
+
+
+def test_stab_open_interval():
+    tree = IntervalTree([(day(1), OPEN, 1, 10), (day(2), day(4), 2, 20)])
+
+    assert stab_ids(tree, day(0)) == []
+    assert stab_ids(tree, day(3)) == [1, 2]
+    assert stab_ids(tree, datetime(2999, 12, 31)) == [1]
+
+
+def test_stab_ignores_empty_intervals():
+    tree = IntervalTree([(day(2), day(2), 1, 10), (day(3), day(1), 2, 20), (day(1), day(4), 3, 30)])
+
+    assert len(tree) == 1
+    assert stab_ids(tree, day(2)) == [3]
+
+
+def test_stab_returns_holders_with_ids():
+    tree = IntervalTree([(day(0), day(10), 1, 10), (day(5), OPEN, 2, 20)])
+
+    ids, holders = tree.stab(day(6))
+    assert sorted(zip(ids, holders)) == [(1, 10), (2, 20)]
+
+
+def test_stab_matches_linear_scan():
+    rng = random.Random(7)
+    intervals = []
+    for history_id in range(1, 400):
+        start = day(rng.randint(0, 60))
+        end = OPEN if rng.random() < 0.2 else start + timedelta(days=rng.randint(0, 20))
+        intervals.append((start, end, history_id, rng.randint(1, 30)))
+    tree = IntervalTree(intervals)
+
+    # Points aux bornes des intervalles et entre elles
+    points = {start for start, _, _, _ in intervals} | {end for _, end, _, _ in intervals if end != OPEN}
+    points |= {point + timedelta(hours=12) for point in list(points)}
+    for point in sorted(points):
+        expected = sorted(history_id for start, end, history_id, _ in intervals if start <= point < end)
+        assert stab_ids(tree, point) == expected, point
+
+
+# ---------------------------------------------------------------------------
+# AsOfService (SQLite : arbre d'intervalles, ou index pour un seul employé)
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def assignments(db):
+    db.add_all([
+        Employee(name="Amira", email="amira@example.com", cuid="AAAA0001", department="DSI"),
+        Employee(name="Karim", email="karim@example.com", cuid="BBBB0002", department="RH"),
+    ])
+    db.add_all([
+        Equipment(serial_number=f"SN-{index}", model="m", equipment_type="laptop", condition="good", status="in_stock")
+        for index in range(1, 7)
+    ])
+    db.flush()
+    db.add_all([
+        # 1 : restitué à day(3) ; 2 : pris à day(3) ; 3 : en cours ; 4 : vide ; 5, 6 : en cours
+        EmployeeEquipmentHistory(employee_id=1, equipment_id=1, assigned_at=day(1), returned_at=day(3)),
+        EmployeeEquipmentHistory(employee_id=2, equipment_id=1, assigned_at=day(3), returned_at=day(6)),
+        EmployeeEquipmentHistory(employee_id=1, equipment_id=2, assigned_at=day(2)),
+        EmployeeEquipmentHistory(employee_id=2, equipment_id=3, assigned_at=day(3), returned_at=day(3)),
+        EmployeeEquipmentHistory(employee_id=2, equipment_id=4, assigned_at=day(0)),
+        EmployeeEquipmentHistory(employee_id=1, equipment_id=5, assigned_at=day(1)),
+    ])
+    db.commit()
+    return db
+
+
+def holder_ids(service: AsOfService, at: datetime, **filters) -> list:
+    items, next_cursor = service.holders(at, **filters)
+    assert next_cursor is None
+    return [item["id"] for item in items]
+
+
+def test_holders_at_boundaries(assignments):
+    service = AsOfService(assignments)
+    assert service.engine_name == "interval_tree"
+
+    assert holder_ids(service, day(1)) == [1, 5, 6]
+    # returned_at == at : l'attribution est close, la suivante commence
+    assert holder_ids(service, day(3)) == [2, 3, 5, 6]
+    assert holder_ids(service, day(3) - timedelta(microseconds=1)) == [1, 3, 5, 6]
+    assert holder_ids(service, day(6)) == [3, 5, 6]
+    assert holder_ids(service, day(-1)) == []
+
+
+def test_holders_aware_datetime_is_utc(assignments):
+    at = (day(3) - timedelta(microseconds=1)).replace(tzinfo=timezone.utc).astimezone(timezone(timedelta(hours=1)))
+    assert holder_ids(AsOfService(assignments), at) == [1, 3, 5, 6]
+
+
+def test_holders_filters_match_tree(assignments):
+    service = AsOfService(assignments)
+
+    # Filtre par employé ou équipement : requête indexée, mêmes bornes que l'arbre
+    assert holder_ids(service, day(3), employee_id=2) == [2, 5]
+    assert holder_ids(service, day(3), employee_id=1) == [3, 6]
+    assert holder_ids(service, day(3), equipment_id=1) == [2]
+    assert holder_ids(service, day(3), serial_number="SN-3") == []
+    assert holder_ids(service, day(3), department="DSI") == [3, 6]
+
+
+def test_holders_tree_follows_new_assignments(assignments):
+    service = AsOfService(assignments)
+    assert holder_ids(service, day(10)) == [3, 5, 6]
+
+    assignments.add(EmployeeEquipmentHistory(employee_id=2, equipment_id=6, assigned_at=day(9)))
+    assignments.commit()
+    assert holder_ids(service, day(10)) == [3, 5, 6, 7]
+
+
+@pytest.mark.parametrize("filters", [{}, {"employee_id": 1}], ids=["tree", "sql"])
+def test_holders_paging(assignments, filters):
+    service = AsOfService(assignments)
+    expected = holder_ids(service, day(2), **filters)
+
+    seen, cursor = [], None
+    for _ in range(len(expected)):
+        items, cursor = service.holders(day(2), limit=1, cursor=cursor, **filters)
+        seen += [item["id"] for item in items]
+        if cursor is None:
+            break
+
+    assert cursor is None
+    assert seen == expected
+    assert len(expected) >= 2
+
+
+def test_holders_rejects_foreign_cursor(assignments):
+    with pytest.raises(ValueError):
+        AsOfService(assignments).holders(day(2), cursor="not-a-cursor")
@@ -0,0 +1,74 @@
+"""Import en lots : lot rejoué ligne à ligne en cas d'échec, doublons de numéro de série."""
+import io
+
+import pytest
+from sqlalchemy import select, text
+
+from app.models.equipment import Equipment
+from app.services import importer
+
+
+def run_import(db, content: str, chunk_size: int = 100):
+    return importer.import_equipment_file(db, io.BytesIO(content.encode()), "inventaire.csv", chunk_size=chunk_size)
+
+
+def csv_rows(*rows: str, header: str = "serial_number,model,condition") -> str:
+    return "\n".join((header,) + rows) + "\n"
+
+
+def models(db) -> dict:
+    return dict(db.execute(select(Equipment.serial_number, Equipment.model)).all())
+
+
+def rejected(report) -> list:
+    return [(error.row, error.serial_number) for error in report.errors]
+
+
+@pytest.fixture
+def refuse_bad(db):
+    """Erreur levée par la base (et non par la validation) pour le numéro de série PC-BAD."""
+    db.execute(text(
+        "CREATE TRIGGER refuse_bad BEFORE INSERT ON equipment WHEN NEW.serial_number = 'PC-BAD' "
+        "BEGIN SELECT RAISE(ABORT, 'PC-BAD refusé'); END"
+    ))
+    db.commit()
+
+
+def test_failed_chunk_is_replayed_row_by_row(db, refuse_bad):
+    report = run_import(db, csv_rows("PC-1,A,new", "PC-BAD,A,new", "PC-2,A,new", "PC-3,A,new", "PC-4,A,new"),
+                        chunk_size=3)
+    assert (report.rows_total, report.rows_imported, report.rows_failed) == (5, 4, 1)
+    assert rejected(report) == [(3, "PC-BAD")]
+    assert "PC-BAD refusé" in report.errors[0].error
+    assert sorted(models(db)) == ["PC-1", "PC-2", "PC-3", "PC-4"]
+
+
+def test_last_valid_duplicate_wins(db):
+    report = run_import(db, csv_rows(
+        "PC-1,Premier,new",
+        "PC-1,Second,new",
+        "PC-2,Valide,new",
+        "PC-2,Rejeté,cassé",
+    ))
+    # Ligne 2 : doublon écarté ; ligne 5 : invalide, n'écarte pas la ligne 4
+    assert rejected(report) == [(2, "PC-1"), (5, "PC-2")]
+    assert models(db) == {"PC-1": "Second", "PC-2": "Valide"}
+
+
+def test_duplicate_across_chunks_updates(db):
+    report = run_import(db, csv_rows("PC-1,Premier,new", "PC-2,A,new", "PC-1,Second,good"), chunk_size=2)
+    assert report.rows_failed == 0
+    assert models(db)["PC-1"] == "Second"
+    assert db.scalar(select(Equipment.condition).where(Equipment.serial_number == "PC-1")) == "good"
+
+
+def test_errors_are_truncated(db, monkeypatch):
+    monkeypatch.setattr(importer.settings, "IMPORT_MAX_ERRORS", 2)
+    report = run_import(db, csv_rows(*[f",Sans numéro {index},new" for index in range(4)], "PC-1,A,new"))
+    assert (report.rows_failed, len(report.errors), report.errors_truncated) == (4, 2, True)
+    assert report.rows_imported == 1
+
+
+def test_missing_required_column(db):
+    with pytest.raises(ValueError):
+        run_import(db, "serial_number,condition\nPC-1,new\n")
@@ -0,0 +1,22 @@
+"""Moteur d'intentions du chatbot : intention et entités de chaque question étiquetée."""
+import json
+from pathlib import Path
+
+import pytest
+
+from app.services import intent
+
+CORPUS = json.loads((Path(__file__).parent / "fixtures" / "intent_corpus.json").read_text(encoding="utf-8"))
+
+
+@pytest.mark.parametrize("case", CORPUS, ids=[case["question"] for case in CORPUS])
+def test_labelled_question(case):
+    parsed = intent.parse(case["question"])
+
+    assert parsed.intent == case["intent"]
+    assert parsed.entities == case["entities"]
+
+
+def test_corpus_covers_every_intent():
+    labelled = {case["intent"] for case in CORPUS}
+    assert {intent.COUNT, intent.LOCATE, intent.LIST, intent.INVENTORY, intent.UNKNOWN} <= labelled
@@ -0,0 +1,124 @@
+"""File de tâches : battement de cœur et réclamation exclusive d'une tâche remise en file."""
+import threading
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app.db import schema
+from app.db.session import Base
+from app.models.job import Job, JobStatus
+from app.services import jobs
+from app.services.jobs import JobProgress, JobQueue, JobReclaimed, job_handler
+
+RECLAIMED_KIND = "test_reclaimed"
+
+
+@job_handler(RECLAIMED_KIND)
+def run_reclaimed(db, job, progress):
+    # Pendant une étape longue, la tâche est déclarée orpheline et reprise ailleurs
+    queue = JobQueue(progress._session_factory)
+    make_stale(progress._session_factory, job.id)
+    queue._requeue_stale()
+    assert queue._claim_next()[0] == job.id
+    progress.flush()
+    return {"done": True}
+
+
+@pytest.fixture
+def queue(session_factory):
+    queue = JobQueue(session_factory, workers=1)
+    queue._slots = threading.Semaphore(1)
+    return queue
+
+
+def submit(session_factory, kind: str = RECLAIMED_KIND) -> str:
+    with session_factory() as db:
+        job = Job(kind=kind, status=JobStatus.QUEUED.value)
+        db.add(job)
+        db.commit()
+        return job.id
+
+
+def make_stale(session_factory, job_id: str) -> None:
+    with session_factory() as db:
+        job = db.get(Job, job_id)
+        job.updated_at = jobs._utcnow() - timedelta(seconds=jobs.settings.JOB_STALE_AFTER_SECONDS + 1)
+        db.commit()
+
+
+def status(session_factory, job_id: str) -> Job:
+    with session_factory() as db:
+        return db.get(Job, job_id)
+
+
+def test_claim_sets_a_fresh_token(queue, session_factory):
+    job_id = submit(session_factory)
+    claimed, token = queue._claim_next()
+    assert claimed == job_id
+    assert status(session_factory, job_id).claim_token == token
+    assert queue._running == {job_id: token}
+    assert queue._claim_next() is None
+
+
+def test_heartbeat_keeps_long_step_from_being_requeued(queue, session_factory):
+    job_id = submit(session_factory)
+    queue._claim_next()
+    make_stale(session_factory, job_id)
+    queue._heartbeat()
+    queue._requeue_stale()
+    assert status(session_factory, job_id).status == JobStatus.RUNNING.value
+
+
+def test_heartbeat_is_throttled(queue, session_factory):
+    job_id = submit(session_factory)
+    queue._claim_next()
+    queue._heartbeat()
+    make_stale(session_factory, job_id)
+    queue._heartbeat()
+    queue._requeue_stale()
+    assert status(session_factory, job_id).status == JobStatus.QUEUED.value
+
+
+def test_stale_claim_cannot_finish_or_publish(queue, session_factory):
+    job_id = submit(session_factory)
+    _, first = queue._claim_next()
+    make_stale(session_factory, job_id)
+    queue._requeue_stale()
+    assert status(session_factory, job_id).claim_token is None
+    _, second = queue._claim_next()
+
+    with pytest.raises(JobReclaimed):
+        JobProgress(session_factory, job_id, first).flush()
+    with pytest.raises(JobReclaimed):
+        queue._finish(job_id, first, JobStatus.SUCCEEDED, result={"by": "first"})
+    queue._finish(job_id, second, JobStatus.SUCCEEDED, result={"by": "second"})
+    job = status(session_factory, job_id)
+    assert (job.status, job.result) == (JobStatus.SUCCEEDED.value, {"by": "second"})
+    with pytest.raises(JobReclaimed):
+        queue._finish(job_id, second, JobStatus.FAILED, error="deux fois")
+
+
+def test_reclaimed_worker_abandons_the_job(queue, session_factory):
+    job_id = submit(session_factory)
+    _, token = queue._claim_next()
+    queue._slots.acquire()
+    queue._run(job_id, token)
+
+    job = status(session_factory, job_id)
+    # Toujours en cours, sous la réclamation du second worker
+    assert job.status == JobStatus.RUNNING.value
+    assert job.claim_token not in (None, token)
+    assert job.finished_at is None
+    assert job_id not in queue._running
+
+
+def test_schema_upgrade_adds_claim_token_to_existing_table(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(text("ALTER TABLE jobs DROP COLUMN claim_token"))
+    assert schema.upgrade(engine) == ["jobs.claim_token"]
+    assert schema.upgrade(engine) == []
+    assert "claim_token" in {column["name"] for column in inspect(engine).get_columns("jobs")}
+    engine.dispose()
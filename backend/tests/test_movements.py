@@ -0,0 +1,52 @@
+"""Rétention du journal des mouvements : archive persistante obligatoire avant tout DROP."""
+import gzip
+import json
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+from app.core.config import settings
+from app.services import movements
+
+NOW = datetime(2024, 6, 15, tzinfo=timezone.utc)
+OLD = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def old_month(db, monkeypatch):
+    """Trois mouvements en janvier, rétention de deux mois au 15 juin."""
+    monkeypatch.setattr(settings, "MOVEMENT_RETENTION_MONTHS", 2)
+    movements.record(db, [
+        {"equipment_id": 1, "employee_id": 1, "action": "moved", "timestamp": OLD.replace(day=day)}
+        for day in (3, 10, 20)
+    ])
+    db.commit()
+    return OLD
+
+
+def test_maintain_keeps_partitions_without_archive_dir(db, old_month, monkeypatch):
+    monkeypatch.setattr(settings, "MOVEMENT_ARCHIVE_DIR", None)
+    result = movements.maintain(db, now=NOW)
+    assert result["archived"] == []
+    assert old_month in movements.partitions(db)
+    assert len(movements.query(db, start=old_month, end=movements.add_months(old_month, 1))[0]) == 3
+
+
+def test_maintain_archives_before_drop(db, old_month, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "MOVEMENT_ARCHIVE_DIR", str(tmp_path / "archives"))
+    result = movements.maintain(db, now=NOW)
+    assert [archive["partition"] for archive in result["archived"]] == [movements.partition_name(old_month)]
+    assert old_month not in movements.partitions(db)
+
+    path = result["archived"][0]["path"]
+    assert not os.path.exists(f"{path}.part")
+    with gzip.open(path, "rt") as archive:
+        lines = [json.loads(line) for line in archive]
+    assert len(lines) == result["archived"][0]["rows"] == 3
+
+
+def test_archive_partition_requires_directory(db, old_month, monkeypatch):
+    monkeypatch.setattr(settings, "MOVEMENT_ARCHIVE_DIR", None)
+    with pytest.raises(ValueError):
+        movements.archive_partition(db, old_month)
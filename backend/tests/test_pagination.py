@@ -0,0 +1,69 @@
+"""Pagination par curseur : parcours complet identique au tri demandé, sans doublon ni trou."""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from app.crud import equipment as crud_equipment
+from app.crud.pagination import _page_statement, parse_sort
+from app.models.equipment import Equipment
+
+START = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def rows(db):
+    """Douze équipements : statuts et dates répétés, quelques updated_at NULL."""
+    statuses = ("in_stock", "assigned", "maintenance")
+    db.add_all([
+        Equipment(serial_number=f"PC-{index:02d}", model="Latitude", equipment_type="laptop", condition="new",
+                  status=statuses[index % 3])
+        for index in range(12)
+    ])
+    db.commit()
+    for equipment in db.scalars(select(Equipment)):
+        stamp = None if equipment.id % 4 == 0 else START + timedelta(days=equipment.id % 3)
+        db.execute(update(Equipment).where(Equipment.id == equipment.id).values(updated_at=stamp))
+    db.commit()
+    return db.execute(select(Equipment.id, Equipment.status, Equipment.updated_at)).all()
+
+
+def walk(db, sort: str, limit: int = 5):
+    ids, cursor = [], None
+    while True:
+        page, cursor = crud_equipment.get_equipment(db, limit=limit, cursor=cursor, sort=sort)
+        ids += [row.id for row in page]
+        if cursor is None:
+            return ids
+
+
+def ordered(rows, *keys) -> list:
+    """Ordre attendu : tris stables successifs, NULL plus grand que toute valeur."""
+    for index, descending in reversed(keys):
+        rows = sorted(rows, key=lambda row: (False, row[index]) if row[index] is not None else (True,),
+                      reverse=descending)
+    return [row[0] for row in rows]
+
+
+@pytest.mark.parametrize("limit", [1, 5, 12])
+def test_mixed_directions_round_trip(db, rows, limit):
+    assert walk(db, "-status,id", limit) == ordered(rows, (1, True), (0, False))
+    # id implicite : il suit le sens de la dernière clé
+    assert walk(db, "status,-updated_at", limit) == ordered(rows, (1, False), (2, True), (0, True))
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_nullable_key_round_trip(db, rows, descending):
+    sort = "-updated_at" if descending else "updated_at"
+    assert walk(db, sort, 3) == ordered(rows, (2, descending), (0, descending))
+
+
+def test_explicit_id_keeps_its_position():
+    sort_keys = parse_sort("-id,status", crud_equipment.SORTABLE_FIELDS)
+    stmt, columns = _page_statement(select(Equipment), sort_keys, Equipment.id, 10, None, 0)
+    assert columns == [Equipment.id]
+    assert "ORDER BY equipment.id DESC" in str(stmt)
+
+    sort_keys = parse_sort("status,id", crud_equipment.SORTABLE_FIELDS)
+    _, columns = _page_statement(select(Equipment), sort_keys, Equipment.id, 10, None, 0)
+    assert columns == [Equipment.status, Equipment.id]
@@ -0,0 +1,84 @@
+"""Budgets de requêtes SQL des endpoints : constants quelle que soit la taille des données."""
+import pytest
+from sqlalchemy import select
+
+from app.core.query_budget import QueryBudgetExceeded, max_queries
+from app.models.emplacements import Emplacement
+from app.models.employee import Employee
+from app.models.equipment import Equipment
+from app.schemas.assignment import AssignmentItem
+from app.services import assignment
+
+# Au-delà, une même instruction répétée trahit une boucle par ligne (N+1)
+REPEAT_THRESHOLD = 3
+
+
+@pytest.fixture(params=[3, 30], ids=["small", "large"])
+def inventory(request, db, user):
+    """Employés, emplacements et équipements, tous attribués au premier employé (historique ouvert)."""
+    size = request.param
+    db.add_all([Employee(name=f"Employé {index}", email=f"e{index}@example.com", cuid=f"CUID{index:04d}")
+                for index in range(size)])
+    db.add_all([Emplacement(site="Paris", etage=str(index), rosace="R1") for index in range(size)])
+    db.add_all([Equipment(serial_number=f"PC-{index:03d}", model="Latitude", equipment_type="laptop",
+                          condition="new", status="in_stock") for index in range(size)])
+    db.commit()
+    employees = db.scalars(select(Employee.id).order_by(Employee.id)).all()
+    equipment = db.scalars(select(Equipment.id).order_by(Equipment.id)).all()
+    assignment.apply_assignments(
+        db, [AssignmentItem(equipment_id=equipment_id, employee_id=employees[0]) for equipment_id in equipment],
+        user.id,
+    )
+    return employees, equipment
+
+
+def test_employee_history(client, inventory):
+    employees, equipment = inventory
+    with max_queries(2, REPEAT_THRESHOLD):
+        response = client.get(f"/api/v1/employees/{employees[0]}/history")
+    assert response.status_code == 200
+    assert len(response.json()) == len(equipment)
+
+
+@pytest.mark.parametrize("resource", ["equipment", "employees", "emplacements"])
+def test_paginated_lists(client, inventory, resource):
+    # ETag des versions, page, total
+    with max_queries(3, REPEAT_THRESHOLD):
+        response = client.get(f"/api/v1/{resource}", params={"limit": 10, "count": "exact"})
+    assert response.status_code == 200
+    assert len(response.json()) == min(10, int(response.headers["X-Total-Count"]))
+
+
+def test_update_equipment(client, inventory):
+    _, equipment = inventory
+    with max_queries(6, REPEAT_THRESHOLD):
+        response = client.put(f"/api/v1/equipment/{equipment[1]}", json={"model": "Latitude 7450"})
+    assert response.status_code == 200
+
+
+def test_update_equipment_reassigns(client, inventory):
+    employees, equipment = inventory
+    with max_queries(13, REPEAT_THRESHOLD):
+        response = client.put(f"/api/v1/equipment/{equipment[1]}", json={"employee_id": employees[1]})
+    assert response.status_code == 200
+    assert response.json()["employee_id"] == employees[1]
+
+
+@pytest.mark.parametrize("changes, budget", [
+    (lambda employees: {"condition": "good"}, 7),
+    (lambda employees: {"employee_id": employees[1], "status": "assigned"}, 11),
+], ids=["fields", "reassign"])
+def test_bulk_update(client, inventory, changes, budget):
+    employees, equipment = inventory
+    with max_queries(budget, REPEAT_THRESHOLD):
+        response = client.patch("/api/v1/equipment/bulk", json={"ids": equipment, "changes": changes(employees)})
+    assert response.status_code == 200
+    assert response.json()["succeeded"] == len(equipment)
+
+
+def test_budget_reports_per_row_queries(db, inventory):
+    _, equipment = inventory
+    with pytest.raises(QueryBudgetExceeded):
+        with max_queries(100, REPEAT_THRESHOLD):
+            for equipment_id in equipment:
+                db.get(Equipment, equipment_id, populate_existing=True)
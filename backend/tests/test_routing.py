@@ -0,0 +1,180 @@
+"""Lectures sur réplica et lecture de ses propres écritures, avec deux bases SQLite (primaire et réplica)."""
+import time
+
+import pytest
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.core.security import create_access_token
+from app.db import routing
+from app.db.pool import PoolLivenessMonitor, PoolMetrics
+from app.db.routing import READ_AFTER_HEADER, ReplicaRouter, ReplicaRoutingMiddleware, RoutingSession, WritePositions
+from app.db.session import Base
+from app.models.emplacements import Emplacement
+from app.models.outbox import OutboxEvent
+
+
+def database(path):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def outbox_event(engine) -> None:
+    with engine.begin() as connection:
+        connection.execute(insert(OutboxEvent.__table__).values(resource="emplacements", action="changed"))
+
+
+@pytest.fixture
+def cluster(tmp_path):
+    """Primaire et réplica à la même position ; seul le réplica contient le site ``replica``."""
+    primary, replica = database(tmp_path / "primary.db"), database(tmp_path / "replica.db")
+    for engine in (primary, replica):
+        outbox_event(engine)
+    with replica.begin() as connection:
+        connection.execute(insert(Emplacement.__table__).values(site="replica", etage="0", rosace="R"))
+    router = ReplicaRouter(primary, [replica], interval_seconds=60, max_lag_seconds=5)
+    router.refresh()
+    factory = sessionmaker(bind=primary, class_=RoutingSession, router=router, replicas=[replica])
+    yield router, factory
+    primary.dispose()
+    replica.dispose()
+
+
+def served_by(factory) -> str:
+    with factory() as db:
+        return "replica" if db.scalar(select(Emplacement.site).where(Emplacement.site == "replica")) else "primary"
+
+
+def write(factory) -> None:
+    with factory() as db:
+        db.add(Emplacement(site="primary", etage="0", rosace="R"))
+        db.commit()
+
+
+# ---------------------------------------------------------------------------
+# RoutingSession
+# ---------------------------------------------------------------------------
+
+def test_reads_go_to_replica_only_in_read_only_requests(cluster):
+    router, factory = cluster
+    assert served_by(factory) == "primary"
+    with routing.route(read_only=False):
+        assert served_by(factory) == "primary"
+    with routing.route(read_only=True):
+        assert served_by(factory) == "replica"
+    assert router.stats()["reads"] == {"replica0": 1}
+
+
+def test_session_stays_on_primary_after_writing(cluster):
+    _, factory = cluster
+    with routing.route(read_only=True):
+        with factory() as db:
+            db.add(Emplacement(site="primary", etage="0", rosace="R"))
+            db.flush()
+            assert db.scalar(select(Emplacement.site)) == "primary"
+
+
+def test_write_position_keeps_reads_on_primary_until_replica_catches_up(cluster):
+    router, factory = cluster
+    with routing.route(read_only=False) as current:
+        write(factory)
+    assert current.position == 2
+    with routing.route(read_only=True, after=current.position):
+        assert served_by(factory) == "primary"
+    assert router.stats()["reads"] == {"primary_read_your_writes": 1}
+
+    # Le réplica rejoint la position
+    outbox_event(router.replicas[0])
+    router.refresh()
+    with routing.route(read_only=True, after=current.position):
+        assert served_by(factory) == "replica"
+
+
+def test_unhealthy_replica_is_skipped(cluster, tmp_path):
+    router, factory = cluster
+    # Réplica injoignable au relevé suivant
+    router.replicas[0] = create_engine(f"sqlite:///{tmp_path / 'absent' / 'replica.db'}")
+    router.refresh()
+    assert router.statuses[0].healthy is False
+    with routing.route(read_only=True):
+        assert served_by(factory) == "primary"
+
+
+# ---------------------------------------------------------------------------
+# Middleware : position retenue par utilisateur
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def api(cluster):
+    router, factory = cluster
+
+    async def emplacements(request):
+        if request.method == "POST":
+            write(factory)
+            return JSONResponse({})
+        return JSONResponse({"served_by": served_by(factory)})
+
+    app = Starlette(routes=[Route("/emplacements", emplacements, methods=["GET", "POST"])])
+    return ReplicaRoutingMiddleware(app, router, WritePositions(ttl_seconds=60))
+
+
+def call(api, method: str, email: str = None, **headers):
+    # Client neuf à chaque appel : aucun cookie renvoyé, comme un client qui les ignore
+    if email:
+        headers["Authorization"] = f"Bearer {create_access_token({'sub': email})}"
+    return TestClient(api).request(method, "/emplacements", headers=headers)
+
+
+def test_writer_reads_own_writes_without_cookie_or_header(api):
+    assert call(api, "GET", "ada@example.com").json()["served_by"] == "replica"
+    response = call(api, "POST", "ada@example.com")
+    assert response.headers[READ_AFTER_HEADER] == "2"
+
+    assert call(api, "GET", "ada@example.com").json()["served_by"] == "primary"
+    # Les autres utilisateurs ne sont pas concernés
+    assert call(api, "GET", "bob@example.com").json()["served_by"] == "replica"
+    assert call(api, "GET").json()["served_by"] == "replica"
+
+
+def test_read_after_header_from_another_pod(api):
+    assert call(api, "GET", **{READ_AFTER_HEADER: "2"}).json()["served_by"] == "primary"
+
+
+def test_invalid_token_is_not_a_principal(api):
+    call(api, "POST", **{"Authorization": "Bearer pas-un-jeton"})
+    assert call(api, "GET", **{"Authorization": "Bearer pas-un-jeton"}).json()["served_by"] == "replica"
+
+
+def test_write_positions_expire_and_are_bounded(monkeypatch):
+    positions = WritePositions(ttl_seconds=10, max_entries=2)
+    positions.put("a", 5)
+    positions.put("a", 3)
+    assert positions.get("a") == 5
+    positions.put("b", 1)
+    positions.put("c", 1)
+    assert positions.get("a") is None
+    assert positions.get("c") == 1
+
+    now = time.monotonic()
+    monkeypatch.setattr(routing.time, "monotonic", lambda: now + 11)
+    assert positions.get("c") is None
+
+
+# ---------------------------------------------------------------------------
+# Vivacité des pools
+# ---------------------------------------------------------------------------
+
+def test_liveness_checks_every_engine(cluster, tmp_path):
+    router, _ = cluster
+    broken = create_engine(f"sqlite:///{tmp_path / 'absent' / 'replica.db'}")
+    engines = [router.primary, broken, router.replicas[0]]
+    for index, engine in enumerate(engines):
+        engine.pool.metrics = PoolMetrics(f"engine{index}")
+
+    PoolLivenessMonitor(engines, [], interval_seconds=60).check()
+    assert [engine.pool.metrics.liveness_failures for engine in engines] == [0, 1, 0]
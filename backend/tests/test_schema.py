@@ -0,0 +1,42 @@
+"""Mise à niveau d'une base existante : index des modèles créés après coup, sans rien refaire."""
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app.db import schema
+from app.db.session import Base
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'deployed.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def indexes(engine, table: str) -> set:
+    return {info["name"] for info in inspect(engine).get_indexes(table)}
+
+
+def test_upgrade_of_current_schema_does_nothing(engine):
+    assert schema.upgrade(engine) == []
+
+
+def test_upgrade_creates_missing_indexes(engine):
+    # Base déployée avant l'ajout des index composites
+    with engine.begin() as connection:
+        connection.execute(text("DROP INDEX ix_equipment_status_type_id"))
+        connection.execute(text("DROP INDEX ix_employee_equipment_history_equipment_assigned"))
+
+    assert sorted(schema.upgrade(engine)) == [
+        "ix_employee_equipment_history_equipment_assigned", "ix_equipment_status_type_id"
+    ]
+    assert "ix_equipment_status_type_id" in indexes(engine, "equipment")
+    assert "ix_employee_equipment_history_equipment_assigned" in indexes(engine, "employee_equipment_history")
+    assert schema.upgrade(engine) == []
+
+
+def test_upgrade_skips_postgresql_only_indexes(engine):
+    # Trigrammes GIN et GiST de période : ddl_if les réserve à PostgreSQL
+    assert "ix_equipment_model_trgm" not in indexes(engine, "equipment")
+    assert "ix_equipment_model_trgm" not in schema.upgrade(engine)
@@ -0,0 +1,112 @@
+"""``RowSerializer`` produit le même JSON que le schéma de réponse Pydantic."""
+from datetime import datetime, timedelta, timezone
+
+import orjson
+import pytest
+from sqlalchemy import select
+
+from app.crud import emplacement as emplacement_crud
+from app.crud import employee as employee_crud
+from app.crud import equipment as equipment_crud
+from app.crud.emplacement import EMPLACEMENT_ROWS
+from app.crud.employee import EMPLOYEE_ROWS
+from app.core.serialization import ORJSON_OPTIONS
+from app.crud.equipment import EQUIPMENT_ROWS
+from app.models.emplacements import Emplacement
+from app.models.employee import Employee
+from app.models.equipment import Equipment
+from app.schemas.emplacements import EmplacementResponse
+from app.schemas.employee import Employee as EmployeeSchema
+from app.schemas.equipment import EquipmentResponse
+
+# Sérialiseur, schéma de réponse, modèle
+LISTS = [
+    pytest.param(EQUIPMENT_ROWS, EquipmentResponse, Equipment, id="equipment"),
+    pytest.param(EMPLOYEE_ROWS, EmployeeSchema, Employee, id="employees"),
+    pytest.param(EMPLACEMENT_ROWS, EmplacementResponse, Emplacement, id="emplacements"),
+]
+
+# Datetimes stockés : avec et sans microsecondes
+STAMPS = [datetime(2024, 3, 31, 23, 59, 59, 123456), datetime(2024, 1, 1, 8, 0, 0)]
+
+
+def _pydantic(schema, entities):
+    return [schema.model_validate(entity).model_dump(mode="json") for entity in entities]
+
+
+@pytest.fixture
+def seeded(db):
+    db.add_all([
+        Emplacement(site="Tunis", etage="3", rosace="R1", exact_position="Bureau 12"),
+        Emplacement(site="Sfax", etage="1", rosace="R2"),
+    ])
+    db.add_all([
+        Employee(name="Amira Ben Salah", email="amira@example.com", cuid="ABCD1234",
+                 contract_type="CDI", department="DSI"),
+        Employee(name="Karim Trabelsi", email="karim@example.com", cuid="EFGH5678"),
+    ])
+    db.flush()
+    db.add_all([
+        Equipment(serial_number="SN-001", model="Latitude 5440", equipment_type="laptop", condition="new",
+                  status="assigned", employee_id=1, emplacement_id=1,
+                  created_at=STAMPS[0], updated_at=STAMPS[0]),
+        Equipment(serial_number="SN-002", model="P2422H", equipment_type="monitor", condition="good",
+                  status="in_stock", created_at=STAMPS[1], updated_at=STAMPS[1]),
+    ])
+    db.commit()
+    return db
+
+
+@pytest.mark.parametrize("serializer, schema, model", LISTS)
+def test_rows_match_schema(seeded, serializer, schema, model):
+    rows = seeded.execute(serializer.project(select(model).order_by(model.id))).all()
+    expected = _pydantic(schema, seeded.scalars(select(model).order_by(model.id)))
+
+    assert len(expected) == 2
+    assert orjson.loads(serializer.dumps(rows)) == expected
+
+
+@pytest.mark.parametrize("stamp", [
+    datetime(2024, 6, 1, 12, 30, 0, 500, tzinfo=timezone.utc),
+    datetime(2024, 6, 1, 12, 30, 0, tzinfo=timezone.utc),
+    datetime(2024, 6, 1, 14, 30, 0, 250000, tzinfo=timezone(timedelta(hours=2))),
+    datetime(2024, 6, 1, 12, 30, 0),
+], ids=["utc-microseconds", "utc", "offset", "naive"])
+def test_datetimes_match_schema(stamp):
+    # Dates avec fuseau telles que les rend PostgreSQL (timestamptz)
+    row = {
+        "serial_number": "SN-003", "model": "ThinkPad", "equipment_type": "laptop", "condition": "fair",
+        "status": "maintenance", "id": 3, "emplacement_id": None, "employee_id": None,
+        "created_at": stamp, "updated_at": stamp,
+    }
+    values = tuple(row[field] for field in EQUIPMENT_ROWS.fields)
+
+    expected = EquipmentResponse.model_validate(row).model_dump(mode="json")
+    assert orjson.loads(EQUIPMENT_ROWS.dumps([values])) == [expected]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("orm_fetch, rows_fetch, schema", [
+    pytest.param(equipment_crud.get_equipment_async, equipment_crud.get_equipment_rows_async,
+                 EquipmentResponse, id="equipment"),
+    pytest.param(employee_crud.get_multi_async, employee_crud.get_rows_async, EmployeeSchema, id="employees"),
+    pytest.param(emplacement_crud.get_emplacements_async, emplacement_crud.get_emplacement_rows_async,
+                 EmplacementResponse, id="emplacements"),
+])
+async def test_list_pages_match_schema(seeded, async_factory, orm_fetch, rows_fetch, schema):
+    # Pages lues comme par les endpoints : une ligne par page, curseur suivi jusqu'au bout
+    orm_pages, rows_pages = [], []
+    async with async_factory() as db:
+        for fetch, pages, encode in (
+            (orm_fetch, orm_pages, lambda items: _pydantic(schema, items)),
+            (rows_fetch, rows_pages, lambda items: orjson.loads(orjson.dumps(items, option=ORJSON_OPTIONS))),
+        ):
+            cursor = None
+            while True:
+                items, cursor = await fetch(db, limit=1, cursor=cursor, sort="id")
+                pages.append(encode(items))
+                if cursor is None:
+                    break
+
+    assert len(rows_pages) == 2
+    assert rows_pages == orm_pages
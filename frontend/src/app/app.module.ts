@@ -23,6 +23,7 @@ import { AppComponent } from './app.component';
 // Interceptors
 import { AuthInterceptor } from './core/interceptors/auth.interceptor';
 import { ErrorInterceptor } from './core/interceptors/error.interceptor';
+import { ReadAfterInterceptor } from './core/interceptors/read-after.interceptor';
 
 // Composants NON standalone
 import { LoginComponent } from './features/auth/login/login.component';
@@ -75,7 +76,8 @@ import { EquipmentFormComponent } from './features/equipment/equipment-form/equi
   ],
   providers: [
     { provide: HTTP_INTERCEPTORS, useClass: AuthInterceptor, multi: true },
-    { provide: HTTP_INTERCEPTORS, useClass: ErrorInterceptor, multi: true }
+    { provide: HTTP_INTERCEPTORS, useClass: ErrorInterceptor, multi: true },
+    { provide: HTTP_INTERCEPTORS, useClass: ReadAfterInterceptor, multi: true }
   ],
   bootstrap: [AppComponent]
 })
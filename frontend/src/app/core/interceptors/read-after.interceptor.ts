@@ -0,0 +1,47 @@
+import { Injectable } from '@angular/core';
+import {
+  HttpRequest,
+  HttpHandler,
+  HttpEvent,
+  HttpInterceptor,
+  HttpResponse
+} from '@angular/common/http';
+import { Observable } from 'rxjs';
+import { tap } from 'rxjs/operators';
+
+// ✅ Même durée que DB_READ_YOUR_WRITES_SECONDS côté API
+const READ_AFTER_TTL_MS = 60_000;
+const READ_AFTER_HEADER = 'X-Read-After';
+
+/**
+ * Lire ses propres écritures : la position renvoyée par l'API après une
+ * écriture est renvoyée avec les requêtes suivantes, pour qu'une lecture
+ * servie par un autre pod n'aille qu'à un réplica qui l'a rejointe.
+ */
+@Injectable()
+export class ReadAfterInterceptor implements HttpInterceptor {
+  private position: number | null = null;
+  private expiresAt = 0;
+
+  intercept(request: HttpRequest<unknown>, next: HttpHandler): Observable<HttpEvent<unknown>> {
+    if (this.position !== null && Date.now() < this.expiresAt) {
+      request = request.clone({
+        setHeaders: {
+          [READ_AFTER_HEADER]: String(this.position)
+        }
+      });
+    }
+
+    return next.handle(request).pipe(
+      tap(event => {
+        if (event instanceof HttpResponse) {
+          const value = Number(event.headers.get(READ_AFTER_HEADER));
+          if (value && value >= (this.position ?? 0)) {
+            this.position = value;
+            this.expiresAt = Date.now() + READ_AFTER_TTL_MS;
+          }
+        }
+      })
+    );
+  }
+}